@@ -37,12 +37,12 @@ class ChatAgent:
             # OR brand contains the full query
             
             # Start with base query
-            db_query = self.sb.client.table("products").select("*")
+            db_query = self.sb.db.table("products").select("*")
             
             # If plain single word, use simple OR
             if len(terms) == 1:
                 db_query = db_query.or_(f"product_name.ilike.%{query}%,sku.ilike.%{query}%,brand.ilike.%{query}%")
-                response = db_query.limit(10).execute()
+                response = await db_query.limit(10).execute()
             else:
                 # For multiple words, we want:
                 # (Name matches Term1 OR SKU matches Term1 OR Brand matches Term1)
@@ -53,14 +53,14 @@ class ChatAgent:
                 # Supabase/Postgrest allows chaining filters which acts as AND.
                 # So we chain an .or_() for each term.
                 
-                temp_q = self.sb.client.table("products").select("*")
+                temp_q = self.sb.db.table("products").select("*")
                 for term in terms:
                     # Construct the OR filter for this specific term
                     # "product_name.ilike.%term%,sku.ilike.%term%,brand.ilike.%term%"
                     term_filter = f"product_name.ilike.%{term}%,sku.ilike.%{term}%,brand.ilike.%{term}%"
                     temp_q = temp_q.or_(term_filter)
                 
-                response = temp_q.limit(10).execute()
+                response = await temp_q.limit(10).execute()
 
             products = response.data
             
@@ -77,7 +77,7 @@ class ChatAgent:
                      conditions.append(f"brand.ilike.%{t}%")
                  
                  or_clause = ",".join(conditions)
-                 response = self.sb.client.table("products").select("*").or_(or_clause).limit(10).execute()
+                 response = await self.sb.db.table("products").select("*").or_(or_clause).limit(10).execute()
                  products = response.data
 
             if not products:
@@ -88,7 +88,7 @@ class ChatAgent:
             supplier_map = {}
             if supplier_ids:
                 try:
-                    sup_res = self.sb.client.table("suppliers").select("id, name").in_("id", supplier_ids).execute()
+                    sup_res = await self.sb.db.table("suppliers").select("id, name").in_("id", supplier_ids).execute()
                     for s in sup_res.data:
                         supplier_map[s['id']] = s['name']
                 except Exception as e:
@@ -130,11 +130,11 @@ class ChatAgent:
             # Check for exact order number match match
             clean_query = query.strip().replace("#", "")
             
-            response = self.sb.client.table("orders_tracker").select("*").eq("order_no", clean_query).execute()
+            response = await self.sb.db.table("orders_tracker").select("*").eq("order_no", clean_query).execute()
             
             if not response.data:
                 # Try partial match on order_name or supplier
-                response = self.sb.client.table("orders_tracker").select("*").or_(f"order_name.ilike.%{query}%,supplier.ilike.%{query}%").limit(5).execute()
+                response = await self.sb.db.table("orders_tracker").select("*").or_(f"order_name.ilike.%{query}%,supplier.ilike.%{query}%").limit(5).execute()
             
             orders = response.data
             if not orders:
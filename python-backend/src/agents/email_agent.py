@@ -724,7 +724,7 @@ Extract invoice details."""
             supplier_email = ""
             try:
                 # Case-insensitive search for supplier
-                sup_res = self.supabase.client.table("supplier_addresses").select("contact_email").ilike("name", supplier_name).limit(1).execute()
+                sup_res = await self.supabase.db.table("supplier_addresses").select("contact_email").ilike("name", supplier_name).limit(1).execute()
                 if sup_res.data and sup_res.data[0].get("contact_email"):
                     supplier_email = sup_res.data[0]["contact_email"]
             except Exception as e:
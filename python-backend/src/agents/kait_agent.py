@@ -22,7 +22,7 @@ class KaitAgent:
     async def get_workflow_state(self, order_no: str) -> Optional[Dict[str, Any]]:
         """Fetch the current Kait state for an order."""
         try:
-            response = self.sb.client.table("kait_workflows").select("*").eq("order_no", order_no).execute()
+            response = await self.sb.db.table("kait_workflows").select("*").eq("order_no", order_no).execute()
             if response.data:
                 return response.data[0]
             return None
@@ -42,7 +42,7 @@ class KaitAgent:
             "logs": [f"Workflow initialized at {datetime.now()}"]
         }
         
-        response = self.sb.client.table("kait_workflows").insert(payload).execute()
+        response = await self.sb.db.table("kait_workflows").insert(payload).execute()
         return response.data[0]
 
     async def log_action(self, order_no: str, action: str):
@@ -55,7 +55,7 @@ class KaitAgent:
         current_logs = state.get("logs", []) or []
         current_logs.append(f"[{datetime.now().strftime('%Y-%m-%d %H:%M')}] {action}")
         
-        self.sb.client.table("kait_workflows").update({
+        await self.sb.db.table("kait_workflows").update({
             "logs": current_logs,
             "last_action_at": datetime.now().isoformat()
         }).eq("order_no", order_no).execute()
@@ -88,7 +88,7 @@ class KaitAgent:
         REINFORCEMENT LEARNING STEP.
         """
         # Fetch rejected drafts
-        response = self.sb.client.table("kait_email_drafts").select("*").eq("status", "changes_requested").execute()
+        response = await self.sb.db.table("kait_email_drafts").select("*").eq("status", "changes_requested").execute()
         
         for draft in response.data:
             feedback = draft.get("feedback")
@@ -152,7 +152,7 @@ Output JSON:
             
             # 1. Store Memory (if learned)
             if result.get("memory_key") and result.get("memory_value"):
-                self.sb.client.table("kait_memories").insert({
+                await self.sb.db.table("kait_memories").insert({
                     "category": "learning",
                     "key_pattern": result["memory_key"],
                     "value": result["memory_value"],
@@ -181,7 +181,7 @@ Output JSON:
                 if sup_info and sup_info.get("contact_email"):
                     updates["to_email"] = sup_info["contact_email"]
             
-            self.sb.client.table("kait_email_drafts").update(updates).eq("id", draft["id"]).execute()
+            await self.sb.db.table("kait_email_drafts").update(updates).eq("id", draft["id"]).execute()
             await self.log_action(draft['order_no'], f"Redrafted email based on feedback: {result['explanation']}")
 
         except Exception as e:
@@ -195,7 +195,8 @@ Output JSON:
         email_client = get_email_client()
 
         # Fetch approved drafts
-        response = self.sb.client.table("kait_email_drafts").select("*").eq("status", "approved").execute()
+        response = await self.sb.db.table("kait_email_drafts").select("*").eq("status", "approved").execute()
+        tracker_updates = []
         
         for draft in response.data:
             print(f"Sending Approved Email: {draft['id']} to {draft['to_email']}")
@@ -210,7 +211,7 @@ Output JSON:
             
             if msg_id:
                 # Mark as Sent
-                self.sb.client.table("kait_email_drafts").update({
+                await self.sb.db.table("kait_email_drafts").update({
                     "status": "sent",
                     "sent_at": datetime.now().isoformat(),
                     "message_id": msg_id
@@ -227,7 +228,7 @@ Output JSON:
                 # So we should find the workflow and update the thread_id.
                 
                 # Check for active workflow
-                wf_res = self.sb.client.table("kait_workflows").select("*").eq("order_no", draft['order_no']).execute()
+                wf_res = await self.sb.db.table("kait_workflows").select("*").eq("order_no", draft['order_no']).execute()
                 if wf_res.data:
                     wf = wf_res.data[0]
                     updates = {}
@@ -236,6 +237,21 @@ Output JSON:
                     # For now, let's just log it.
                     await self.log_action(draft['order_no'], f"Approved Email Sent to {draft['to_email']}. ID: {msg_id}")
 
+                if draft.get('order_no'):
+                    tracker_updates.append({
+                        "order_no": draft['order_no'],
+                        "updates": f"Kait sent email to {draft['to_email']}: {draft['subject']}",
+                        "source": "agent",
+                        "last_modified_by": "kait",
+                    })
+
+        # Note every sent email on the order trackers in one atomic batch
+        if tracker_updates:
+            try:
+                await self.sb.merge_order_trackers(tracker_updates)
+            except Exception as e:
+                logger.error(f"Failed to update order trackers for sent emails: {e}")
+
     async def check_for_replies(self):
         """
         Scan inbox for replies to our threads.
@@ -257,15 +273,15 @@ Output JSON:
             matched_wf = None
             if in_reply_to:
                 # Check supplier threads
-                dataset = self.sb.client.table("kait_workflows").select("*").eq("supplier_thread_id", in_reply_to).execute()
+                dataset = await self.sb.db.table("kait_workflows").select("*").eq("supplier_thread_id", in_reply_to).execute()
                 if dataset.data:
                     matched_wf = dataset.data[0]
                     await self.log_action(matched_wf["order_no"], f"Received Supplier Reply from {sender}")
-                    self.sb.client.table("kait_workflows").update({"status": "supplier_replied"}).eq("id", matched_wf["id"]).execute()
+                    await self.sb.db.table("kait_workflows").update({"status": "supplier_replied"}).eq("id", matched_wf["id"]).execute()
                 
                 # Check customer threads
                 if not matched_wf:
-                    dataset = self.sb.client.table("kait_workflows").select("*").eq("customer_thread_id", in_reply_to).execute()
+                    dataset = await self.sb.db.table("kait_workflows").select("*").eq("customer_thread_id", in_reply_to).execute()
                     if dataset.data:
                         matched_wf = dataset.data[0]
                         await self.log_action(matched_wf["order_no"], f"Received Customer Reply from {sender}")
@@ -400,7 +416,7 @@ Kait
         
         # Need Supplier Email - Re-fetch or cache? 
         # Need Supplier Email
-        order_info = self.sb.client.table("orders_tracker").select("supplier").eq("order_no", order_no).execute()
+        order_info = await self.sb.db.table("orders_tracker").select("supplier").eq("order_no", order_no).execute()
         if not order_info.data: return
         supplier_name = order_info.data[0]["supplier"]
         supplier_info = await self.sb.get_supplier_address(supplier_name)
@@ -525,7 +541,7 @@ Audico Online Team
                     await self.log_action(order_no, f"Extracted Total: {extracted_total}")
                     
                     # Update status to 'invoiced'
-                    self.sb.client.table("kait_workflows").update({
+                    await self.sb.db.table("kait_workflows").update({
                         "status": "invoiced",
                         "metadata": wf.get("metadata", {}) | {"invoice_file": filename, "invoice_total": extracted_total}
                     }).eq("id", wf["id"]).execute()
@@ -596,7 +612,7 @@ Audico Online Team
         # Get stale workflows
         time_limit = datetime.now() - timedelta(hours=4)
         
-        response = self.sb.client.table("kait_workflows") \
+        response = await self.sb.db.table("kait_workflows") \
             .select("*") \
             .eq("status", "supplier_contacted") \
             .lt("last_action_at", time_limit.isoformat()) \
@@ -620,7 +636,7 @@ Audico Online Team
         
         # Need to re-fetch supplier email (it's not in wf, maybe I should store it?)
         # For now, fetch from tracker -> supplier -> address
-        order_info = self.sb.client.table("orders_tracker").select("supplier").eq("order_no", order_no).execute()
+        order_info = await self.sb.db.table("orders_tracker").select("supplier").eq("order_no", order_no).execute()
         if not order_info.data: return
         
         supplier_name = order_info.data[0]["supplier"]
@@ -663,9 +679,9 @@ Kait
         # We look for orders where we don't have a kait_workflow record yet.
         
         # 1. Get recent orders with supplier
-        recent_orders_response = self.sb.client.table("orders_tracker") \
+        recent_orders_response = await self.sb.db.table("orders_tracker") \
             .select("order_no, supplier, order_name") \
-            .neq("supplier", None) \
+            .not_("supplier", "is", "null") \
             .order("order_no", desc=True) \
             .limit(10) \
             .execute()
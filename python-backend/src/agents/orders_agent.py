@@ -1,13 +1,45 @@
+from datetime import datetime, timedelta
 from typing import Dict, Any, List, Optional
 from fastapi import HTTPException
 from src.connectors.shiplogic import get_shiplogic_connector
 from src.connectors.opencart import get_opencart_connector
 from src.connectors.supabase import get_supabase_connector
 from src.agents.email_agent import get_email_agent
+from src.utils.config import get_config
 from src.utils.logging import AgentLogger
 
 logger = AgentLogger("OrdersLogisticsAgent")
 
+# Valid OpenCart status IDs to sync into dashboard
+VALID_STATUSES = [1, 2, 3, 5, 15, 18, 23, 29]
+
+# Cancelled/dead statuses — if order already in Supabase, mark as Cancelled
+CANCELLED_STATUSES = [7, 8, 9, 10, 11, 14, 16, 17]
+# 7=Canceled, 8=Denied, 9=Cancelled Reversal, 10=Failed,
+# 11=Refunded, 14=Expired, 16=Voided, 17=Chargeback
+
+STATUS_MAP = {
+    1: "Pending",
+    2: "Processing",
+    3: "Shipped",
+    5: "Complete",
+    7: "Cancelled",
+    8: "Cancelled",
+    9: "Cancelled",
+    10: "Cancelled",
+    11: "Refunded",
+    14: "Cancelled",
+    15: "Processed",
+    16: "Cancelled",
+    17: "Cancelled",
+    18: "Awaiting Payment",
+    23: "Paid",
+    29: "Supplier Ordered"
+}
+
+# Supabase config key holding the incremental order sync cursor
+ORDERS_SYNC_CURSOR_KEY = "opencart_orders_sync_cursor"
+
 class OrdersLogisticsAgent:
     """
     Agent responsible for handling order data, logistics operations, and Shiplogic integration.
@@ -373,234 +405,287 @@ class OrdersLogisticsAgent:
 
     async def sync_orders(self) -> Dict[str, Any]:
         """
-        Sync recent orders from OpenCart to Supabase.
+        Sync changed orders from OpenCart to Supabase.
         Syncs valid orders and marks cancelled/refunded orders so dashboard can hide them.
+
+        Incremental: pages through orders modified after the persisted
+        (date_modified, order_id) cursor, so each run only touches what
+        changed. The cursor advances after every page that was written.
+        Each run starts ``orders_sync_overlap_seconds`` before the saved
+        cursor: date_modified has one-second resolution, so an order with a
+        lower order_id modified in the cursor's second would otherwise be
+        missed (re-syncing is safe: the tracker merge is idempotent and
+        enrichment skips emails already drafted).
+
+        The first run (no saved cursor) starts at the newest order, so
+        deploying doesn't draft emails for old orders. With
+        ``orders_sync_backfill_days`` it starts that far back instead, writing
+        trackers only (no enrichment).
         """
         logger.info("sync_orders_started")
         try:
-            # Valid OpenCart status IDs to sync into dashboard
-            VALID_STATUSES = [1, 2, 3, 5, 15, 18, 23, 29]
-
-            # Cancelled/dead statuses — if order already in Supabase, mark as Cancelled
-            CANCELLED_STATUSES = [7, 8, 9, 10, 11, 14, 16, 17]
-            # 7=Canceled, 8=Denied, 9=Cancelled Reversal, 10=Failed,
-            # 11=Refunded, 14=Expired, 16=Voided, 17=Chargeback
-
-            STATUS_MAP = {
-                1: "Pending",
-                2: "Processing",
-                3: "Shipped",
-                5: "Complete",
-                7: "Cancelled",
-                8: "Cancelled",
-                9: "Cancelled",
-                10: "Cancelled",
-                11: "Refunded",
-                14: "Cancelled",
-                15: "Processed",
-                16: "Cancelled",
-                17: "Cancelled",
-                18: "Awaiting Payment",
-                23: "Paid",
-                29: "Supplier Ordered"
-            }
+            config = get_config()
+            page_size = config.orders_sync_page_size
+            cursor = await self._load_orders_cursor(config.orders_sync_overlap_seconds)
+            enrich = cursor is not None
+            if cursor is None:
+                cursor = await self._initial_orders_cursor(config.orders_sync_backfill_days)
+            stats = {"synced": 0, "skipped": 0, "cancelled": 0, "errors": 0}
+            pages = 0
+
+            while True:
+                # 1. Fetch the next page of changed orders
+                orders = await self.opencart.get_orders_changed_since(
+                    cursor["date_modified"], cursor["order_id"], limit=page_size
+                )
+                if not orders:
+                    break
 
-            # 1. Fetch recent orders
-            orders = await self.opencart.get_recent_orders(limit=50)
+                await self._sync_order_page(orders, stats, enrich=enrich)
+                pages += 1
 
-            synced_count = 0
-            skipped_count = 0
-            cancelled_count = 0
-            errors = 0
+                last = orders[-1]
+                cursor = {"date_modified": last["date_modified"], "order_id": int(last["order_id"])}
+                await self._save_orders_cursor(cursor)
+                if len(orders) < page_size:
+                    break
 
-            for order in orders:
-                try:
-                    order_id = str(order["order_id"])
-                    status_id = int(order.get("order_status_id", 0))
-
-                    # Handle cancelled/dead orders: update Supabase if they exist
-                    if status_id in CANCELLED_STATUSES:
-                        existing = await self.supabase.get_order_tracker(order_id)
-                        if existing and existing.get("supplier_status") != "Cancelled":
-                            status_label = STATUS_MAP.get(status_id, "Cancelled")
-                            await self.supabase.upsert_order_tracker(
-                                order_no=order_id,
-                                supplier_status=status_label,
-                                order_paid=False,
-                                last_modified_by="system_sync"
-                            )
-                            logger.info("order_marked_cancelled", order_id=order_id, status_id=status_id)
-                            cancelled_count += 1
-                        else:
-                            skipped_count += 1
-                        continue
-
-                    # Skip truly invalid statuses (0=Unconfirmed, etc.)
-                    if status_id not in VALID_STATUSES:
-                        logger.debug("sync_order_skipped", order_id=order_id, status_id=status_id, reason="invalid_status")
-                        skipped_count += 1
-                        continue
-
-                    status_name = STATUS_MAP.get(status_id, "Processing")
-
-                    # 2. Upsert into Supabase
-                    total = float(order.get("total", 0))
-
-                    # Determine Paid status from OpenCart
-                    # Awaiting Payment (18) or Pending (1) = Unpaid
-                    is_paid = status_id not in [1, 18]
-
-                    full_name = f"{order.get('firstname', '')} {order.get('lastname', '')}".strip()
-                    if not full_name:
-                        full_name = f"Order #{order_id}"
-
-                    # Check if this order was manually edited on dashboard
-                    # If so, don't overwrite order_paid or supplier_status
-                    existing = await self.supabase.get_order_tracker(order_id)
-                    manual_edit = existing and existing.get("last_modified_by") == "dashboard"
-
-                    await self.supabase.upsert_order_tracker(
-                        order_no=order_id,
-                        order_name=full_name,
-                        source="opencart",
-                        cost=total,
-                        supplier_status=status_name if not manual_edit else None,
-                        order_paid=is_paid if not manual_edit else None,
-                        notes=order.get("products_summary") or "",
-                        updates=f"Contact: {order.get('email')} | {order.get('telephone')}",
-                        last_modified_by="system_sync" if not manual_edit else None,
-                    )
+            if not enrich:
+                # First run: persist the starting point even if nothing changed since
+                await self._save_orders_cursor(cursor)
 
-                    # --- NEW: Product Knowledge / Supplier Assignment ---
-                    # Logic: Look up products in DB to find their registered supplier.
-                    # This prevents Kait from "guessing".
+            logger.info("sync_orders_completed", pages=pages, cursor_order_id=cursor["order_id"],
+                        enriched=enrich, **stats)
+            return {"status": "success", **stats}
+            
+        except Exception as e:
+            logger.error("sync_orders_failed", error=str(e))
+            return {"status": "error", "error": str(e)}
+
+    async def _load_orders_cursor(self, overlap_seconds: int) -> Optional[Dict[str, Any]]:
+        """Saved sync cursor moved back ``overlap_seconds``, or None on the first run."""
+        saved = await self.supabase.get_config(ORDERS_SYNC_CURSOR_KEY)
+        if not saved or not saved.get("date_modified"):
+            return None
+        date_modified = datetime.fromisoformat(saved["date_modified"])
+        if overlap_seconds > 0:
+            return {"date_modified": date_modified - timedelta(seconds=overlap_seconds), "order_id": 0}
+        return {"date_modified": date_modified, "order_id": int(saved.get("order_id") or 0)}
+
+    async def _initial_orders_cursor(self, backfill_days: int) -> Dict[str, Any]:
+        """Starting point of the first run: the newest order, or ``backfill_days`` back."""
+        if backfill_days > 0:
+            return {"date_modified": datetime.now() - timedelta(days=backfill_days), "order_id": 0}
+        position = await self.opencart.get_orders_sync_position()
+        if position:
+            return position
+        return {"date_modified": datetime.now(), "order_id": 0}
+
+    async def _save_orders_cursor(self, cursor: Dict[str, Any]) -> None:
+        await self.supabase.set_config(
+            ORDERS_SYNC_CURSOR_KEY,
+            {"date_modified": cursor["date_modified"].isoformat(), "order_id": cursor["order_id"]},
+            description="OpenCart order sync position (date_modified, order_id)",
+        )
+
+    async def _sync_order_page(self, orders: List[Dict[str, Any]], stats: Dict[str, int],
+                               enrich: bool = True) -> None:
+        """Write one page of orders to orders_tracker with a single prefetch and bulk upsert.
+
+        With ``enrich`` off (first-run backfill) only the trackers are written.
+        """
+        existing_trackers = await self.supabase.get_order_trackers([str(o["order_id"]) for o in orders])
+
+        entries = []
+        to_enrich = []
+        for order in orders:
+            try:
+                order_id = str(order["order_id"])
+                status_id = int(order.get("order_status_id", 0))
+                existing = existing_trackers.get(order_id)
+
+                # Handle cancelled/dead orders: update Supabase if they exist
+                if status_id in CANCELLED_STATUSES:
+                    if existing and existing.get("supplier_status") != "Cancelled":
+                        entries.append({
+                            "order_no": order_id,
+                            "supplier_status": STATUS_MAP.get(status_id, "Cancelled"),
+                            "order_paid": False,
+                            "last_modified_by": "system_sync",
+                        })
+                        logger.info("order_marked_cancelled", order_id=order_id, status_id=status_id)
+                        stats["cancelled"] += 1
+                    else:
+                        stats["skipped"] += 1
+                    continue
+
+                # Skip truly invalid statuses (0=Unconfirmed, etc.)
+                if status_id not in VALID_STATUSES:
+                    logger.debug("sync_order_skipped", order_id=order_id, status_id=status_id, reason="invalid_status")
+                    stats["skipped"] += 1
+                    continue
+
+                status_name = STATUS_MAP.get(status_id, "Processing")
+
+                # 2. Upsert into Supabase
+                total = float(order.get("total", 0))
+
+                # Determine Paid status from OpenCart
+                # Awaiting Payment (18) or Pending (1) = Unpaid
+                is_paid = status_id not in [1, 18]
+
+                full_name = f"{order.get('firstname', '')} {order.get('lastname', '')}".strip()
+                if not full_name:
+                    full_name = f"Order #{order_id}"
+
+                # Check if this order was manually edited on dashboard
+                # If so, don't overwrite order_paid or supplier_status
+                manual_edit = existing and existing.get("last_modified_by") == "dashboard"
+
+                entries.append({
+                    "order_no": order_id,
+                    "order_name": full_name,
+                    "source": "opencart",
+                    "cost": total,
+                    "supplier_status": status_name if not manual_edit else None,
+                    "order_paid": is_paid if not manual_edit else None,
+                    "notes": order.get("products_summary") or "",
+                    "updates": f"Contact: {order.get('email')} | {order.get('telephone')}",
+                    "last_modified_by": "system_sync" if not manual_edit else None,
+                })
+                to_enrich.append((order_id, status_id))
+
+            except Exception as e:
+                logger.error("sync_order_failed", order_id=order.get("order_id"), error=str(e))
+                stats["errors"] += 1
+
+        # 3. One atomic batched merge for the whole page (raises, so the cursor isn't advanced on failure)
+        await self.supabase.merge_order_trackers(entries)
+
+        for order_id, status_id in to_enrich:
+            if enrich:
+                await self._enrich_synced_order(order_id, status_id)
+            stats["synced"] += 1
+
+    async def _enrich_synced_order(self, order_id: str, status_id: int) -> None:
+        """Welcome email, supplier assignment and supplier draft for a synced order."""
+        # --- NEW: Product Knowledge / Supplier Assignment ---
+        # Logic: Look up products in DB to find their registered supplier.
+        # This prevents Kait from "guessing".
+        try:
+            # Parse products from summary or fetch details if needed. 
+            # 'order' object from 'get_recent_orders' has 'products_summary' string, but not detailed list.
+            # We might need to fetch full order details if we want exact SKUs, OR we can rely on what we have.
+            # 'get_recent_orders' query in opencart.py uses GROUP_CONCAT. It doesn't return SKUs list.
+            # So we should fetch full order details to get SKUs for accurate lookup.
+
+            full_order_details = await self.opencart.get_order(order_id)
+            if full_order_details:
+                # --- Step 1: Client Welcome Email ---
+                # Only if Paid/Processing and NOT already sent
+                if status_id in [1, 2, 15, 23]: # Pending(1), Processing(2), Processed(15), Paid(23)
+                    # Check duplicate via Supabase logs (Category: CLIENT_WELCOME_DRAFT)
                     try:
-                        # Parse products from summary or fetch details if needed. 
-                        # 'order' object from 'get_recent_orders' has 'products_summary' string, but not detailed list.
-                        # We might need to fetch full order details if we want exact SKUs, OR we can rely on what we have.
-                        # 'get_recent_orders' query in opencart.py uses GROUP_CONCAT. It doesn't return SKUs list.
-                        # So we should fetch full order details to get SKUs for accurate lookup.
-                        
-                        full_order_details = await self.opencart.get_order(order_id)
-                        if full_order_details:
-                            # --- Step 1: Client Welcome Email ---
-                            # Only if Paid/Processing and NOT already sent
-                            if status_id in [1, 2, 15, 23]: # Pending(1), Processing(2), Processed(15), Paid(23)
-                                # Check duplicate via Supabase logs (Category: CLIENT_WELCOME_DRAFT)
-                                try:
-                                    # Check if we logged a welcome draft for this order recently
-                                    # Note: Using subject match as proxy
-                                    existing_welcome = self.supabase.client.table("email_logs") \
-                                        .select("id") \
-                                        .eq("category", "CLIENT_WELCOME_DRAFT") \
-                                        .ilike("subject", f"%#{order_id}%") \
-                                        .execute()
-                                        
-                                    if not existing_welcome.data:
-                                        email_agent = get_email_agent()
-                                        await email_agent.draft_client_welcome_email(full_order_details)
-                                        logger.info("triggered_client_welcome", order_id=order_id)
-                                except Exception as e:
-                                    logger.warning("failed_check_welcome_email", error=str(e))
-                            
-                        # --- Step 2: Supplier Assignment & Draft ---
-                        if full_order_details and full_order_details.get('products'):
-                                # Collect potential suppliers
-                            detected_suppliers = []
-                            
-                            for prod in full_order_details['products']:
-                                model = prod.get('model')
-                                sku = prod.get('sku') # Note: get_order might not return SKU in product list? Check opencart.py get_order query.
-                                # opencart.py get_order query: SELECT name, model, quantity, price, total FROM order_product
-                                # It returns 'model', but not 'sku'. usually model IS sku in OpenCart, but let's use model.
-                                
-                                search_ref = sku if sku else model
-                                if search_ref:
-                                    # Look up in Supabase Products
-                                    # We match on 'sku' column in DB (which corresponds to model/sku)
-                                    p_res = self.supabase.client.table("products").select("supplier_id").eq("sku", search_ref).execute()
-                                    
-                                    if p_res.data:
-                                        sup_id = p_res.data[0].get('supplier_id')
-                                        if sup_id:
-                                            # Resolve Name
-                                            s_res = self.supabase.client.table("suppliers").select("name").eq("id", sup_id).execute()
-                                            if s_res.data:
-                                                detected_suppliers.append(s_res.data[0]['name'])
-                            
-                            if detected_suppliers:
-                                # Logic: Pick the most common one, or just the first.
-                                # For now, simple Majority Vote
-                                from collections import Counter
-                                most_common = Counter(detected_suppliers).most_common(1)
-                                if most_common:
-                                    best_supplier = most_common[0][0]
-                                    
-                                    # Update orders_tracker with the Hard Data supplier
+                        # Check if we logged a welcome draft for this order recently
+                        # Note: Using subject match as proxy
+                        existing_welcome = await self.supabase.db.table("email_logs") \
+                            .select("id") \
+                            .eq("category", "CLIENT_WELCOME_DRAFT") \
+                            .ilike("subject", f"%#{order_id}%") \
+                            .execute()
+
+                        if not existing_welcome.data:
+                            email_agent = get_email_agent()
+                            await email_agent.draft_client_welcome_email(full_order_details)
+                            logger.info("triggered_client_welcome", order_id=order_id)
+                    except Exception as e:
+                        logger.warning("failed_check_welcome_email", error=str(e))
+
+            # --- Step 2: Supplier Assignment & Draft ---
+            if full_order_details and full_order_details.get('products'):
+                    # Collect potential suppliers
+                detected_suppliers = []
+
+                for prod in full_order_details['products']:
+                    model = prod.get('model')
+                    sku = prod.get('sku') # Note: get_order might not return SKU in product list? Check opencart.py get_order query.
+                    # opencart.py get_order query: SELECT name, model, quantity, price, total FROM order_product
+                    # It returns 'model', but not 'sku'. usually model IS sku in OpenCart, but let's use model.
+
+                    search_ref = sku if sku else model
+                    if search_ref:
+                        # Look up in Supabase Products
+                        # We match on 'sku' column in DB (which corresponds to model/sku)
+                        p_res = await self.supabase.db.table("products").select("supplier_id").eq("sku", search_ref).execute()
+
+                        if p_res.data:
+                            sup_id = p_res.data[0].get('supplier_id')
+                            if sup_id:
+                                # Resolve Name
+                                s_res = await self.supabase.db.table("suppliers").select("name").eq("id", sup_id).execute()
+                                if s_res.data:
+                                    detected_suppliers.append(s_res.data[0]['name'])
+
+                if detected_suppliers:
+                    # Logic: Pick the most common one, or just the first.
+                    # For now, simple Majority Vote
+                    from collections import Counter
+                    most_common = Counter(detected_suppliers).most_common(1)
+                    if most_common:
+                        best_supplier = most_common[0][0]
+
+                        # Update orders_tracker with the Hard Data supplier
+                        await self.supabase.upsert_order_tracker(
+                            order_no=order_id,
+                            supplier=best_supplier,
+                            last_modified_by="system_sync_enrichment"
+                        )
+                        logger.info("assigned_supplier_from_data", order_id=order_id, supplier=best_supplier)
+
+                        # --- NEW: Trigger Supplier Draft ---
+                        # Only if order is PAID and not already drafted/sent
+                        # Status 23 = Paid, 3 = Shipped, 5 = Complete, 15 = Processed (usually paid)
+                        if status_id in [23, 15, 2, 1]: # Pending(1), Processing(2), Processed(15), Paid(23)
+                            # Check if we already drafted this
+                            tracker = await self.supabase.get_order_tracker(order_id)
+                            current_sup_status = tracker.get("supplier_status") if tracker else None
+
+                            if current_sup_status not in ["Drafted", "Sent", "Invoiced", "Quoted", "Shipped"]:
+                                # Generate Draft
+                                logger.info("triggering_supplier_draft", order_id=order_id, supplier=best_supplier)
+                                email_agent = get_email_agent()
+
+                                # Filter products for this supplier
+                                supplier_products = []
+                                for p in full_order_details['products']:
+                                    # Re-check SKU match or if we just assume all items in this mixed order go to this supplier?
+                                    # For now, simplest is: if we identified ONE supplier for the order, sending ALL items might be wrong if mixed.
+                                    # But "best_supplier" logic above picked the majority one.
+                                    # Let's filter strictly if possible, or send all if single supplier.
+
+                                    # Re-verify if this product belongs to best_supplier
+                                    p_sku = p.get('sku') or p.get('model')
+                                    # Quick DB check for this product?
+                                    # Optimization: just include all for now, user can edit draft.
+                                    supplier_products.append(p)
+
+                                draft_res = await email_agent.draft_supplier_order_email(
+                                    order_details=full_order_details,
+                                    supplier_name=best_supplier,
+                                    products=supplier_products
+                                )
+
+                                if draft_res.get("status") == "success":
                                     await self.supabase.upsert_order_tracker(
                                         order_no=order_id,
-                                        supplier=best_supplier,
-                                        last_modified_by="system_sync_enrichment"
+                                        supplier_status="Drafted",
+                                        updates="System generated supplier email draft."
                                     )
-                                    logger.info("assigned_supplier_from_data", order_id=order_id, supplier=best_supplier)
-                                    
-                                    # --- NEW: Trigger Supplier Draft ---
-                                    # Only if order is PAID and not already drafted/sent
-                                    # Status 23 = Paid, 3 = Shipped, 5 = Complete, 15 = Processed (usually paid)
-                                    if status_id in [23, 15, 2, 1]: # Pending(1), Processing(2), Processed(15), Paid(23)
-                                        # Check if we already drafted this
-                                        tracker = await self.supabase.get_order_tracker(order_id)
-                                        current_sup_status = tracker.get("supplier_status") if tracker else None
-                                        
-                                        if current_sup_status not in ["Drafted", "Sent", "Invoiced", "Quoted", "Shipped"]:
-                                            # Generate Draft
-                                            logger.info("triggering_supplier_draft", order_id=order_id, supplier=best_supplier)
-                                            email_agent = get_email_agent()
-                                            
-                                            # Filter products for this supplier
-                                            supplier_products = []
-                                            for p in full_order_details['products']:
-                                                # Re-check SKU match or if we just assume all items in this mixed order go to this supplier?
-                                                # For now, simplest is: if we identified ONE supplier for the order, sending ALL items might be wrong if mixed.
-                                                # But "best_supplier" logic above picked the majority one.
-                                                # Let's filter strictly if possible, or send all if single supplier.
-                                                
-                                                # Re-verify if this product belongs to best_supplier
-                                                p_sku = p.get('sku') or p.get('model')
-                                                # Quick DB check for this product?
-                                                # Optimization: just include all for now, user can edit draft.
-                                                supplier_products.append(p)
-
-                                            draft_res = await email_agent.draft_supplier_order_email(
-                                                order_details=full_order_details,
-                                                supplier_name=best_supplier,
-                                                products=supplier_products
-                                            )
-                                            
-                                            if draft_res.get("status") == "success":
-                                                await self.supabase.upsert_order_tracker(
-                                                    order_no=order_id,
-                                                    supplier_status="Drafted",
-                                                    updates="System generated supplier email draft."
-                                                )
-                                    # -----------------------------------
-                                    
-                    except Exception as e:
-                        logger.warning("failed_to_assign_supplier", order_id=order_id, error=str(e))
-                    # ----------------------------------------------------
+                        # -----------------------------------
 
-                    synced_count += 1
-                    
-                except Exception as e:
-                    logger.error("sync_order_failed", order_id=order.get("order_id"), error=str(e))
-                    errors += 1
-            
-            logger.info("sync_orders_completed", synced=synced_count, skipped=skipped_count, cancelled=cancelled_count, errors=errors)
-            return {"status": "success", "synced": synced_count, "skipped": skipped_count, "cancelled": cancelled_count, "errors": errors}
-            
         except Exception as e:
-            logger.error("sync_orders_failed", error=str(e))
-            return {"status": "error", "error": str(e)}
+            logger.warning("failed_to_assign_supplier", order_id=order_id, error=str(e))
+        # ----------------------------------------------------
 
     async def _get_rates(self, data: Dict[str, Any]) -> Dict[str, Any]:
         """Get shipping rates."""
@@ -174,7 +174,7 @@ Respond in JSON only:
             supplier_id = None
             if supplier_name != "Unknown":
                 # Look up supplier
-                res = self.sb.client.table("suppliers").select("id").ilike("name", f"%{supplier_name}%").limit(1).execute()
+                res = await self.sb.db.table("suppliers").select("id").ilike("name", f"%{supplier_name}%").limit(1).execute()
                 if res.data:
                     supplier_id = res.data[0]['id']
             
@@ -209,27 +209,39 @@ Respond in JSON only:
                 "source_url": source 
             }
             
-            self.sb.client.table("supplier_specials").insert(payload).execute()
+            await self.sb.db.table("supplier_specials").insert(payload).execute()
             
             logger.info(f"Specials saved. Count: {len(deals)}")
             
             # AUTO-SYNC: Push to OpenCart immediately
+            sync_report = None
             try:
                 logger.info("Starting Auto-Sync to OpenCart...")
-                await self.sync_to_opencart(deals, valid_until)
+                sync_report = await self.sync_to_opencart(deals, valid_until)
             except Exception as e:
                 logger.error(f"Auto-Sync Failed: {e}")
             
-            return {"status": "success", "deals_count": len(deals), "data": payload}
+            return {"status": "success", "deals_count": len(deals), "data": payload, "opencart_sync": sync_report}
         except Exception as e:
              logger.error(f"Error saving to DB: {e}")
              raise e
 
-    async def sync_to_opencart(self, deals: List[Dict], valid_until: Optional[str]):
+    async def sync_to_opencart(self, deals: List[Dict], valid_until: Optional[str]) -> Dict[str, Any]:
         """
         Apply computed specials directly to OpenCart products.
         Formula: (Cost * 1.15 * 1.15) rounded to nearest 10.
+
+        All deals are resolved against the catalog first, then every matched
+        product's specials are replaced in a single transaction.
+
+        Returns:
+            Report with matched/unmatched/ambiguous/superseded counts, whether
+            the write was applied, and a per-deal ``deals`` list ({index, sku,
+            product_name, status, product_id?, price?, reason?, candidates?,
+            superseded_by?}). A deal is ``superseded`` when a later deal
+            matched the same product.
         """
+        from src.catalog.snapshot import get_catalog_snapshot
         from src.connectors.opencart import get_opencart_connector
         oc = get_opencart_connector()
         
@@ -241,57 +253,93 @@ Respond in JSON only:
         # Pricing Config
         VAT = 1.15
         MARGIN = 1.15 
-        
-        updated_count = 0
-        
-        for deal in deals:
-            # 1. Parse Cost
+
+        # 1. Resolve every deal in one pass over the catalog
+        catalog = await get_catalog_snapshot()
+        report = []
+        for index, deal in enumerate(deals):
+            entry = {"index": index, "sku": deal.get("sku", ""), "product_name": deal.get("product_name", "")}
+            report.append(entry)
+
+            # Parse Cost
             cost_str = str(deal.get("price", "0")).replace("R", "").replace(" ", "").replace(",", "")
             try:
                 cost = float(cost_str)
             except:
+                entry.update(status="unmatched", reason="invalid_price")
                 continue
 
-            # 2. Calculate Retail
-            retail_price = (cost * VAT) * MARGIN
-            # Round to nearest 10
-            retail_price = round(retail_price / 10) * 10.0
-            
-            # 3. Match Product
-            sku = deal.get("sku", "")
-            name = deal.get("product_name", "")
-            
-            if not sku and not name: continue
-            
-            product = None
-            if sku:
-                product = await oc.get_product_by_sku(sku)
-                if not product:
-                    product = await oc.get_product_by_model(sku)
-            
-            if not product and name:
-                 # Name Search Fallback
-                 candidates = await oc.search_products_by_name(name)
-                 if len(candidates) == 1:
-                     product = candidates[0]
-            
-            if product:
-                # 4. Apply Special
-                # Ensure we clear old ones or just add? 
-                # If we clear, we might remove other unrelated specials. 
-                # But typically we want THIS special to be authoritative.
-                await oc.clear_product_specials(product['product_id'])
-                
-                await oc.add_product_special(
-                    product_id=product['product_id'],
-                    price=retail_price,
-                    date_start=date_start,
-                    date_end=date_end
-                )
-                updated_count += 1
-                logger.info(f"Synced Special: {sku} -> R{retail_price}")
-        
-        logger.info(f"Auto-Sync Complete. Updated: {updated_count}")
+            if not entry["sku"] and not entry["product_name"]:
+                entry.update(status="unmatched", reason="no_sku_or_name")
+                continue
+
+            # Calculate Retail, rounded to nearest 10
+            entry["price"] = round((cost * VAT) * MARGIN / 10) * 10.0
+            entry.update(await self._match_deal(catalog, entry["sku"], entry["product_name"]))
+
+        # 2. A product named by several deals takes the last one (as clear + add per deal did)
+        winners: Dict[int, Dict] = {}
+        for entry in report:
+            if entry["status"] == "matched":
+                previous = winners.get(entry["product_id"])
+                if previous:
+                    previous.update(status="superseded", reason="superseded_by_later_deal",
+                                    superseded_by=entry["index"])
+                winners[entry["product_id"]] = entry
+
+        # 3. Replace the specials of every matched product atomically
+        result = {"success": True, "products": 0, "error": None}
+        if winners:
+            result = await oc.replace_product_specials([
+                {"product_id": pid, "price": entry["price"], "date_start": date_start, "date_end": date_end}
+                for pid, entry in winners.items()
+            ])
+
+        counts = {"matched": 0, "unmatched": 0, "ambiguous": 0, "superseded": 0}
+        for entry in report:
+            counts[entry["status"]] += 1
+
+        if result["success"]:
+            logger.info(f"Auto-Sync Complete. Updated: {result['products']} "
+                        f"(unmatched: {counts['unmatched']}, ambiguous: {counts['ambiguous']}, "
+                        f"superseded: {counts['superseded']})")
+        else:
+            logger.error(f"Auto-Sync Failed, no specials applied: {result['error']}")
+
+        return {
+            "applied": result["success"],
+            "updated": result["products"],
+            "error": result["error"],
+            **counts,
+            "deals": report,
+        }
+
+    async def _match_deal(self, catalog, sku: str, name: str) -> Dict[str, Any]:
+        """Match one deal by SKU, then model, then a unique name search hit."""
+        from src.catalog.snapshot import fold_key
+        from src.search.product_index import get_product_search_index
+
+        if sku:
+            for field in ("sku", "model"):
+                candidates = catalog.group_by(field).get(fold_key(sku), [])
+                active = [p for p in candidates if p.get("status") == 1]
+                if len(candidates) > 1 and len(active) != 1:
+                    return {"status": "ambiguous", "reason": f"{field}_matches_multiple",
+                            "candidates": [p["product_id"] for p in candidates]}
+                if candidates:
+                    product = active[0] if active else candidates[0]
+                    return {"status": "matched", "product_id": product["product_id"], "matched_by": field}
+
+        if name:
+            # Name Search Fallback
+            candidates = await get_product_search_index().search_products_by_name(name)
+            if len(candidates) == 1:
+                return {"status": "matched", "product_id": candidates[0]["product_id"], "matched_by": "name"}
+            if candidates:
+                return {"status": "ambiguous", "reason": "name_matches_multiple",
+                        "candidates": [p["product_id"] for p in candidates[:10]]}
+
+        return {"status": "unmatched", "reason": "not_found"}
 
     async def search_specials(self, query: str) -> str:
         """
@@ -306,7 +354,7 @@ Respond in JSON only:
             # Better: RPC function? Or just fetch recent specials.
             # Let's fetch extracted specials from the last 30 days.
             
-            response = self.sb.client.table("supplier_specials").select("*").order("created_at", desc=True).limit(20).execute()
+            response = await self.sb.db.table("supplier_specials").select("*").order("created_at", desc=True).limit(20).execute()
             
             hits = []
             for flyer in response.data:
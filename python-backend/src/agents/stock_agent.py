@@ -4,6 +4,7 @@ StockListingsAgent - Processes supplier price lists using Gemini File API.
 Uses Google Gemini's File Search tool to extract structured product data
 from any format (CSV, Excel, PDF, scanned images) without manual parsing.
 """
+import asyncio
 import json
 from typing import Optional, Dict, List, Any
 from datetime import datetime
@@ -15,7 +16,9 @@ import re
 from pydantic import BaseModel
 
 from ..connectors.supabase import SupabaseConnector
+from ..connectors.db_executor import QueryTimeoutError
 from ..connectors.opencart import OpenCartConnector
+from ..search.product_index import get_product_search_index
 from ..utils.config import get_config
 
 logger = structlog.get_logger()
@@ -39,6 +42,7 @@ class StockListingsAgent:
     def __init__(self, supabase: SupabaseConnector, opencart: OpenCartConnector):
         self.supabase = supabase
         self.opencart = opencart
+        self.search_index = get_product_search_index()
         
         # Initialize OpenAI
         config = get_config()
@@ -52,7 +56,7 @@ class StockListingsAgent:
     async def get_pricing_rule(self, supplier_id: str) -> Optional[Dict]:
         """Get pricing rule for a supplier."""
         try:
-            response = self.supabase.client.table("supplier_pricing_rules")\
+            response = await self.supabase.db.table("supplier_pricing_rules")\
                 .select("*")\
                 .eq("supplier_id", supplier_id)\
                 .single()\
@@ -201,7 +205,7 @@ class StockListingsAgent:
                     supplier_name, filename, storage_path
                 )
             else:
-                self.supabase.client.table("price_list_uploads").update({
+                await self.supabase.db.table("price_list_uploads").update({
                     "storage_path": storage_path,
                     "status": "processing"
                 }).eq("id", upload_id).execute()
@@ -221,6 +225,7 @@ class StockListingsAgent:
             # 5. Process each product
             extracted_skus = set()
             changes_detected = 0
+            lookup = await self._prefetch_existing_products([p.sku for p in price_list_data.products])
             
             for product in price_list_data.products:
                 extracted_skus.add(product.sku)
@@ -229,7 +234,7 @@ class StockListingsAgent:
                 await self._upsert_supplier_catalog(upload_id, supplier_name, product)
                 
                 # Detect changes vs OpenCart (Price only)
-                detected = await self._detect_changes(upload_id, supplier_name, product, instruction, markup_pct)
+                detected = await self._detect_changes(upload_id, supplier_name, product, instruction, markup_pct, lookup)
                 changes_detected += detected
             
             # 6. Process Discontinued Products (Missing from file)
@@ -314,7 +319,7 @@ class StockListingsAgent:
         """Poll and process pending price list uploads."""
         try:
             # 1. Fetch pending uploads
-            response = self.supabase.client.table("price_list_uploads")\
+            response = await self.supabase.db.table("price_list_uploads")\
                 .select("*")\
                 .eq("status", "pending")\
                 .execute()
@@ -343,14 +348,15 @@ class StockListingsAgent:
         
         try:
             # 1. Mark as processing
-            self.supabase.client.table("price_list_uploads").update({
+            await self.supabase.db.table("price_list_uploads").update({
                 "status": "processing"
             }).eq("id", upload_id).execute()
             
             # 2. Download file
             # Bucket is 'invoices' based on frontend code
             bucket = "invoices" 
-            file_data = self.supabase.client.storage.from_(bucket).download(storage_path)
+            # Storage isn't covered by the async PostgREST facade: download off the event loop
+            file_data = await asyncio.to_thread(self.supabase.client.storage.from_(bucket).download, storage_path)
             
             # 3. Process
             # process_price_list handles completion status updates
@@ -365,7 +371,7 @@ class StockListingsAgent:
             
         except Exception as e:
             logger.error("upload_processing_failed", upload_id=upload_id, error=str(e))
-            self.supabase.client.table("price_list_uploads").update({
+            await self.supabase.db.table("price_list_uploads").update({
                 "status": "failed",
                 "error_message": str(e)
             }).eq("id", upload_id).execute()
@@ -374,7 +380,7 @@ class StockListingsAgent:
         """Process all products in approved_pending status."""
         try:
             # Fetch pending
-            response = self.supabase.client.table("new_products_queue")\
+            response = await self.supabase.db.table("new_products_queue")\
                 .select("id")\
                 .eq("status", "approved_pending")\
                 .execute()
@@ -384,8 +390,7 @@ class StockListingsAgent:
             
             logger.info("processing_approval_queue", count=len(response.data))
             
-            for item in response.data:
-                await self.approve_new_product(item['id'])
+            await self.approve_new_products([item['id'] for item in response.data])
                 
         except Exception as e:
             logger.error("queue_processing_failed", error=str(e))
@@ -396,7 +401,7 @@ class StockListingsAgent:
         """
         try:
             # 1. Get product from queue
-            response = self.supabase.client.table("new_products_queue")\
+            response = await self.supabase.db.table("new_products_queue")\
                 .select("*")\
                 .eq("id", queue_id)\
                 .single()\
@@ -408,12 +413,10 @@ class StockListingsAgent:
             product = response.data
             
             # 2. Get manufacturer (brand) name
-            # Fix: Do NOT use supplier_name (e.g. Esquire) as Manufacturer.
-            # Instead, try to infer brand from the Product Name (e.g. "Dahua ...")
             manufacturer = None
-            first_word = product['name'].split(' ')[0] if product.get('name') else ""
-            if first_word and len(first_word) > 2:
-                 manufacturer = await self.opencart.get_manufacturer_by_name(first_word)
+            brand = self._queue_brand(product)
+            if brand:
+                 manufacturer = await self.opencart.get_manufacturer_by_name(brand)
             
             # 3. Create product in OpenCart
             
@@ -424,77 +427,24 @@ class StockListingsAgent:
                 logger.info("product_already_exists_skipping_creation", sku=product['sku'])
                 product_id = existing_product['product_id']
             else:
-                # Simplify Name Logic: Use valid name directly from queue
-                product_name = product['name']
-
-                # --- VALIDATION GUARD ---
-                # Reduce risk of creating corrupted products (e.g. "Electronics Mega Store" or "name")
-                # Use EXACT matches for short words, substring for longer phrases
-                exact_match_bad = ['name', 'product name', 'model name', 'xyz', 'test', 'sample']
-                contains_bad = [
-                    'electronics mega store', 'electronics galore', 
-                    'electronic paradise', 'electronics superstore',
-                    'electronics and gadgets store'
-                ]
-                
-                check_name = product_name.lower().strip() if product_name else ""
-                check_sku = product['sku'].lower().strip() if product['sku'] else ""
-                check_model = product.get('model', '').lower().strip()
-
-                # Reject if name is empty, equals a bad string exactly, or contains a long bad phrase
-                is_bad_name = (
-                    not check_name or 
-                    check_name in exact_match_bad or 
-                    any(bad in check_name for bad in contains_bad)
-                )
-                
-                if is_bad_name:
-                    logger.error("invalid_product_name_rejected", queue_id=queue_id, name=product_name)
-                    return {"status": "failed", "error": f"Invalid product name rejected: {product_name}"}
-                
-                if check_sku in ['name', 'sku', 'xyz'] or any(bad in check_sku for bad in contains_bad):
-                     logger.error("invalid_sku_rejected", queue_id=queue_id, sku=product['sku'])
-                     return {"status": "failed", "error": f"Invalid SKU rejected: {product['sku']}"}
-
-                if check_model in ['name', 'model name', 'xyz', 'product model']:
-                     logger.error("invalid_model_rejected", queue_id=queue_id, model=product.get('model'))
-                     return {"status": "failed", "error": f"Invalid Model rejected: {product.get('model')}"}
-                # ------------------------
-
-                # Calculate retail price
-                # Improved Logic: Check if 'selling_price' is provided in queue (e.g. from Scoop/Alignment)
-                # If so, use it as the Retail Price.
-                # If not, fallback to treating 'cost_price' as Retail (legacy behavior, or for manual uploads where user input Retail)
-                
-                queue_selling_price = float(product.get('selling_price') or 0)
-                queue_cost_price = float(product.get('cost_price') or 0)
-                
-                if queue_selling_price > 0:
-                     retail_price = queue_selling_price
-                     # If we have a cost price, use it. Otherwise reverse calc.
-                     cost_price = queue_cost_price if queue_cost_price > 0 else (retail_price / 1.5)
-                else:
-                    # Fallback: Treat cost_price as Retail (as per original logic/assumption for some flows)
-                    retail_price = queue_cost_price
-                    cost_price = retail_price / 1.5
-                
-                product_data = {
-                    "sku": product['sku'],
-                    "name": product_name,
-                    "price": retail_price,
-                    "cost": cost_price,
-                    "quantity": product['stock_level'],
-                    "manufacturer_id": manufacturer['manufacturer_id'] if manufacturer else 0,
-                    "status": 1  # Enabled
-                }
-                
-                product_id = await self.opencart.create_product(product_data)
+                error = self._validate_queue_item(product)
+                if error:
+                    logger.error("queue_item_rejected", queue_id=queue_id, error=error)
+                    return {"status": "failed", "error": error}
+
+                try:
+                    product_id = await self.opencart.create_product(self._queue_product_data(product, manufacturer))
+                except QueryTimeoutError as e:
+                    # The insert may still commit: leave the queue item pending; a retry
+                    # finds the product via _find_existing_product instead of duplicating it
+                    logger.error("create_product_outcome_unknown", queue_id=queue_id, sku=product['sku'], error=str(e))
+                    return {"status": "failed", "error": f"OpenCart create timed out, outcome unknown: {e}"}
             
             if not product_id:
                 return {"status": "failed", "error": "Failed to create product in OpenCart"}
             
             # 4. Update queue status
-            self.supabase.client.table("new_products_queue").update({
+            await self.supabase.db.table("new_products_queue").update({
                 "status": "approved"
             }).eq("id", queue_id).execute()
             
@@ -502,7 +452,7 @@ class StockListingsAgent:
             # We must find the internal product ID by SKU to link it.
             try:
                 # Find internal product
-                internal_prod_res = self.supabase.client.table("products")\
+                internal_prod_res = await self.supabase.db.table("products")\
                     .select("id")\
                     .eq("sku", product['sku'])\
                     .limit(1)\
@@ -513,7 +463,7 @@ class StockListingsAgent:
                     
                     # Update (or Upsert) the match record
                     # We look for an existing match for this internal ID
-                    self.supabase.client.table("product_matches").update({
+                    await self.supabase.db.table("product_matches").update({
                         "opencart_product_id": product_id,
                         "match_type": "created_via_queue"
                     }).eq("internal_product_id", internal_id).execute()
@@ -537,12 +487,216 @@ class StockListingsAgent:
             logger.error("approve_product_failed", queue_id=queue_id, error=str(e))
             return {"status": "failed", "error": str(e)}
 
+    @staticmethod
+    def _queue_brand(product: Dict) -> Optional[str]:
+        """Brand to look up as the OpenCart manufacturer.
+
+        Do NOT use supplier_name (e.g. Esquire) as Manufacturer. Instead,
+        infer the brand from the Product Name (e.g. "Dahua ...").
+        """
+        first_word = product['name'].split(' ')[0] if product.get('name') else ""
+        return first_word if len(first_word) > 2 else None
+
+    @staticmethod
+    def _validate_queue_item(product: Dict) -> Optional[str]:
+        """Reject obviously corrupted queue items (e.g. "Electronics Mega Store" or "name").
+
+        Returns:
+            Error message, or None if the item may be created
+        """
+        product_name = product.get('name')
+        # Use EXACT matches for short words, substring for longer phrases
+        exact_match_bad = ['name', 'product name', 'model name', 'xyz', 'test', 'sample']
+        contains_bad = [
+            'electronics mega store', 'electronics galore', 
+            'electronic paradise', 'electronics superstore',
+            'electronics and gadgets store'
+        ]
+        
+        check_name = product_name.lower().strip() if product_name else ""
+        check_sku = product['sku'].lower().strip() if product['sku'] else ""
+        check_model = (product.get('model') or '').lower().strip()
+
+        # Reject if name is empty, equals a bad string exactly, or contains a long bad phrase
+        is_bad_name = (
+            not check_name or 
+            check_name in exact_match_bad or 
+            any(bad in check_name for bad in contains_bad)
+        )
+        
+        if is_bad_name:
+            return f"Invalid product name rejected: {product_name}"
+        
+        if check_sku in ['name', 'sku', 'xyz'] or any(bad in check_sku for bad in contains_bad):
+            return f"Invalid SKU rejected: {product['sku']}"
+
+        if check_model in ['name', 'model name', 'xyz', 'product model']:
+            return f"Invalid Model rejected: {product.get('model')}"
+        return None
+
+    @staticmethod
+    def _queue_product_data(product: Dict, manufacturer: Optional[Dict]) -> Dict[str, Any]:
+        """Build create_product input for a queue item."""
+        # Calculate retail price
+        # Improved Logic: Check if 'selling_price' is provided in queue (e.g. from Scoop/Alignment)
+        # If so, use it as the Retail Price.
+        # If not, fallback to treating 'cost_price' as Retail (legacy behavior, or for manual uploads where user input Retail)
+        queue_selling_price = float(product.get('selling_price') or 0)
+        queue_cost_price = float(product.get('cost_price') or 0)
+        
+        if queue_selling_price > 0:
+             retail_price = queue_selling_price
+             # If we have a cost price, use it. Otherwise reverse calc.
+             cost_price = queue_cost_price if queue_cost_price > 0 else (retail_price / 1.5)
+        else:
+            # Fallback: Treat cost_price as Retail (as per original logic/assumption for some flows)
+            retail_price = queue_cost_price
+            cost_price = retail_price / 1.5
+        
+        return {
+            "sku": product['sku'],
+            # Simplify Name Logic: Use valid name directly from queue
+            "name": product['name'],
+            "price": retail_price,
+            "cost": cost_price,
+            "quantity": product['stock_level'],
+            "manufacturer_id": manufacturer['manufacturer_id'] if manufacturer else 0,
+            "status": 1  # Enabled
+        }
+
+    async def approve_new_products(self, queue_ids: List[str], chunk_size: int = 100) -> Dict[str, Any]:
+        """
+        Approve many queue items at once (bulk version of approve_new_product).
+
+        Manufacturers and existing products are prefetched in batch, every
+        new product is created in one OpenCart transaction, and the queue
+        and product_matches rows are updated in bulk.
+
+        Returns:
+            Dict with approved/created/existing/failed counts and per-item
+            ``results`` ({queue_id, status, product_id?, error?})
+        """
+        results: Dict[str, Dict[str, Any]] = {}
+        try:
+            # 1. Load queue items
+            items: List[Dict] = []
+            for start in range(0, len(queue_ids), chunk_size):
+                res = await self.supabase.db.table("new_products_queue")\
+                    .select("*")\
+                    .in_("id", queue_ids[start:start + chunk_size])\
+                    .execute()
+                items.extend(res.data or [])
+            found_ids = {item['id'] for item in items}
+            for queue_id in queue_ids:
+                if queue_id not in found_ids:
+                    results[queue_id] = {"queue_id": queue_id, "status": "failed", "error": "Product not found in queue"}
+
+            # 2. Prefetch manufacturers and existing products
+            brands = {self._queue_brand(item) for item in items} - {None}
+            manufacturers = await self.opencart.get_manufacturers_by_names(list(brands))
+            lookup = await self._prefetch_existing_products([item['sku'] for item in items if item.get('sku')])
+
+            # 3. Split into already-existing, rejected and to-create
+            product_ids: Dict[str, int] = {}  # queue_id -> OpenCart product_id
+            to_create: Dict[str, Dict] = {}  # queue_id -> create_product input
+            for item in items:
+                existing_product = await self._find_existing_product(item['sku'], item.get('name'), lookup)
+                if existing_product:
+                    logger.info("product_already_exists_skipping_creation", sku=item['sku'])
+                    product_ids[item['id']] = existing_product['product_id']
+                    results[item['id']] = {"queue_id": item['id'], "status": "existing",
+                                           "product_id": existing_product['product_id']}
+                    continue
+                error = self._validate_queue_item(item)
+                if error:
+                    logger.error("queue_item_rejected", queue_id=item['id'], error=error)
+                    results[item['id']] = {"queue_id": item['id'], "status": "failed", "error": error}
+                    continue
+                to_create[item['id']] = self._queue_product_data(item, manufacturers.get(self._queue_brand(item)))
+
+            # 4. Create everything in one transaction
+            if to_create:
+                created = await self.opencart.bulk_create_products(list(to_create.values()))
+                # Keyed like MySQL compares SKUs, so an item whose SKU repeats
+                # an earlier one in the batch reuses that product
+                by_sku = {sku.lower().rstrip(): pid
+                          for sku, pid in {**created['existing'], **created['created']}.items()}
+                for queue_id, data in to_create.items():
+                    product_id = by_sku.get(data['sku'].lower().rstrip())
+                    if product_id:
+                        product_ids[queue_id] = product_id
+                        results[queue_id] = {"queue_id": queue_id, "status": "created", "product_id": product_id}
+                    else:
+                        results[queue_id] = {"queue_id": queue_id, "status": "failed",
+                                             "error": created['error'] or "Failed to create product in OpenCart"}
+
+            # 5. Bulk-update queue status and product links
+            approved = list(product_ids)
+            for start in range(0, len(approved), chunk_size):
+                await self.supabase.db.table("new_products_queue").update({
+                    "status": "approved"
+                }).in_("id", approved[start:start + chunk_size]).execute()
+
+            skus = {item['id']: item['sku'] for item in items if item['id'] in product_ids}
+            try:
+                await self._link_created_products(skus, product_ids, chunk_size)
+            except Exception as link_error:
+                 # Log but don't fail the approval if linking fails (it can be fixed by daily sync later)
+                 logger.error("failed_to_create_links", count=len(skus), error=str(link_error))
+
+        except Exception as e:
+            logger.error("bulk_approve_failed", requested=len(queue_ids), error=str(e))
+            for queue_id in queue_ids:
+                results.setdefault(queue_id, {"queue_id": queue_id, "status": "failed", "error": str(e)})
+
+        counts = {"created": 0, "existing": 0, "failed": 0}
+        for result in results.values():
+            counts[result["status"]] += 1
+        logger.info("products_bulk_approved", requested=len(queue_ids), **counts)
+        return {"approved": counts["created"] + counts["existing"], **counts, "results": list(results.values())}
+
+    async def _link_created_products(self, skus: Dict[str, str], product_ids: Dict[str, int], chunk_size: int) -> None:
+        """Point existing product_matches rows at the approved OpenCart products (matched by SKU)."""
+        sku_list = list(set(skus.values()))
+        internal_by_sku: Dict[str, str] = {}
+        for start in range(0, len(sku_list), chunk_size):
+            res = await self.supabase.db.table("products")\
+                .select("id, sku")\
+                .in_("sku", sku_list[start:start + chunk_size])\
+                .execute()
+            for row in res.data or []:
+                internal_by_sku.setdefault(row['sku'], row['id'])
+
+        target: Dict[str, int] = {}  # internal_product_id -> OpenCart product_id
+        for queue_id, sku in skus.items():
+            if sku in internal_by_sku:
+                target[internal_by_sku[sku]] = product_ids[queue_id]
+            else:
+                logger.warning("internal_product_not_found_for_link", sku=sku)
+
+        # Update (not insert) the existing match records, one upsert by primary key per chunk
+        internal_ids = list(target)
+        for start in range(0, len(internal_ids), chunk_size):
+            res = await self.supabase.db.table("product_matches")\
+                .select("id, internal_product_id")\
+                .in_("internal_product_id", internal_ids[start:start + chunk_size])\
+                .execute()
+            rows = [{
+                "id": match['id'],
+                "internal_product_id": match['internal_product_id'],
+                "opencart_product_id": target[match['internal_product_id']],
+                "match_type": "created_via_queue"
+            } for match in res.data or []]
+            if rows:
+                await self.supabase.db.table("product_matches").upsert(rows).execute()
+        logger.info("product_links_established", count=len(target))
+
     async def _queue_new_product(self, supplier_name: str, product: ProductData):
         """Add new product to the review queue (with duplicate guard)."""
         try:
             # Duplicate guard: skip if SKU already queued (pending or approved_pending)
             if product.sku:
-                existing = self.supabase.client.table("new_products_queue")\
+                existing = await self.supabase.db.table("new_products_queue")\
                     .select("id")\
                     .eq("sku", product.sku)\
                     .in_("status", ["pending", "approved_pending"])\
@@ -552,7 +706,7 @@ class StockListingsAgent:
                     logger.info("product_already_queued_skipping", sku=product.sku)
                     return
 
-            self.supabase.client.table("new_products_queue").insert({
+            await self.supabase.db.table("new_products_queue").insert({
                 "supplier_name": supplier_name,
                 "sku": product.sku,
                 "name": product.name,
@@ -662,7 +816,7 @@ Extract ALL products - do not skip any rows.
     
     async def _create_upload_record(self, supplier_name: str, filename: str, storage_path: str) -> str:
         """Create a record in price_list_uploads table."""
-        result = self.supabase.client.table("price_list_uploads").insert({
+        result = await self.supabase.db.table("price_list_uploads").insert({
             "supplier_name": supplier_name,
             "filename": filename,
             "storage_path": storage_path,
@@ -673,7 +827,7 @@ Extract ALL products - do not skip any rows.
     
     async def _upsert_supplier_catalog(self, upload_id: str, supplier_name: str, product: ProductData):
         """Store product in supplier_catalogs table."""
-        self.supabase.client.table("supplier_catalogs").upsert({
+        await self.supabase.db.table("supplier_catalogs").upsert({
             "upload_id": upload_id,
             "supplier_name": supplier_name,
             "sku": product.sku,
@@ -683,40 +837,62 @@ Extract ALL products - do not skip any rows.
             "raw_data": product.dict()
         }, on_conflict="supplier_name,sku").execute()
     
-    async def _find_existing_product(self, sku: str, name: str = None) -> Optional[Dict]:
+    @staticmethod
+    def _sku_variations(sku: str) -> List[str]:
+        """Space/dash variants of a SKU, e.g. "HTM6 S3" vs "HTM6-S3" vs "HTM6S3"."""
+        variations = set([
+            sku.replace(" ", "-"),
+            sku.replace("-", " "),
+            sku.replace(" ", ""),
+            sku.replace("-", ""),
+        ])
+        variations.discard(sku)
+        return list(variations)
+
+    async def _prefetch_existing_products(self, skus: List[str]) -> Dict[str, Dict]:
+        """Resolve every SKU (and its variations) against OpenCart in two batch queries.
+
+        Returns a lookup for _find_existing_product: {"sku": {...}, "model": {...}}.
+        """
+        keys = set()
+        for sku in skus:
+            if sku:
+                keys.add(sku)
+                keys.update(self._sku_variations(sku))
+        keys = list(keys)
+        return {
+            "sku": await self.opencart.get_products_by_skus(keys),
+            "model": await self.opencart.get_products_by_models(keys),
+        }
+
+    async def _find_existing_product(self, sku: str, name: str = None, lookup: Optional[Dict[str, Dict]] = None) -> Optional[Dict]:
         """
         Find product by SKU, Model, or Name, handling common formatting differences.
+
+        ``lookup`` is the result of _prefetch_existing_products; without it the
+        SKU/model strategies are resolved with one batch round trip.
         """
         if not sku and not name:
             return None
 
         if sku:
+            if lookup is None:
+                lookup = await self._prefetch_existing_products([sku])
+            by_sku, by_model = lookup["sku"], lookup["model"]
+
             # 1. Exact SKU match
-            product = await self.opencart.get_product_by_sku(sku)
+            product = by_sku.get(sku)
             if product:
                 return product
 
             # 2. Exact Model match
-            product = await self.opencart.get_product_by_model(sku)
+            product = by_model.get(sku)
             if product:
                 return product
 
             # 3. Normalized variations (space/dash differences)
-            # e.g. "HTM6 S3" vs "HTM6-S3" vs "HTM6S3"
-            variations = set([
-                sku.replace(" ", "-"),
-                sku.replace("-", " "),
-                sku.replace(" ", ""),
-                sku.replace("-", ""),
-            ])
-
-            for var in variations:
-                if var == sku:
-                    continue
-                product = await self.opencart.get_product_by_model(var)
-                if product:
-                    return product
-                product = await self.opencart.get_product_by_sku(var)
+            for var in self._sku_variations(sku):
+                product = by_model.get(var) or by_sku.get(var)
                 if product:
                     return product
 
@@ -724,7 +900,7 @@ Extract ALL products - do not skip any rows.
         if name and len(name) > 5:
             from difflib import SequenceMatcher
 
-            results = await self.opencart.search_products_by_name(name)
+            results = await self.search_index.search_products_by_name(name)
             if results:
                 normalized_name = self._normalize_string(name)
                 for r in results:
@@ -741,7 +917,7 @@ Extract ALL products - do not skip any rows.
 
         return None
 
-    async def _detect_changes(self, upload_id: str, supplier_name: str, product: ProductData, instruction: str, markup_pct: Optional[float] = None) -> int:
+    async def _detect_changes(self, upload_id: str, supplier_name: str, product: ProductData, instruction: str, markup_pct: Optional[float] = None, lookup: Optional[Dict[str, Dict]] = None) -> int:
         """
         Compare product data with OpenCart and:
         1. Queue price changes if > 10%
@@ -752,7 +928,7 @@ Extract ALL products - do not skip any rows.
         
         try:
             # 1. Try robust SKU/Model match first
-            oc_product = await self._find_existing_product(product.sku, product.name)
+            oc_product = await self._find_existing_product(product.sku, product.name, lookup)
 
             # 2. If no match, try fuzzy name matching using search
             if not oc_product and product.name:
@@ -773,7 +949,7 @@ Extract ALL products - do not skip any rows.
                 for query in search_queries:
                     if len(query) < 3: continue
                     
-                    results = await self.opencart.search_products_by_name(query)
+                    results = await self.search_index.search_products_by_name(query)
                     for res in results:
                         if res['product_id'] not in seen_ids:
                             candidates.append(res)
@@ -822,7 +998,7 @@ Extract ALL products - do not skip any rows.
             product_id = oc_product['product_id']
             
             # Get supplier ID from supplier_name
-            supplier_response = self.supabase.client.table("suppliers")\
+            supplier_response = await self.supabase.db.table("suppliers")\
                 .select("id")\
                 .eq("name", supplier_name)\
                 .single()\
@@ -852,7 +1028,7 @@ Extract ALL products - do not skip any rows.
                 
                 # Queue if change > 10%
                 if abs(price_change_pct) > 10.0:
-                    self.supabase.client.table("price_change_queue").insert({
+                    await self.supabase.db.table("price_change_queue").insert({
                         "product_id": product_id,
                         "sku": product.sku,
                         "product_name": product.name,
@@ -889,7 +1065,7 @@ Extract ALL products - do not skip any rows.
         try:
             # 1. Get all known SKUs for this supplier from supplier_catalogs
             # Note: This might be heavy if a supplier has thousands of products.
-            response = self.supabase.client.table("supplier_catalogs")\
+            response = await self.supabase.db.table("supplier_catalogs")\
                 .select("sku")\
                 .eq("supplier_name", supplier_name)\
                 .execute()
@@ -921,7 +1097,7 @@ Extract ALL products - do not skip any rows.
 
     async def _mark_upload_completed(self, upload_id: str, total_rows: int, processed_rows: int):
         """Mark upload as completed."""
-        self.supabase.client.table("price_list_uploads").update({
+        await self.supabase.db.table("price_list_uploads").update({
             "status": "completed",
             "total_rows": total_rows,
             "processed_rows": processed_rows
@@ -929,7 +1105,7 @@ Extract ALL products - do not skip any rows.
     
     async def _mark_upload_failed(self, upload_id: str, error_message: str):
         """Mark upload as failed with error message."""
-        self.supabase.client.table("price_list_uploads").update({
+        await self.supabase.db.table("price_list_uploads").update({
             "status": "failed",
             "error_message": error_message
         }).eq("id", upload_id).execute()
@@ -1,4 +1,5 @@
 from typing import List, Dict, Any, Optional
+import asyncio
 import re
 
 try:
@@ -20,7 +21,10 @@ if not FUZZ_AVAILABLE:
 
     fuzz = FuzzFallback()
 
+from src.aligner.fuzzy import process_text, token_set_scores
+from src.aligner.match_index import MatchIndex, get_match_index
 from src.connectors.opencart import OpenCartConnector
+from src.search.product_index import get_product_search_index
 from src.utils.logging import AgentLogger
 
 logger = AgentLogger("alignment_engine")
@@ -38,32 +42,32 @@ def _normalize_name(name: str) -> str:
 class AlignmentEngine:
     def __init__(self):
         self.oc = OpenCartConnector()
+        self.search_index = get_product_search_index()
 
     async def find_matches(self, supplier_product: Dict[str, Any], limit: int = 10) -> List[Dict[str, Any]]:
         """Find OpenCart product candidates for a given supplier product.
 
         Uses three search strategies:
-        1. SKU/model search (exact match in OpenCart sku/model fields)
+        1. SKU/model search (exact, normalized, then substring - via MatchIndex)
         2. Name search (progressive relaxation with AND conditions)
         3. OR-based search (any 2+ words match — catches partial name overlaps)
         """
         s_sku = supplier_product.get('sku', '')
         s_name = supplier_product.get('name', '')
-        s_price = float(supplier_product.get('price', 0) or 0)
 
         seen_ids = set()
         oc_products = []
 
-        # Strategy 1: Search by SKU/model in OpenCart (fast, high confidence)
+        # Strategy 1: SKU/model candidates from the shared match index (no MySQL round trip)
         if s_sku:
-            sku_results = await self.oc.search_products_by_sku(s_sku)
+            sku_results = (await get_match_index()).sku_candidates(s_sku)
             for p in sku_results:
                 if p['product_id'] not in seen_ids:
                     oc_products.append(p)
                     seen_ids.add(p['product_id'])
 
         # Strategy 2: Standard name search (AND-based, progressive relaxation)
-        name_results = await self.oc.search_products_by_name(s_name)
+        name_results = await self.search_index.search_products_by_name(s_name)
         for p in name_results:
             if p['product_id'] not in seen_ids:
                 oc_products.append(p)
@@ -71,72 +75,155 @@ class AlignmentEngine:
 
         # Strategy 3: OR-based search if we still have few results
         if len(oc_products) < 5 and s_name:
-            or_results = await self.oc.search_products_by_name_or(s_name)
+            or_results = await self.search_index.search_products_by_name_or(s_name)
             for p in or_results:
                 if p['product_id'] not in seen_ids:
                     oc_products.append(p)
                     seen_ids.add(p['product_id'])
 
         # Score all candidates
-        ranked_candidates = []
         s_name_norm = _normalize_name(s_name)
-        s_sku_norm = re.sub(r'[^a-z0-9]', '', s_sku.lower()) if s_sku else ''
-
-        for p in oc_products:
-            score = 0
-            match_type = "fuzzy"
-
-            p_sku = p.get('sku', '') or ''
-            p_model = p.get('model', '') or ''
-            p_name = p.get('name', '')
-            p_price = float(p.get('price', 0) or 0)
-
-            # 1. Exact SKU/model match (highest priority)
-            p_sku_norm = re.sub(r'[^a-z0-9]', '', p_sku.lower()) if p_sku else ''
-            p_model_norm = re.sub(r'[^a-z0-9]', '', p_model.lower()) if p_model else ''
-
-            if s_sku_norm and (
-                (p_sku_norm and s_sku_norm == p_sku_norm) or
-                (p_model_norm and s_sku_norm == p_model_norm)
-            ):
-                score = 100
-                match_type = "exact_sku"
-            else:
-                # 2. Fuzzy name match with normalized names
-                p_name_norm = _normalize_name(p_name)
-                score_raw = fuzz.token_set_ratio(s_name, p_name)
-                score_norm = fuzz.token_set_ratio(s_name_norm, p_name_norm)
-                score = max(score_raw, score_norm)
-
-                # 3. Bonus: if a model number from supplier appears in OpenCart name
-                model_nums = [w for w in re.findall(r'\w+', s_name_norm)
-                              if re.search(r'[a-z]', w) and re.search(r'\d', w) and len(w) >= 4]
-                p_name_stripped = re.sub(r'[^a-z0-9\s]', '', p_name.lower())
-                for model in model_nums:
-                    if model in p_name_stripped.replace('-', '').replace(' ', ''):
-                        score = max(score, 85)
-                        match_type = "model_match"
-                        break
-
-                # 4. Bonus: SKU appears as substring in OpenCart name or vice versa
-                if s_sku_norm and len(s_sku_norm) >= 4:
-                    if s_sku_norm in p_name_norm.replace('-', '').replace(' ', ''):
-                        score = max(score, 90)
-                        match_type = "sku_in_name"
-
-            # Price penalty: gentler — only penalize extreme differences
-            # Supplier cost is typically 40-60% of retail, so >70% diff is suspicious
-            if s_price > 0 and p_price > 0:
-                diff_pct = abs(s_price - p_price) / max(s_price, p_price)
-                if diff_pct > 0.85:
-                    score = int(score * 0.7)  # Mild penalty for very large diff
-
-            ranked_candidates.append({
-                "confidence": score,
-                "match_type": match_type,
-                "price_diff_pct": round(abs(s_price - p_price) / max(s_price, p_price) * 100, 1) if s_price and p_price else 0,
-                "product": p
-            })
-
-        ranked_candidates.sort(key=lambda x: x['confidence'], reverse=True)
-        return ranked_candidates[:limit]
+        name_scores = [
+            max(fuzz.token_set_ratio(s_name, p.get('name') or ''),
+                fuzz.token_set_ratio(s_name_norm, _normalize_name(p.get('name') or '')))
+            for p in oc_products
+        ]
+        return _rank_candidates(supplier_product, oc_products, name_scores, limit)
+
+    async def find_matches_batch(self, supplier_products: List[Dict[str, Any]], limit: int = 10,
+                                 workers: int = -1) -> List[List[Dict[str, Any]]]:
+        """find_matches for many supplier products in one pass.
+
+        Candidates come from the in-memory match and name indexes, and every
+        name similarity of the batch is scored together (rapidfuzz, off the
+        event loop). Falls back to per-product find_matches when the name
+        index can't load.
+
+        Returns:
+            Ranked candidates per supplier product, in input order
+        """
+        if not supplier_products:
+            return []
+        if not await self.search_index.ready():
+            return list(await asyncio.gather(*(self.find_matches(p, limit) for p in supplier_products)))
+
+        index = await get_match_index()
+        return await asyncio.to_thread(self._match_batch, supplier_products, index, limit, workers)
+
+    def _match_batch(self, supplier_products: List[Dict[str, Any]], index: MatchIndex,
+                     limit: int, workers: int) -> List[List[Dict[str, Any]]]:
+        batches: List[List[Dict[str, Any]]] = []
+        processed: Dict[int, Any] = {}  # product_id -> preprocessed (name, normalized name)
+        left_raw: List[str] = []
+        right_raw: List[str] = []
+        left_norm: List[str] = []
+        right_norm: List[str] = []
+
+        for supplier_product in supplier_products:
+            s_sku = supplier_product.get('sku', '')
+            s_name = supplier_product.get('name', '') or ''
+
+            # Same three strategies as find_matches, against memory only
+            candidates: Dict[int, Dict[str, Any]] = {}
+            for p in index.sku_candidates(s_sku) if s_sku else []:
+                candidates.setdefault(p['product_id'], p)
+            for p in self.search_index.search(s_name):
+                candidates.setdefault(p['product_id'], p)
+            if len(candidates) < 5 and s_name:
+                for p in self.search_index.search_or(s_name):
+                    candidates.setdefault(p['product_id'], p)
+            oc_products = list(candidates.values())
+            batches.append(oc_products)
+
+            s_name_p = process_text(s_name)
+            s_norm_p = process_text(_normalize_name(s_name))
+            for p in oc_products:
+                texts = processed.get(p['product_id'])
+                if texts is None:
+                    p_name = p.get('name', '') or ''
+                    texts = processed[p['product_id']] = (process_text(p_name), process_text(_normalize_name(p_name)))
+                left_raw.append(s_name_p)
+                right_raw.append(texts[0])
+                left_norm.append(s_norm_p)
+                right_norm.append(texts[1])
+
+        raw_scores = token_set_scores(left_raw, right_raw, workers)
+        norm_scores = token_set_scores(left_norm, right_norm, workers)
+
+        results = []
+        pair = 0
+        for supplier_product, oc_products in zip(supplier_products, batches):
+            name_scores = [max(raw, norm) for raw, norm in
+                           zip(raw_scores[pair:pair + len(oc_products)], norm_scores[pair:pair + len(oc_products)])]
+            pair += len(oc_products)
+            results.append(_rank_candidates(supplier_product, oc_products, name_scores, limit))
+        return results
+
+
+def _rank_candidates(supplier_product: Dict[str, Any], oc_products: List[Dict[str, Any]],
+                     name_scores: List[int], limit: int) -> List[Dict[str, Any]]:
+    """Score and rank candidates; ``name_scores[i]`` is the name similarity of ``oc_products[i]``."""
+    s_sku = supplier_product.get('sku', '')
+    s_name = supplier_product.get('name', '')
+    s_price = float(supplier_product.get('price', 0) or 0)
+
+    ranked_candidates = []
+    s_name_norm = _normalize_name(s_name or '')
+    s_sku_norm = re.sub(r'[^a-z0-9]', '', s_sku.lower()) if s_sku else ''
+
+    for p, name_score in zip(oc_products, name_scores):
+        score = 0
+        match_type = "fuzzy"
+
+        p_sku = p.get('sku', '') or ''
+        p_model = p.get('model', '') or ''
+        p_name = p.get('name', '')
+        p_price = float(p.get('price', 0) or 0)
+
+        # 1. Exact SKU/model match (highest priority)
+        p_sku_norm = re.sub(r'[^a-z0-9]', '', p_sku.lower()) if p_sku else ''
+        p_model_norm = re.sub(r'[^a-z0-9]', '', p_model.lower()) if p_model else ''
+
+        if s_sku_norm and (
+            (p_sku_norm and s_sku_norm == p_sku_norm) or
+            (p_model_norm and s_sku_norm == p_model_norm)
+        ):
+            score = 100
+            match_type = "exact_sku"
+        else:
+            # 2. Fuzzy name match with normalized names (scored by the caller)
+            p_name_norm = _normalize_name(p_name)
+            score = name_score
+
+            # 3. Bonus: if a model number from supplier appears in OpenCart name
+            model_nums = [w for w in re.findall(r'\w+', s_name_norm)
+                          if re.search(r'[a-z]', w) and re.search(r'\d', w) and len(w) >= 4]
+            p_name_stripped = re.sub(r'[^a-z0-9\s]', '', p_name.lower())
+            for model in model_nums:
+                if model in p_name_stripped.replace('-', '').replace(' ', ''):
+                    score = max(score, 85)
+                    match_type = "model_match"
+                    break
+
+            # 4. Bonus: SKU appears as substring in OpenCart name or vice versa
+            if s_sku_norm and len(s_sku_norm) >= 4:
+                if s_sku_norm in p_name_norm.replace('-', '').replace(' ', ''):
+                    score = max(score, 90)
+                    match_type = "sku_in_name"
+
+        # Price penalty: gentler — only penalize extreme differences
+        # Supplier cost is typically 40-60% of retail, so >70% diff is suspicious
+        if s_price > 0 and p_price > 0:
+            diff_pct = abs(s_price - p_price) / max(s_price, p_price)
+            if diff_pct > 0.85:
+                score = int(score * 0.7)  # Mild penalty for very large diff
+
+        ranked_candidates.append({
+            "confidence": score,
+            "match_type": match_type,
+            "price_diff_pct": round(abs(s_price - p_price) / max(s_price, p_price) * 100, 1) if s_price and p_price else 0,
+            "product": p
+        })
+
+    ranked_candidates.sort(key=lambda x: x['confidence'], reverse=True)
+    return ranked_candidates[:limit]
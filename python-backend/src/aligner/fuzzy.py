@@ -0,0 +1,135 @@
+"""Batch fuzzy scoring for auto-link pass 2.
+
+Scores every (supplier product, OpenCart candidate) pair of a run together:
+candidates come from the persisted name index, OpenCart names are
+normalized once per row rather than per comparison, and the token-set
+ratios are computed by rapidfuzz over flat pair lists (``cpdist``), which
+runs in native code across all cores without holding the GIL.
+
+Scores match thefuzz's ``token_set_ratio`` (same preprocessing and rounding),
+so thresholds tuned against the old per-pair loop still apply.
+"""
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    from rapidfuzz import fuzz as _fuzz, process as _process, utils as _utils
+except ImportError:
+    _fuzz = _process = _utils = None
+
+from src.aligner.match_artifact import MatchArtifact
+from src.connectors.opencart import normalize_product_key
+from src.search.text import content_words
+
+# Candidates scored per supplier product (most shared name words first)
+CANDIDATE_LIMIT = 50
+
+
+@dataclass
+class FuzzyMatch:
+    """Best OpenCart candidate for one supplier product."""
+    product_id: int
+    score: int
+    match_type: str  # exact_sku, sku_in_name or fuzzy
+
+
+def process_text(text: str) -> str:
+    """thefuzz's full_process: ASCII only, lowercased, non-alphanumerics as spaces, trimmed."""
+    text = (text or '').encode("ascii", "ignore").decode()
+    return _utils.default_process(text) if _utils else text.lower().strip()
+
+
+def _jaccard(s1: str, s2: str) -> int:
+    """Fallback when rapidfuzz isn't installed: Jaccard similarity on word sets."""
+    set1, set2 = set(s1.split()), set(s2.split())
+    if not set1 or not set2:
+        return 0
+    return int(len(set1 & set2) / len(set1 | set2) * 100)
+
+
+def token_set_scores(left: List[str], right: List[str], workers: int) -> List[int]:
+    """token_set_ratio of each (left[i], right[i]) pair of preprocessed strings."""
+    if not left:
+        return []
+    if _process is None:
+        return [_jaccard(a, b) for a, b in zip(left, right)]
+    if hasattr(_process, "cpdist"):
+        scores = _process.cpdist(left, right, scorer=_fuzz.token_set_ratio, workers=workers).tolist()
+    else:
+        scores = [_fuzz.token_set_ratio(a, b) for a, b in zip(left, right)]
+    return [int(round(score)) for score in scores]
+
+
+def score_candidates(
+    items: Sequence[Tuple[str, str]],
+    index: MatchArtifact,
+    candidate_limit: int = CANDIDATE_LIMIT,
+    workers: int = -1,
+) -> List[Optional[FuzzyMatch]]:
+    """Best-scoring OpenCart product for each supplier ``(name, sku)``.
+
+    Per candidate: an exact normalized SKU/model match scores 100, the SKU
+    inside the OpenCart name 90; otherwise the higher token-set ratio of the
+    raw and normalized names. The first candidate with the top score wins.
+    CPU-bound: call it off the event loop (e.g. ``asyncio.to_thread``).
+
+    Returns:
+        One entry per item, None where no candidate scored above 0
+    """
+    plans: List[List[Tuple[int, int, str, Optional[int]]]] = []  # (product_id, score, type, pair)
+    processed: Dict[int, Tuple[str, str]] = {}  # row -> preprocessed (name, normalized name)
+    left_raw: List[str] = []
+    right_raw: List[str] = []
+    left_norm: List[str] = []
+    right_norm: List[str] = []
+
+    for s_name, s_sku in items:
+        plan: List[Tuple[int, int, str, Optional[int]]] = []
+        plans.append(plan)
+        s_words = content_words(s_name) if s_name else []
+        if not s_words:
+            continue
+
+        # Only consider candidates sharing at least 2 words (or 1 if few words)
+        min_shared = 2 if len(s_words) >= 2 else 1
+        s_sku_norm = normalize_product_key(s_sku)
+        s_name_p = process_text(s_name)
+        s_norm_p = process_text(normalize_product_key(s_name))
+
+        for idx in index.candidates(s_words, min_shared=min_shared, limit=candidate_limit):
+            oc_pid, oc_name, oc_sku_norm, oc_model_norm = index.row(idx)
+            score, match_type = 0, "fuzzy"
+
+            # SKU match bonus
+            if s_sku_norm and len(s_sku_norm) >= 4:
+                if s_sku_norm == oc_sku_norm or s_sku_norm == oc_model_norm:
+                    score, match_type = 100, "exact_sku"
+                elif s_sku_norm in index.norm_name(idx):
+                    score, match_type = 90, "sku_in_name"
+
+            # Fuzzy name match, scored in bulk below
+            pair = None
+            if score < 90:
+                texts = processed.get(idx)
+                if texts is None:
+                    texts = processed[idx] = (process_text(oc_name), process_text(index.norm_name(idx)))
+                pair = len(left_raw)
+                left_raw.append(s_name_p)
+                right_raw.append(texts[0])
+                left_norm.append(s_norm_p)
+                right_norm.append(texts[1])
+            plan.append((oc_pid, score, match_type, pair))
+
+    raw_scores = token_set_scores(left_raw, right_raw, workers)
+    norm_scores = token_set_scores(left_norm, right_norm, workers)
+
+    results: List[Optional[FuzzyMatch]] = []
+    for plan in plans:
+        best: Optional[FuzzyMatch] = None
+        for oc_pid, score, match_type, pair in plan:
+            if pair is not None:
+                score = max(score, raw_scores[pair], norm_scores[pair])
+            if score > (best.score if best else 0):
+                best = FuzzyMatch(oc_pid, score, match_type)
+        results.append(best)
+    return results
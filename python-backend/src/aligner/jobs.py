@@ -0,0 +1,311 @@
+"""Persistent, resumable alignment jobs (bulk align, auto-link).
+
+Each run is a row in ``alignment_jobs`` (migration 023) holding the current
+pass, the last processed key and the counts so far, so progress is visible
+from any replica and a run interrupted by a restart continues from its last
+checkpoint instead of starting over:
+
+    job, started = await get_alignment_job_store().start("bulk_align")
+    if started:
+        async with job.heartbeat():
+            ...
+            await job.checkpoint("matching", last_key=page[-1]["id"], linked=n)
+        await job.finish("completed", result)
+
+A running job whose heartbeat is older than ``alignment_job_stale_seconds``
+is considered dead; the next start() of that kind claims and resumes it, as
+it does the latest failed job when started with the same parameters.
+checkpoint() raises JobCancelled once cancellation was requested. If the
+table doesn't exist yet, jobs are kept in process memory (no resume).
+"""
+import asyncio
+import contextlib
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.connectors.supabase import SupabaseConnector, get_supabase_connector
+from src.utils.config import get_config
+from src.utils.logging import AgentLogger
+
+logger = AgentLogger("AlignmentJobs")
+
+JOB_KINDS = ("bulk_align", "auto_link")
+ACTIVE_STATUSES = ("queued", "running")
+
+# PostgREST/Postgres codes for a missing table (migration 023 not applied)
+_MISSING_TABLE_CODES = ("PGRST205", "42P01")
+# Unique violation: another replica started a job of this kind first
+_UNIQUE_VIOLATION = "23505"
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _age_seconds(timestamp: Optional[str]) -> float:
+    if not timestamp:
+        return float("inf")
+    try:
+        return (datetime.now(timezone.utc) - datetime.fromisoformat(timestamp)).total_seconds()
+    except ValueError:
+        return float("inf")
+
+
+class JobCancelled(Exception):
+    """Raised by AlignmentJob.checkpoint() once cancellation was requested."""
+
+
+class AlignmentJob:
+    """One alignment_jobs row plus the calls that move it forward."""
+
+    def __init__(self, store: "AlignmentJobStore", row: Dict[str, Any], resumed: bool = False):
+        self._store = store
+        self.row = row
+        self.resumed = resumed
+
+    @property
+    def id(self) -> str:
+        return self.row["id"]
+
+    @property
+    def kind(self) -> str:
+        return self.row["kind"]
+
+    @property
+    def params(self) -> Dict[str, Any]:
+        return self.row.get("params") or {}
+
+    @property
+    def pass_name(self) -> Optional[str]:
+        return self.row.get("pass")
+
+    @property
+    def last_key(self) -> Optional[str]:
+        return self.row.get("last_key")
+
+    @property
+    def counts(self) -> Dict[str, Any]:
+        return self.row.get("counts") or {}
+
+    async def checkpoint(self, pass_name: str, last_key: Any = None, **counts: Any) -> None:
+        """Persist progress (counts are merged into the saved ones).
+
+        Raises:
+            JobCancelled: cancellation was requested for this job
+        """
+        values = {
+            "pass": pass_name,
+            "last_key": None if last_key is None else str(last_key),
+            "counts": {**self.counts, **counts},
+            "heartbeat_at": _now(),
+        }
+        row = await self._store._update(self.id, values)
+        self.row.update(row or values)
+        if self.row.get("cancel_requested"):
+            raise JobCancelled(self.id)
+
+    async def finish(self, status: str, result: Optional[Dict[str, Any]] = None,
+                     error: Optional[str] = None) -> None:
+        """Mark the job completed, failed or cancelled."""
+        values = {"status": status, "result": result, "error": error,
+                  "completed_at": _now(), "heartbeat_at": _now()}
+        row = await self._store._update(self.id, values)
+        self.row.update(row or values)
+        logger.info("alignment_job_finished", job_id=self.id, kind=self.kind, status=status)
+
+    @contextlib.asynccontextmanager
+    async def heartbeat(self, interval: Optional[float] = None):
+        """Keep heartbeat_at fresh between checkpoints (long loads, scoring)."""
+        interval = interval or max(get_config().alignment_job_stale_seconds / 4, 5)
+
+        async def _beat():
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    await self._store._update(self.id, {"heartbeat_at": _now()})
+                except Exception as e:
+                    logger.warning("alignment_job_heartbeat_failed", job_id=self.id, error=str(e))
+
+        task = asyncio.create_task(_beat())
+        try:
+            yield self
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(self.row)
+
+
+class AlignmentJobStore:
+    """alignment_jobs table access (falls back to process memory without the table)."""
+
+    def __init__(self, sb: Optional[SupabaseConnector] = None):
+        self.sb = sb or get_supabase_connector()
+        self._memory: Optional[Dict[str, Dict[str, Any]]] = None
+
+    def _use_memory(self, error: Exception) -> bool:
+        """Switch to in-memory jobs if ``error`` says the table is missing."""
+        if getattr(error, "code", None) not in _MISSING_TABLE_CODES:
+            return False
+        if self._memory is None:
+            self._memory = {}
+            logger.warning("alignment_jobs_table_unavailable", error=str(error))
+        return True
+
+    async def _insert(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        if self._memory is None:
+            try:
+                response = await self.sb.db.table("alignment_jobs").insert(row).execute()
+                return response.data[0]
+            except Exception as e:
+                if not self._use_memory(e):
+                    raise
+        row = {"id": str(uuid.uuid4()), "counts": {}, "cancel_requested": False, "created_at": _now(), **row}
+        self._memory[row["id"]] = row
+        return row
+
+    async def _update(self, job_id: str, values: Dict[str, Any],
+                      expect: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Update one job; with ``expect`` only if those columns still hold those values."""
+        values = {**values, "updated_at": _now()}
+        if self._memory is None:
+            try:
+                query = self.sb.db.table("alignment_jobs").update(values).eq("id", job_id)
+                for column, value in (expect or {}).items():
+                    query = query.is_(column, "null") if value is None else query.eq(column, value)
+                response = await query.execute()
+                return response.data[0] if response.data else None
+            except Exception as e:
+                if not self._use_memory(e):
+                    raise
+        row = self._memory.get(job_id)
+        if row is None or any(row.get(k) != v for k, v in (expect or {}).items()):
+            return None
+        row.update(values)
+        return dict(row)
+
+    async def _select(self, kind: Optional[str] = None, job_id: Optional[str] = None,
+                      active: bool = False, limit: int = 20) -> List[Dict[str, Any]]:
+        if self._memory is None:
+            try:
+                query = self.sb.db.table("alignment_jobs").select("*")
+                if kind:
+                    query = query.eq("kind", kind)
+                if job_id:
+                    query = query.eq("id", job_id)
+                if active:
+                    query = query.in_("status", list(ACTIVE_STATUSES))
+                response = await query.order("created_at", desc=True).limit(limit).execute()
+                return response.data or []
+            except Exception as e:
+                if not self._use_memory(e):
+                    raise
+        rows = [
+            dict(row) for row in self._memory.values()
+            if (not kind or row["kind"] == kind) and (not job_id or row["id"] == job_id)
+            and (not active or row["status"] in ACTIVE_STATUSES)
+        ]
+        rows.sort(key=lambda row: row["created_at"], reverse=True)
+        return rows[:limit]
+
+    async def start(self, kind: str, params: Optional[Dict[str, Any]] = None) -> Tuple[AlignmentJob, bool]:
+        """Start (or resume) a job of ``kind``.
+
+        Returns:
+            (job, True) for a new job or a dead one claimed for resuming;
+            (job, False) if a live job of this kind is already running
+        """
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown alignment job kind: {kind}")
+
+        for _ in range(2):
+            active = await self._select(kind=kind, active=True, limit=1)
+            if active:
+                row = active[0]
+                if _age_seconds(row.get("heartbeat_at")) < get_config().alignment_job_stale_seconds:
+                    return AlignmentJob(self, row), False
+                # The worker running it died: claim it (only one replica wins)
+                claimed = await self._update(row["id"], {"status": "running", "heartbeat_at": _now()},
+                                             expect={"heartbeat_at": row.get("heartbeat_at")})
+                if claimed:
+                    logger.info("alignment_job_resumed", job_id=row["id"], kind=kind,
+                                pass_name=row.get("pass"), last_key=row.get("last_key"))
+                    return AlignmentJob(self, claimed, resumed=True), True
+                continue
+
+            # A failed run with the same parameters continues from its checkpoint
+            latest = await self._select(kind=kind, limit=1)
+            if latest and latest[0]["status"] == "failed" and (latest[0].get("params") or {}) == (params or {}):
+                try:
+                    reopened = await self._update(
+                        latest[0]["id"], {"status": "running", "error": None, "completed_at": None,
+                                          "cancel_requested": False, "heartbeat_at": _now()},
+                        expect={"status": "failed"},
+                    )
+                except Exception as e:
+                    if getattr(e, "code", None) != _UNIQUE_VIOLATION:
+                        raise
+                    reopened = None
+                if reopened:
+                    logger.info("alignment_job_resumed", job_id=reopened["id"], kind=kind,
+                                pass_name=reopened.get("pass"), last_key=reopened.get("last_key"))
+                    return AlignmentJob(self, reopened, resumed=True), True
+                continue
+
+            try:
+                row = await self._insert({
+                    "kind": kind,
+                    "status": "running",
+                    "params": params or {},
+                    "counts": {},
+                    "heartbeat_at": _now(),
+                })
+            except Exception as e:
+                if getattr(e, "code", None) == _UNIQUE_VIOLATION:
+                    continue  # Another replica started one just now
+                raise
+            logger.info("alignment_job_started", job_id=row["id"], kind=kind)
+            return AlignmentJob(self, row), True
+
+        active = await self._select(kind=kind, active=True, limit=1)
+        return AlignmentJob(self, active[0]), False
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        rows = await self._select(job_id=job_id, limit=1)
+        return rows[0] if rows else None
+
+    async def latest(self, kind: str) -> Optional[Dict[str, Any]]:
+        rows = await self._select(kind=kind, limit=1)
+        return rows[0] if rows else None
+
+    async def list(self, kind: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        return await self._select(kind=kind, limit=limit)
+
+    async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Request cancellation; the worker stops at its next checkpoint.
+
+        A job nobody is running any more (stale heartbeat) is cancelled directly.
+        """
+        row = await self.get(job_id)
+        if not row or row["status"] not in ACTIVE_STATUSES:
+            return row
+        values: Dict[str, Any] = {"cancel_requested": True}
+        if _age_seconds(row.get("heartbeat_at")) >= get_config().alignment_job_stale_seconds:
+            values.update(status="cancelled", completed_at=_now())
+        logger.info("alignment_job_cancel_requested", job_id=job_id, kind=row["kind"])
+        return await self._update(job_id, values)
+
+
+# Global instance
+_alignment_job_store: Optional[AlignmentJobStore] = None
+
+
+def get_alignment_job_store() -> AlignmentJobStore:
+    """Get or create the global alignment job store."""
+    global _alignment_job_store
+    if _alignment_job_store is None:
+        _alignment_job_store = AlignmentJobStore()
+    return _alignment_job_store
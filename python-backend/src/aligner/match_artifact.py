@@ -0,0 +1,408 @@
+"""Persisted, versioned name index for auto-link matching.
+
+Pass 2 of auto_link_products needs every active OpenCart product's name,
+normalized SKU/model and a word -> products inverted index. Rebuilding that
+from the catalog on every run (once per supplier sync) is the expensive
+part, so it is kept as an on-disk artifact of flat numpy arrays, memory-mapped
+on load and tagged with the catalog it was built from. Later runs apply
+only the products changed since then as a small in-memory overlay. The
+files are rewritten when the overlay grows large or the artifact ages out.
+
+Layout of ``match_index_dir``::
+
+    CURRENT             name of the live build directory
+    <build>/manifest.json
+    <build>/<array>.npy  pids, stamps, name/norm/sku/model/vocab blobs + offsets, postings
+"""
+import json
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from src.catalog.snapshot import CatalogService, CatalogSnapshot, get_catalog_service
+from src.connectors.db_executor import run_blocking
+from src.connectors.opencart import normalize_product_key
+from src.search.text import content_words
+from src.utils.config import get_config
+from src.utils.logging import AgentLogger
+
+logger = AgentLogger("MatchArtifact")
+
+FORMAT_VERSION = 2
+
+# String columns stored as one UTF-8 blob plus an offsets array each
+_STRING_COLUMNS = ("name", "norm", "sku", "model", "vocab")
+_ARRAYS = ("pids", "stamps", "post_off", "post_rows") + tuple(
+    f"{column}_{part}" for column in _STRING_COLUMNS for part in ("blob", "off")
+)
+
+# (product_id, name, normalized sku, normalized model, date_modified stamp)
+Row = Tuple[int, str, str, str, int]
+
+
+def _stamp(value: Any) -> int:
+    """date_modified as whole seconds (0 when unknown)."""
+    if value is None:
+        return 0
+    if hasattr(value, "timestamp"):
+        return int(value.timestamp())
+    return int(value)
+
+
+def _product_row(p: Dict[str, Any]) -> Row:
+    return (
+        p['product_id'],
+        p['name'],
+        normalize_product_key(p.get('sku')),
+        normalize_product_key(p.get('model')),
+        _stamp(p.get('date_modified')),
+    )
+
+
+def _pack(strings: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+class MatchArtifact:
+    """Immutable name index: base arrays (possibly memory-mapped) plus an overlay.
+
+    Rows are addressed by index: base rows first (product_id order), then
+    overlay rows. Changed products get a new overlay row and their old row
+    is marked dead, so indexes handed out stay valid for this object.
+
+    Attributes:
+        catalog_version: CatalogSnapshot.version this index reflects
+        built_at: Unix time the base arrays were built
+    """
+
+    def __init__(
+        self,
+        arrays: Dict[str, np.ndarray],
+        built_at: float,
+        catalog_version: int = 0,
+        dead: FrozenSet[int] = frozenset(),
+        extra: Tuple[Row, ...] = (),
+        extra_postings: Optional[Dict[str, Tuple[int, ...]]] = None,
+        row_of: Optional[Dict[int, int]] = None,
+        vocab: Optional[Dict[str, int]] = None,
+        cache: Optional[Dict[str, List[Any]]] = None,
+    ):
+        self._arrays = arrays
+        self.built_at = built_at
+        self.catalog_version = catalog_version
+        self._base_n = len(arrays["pids"])
+        self._dead = dead
+        self._dead_array = np.fromiter(dead, dtype=np.int64, count=len(dead))
+        self._extra = extra
+        self._extra_postings = extra_postings or {}
+        self._row_of = row_of if row_of is not None else {
+            pid: idx for idx, pid in enumerate(arrays["pids"].tolist())
+        }
+        self._vocab = vocab if vocab is not None else {
+            word: idx for idx, word in enumerate(self._strings("vocab"))
+        }
+        # Base columns decoded on first use; shared with derived artifacts
+        self._cache = cache if cache is not None else {}
+
+    # -- building -----------------------------------------------------------
+
+    @classmethod
+    def build(cls, snapshot: CatalogSnapshot) -> "MatchArtifact":
+        """Index every active, named product of ``snapshot``."""
+        rows = [_product_row(p) for p in snapshot.by_id.values() if p.get('name')]
+        artifact = cls._from_rows(rows)
+        artifact.catalog_version = snapshot.version
+        return artifact
+
+    @classmethod
+    def _from_rows(cls, rows: List[Row]) -> "MatchArtifact":
+        rows = sorted(rows)
+        postings: Dict[str, List[int]] = {}
+        for idx, row in enumerate(rows):
+            for word in set(content_words(row[1])):
+                postings.setdefault(word, []).append(idx)
+        words = sorted(postings)
+
+        arrays: Dict[str, np.ndarray] = {
+            "pids": np.array([r[0] for r in rows], dtype=np.int64),
+            "stamps": np.array([r[4] for r in rows], dtype=np.int64),
+            "post_off": np.zeros(len(words) + 1, dtype=np.int64),
+        }
+        for column, position in (("name", 1), ("sku", 2), ("model", 3)):
+            arrays[f"{column}_blob"], arrays[f"{column}_off"] = _pack([r[position] for r in rows])
+        arrays["norm_blob"], arrays["norm_off"] = _pack([normalize_product_key(r[1]) for r in rows])
+        arrays["vocab_blob"], arrays["vocab_off"] = _pack(words)
+        if words:
+            np.cumsum([len(postings[w]) for w in words], out=arrays["post_off"][1:])
+        arrays["post_rows"] = np.array([idx for w in words for idx in postings[w]], dtype=np.int32)
+        return cls(arrays, built_at=time.time())
+
+    # -- reading ------------------------------------------------------------
+
+    def __len__(self) -> int:
+        return self._base_n + len(self._extra) - len(self._dead)
+
+    @property
+    def word_count(self) -> int:
+        return len(self._vocab) + sum(1 for w in self._extra_postings if w not in self._vocab)
+
+    @property
+    def overlay_size(self) -> int:
+        """Rows changed or removed since the base arrays were built."""
+        return len(self._dead) + len(self._extra)
+
+    def _column(self, column: str) -> List[Any]:
+        values = self._cache.get(column)
+        if values is None:
+            values = self._arrays["pids"].tolist() if column == "pids" else self._strings(column)
+            self._cache[column] = values
+        return values
+
+    def _strings(self, column: str) -> List[str]:
+        offsets = self._arrays[f"{column}_off"].tolist()
+        blob = self._arrays[f"{column}_blob"].tobytes()
+        return [blob[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+    def row(self, idx: int) -> Tuple[int, str, str, str]:
+        """(product_id, name, normalized sku, normalized model) of row ``idx``."""
+        if idx >= self._base_n:
+            return self._extra[idx - self._base_n][:4]
+        return (
+            self._column("pids")[idx],
+            self._column("name")[idx],
+            self._column("sku")[idx],
+            self._column("model")[idx],
+        )
+
+    def norm_name(self, idx: int) -> str:
+        """Normalized name (lowercase alphanumerics) of row ``idx``."""
+        if idx >= self._base_n:
+            return normalize_product_key(self._extra[idx - self._base_n][1])
+        return self._column("norm")[idx]
+
+    def _stamp_of(self, idx: int) -> int:
+        if idx >= self._base_n:
+            return self._extra[idx - self._base_n][4]
+        return int(self._arrays["stamps"][idx])
+
+    def candidates(self, words: Iterable[str], min_shared: int = 1, limit: int = 50) -> List[int]:
+        """Live rows sharing at least ``min_shared`` of ``words``, most shared first.
+
+        Ties keep row order (product_id order for base rows).
+        """
+        parts = []
+        for word in words:
+            vocab_idx = self._vocab.get(word)
+            if vocab_idx is not None:
+                start, end = self._arrays["post_off"][vocab_idx], self._arrays["post_off"][vocab_idx + 1]
+                parts.append(self._arrays["post_rows"][start:end].astype(np.int64))
+            extra = self._extra_postings.get(word)
+            if extra:
+                parts.append(np.array(extra, dtype=np.int64))
+        if not parts:
+            return []
+        ids, counts = np.unique(np.concatenate(parts), return_counts=True)
+        mask = counts >= min_shared
+        if self._dead:
+            mask &= ~np.isin(ids, self._dead_array)
+        ids, counts = ids[mask], counts[mask]
+        order = np.lexsort((ids, -counts))[:limit]
+        return ids[order].tolist()
+
+    def live_rows(self) -> List[Row]:
+        rows = [
+            (*self.row(idx), self._stamp_of(idx))
+            for idx in range(self._base_n) if idx not in self._dead
+        ]
+        rows.extend(row for i, row in enumerate(self._extra) if self._base_n + i not in self._dead)
+        return rows
+
+    # -- deltas -------------------------------------------------------------
+
+    def diff(self, snapshot: CatalogSnapshot) -> Tuple[List[Row], List[int]]:
+        """Products of ``snapshot`` that are new or modified, and product_ids to drop."""
+        changed: List[Row] = []
+        live = set()
+        for pid, p in snapshot.by_id.items():
+            if not p.get('name'):
+                continue
+            live.add(pid)
+            idx = self._row_of.get(pid)
+            if idx is None or self._stamp_of(idx) != _stamp(p.get('date_modified')):
+                changed.append(_product_row(p))
+        removed = [pid for pid in self._row_of if pid not in live]
+        return changed, removed
+
+    def with_delta(self, changed: List[Row], removed: List[int], catalog_version: int) -> "MatchArtifact":
+        """New artifact with ``changed`` rows (re)indexed and ``removed`` products dropped."""
+        if not changed and not removed:
+            return MatchArtifact(
+                self._arrays, self.built_at, catalog_version, dead=self._dead, extra=self._extra,
+                extra_postings=self._extra_postings, row_of=self._row_of, vocab=self._vocab,
+                cache=self._cache,
+            )
+        dead = set(self._dead)
+        extra = list(self._extra)
+        extra_postings = {word: list(rows) for word, rows in self._extra_postings.items()}
+        row_of = dict(self._row_of)
+
+        for pid in removed:
+            idx = row_of.pop(pid, None)
+            if idx is not None:
+                dead.add(idx)
+        for row in changed:
+            idx = row_of.get(row[0])
+            if idx is not None:
+                dead.add(idx)
+            idx = self._base_n + len(extra)
+            extra.append(row)
+            row_of[row[0]] = idx
+            for word in set(content_words(row[1])):
+                extra_postings.setdefault(word, []).append(idx)
+
+        return MatchArtifact(
+            self._arrays, self.built_at, catalog_version,
+            dead=frozenset(dead),
+            extra=tuple(extra),
+            extra_postings={word: tuple(rows) for word, rows in extra_postings.items()},
+            row_of=row_of,
+            vocab=self._vocab,
+            cache=self._cache,
+        )
+
+    def compacted(self) -> "MatchArtifact":
+        """Fold the overlay into fresh base arrays."""
+        artifact = self._from_rows(self.live_rows())
+        artifact.catalog_version = self.catalog_version
+        return artifact
+
+    # -- persistence --------------------------------------------------------
+
+    def save(self, directory: Path) -> None:
+        """Write a new build directory and switch CURRENT to it atomically."""
+        directory.mkdir(parents=True, exist_ok=True)
+        build = f"build-{int(self.built_at * 1000)}-{os.getpid()}"
+        target = directory / build
+        target.mkdir()
+        for name in _ARRAYS:
+            np.save(target / f"{name}.npy", np.ascontiguousarray(self._arrays[name]))
+        manifest = {
+            "format": FORMAT_VERSION,
+            "built_at": self.built_at,
+            "rows": self._base_n,
+            "words": len(self._vocab),
+        }
+        (target / "manifest.json").write_text(json.dumps(manifest), encoding="utf-8")
+
+        pointer = directory / f"CURRENT.{os.getpid()}.tmp"
+        pointer.write_text(build, encoding="utf-8")
+        os.replace(pointer, directory / "CURRENT")
+
+        for old in directory.glob("build-*"):
+            if old.name != build:
+                # Still-mapped files can't be removed on Windows; retried next save
+                shutil.rmtree(old, ignore_errors=True)
+
+    @classmethod
+    def load(cls, directory: Path) -> Optional["MatchArtifact"]:
+        """Memory-map the current build, or None if there is no usable one."""
+        try:
+            build = (directory / "CURRENT").read_text(encoding="utf-8").strip()
+            manifest = json.loads((directory / build / "manifest.json").read_text(encoding="utf-8"))
+            if manifest.get("format") != FORMAT_VERSION:
+                return None
+            arrays = {name: np.load(directory / build / f"{name}.npy", mmap_mode="r") for name in _ARRAYS}
+            return cls(arrays, built_at=manifest["built_at"])
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning("match_artifact_load_failed", directory=str(directory), error=str(e))
+            return None
+
+
+class MatchArtifactStore:
+    """Keeps the MatchArtifact in step with the shared catalog snapshot.
+
+    The first use in a process loads the persisted artifact (or builds one).
+    Each later use applies the catalog's changes as an overlay rather than
+    re-tokenizing the whole catalog.
+    """
+
+    def __init__(self, catalog: Optional[CatalogService] = None, directory: Optional[str] = None):
+        self.catalog = catalog or get_catalog_service()
+        self.config = get_config()
+        self.directory = Path(directory or self.config.match_index_dir)
+        self._lock = threading.Lock()
+        self._artifact: Optional[MatchArtifact] = None
+
+    def artifact_sync(self) -> MatchArtifact:
+        """Artifact for the current catalog snapshot (blocking)."""
+        snapshot = self.catalog.snapshot_sync()
+        current = self._artifact
+        if current is not None and current.catalog_version == snapshot.version:
+            return current
+        with self._lock:
+            if self._artifact is None or self._artifact.catalog_version != snapshot.version:
+                self._artifact = self._sync(self._artifact, snapshot)
+            return self._artifact
+
+    async def artifact(self) -> MatchArtifact:
+        """Async variant of artifact_sync (any rebuild runs on the DB executor)."""
+        snapshot = await self.catalog.snapshot()
+        current = self._artifact
+        if current is not None and current.catalog_version == snapshot.version:
+            return current
+        return await run_blocking(self.artifact_sync)
+
+    def _sync(self, artifact: Optional[MatchArtifact], snapshot: CatalogSnapshot) -> MatchArtifact:
+        started = time.monotonic()
+        if artifact is None:
+            artifact = MatchArtifact.load(self.directory)
+
+        if artifact is None or time.time() - artifact.built_at >= self.config.match_index_rebuild_seconds:
+            artifact = MatchArtifact.build(snapshot)
+            self._save(artifact)
+            logger.info("match_artifact_built", rows=len(artifact), words=artifact.word_count,
+                        catalog_version=snapshot.version, ms=int((time.monotonic() - started) * 1000))
+            return artifact
+
+        changed, removed = artifact.diff(snapshot)
+        artifact = artifact.with_delta(changed, removed, snapshot.version)
+        if artifact.overlay_size > self.config.match_index_max_overlay_ratio * max(len(artifact), 1):
+            artifact = artifact.compacted()
+            self._save(artifact)
+            logger.info("match_artifact_compacted", rows=len(artifact), words=artifact.word_count,
+                        catalog_version=snapshot.version, ms=int((time.monotonic() - started) * 1000))
+        elif changed or removed:
+            logger.info("match_artifact_delta_applied", changed=len(changed), removed=len(removed),
+                        overlay=artifact.overlay_size, catalog_version=snapshot.version,
+                        ms=int((time.monotonic() - started) * 1000))
+        return artifact
+
+    def _save(self, artifact: MatchArtifact) -> None:
+        try:
+            artifact.save(self.directory)
+        except Exception as e:
+            # Still usable from memory; the next process rebuilds it
+            logger.warning("match_artifact_save_failed", directory=str(self.directory), error=str(e))
+
+
+# Global instance
+_match_artifact_store: Optional[MatchArtifactStore] = None
+
+
+def get_match_artifact_store() -> MatchArtifactStore:
+    """Get or create the process-wide match artifact store."""
+    global _match_artifact_store
+    if _match_artifact_store is None:
+        _match_artifact_store = MatchArtifactStore()
+    return _match_artifact_store
@@ -0,0 +1,324 @@
+"""Shared SKU/model/name lookup for every alignment path.
+
+Auto-link, bulk align, the potential-duplicates report and the alignment
+engine used to each build their own dicts and re-implement the same
+normalization and prefix stripping. They now describe their matching as an
+ordered list of strategies run against one MatchIndex:
+
+    index = await get_match_index()
+    hit = index.match({"sku": sku, "name": name}, AUTO_LINK_PASS1)
+    if hit:
+        row, strategy = hit
+
+A MatchIndex built from the catalog snapshot reuses the snapshot's lookup
+maps, so it costs nothing to create; one index is kept per catalog version
+so the lazily built multi-row groups are shared between requests.
+"""
+import bisect
+import re
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.aligner.match_artifact import MatchArtifact, get_match_artifact_store
+from src.catalog.snapshot import CatalogSnapshot, fold_key, get_catalog_service, normalize_name
+from src.connectors.opencart import normalize_product_key
+from src.utils.logging import AgentLogger
+
+logger = AgentLogger("MatchIndex")
+
+_SCOOP_SKU = re.compile(r'^(\d+)_en-gb-[A-Z]{3}$')
+_SUPPLIER_PREFIX = re.compile(r'^(sp-[0-9a-f-]+|nol-|pa-|PA-)')
+
+# Shortest normalized name the name map holds (shorter names are too generic)
+MIN_NAME_KEY = 6
+
+
+def extract_scoop_id(sku: Optional[str]) -> Optional[int]:
+    """OpenCart product_id from a Scoop-format SKU ('12622_en-gb-ZAR' -> 12622)."""
+    m = _SCOOP_SKU.match(sku or '')
+    return int(m.group(1)) if m else None
+
+
+def strip_supplier_prefix(sku: Optional[str]) -> Optional[str]:
+    """Strip common supplier prefixes ('sp-UUID', 'nol-123', 'PA-123'); None if there was none."""
+    if not sku:
+        return None
+    stripped = _SUPPLIER_PREFIX.sub('', sku)
+    return stripped if stripped != sku else None
+
+
+@dataclass(frozen=True)
+class Strategy:
+    """One matching rule: look ``field`` of the query up with ``lookup``.
+
+    Lookups:
+        sku / model: exact sku or model (case and surrounding spaces ignored)
+        norm_sku / norm_model: alphanumerics-only sku or model
+        norm_key: alphanumerics-only sku or model, whichever matches
+        name: alphanumerics-only product name (6+ chars)
+        scoop_id: product_id embedded in a Scoop-format SKU
+        stripped: sku, model, then norm_key after stripping a supplier prefix
+    """
+    name: str
+    field: str
+    lookup: str
+
+
+# Auto-link passes; the strategy name is the match_type written
+AUTO_LINK_PASS0 = (
+    Strategy("auto_scoop_id", "sku", "scoop_id"),
+)
+AUTO_LINK_PASS1 = (
+    Strategy("auto_sku", "sku", "sku"),
+    Strategy("auto_sku", "sku", "model"),
+    Strategy("auto_sku", "sku", "norm_key"),
+    Strategy("auto_sku", "sku", "stripped"),
+)
+AUTO_LINK_PASS1B = (
+    Strategy("auto_name", "name", "name"),
+)
+
+# Bulk align (stored as auto_<name>)
+BULK_ALIGN = (
+    Strategy("exact_sku", "sku", "sku"),
+    Strategy("exact_model", "sku", "model"),
+    Strategy("supplier_sku", "supplier_sku", "sku"),
+    Strategy("supplier_model", "supplier_sku", "model"),
+    Strategy("normalized_sku", "sku", "norm_sku"),
+    Strategy("normalized_model", "sku", "norm_model"),
+)
+
+# Unaligned OpenCart product vs an index of the aligned ones
+DUPLICATES = (
+    Strategy("Model matches Aligned SKU", "model", "norm_sku"),
+    Strategy("Model matches Aligned Model", "model", "norm_model"),
+    Strategy("SKU matches Aligned SKU", "sku", "norm_sku"),
+    Strategy("SKU matches Aligned Model", "sku", "norm_model"),
+)
+
+
+class MatchIndex:
+    """Single-row lookup maps plus multi-row SKU candidate search.
+
+    The maps mirror CatalogSnapshot's: when several products share a key the
+    highest product_id wins. ``names`` optionally carries the persisted
+    name-word index (auto-link pass 2 / fuzzy scoring).
+
+    Attributes:
+        by_id: product_id -> row
+        by_sku / by_model: fold_key(value) -> row
+        by_norm_sku / by_norm_model: normalize_product_key(value) -> row
+        by_norm_key: normalize_product_key(sku or model) -> row
+        by_norm_name: normalize_name(name) -> row (names of 6+ chars)
+    """
+
+    def __init__(
+        self,
+        by_id: Dict[int, Dict[str, Any]],
+        by_sku: Dict[str, Dict[str, Any]],
+        by_model: Dict[str, Dict[str, Any]],
+        by_norm_sku: Dict[str, Dict[str, Any]],
+        by_norm_model: Dict[str, Dict[str, Any]],
+        by_norm_key: Dict[str, Dict[str, Any]],
+        by_norm_name: Dict[str, Dict[str, Any]],
+        version: Optional[int] = None,
+        names: Optional[MatchArtifact] = None,
+    ):
+        self.by_id = by_id
+        self.by_sku = by_sku
+        self.by_model = by_model
+        self.by_norm_sku = by_norm_sku
+        self.by_norm_model = by_norm_model
+        self.by_norm_key = by_norm_key
+        self.by_norm_name = by_norm_name
+        self.version = version
+        self.names = names
+        self._lock = threading.Lock()
+        self._groups: Optional[Dict[str, Dict[str, List[Dict[str, Any]]]]] = None
+        self._haystack: Optional[Tuple[str, List[int], List[Dict[str, Any]]]] = None
+
+    @classmethod
+    def from_snapshot(cls, snapshot: CatalogSnapshot) -> "MatchIndex":
+        """Index over the snapshot's active products (shares its maps)."""
+        return cls(
+            snapshot.by_id, snapshot.by_sku, snapshot.by_model,
+            snapshot.by_norm_sku, snapshot.by_norm_model, snapshot.by_norm_key,
+            snapshot.by_norm_name, version=snapshot.version,
+        )
+
+    @classmethod
+    def from_products(cls, products: Iterable[Dict[str, Any]]) -> "MatchIndex":
+        """Index over an arbitrary set of OpenCart rows (any status)."""
+        maps: List[Dict[Any, Dict[str, Any]]] = [{} for _ in range(7)]
+        by_id, by_sku, by_model, by_norm_sku, by_norm_model, by_norm_key, by_norm_name = maps
+        for p in sorted(products, key=lambda row: row['product_id']):
+            by_id[p['product_id']] = p
+            if p.get('sku'):
+                norm = normalize_product_key(p['sku'])
+                by_sku[fold_key(p['sku'])] = p
+                by_norm_sku[norm] = p
+                by_norm_key[norm] = p
+            if p.get('model'):
+                norm = normalize_product_key(p['model'])
+                by_model[fold_key(p['model'])] = p
+                by_norm_model[norm] = p
+                by_norm_key[norm] = p
+            name_norm = normalize_name(p.get('name'))
+            if len(name_norm) >= MIN_NAME_KEY:
+                by_norm_name[name_norm] = p
+        return cls(*maps)
+
+    def with_names(self, names: MatchArtifact) -> "MatchIndex":
+        """Same index with the name-word index attached."""
+        index = MatchIndex(
+            self.by_id, self.by_sku, self.by_model, self.by_norm_sku,
+            self.by_norm_model, self.by_norm_key, self.by_norm_name,
+            version=self.version, names=names,
+        )
+        index._groups, index._haystack = self._groups, self._haystack
+        return index
+
+    def __len__(self) -> int:
+        return len(self.by_id)
+
+    # ── Single-row probes ─────────────────────────────────────────────
+
+    def probe(self, lookup: str, value: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Row for ``value`` under one lookup kind (see Strategy), or None."""
+        if not value:
+            return None
+        if lookup == "sku":
+            return self.by_sku.get(fold_key(value))
+        if lookup == "model":
+            return self.by_model.get(fold_key(value))
+        if lookup in ("norm_sku", "norm_model", "norm_key"):
+            norm = normalize_product_key(value)
+            return getattr(self, f"by_{lookup}").get(norm) if norm else None
+        if lookup == "name":
+            name_norm = normalize_name(value)
+            return self.by_norm_name.get(name_norm) if len(name_norm) >= MIN_NAME_KEY else None
+        if lookup == "scoop_id":
+            scoop_id = extract_scoop_id(value)
+            return self.by_id.get(scoop_id) if scoop_id else None
+        if lookup == "stripped":
+            stripped = strip_supplier_prefix(value)
+            if not stripped:
+                return None
+            return (self.probe("sku", stripped) or self.probe("model", stripped)
+                    or self.probe("norm_key", stripped))
+        raise ValueError(f"Unknown lookup: {lookup}")
+
+    def match(self, query: Dict[str, Any], strategies: Sequence[Strategy]) -> Optional[Tuple[Dict[str, Any], Strategy]]:
+        """First (row, strategy) hit for ``query`` trying ``strategies`` in order."""
+        for strategy in strategies:
+            row = self.probe(strategy.lookup, query.get(strategy.field))
+            if row is not None:
+                return row, strategy
+        return None
+
+    # ── Multi-row SKU candidates (alignment engine) ───────────────────
+
+    def _build_groups(self) -> Dict[str, Dict[str, List[Dict[str, Any]]]]:
+        groups: Dict[str, Dict[str, List[Dict[str, Any]]]] = {"exact": {}, "norm": {}}
+        for pid in sorted(self.by_id):
+            p = self.by_id[pid]
+            exact_keys = {fold_key(p.get('sku')), fold_key(p.get('model'))} - {''}
+            norm_keys = {normalize_product_key(p.get('sku')), normalize_product_key(p.get('model'))} - {''}
+            for key in exact_keys:
+                groups["exact"].setdefault(key, []).append(p)
+            for key in norm_keys:
+                groups["norm"].setdefault(key, []).append(p)
+        return groups
+
+    def _build_haystack(self) -> Tuple[str, List[int], List[Dict[str, Any]]]:
+        # One line per product: dashless lowercased sku, model and name
+        parts: List[str] = []
+        starts: List[int] = []
+        rows: List[Dict[str, Any]] = []
+        offset = 0
+        for pid in sorted(self.by_id):
+            p = self.by_id[pid]
+            line = "\t".join((p.get(col) or '').lower().replace('-', '') for col in ('sku', 'model', 'name')) + "\n"
+            starts.append(offset)
+            rows.append(p)
+            parts.append(line)
+            offset += len(line)
+        return "".join(parts), starts, rows
+
+    def _ensure_candidate_maps(self) -> None:
+        if self._groups is not None and self._haystack is not None:
+            return
+        with self._lock:
+            if self._groups is None:
+                self._groups = self._build_groups()
+            if self._haystack is None:
+                self._haystack = self._build_haystack()
+
+    def _substring_rows(self, needle: str, limit: int) -> List[Dict[str, Any]]:
+        """Rows whose dashless sku, model or name contains ``needle``, by product_id."""
+        text, starts, rows = self._haystack
+        found: List[Dict[str, Any]] = []
+        pos = text.find(needle)
+        while pos != -1 and len(found) < limit:
+            i = bisect.bisect_right(starts, pos) - 1
+            found.append(rows[i])
+            # Skip the rest of this product's line
+            next_start = starts[i + 1] if i + 1 < len(starts) else len(text)
+            pos = text.find(needle, next_start)
+        return found
+
+    def sku_candidates(self, sku: Optional[str]) -> List[Dict[str, Any]]:
+        """Products matching a supplier SKU, in OpenCartConnector.search_products_by_sku order.
+
+        Exact sku/model first (10), then normalized sku/model (10) while fewer
+        than 5 were found, then - for keys of 4+ chars - the SKU as a substring
+        of the dashless sku, model or name (20).
+        """
+        sku_norm = normalize_product_key(sku)
+        if len(sku_norm) < 2:
+            return []
+        self._ensure_candidate_maps()
+
+        results: List[Dict[str, Any]] = []
+        seen_ids = set()
+
+        def _collect(rows: List[Dict[str, Any]]) -> None:
+            for r in rows:
+                if r['product_id'] not in seen_ids:
+                    results.append(r)
+                    seen_ids.add(r['product_id'])
+
+        _collect(self._groups["exact"].get(fold_key(sku), [])[:10])
+        if len(results) < 5:
+            _collect(self._groups["norm"].get(sku_norm, [])[:10])
+        if len(results) < 5 and len(sku_norm) >= 4:
+            _collect(self._substring_rows(sku_norm, 20))
+        return results
+
+
+_index: Optional[MatchIndex] = None
+_index_lock = threading.Lock()
+
+
+def match_index_for(snapshot: CatalogSnapshot) -> MatchIndex:
+    """MatchIndex for ``snapshot``, shared by everyone reading the same catalog version."""
+    global _index
+    with _index_lock:
+        if _index is None or _index.version != snapshot.version:
+            _index = MatchIndex.from_snapshot(snapshot)
+            logger.info("match_index_built", catalog_version=snapshot.version, products=len(_index))
+        return _index
+
+
+def match_index_sync() -> MatchIndex:
+    """Current MatchIndex, for worker threads (blocks on a catalog refresh)."""
+    return match_index_for(get_catalog_service().snapshot_sync())
+
+
+async def get_match_index(names: bool = False) -> MatchIndex:
+    """Current MatchIndex; ``names=True`` attaches the persisted name-word index."""
+    index = match_index_for(await get_catalog_service().snapshot())
+    if names:
+        index = index.with_names(await get_match_artifact_store().artifact())
+    return index
@@ -0,0 +1,230 @@
+"""Buffered, batched writer for product_matches links.
+
+Collects links from the alignment passes and writes them in chunked
+upserts (``on_conflict=internal_product_id``, existing links left alone),
+so linking thousands of products takes a few dozen requests. Counts are
+exact: rows the database inserted, rows skipped because the product was
+already linked, and rows that failed. A failing chunk is split until the
+bad rows are isolated. In dry-run mode nothing is written and flush()
+returns a diff against the current table instead.
+
+    writer = MatchWriter(dry_run=request.dry_run)
+    writer.add(product_id, oc_product_id, "auto_sku", 100)
+    result = await writer.flush()
+"""
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.connectors.supabase import SupabaseConnector, get_supabase_connector
+from src.connectors.supabase_async import SupabaseAPIError
+from src.utils.logging import AgentLogger
+
+logger = AgentLogger("MatchWriter")
+
+# PostgREST/Postgres: no unique index matches the ON CONFLICT target (migration 021 not applied)
+_NO_CONFLICT_TARGET = "42P10"
+
+# Errors kept on a result (the rest are only counted)
+MAX_ERRORS = 10
+
+
+@dataclass
+class MatchWriteResult:
+    """Outcome of MatchWriter.flush().
+
+    In a dry run the counts are what a real flush would do, and ``diff``
+    lists the links per outcome: ``insert``, ``unchanged`` (already linked
+    to the same product) and ``conflict`` (linked elsewhere or ignored;
+    rows carry the ``existing`` match).
+    """
+    inserted: int = 0
+    conflicted: int = 0
+    failed: int = 0
+    dry_run: bool = False
+    errors: List[str] = field(default_factory=list)
+    diff: Optional[Dict[str, List[Dict[str, Any]]]] = None
+
+    def merge(self, other: "MatchWriteResult") -> None:
+        """Add another flush's outcome to this one (jobs flush once per pass/chunk)."""
+        self.inserted += other.inserted
+        self.conflicted += other.conflicted
+        self.failed += other.failed
+        self.dry_run = self.dry_run or other.dry_run
+        self.errors.extend(other.errors[:MAX_ERRORS - len(self.errors)])
+        if other.diff is not None:
+            if self.diff is None:
+                self.diff = {key: [] for key in other.diff}
+            for key, rows in other.diff.items():
+                self.diff.setdefault(key, []).extend(rows)
+
+    def as_dict(self) -> Dict[str, Any]:
+        result = {
+            "inserted": self.inserted,
+            "conflicted": self.conflicted,
+            "failed": self.failed,
+            "dry_run": self.dry_run,
+        }
+        if self.errors:
+            result["errors"] = self.errors
+        if self.diff is not None:
+            result["diff"] = self.diff
+        return result
+
+
+class MatchWriter:
+    """Buffers product_matches links and writes them in chunked upserts.
+
+    Links are keyed by internal product: the first add() for a product wins
+    (later ones count as conflicts), mirroring what the database does with
+    a product that is already linked.
+    """
+
+    def __init__(
+        self,
+        sb: Optional[SupabaseConnector] = None,
+        chunk_size: int = 500,
+        dry_run: bool = False,
+    ):
+        self.sb = sb or get_supabase_connector()
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._duplicates = 0
+        self._upsert_supported: Optional[bool] = None
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, internal_product_id: str, opencart_product_id: Optional[int],
+            match_type: str, score: int = 100) -> None:
+        """Queue one link (``opencart_product_id`` None for an ignore marker)."""
+        if internal_product_id in self._pending:
+            self._duplicates += 1
+            return
+        self._pending[internal_product_id] = {
+            "internal_product_id": internal_product_id,
+            "opencart_product_id": opencart_product_id,
+            "match_type": match_type,
+            "score": score,
+        }
+
+    async def flush(self) -> MatchWriteResult:
+        """Write (or, in a dry run, diff) everything queued, then clear the buffer."""
+        rows = list(self._pending.values())
+        duplicates = self._duplicates
+        self._pending, self._duplicates = {}, 0
+
+        if self.dry_run:
+            result = await self._diff(rows)
+        else:
+            result = MatchWriteResult()
+            chunks = [rows[i:i + self.chunk_size] for i in range(0, len(rows), self.chunk_size)]
+            for inserted, conflicted, errors in await asyncio.gather(*(self._write(chunk) for chunk in chunks)):
+                result.inserted += inserted
+                result.conflicted += conflicted
+                result.failed += len(errors)
+                result.errors.extend(errors[:MAX_ERRORS - len(result.errors)])
+        result.conflicted += duplicates
+
+        if rows:
+            logger.info("product_matches_flushed", links=len(rows), inserted=result.inserted,
+                        conflicted=result.conflicted, failed=result.failed, dry_run=self.dry_run)
+        return result
+
+    async def replace(self, internal_product_id: str, opencart_product_id: Optional[int],
+                      match_type: str, score: int = 100) -> Dict[str, Any]:
+        """Write one link now, replacing any existing row for the product.
+
+        For explicit user choices (/link, /link-manual) that must win over an
+        existing link, ignore marker or pending_creation row. Not buffered and
+        not dry-run aware. Errors propagate.
+        """
+        row = {
+            "internal_product_id": internal_product_id,
+            "opencart_product_id": opencart_product_id,
+            "match_type": match_type,
+            "score": score,
+        }
+        if self._upsert_supported is not False:
+            try:
+                await self.sb.db.table("product_matches").upsert(
+                    row, on_conflict="internal_product_id", returning="minimal",
+                ).execute()
+                self._upsert_supported = True
+                return row
+            except SupabaseAPIError as e:
+                if e.code != _NO_CONFLICT_TARGET:
+                    raise
+                self._upsert_supported = False
+                logger.warning("product_matches_upsert_unavailable", error=str(e))
+
+        await self.sb.db.table("product_matches").delete(returning="minimal")\
+            .eq("internal_product_id", internal_product_id).execute()
+        await self.sb.db.table("product_matches").insert(row, returning="minimal").execute()
+        return row
+
+    async def _write(self, rows: List[Dict[str, Any]]) -> Tuple[int, int, List[str]]:
+        """Write one chunk; returns (inserted, conflicted, errors)."""
+        try:
+            if self._upsert_supported is not False:
+                try:
+                    response = await self.sb.db.table("product_matches").upsert(
+                        rows, on_conflict="internal_product_id", ignore_duplicates=True,
+                    ).execute()
+                    self._upsert_supported = True
+                    # DO NOTHING returns only the rows it inserted
+                    inserted = len(response.data or [])
+                    return inserted, len(rows) - inserted, []
+                except SupabaseAPIError as e:
+                    if e.code != _NO_CONFLICT_TARGET:
+                        raise
+                    self._upsert_supported = False
+                    logger.warning("product_matches_upsert_unavailable", error=str(e))
+
+            existing = await self._existing([row["internal_product_id"] for row in rows])
+            new_rows = [row for row in rows if row["internal_product_id"] not in existing]
+            if new_rows:
+                await self.sb.db.table("product_matches").insert(new_rows, returning="minimal").execute()
+            return len(new_rows), len(rows) - len(new_rows), []
+
+        except Exception as e:
+            if len(rows) == 1:
+                logger.warning("product_match_write_failed",
+                               internal_product_id=rows[0]["internal_product_id"], error=str(e))
+                return 0, 0, [f"{rows[0]['internal_product_id']}: {e}"]
+            # Split to isolate the rows the database rejects
+            mid = len(rows) // 2
+            first, second = await asyncio.gather(self._write(rows[:mid]), self._write(rows[mid:]))
+            return first[0] + second[0], first[1] + second[1], first[2] + second[2]
+
+    async def _existing(self, internal_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Current product_matches rows for ``internal_ids``, keyed by internal id."""
+        existing: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(internal_ids), 200):
+            chunk = internal_ids[start:start + 200]
+            response = await self.sb.db.table("product_matches")\
+                .select("internal_product_id, opencart_product_id, match_type, score")\
+                .in_("internal_product_id", chunk)\
+                .execute()
+            for row in response.data or []:
+                existing.setdefault(row["internal_product_id"], row)
+        return existing
+
+    async def _diff(self, rows: List[Dict[str, Any]]) -> MatchWriteResult:
+        existing = await self._existing([row["internal_product_id"] for row in rows])
+        diff: Dict[str, List[Dict[str, Any]]] = {"insert": [], "unchanged": [], "conflict": []}
+        for row in rows:
+            current = existing.get(row["internal_product_id"])
+            if current is None:
+                diff["insert"].append(row)
+            elif current.get("opencart_product_id") == row["opencart_product_id"]:
+                diff["unchanged"].append(row)
+            else:
+                diff["conflict"].append({**row, "existing": current})
+        return MatchWriteResult(
+            inserted=len(diff["insert"]),
+            conflicted=len(diff["unchanged"]) + len(diff["conflict"]),
+            dry_run=True,
+            diff=diff,
+        )
@@ -1,11 +1,23 @@
+import asyncio
 import json
 import os
 import re
+import time
 from fastapi import APIRouter, HTTPException, BackgroundTasks
 from pydantic import BaseModel
 from typing import List, Optional
 from src.aligner.engine import AlignmentEngine
+from src.aligner.fuzzy import score_candidates
+from src.aligner.match_index import (
+    AUTO_LINK_PASS0, AUTO_LINK_PASS1, AUTO_LINK_PASS1B, BULK_ALIGN, get_match_index,
+)
+from src.aligner.jobs import AlignmentJob, JobCancelled, get_alignment_job_store
+from src.aligner.match_writer import MatchWriteResult, MatchWriter
+from src.catalog.snapshot import get_catalog_snapshot, normalize_name
+from src.connectors.opencart import get_opencart_connector, normalize_product_key
 from src.connectors.supabase import get_supabase_connector, SupabaseConnector
+from src.connectors.supabase_async import close_async_supabase
+from src.utils.config import get_config
 from src.utils.logging import AgentLogger
 
 # Category engine - lazy loaded
@@ -44,7 +56,7 @@ async def get_unmatched_products(limit: int = 20):
     try:
         # Try the SQL function first (fast, correct, no row-limit issues)
         try:
-            result = sb.client.rpc("get_unmatched_products", {"p_limit": limit}).execute()
+            result = await sb.db.rpc("get_unmatched_products", {"p_limit": limit}).execute()
             if result.data is not None:
                 return [
                     {
@@ -63,25 +75,13 @@ async def get_unmatched_products(limit: int = 20):
         # Fallback: Python-side dedup
         # Step 1: Pre-build set of ALL matched SKUs
         matched_skus = set()
-        page_offset = 0
-        while True:
-            matches_batch = sb.client.table("product_matches")\
-                .select("internal_product_id")\
-                .range(page_offset, page_offset + 999)\
-                .execute()
-            if not matches_batch.data:
-                break
-
-            batch_ids = [m['internal_product_id'] for m in matches_batch.data]
-            for i in range(0, len(batch_ids), 100):
-                chunk = batch_ids[i:i+100]
-                prods = sb.client.table("products").select("sku")\
-                    .in_("id", chunk).execute()
-                matched_skus.update(p['sku'] for p in prods.data if p.get('sku'))
-
-            if len(matches_batch.data) < 1000:
-                break
-            page_offset += 1000
+        matched_ids = list(await sb.db.stream("product_matches", "internal_product_id")
+                           .to_set("internal_product_id"))
+        for i in range(0, len(matched_ids), 100):
+            chunk = matched_ids[i:i+100]
+            prods = await sb.db.table("products").select("sku")\
+                .in_("id", chunk).execute()
+            matched_skus.update(p['sku'] for p in prods.data if p.get('sku'))
 
         # Step 2: Fetch products, filter by matched SKUs, dedup
         unmatched_data = []
@@ -89,7 +89,7 @@ async def get_unmatched_products(limit: int = 20):
         offset = 0
 
         while len(unmatched_data) < limit and offset < 2000:
-            products_response = sb.client.table("products")\
+            products_response = await sb.db.table("products")\
                 .select("id, sku, product_name, description, selling_price")\
                 .gt("selling_price", 0)\
                 .order("created_at", desc=True)\
@@ -134,7 +134,7 @@ async def get_candidates(internal_product_id: str):
     engine = AlignmentEngine()
     
     # Fetch product details
-    p_response = sb.client.table("products").select("*").eq("id", internal_product_id).single().execute()
+    p_response = await sb.db.table("products").select("*").eq("id", internal_product_id).single().execute()
     product = p_response.data
     
     if not product:
@@ -149,6 +149,49 @@ async def get_candidates(internal_product_id: str):
     candidates = await engine.find_matches(supplier_data)
     return candidates
 
+class CandidatesBatchRequest(BaseModel):
+    internal_product_ids: List[str]
+    limit: int = 10
+
+# Products per /candidates/batch call (one page of the alignment UI is 50)
+MAX_CANDIDATE_BATCH = 200
+
+@router.post("/candidates/batch")
+async def get_candidates_batch(request: CandidatesBatchRequest):
+    """
+    Candidates for a whole page of internal products in one call.
+    Returns {internal_product_id: [candidates]} (missing products are omitted).
+    """
+    ids = list(dict.fromkeys(request.internal_product_ids))
+    if len(ids) > MAX_CANDIDATE_BATCH:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_CANDIDATE_BATCH} products per batch")
+    if not ids:
+        return {}
+
+    sb = get_supabase_connector()
+    engine = AlignmentEngine()
+
+    p_response = await sb.db.table("products").select("id, sku, product_name, selling_price")\
+        .in_("id", ids).execute()
+    products = {p['id']: p for p in p_response.data or []}
+    found = [pid for pid in ids if pid in products]
+
+    supplier_data = [
+        {
+            "sku": products[pid].get("sku"),
+            "name": products[pid].get("product_name"),
+            "price": products[pid].get("selling_price"),
+        }
+        for pid in found
+    ]
+
+    started = time.monotonic()
+    ranked = await engine.find_matches_batch(supplier_data, limit=request.limit,
+                                             workers=get_config().auto_link_fuzzy_workers)
+    logger.info("candidates_batch", requested=len(ids), found=len(found),
+                ms=int((time.monotonic() - started) * 1000))
+    return dict(zip(found, ranked))
+
 @router.post("/link")
 async def link_product(request: LinkRequest):
     """
@@ -166,38 +209,29 @@ async def link_product(request: LinkRequest):
             "score": request.confidence
         }
 
-        sb.client.table("product_matches").insert(data).execute()
+        # An explicit link replaces whatever the product had (ignored, pending_creation, ...)
+        await MatchWriter(sb).replace(
+            request.internal_product_id, request.opencart_product_id, request.match_type, request.confidence,
+        )
         logger.info("product_linked", **data)
 
         # 2. Find and link ALL duplicates of the same SKU (non-fatal)
         try:
-            product = sb.client.table("products").select("sku")\
+            product = await sb.db.table("products").select("sku")\
                 .eq("id", request.internal_product_id).limit(1).execute()
             if product.data and product.data[0].get('sku'):
                 sku = product.data[0]['sku']
-                dupes = sb.client.table("products").select("id").eq("sku", sku).execute()
+                dupes = await sb.db.table("products").select("id").eq("sku", sku).execute()
                 dupe_ids = [d['id'] for d in dupes.data if d['id'] != request.internal_product_id]
 
                 if dupe_ids:
-                    existing = sb.client.table("product_matches")\
-                        .select("internal_product_id")\
-                        .in_("internal_product_id", dupe_ids)\
-                        .execute()
-                    already_matched = set(m['internal_product_id'] for m in existing.data)
-
+                    # Already-linked duplicates are left as they are
+                    links = MatchWriter(sb)
                     for dupe_id in dupe_ids:
-                        if dupe_id not in already_matched:
-                            try:
-                                sb.client.table("product_matches").insert({
-                                    "internal_product_id": dupe_id,
-                                    "opencart_product_id": request.opencart_product_id,
-                                    "match_type": "duplicate_linked",
-                                    "score": request.confidence
-                                }).execute()
-                            except Exception:
-                                pass
-
-                    logger.info("duplicates_linked", sku=sku, count=len(dupe_ids) - len(already_matched))
+                        links.add(dupe_id, request.opencart_product_id, "duplicate_linked", request.confidence)
+                    written = await links.flush()
+
+                    logger.info("duplicates_linked", sku=sku, count=written.inserted)
         except Exception as e:
             logger.warning("duplicate_link_failed_nonfatal", error=str(e))
 
@@ -223,43 +257,41 @@ async def ignore_product(request: IgnoreRequest):
             "score": 0
         }
 
-        sb.client.table("product_matches").insert(data).execute()
+        marker = MatchWriter(sb)
+        marker.add(request.internal_product_id, None, "ignored", 0)
+        written = await marker.flush()
+        if written.failed:
+            raise HTTPException(status_code=500, detail=written.errors[0])
+        if written.conflicted:
+            # Already linked/ignored/queued: leave it (re-point it via /link-manual)
+            logger.info("product_already_matched", internal_id=request.internal_product_id)
+            return {"status": "already_matched", "message": "This product is already matched or queued"}
         logger.info("product_ignored", internal_id=request.internal_product_id)
 
         # Also ignore ALL duplicates of the same SKU (non-fatal)
         try:
-            product = sb.client.table("products").select("sku")\
+            product = await sb.db.table("products").select("sku")\
                 .eq("id", request.internal_product_id).limit(1).execute()
             if product.data and product.data[0].get('sku'):
                 sku = product.data[0]['sku']
-                dupes = sb.client.table("products").select("id").eq("sku", sku).execute()
+                dupes = await sb.db.table("products").select("id").eq("sku", sku).execute()
                 dupe_ids = [d['id'] for d in dupes.data if d['id'] != request.internal_product_id]
 
                 if dupe_ids:
-                    existing = sb.client.table("product_matches")\
-                        .select("internal_product_id")\
-                        .in_("internal_product_id", dupe_ids)\
-                        .execute()
-                    already_matched = set(m['internal_product_id'] for m in existing.data)
-
+                    # Already-matched duplicates are left as they are
+                    links = MatchWriter(sb)
                     for dupe_id in dupe_ids:
-                        if dupe_id not in already_matched:
-                            try:
-                                sb.client.table("product_matches").insert({
-                                    "internal_product_id": dupe_id,
-                                    "opencart_product_id": None,
-                                    "match_type": "ignored",
-                                    "score": 0
-                                }).execute()
-                            except Exception:
-                                pass  # Skip individual dupe failures
-
-                    logger.info("duplicates_ignored", sku=sku, count=len(dupe_ids) - len(already_matched))
+                        links.add(dupe_id, None, "ignored", 0)
+                    written = await links.flush()
+
+                    logger.info("duplicates_ignored", sku=sku, count=written.inserted)
         except Exception as e:
             logger.warning("duplicate_ignore_failed_nonfatal", error=str(e))
 
         return {"status": "success", "data": data}
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error("ignore_failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
@@ -268,421 +300,359 @@ class AutoLinkRequest(BaseModel):
     confidence_threshold: int = 95
     max_products: int = 5000
     dry_run: bool = False
+    incremental: bool = False  # Only products changed since the last saved watermarks
+
+# Product columns auto-link reads
+AUTO_LINK_COLUMNS = "id, sku, product_name, selling_price, supplier_id, updated_at"
+
+# Job status for auto_link_products result statuses
+_JOB_STATUS = {"success": "completed", "cancelled": "cancelled"}
+
+
+def _job_status(row: Optional[dict]) -> dict:
+    """Status payload for an alignment_jobs row (finished jobs report their result)."""
+    if not row:
+        return {"status": "idle", "progress": {}}
+    if row.get("result") and row["status"] not in ("queued", "running"):
+        return {**row["result"], "status": row["status"], "job_id": row["id"]}
+    return {
+        "status": row["status"],
+        "job_id": row["id"],
+        "progress": {"step": row.get("pass"), "last_key": row.get("last_key"), **(row.get("counts") or {})},
+        "error": row.get("error"),
+        "updated_at": row.get("updated_at"),
+    }
+
+
+async def _last_job_result(kind: str) -> Optional[dict]:
+    """Result of the most recent finished job of ``kind``."""
+    for row in await get_alignment_job_store().list(kind, limit=5):
+        if row.get("result"):
+            return row["result"]
+    return None
 
-# Background auto-link state
-_auto_link_status = {"running": False, "last_result": None}
 
 @router.post("/auto-link")
 async def trigger_auto_link(request: AutoLinkRequest):
-    """Trigger auto-link in the background. Returns immediately."""
-    import asyncio
+    """Trigger auto-link in the background. Returns immediately.
 
-    if _auto_link_status["running"]:
-        return {"status": "already_running", "message": "Auto-link is already running in the background"}
+    The run is an alignment job: it checkpoints after each pass, resumes
+    after a restart and can be cancelled via /jobs/{job_id}/cancel.
+    """
+    job, started = await get_alignment_job_store().start("auto_link", params=request.dict())
+    if not started:
+        return {"status": "already_running", "job_id": job.id,
+                "message": "Auto-link is already running in the background"}
 
     def _run_sync():
         """Run in a thread so synchronous DB calls don't block the event loop."""
         import asyncio as _aio
-        _auto_link_status["running"] = True
+
+        async def _run_job():
+            try:
+                async with job.heartbeat():
+                    result = await auto_link_products(request, job)
+                await job.finish(_JOB_STATUS.get(result.get("status"), "failed"),
+                                 result=result, error=result.get("error"))
+            except Exception as e:
+                logger.error("auto_link_job_failed", job_id=job.id, error=str(e))
+                await job.finish("failed", error=str(e))
+            finally:
+                await close_async_supabase()
+
+        loop = _aio.new_event_loop()
         try:
-            loop = _aio.new_event_loop()
-            result = loop.run_until_complete(auto_link_products(request))
-            loop.close()
-            _auto_link_status["last_result"] = result
-        except Exception as e:
-            _auto_link_status["last_result"] = {"status": "failed", "error": str(e)}
+            loop.run_until_complete(_run_job())
         finally:
-            _auto_link_status["running"] = False
+            loop.close()
 
     import threading
     threading.Thread(target=_run_sync, daemon=True).start()
-    return {"status": "started", "message": "Auto-link started in background. Check GET /api/alignment/auto-link-status for progress."}
+    return {"status": "resumed" if job.resumed else "started", "job_id": job.id,
+            "message": "Auto-link started in background. Check GET /api/alignment/auto-link-status for progress."}
 
 @router.get("/auto-link-status")
 async def get_auto_link_status():
-    """Check status of background auto-link."""
+    """Check status of background auto-link (from any replica)."""
+    store = get_alignment_job_store()
+    latest = await store.latest("auto_link")
     return {
-        "running": _auto_link_status["running"],
-        "last_result": _auto_link_status["last_result"]
+        "running": bool(latest and latest["status"] in ("queued", "running")),
+        "job": _job_status(latest) if latest else None,
+        "last_result": await _last_job_result("auto_link"),
     }
 
-async def auto_link_products(request: AutoLinkRequest):
+@router.get("/jobs")
+async def list_alignment_jobs(kind: Optional[str] = None, limit: int = 20):
+    """Recent alignment jobs (bulk_align, auto_link), newest first."""
+    return await get_alignment_job_store().list(kind, limit=min(limit, 100))
+
+@router.get("/jobs/{job_id}")
+async def get_alignment_job(job_id: str):
+    """One alignment job: pass, last checkpointed key, counts and result."""
+    row = await get_alignment_job_store().get(job_id)
+    if not row:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return row
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_alignment_job(job_id: str):
+    """Ask a running alignment job to stop at its next checkpoint."""
+    row = await get_alignment_job_store().cancel(job_id)
+    if not row:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job_id, "status": row["status"], "cancel_requested": row.get("cancel_requested", False)}
+
+async def _product_watermarks(sb: SupabaseConnector) -> dict:
+    """Newest (updated_at, id) product per supplier ('none' for products without one).
+
+    Products without an updated_at are skipped (NULLs sort first descending);
+    the updated_at trigger (migration 022) sets it on their next update.
     """
-    Automatically link ALL unmatched products that match OpenCart with high confidence.
+    suppliers = await sb.db.table("suppliers").select("id").execute()
+    keys = [str(s['id']) for s in suppliers.data or []] + ["none"]
 
-    Uses BULK SQL queries instead of per-product lookups to avoid blocking the event loop.
-    Pass 1: Single SQL query loads ALL OpenCart SKUs/Models, matches in Python.
-    Pass 2: Remaining unmatched go through alignment engine (batched with yields).
-    """
-    import asyncio
-    import re
-
-    sb = get_supabase_connector()
-    from src.connectors.opencart import get_opencart_connector
+    async def _newest(key):
+        query = sb.db.table("products").select("id, updated_at").not_("updated_at", "is", "null")
+        query = query.is_("supplier_id", "null") if key == "none" else query.eq("supplier_id", key)
+        response = await query.order("updated_at", desc=True).order("id", desc=True).limit(1).execute()
+        return response.data[0] if response.data else None
 
-    try:
-        oc = get_opencart_connector()
+    newest = await asyncio.gather(*(_newest(key) for key in keys))
+    return {key: {"updated_at": row['updated_at'], "id": row['id']}
+            for key, row in zip(keys, newest) if row}
 
-        def _normalize(s):
-            if not s:
-                return ""
-            return re.sub(r'[^a-z0-9]', '', s.lower())
 
-        # ── Step 1: Build set of already-matched internal IDs ──
-        matched_ids = set()
-        offset = 0
-        while True:
-            batch = sb.client.table("product_matches")\
-                .select("internal_product_id")\
-                .range(offset, offset + 999)\
-                .execute()
-            if not batch.data:
-                break
-            matched_ids.update(m['internal_product_id'] for m in batch.data)
-            if len(batch.data) < 1000:
-                break
-            offset += 1000
-
-        # ── Step 2: Fetch ALL unmatched products, dedup by SKU ──
-        unmatched_by_sku = {}
-        offset = 0
-        while len(unmatched_by_sku) < request.max_products:
-            products = sb.client.table("products")\
-                .select("id, sku, product_name, selling_price")\
-                .gt("selling_price", 0)\
-                .range(offset, offset + 499)\
-                .execute()
-            if not products.data:
-                break
-            for p in products.data:
-                if p['id'] in matched_ids:
-                    continue
-                sku = p.get('sku')
-                if not sku:
-                    continue
-                if sku not in unmatched_by_sku:
-                    unmatched_by_sku[sku] = []
-                unmatched_by_sku[sku].append(p)
-            if len(products.data) < 500:
-                break
-            offset += 500
+def _catalog_watermark(catalog) -> dict:
+    """Highest product_id and date_modified in the catalog snapshot."""
+    return {
+        "product_id": max(catalog.products, default=0),
+        "date_modified": max((str(p.get('date_modified') or '') for p in catalog.products.values()), default=''),
+    }
 
-        if not unmatched_by_sku:
-            return {"status": "success", "aligned": 0, "processed": 0,
-                    "message": "No unmatched products found"}
 
-        # ── Step 3 (BULK): Load ALL OpenCart products in ONE query (with names) ──
-        def _load_oc_products():
-            conn = oc._get_connection()
-            try:
-                with conn.cursor() as cursor:
-                    cursor.execute(f"""
-                        SELECT p.product_id, p.sku, p.model, pd.name
-                        FROM {oc.prefix}product p
-                        LEFT JOIN {oc.prefix}product_description pd ON (p.product_id = pd.product_id AND pd.language_id = 1)
-                        WHERE p.status = 1
-                    """)
-                    return cursor.fetchall()
-            finally:
-                conn.close()
-
-        oc_products = _load_oc_products()
-
-        # Build lookup indexes: normalized SKU/Model -> product_id
-        oc_by_sku = {}      # exact sku -> product_id
-        oc_by_model = {}    # exact model -> product_id
-        oc_by_norm = {}     # normalized (stripped) -> product_id
-        oc_by_name = {}     # normalized name -> product_id
-
-        for p in oc_products:
-            pid = p['product_id']
-            if p.get('sku'):
-                oc_by_sku[p['sku']] = pid
-                oc_by_norm[_normalize(p['sku'])] = pid
-            if p.get('model'):
-                oc_by_model[p['model']] = pid
-                oc_by_norm[_normalize(p['model'])] = pid
-            if p.get('name'):
-                name_norm = _normalize(p['name'])
-                if name_norm and len(name_norm) >= 6:
-                    oc_by_name[name_norm] = pid
-
-        logger.info("auto_link_oc_index_built", oc_products=len(oc_products),
-                     unique_norms=len(oc_by_norm), unique_names=len(oc_by_name))
-
-        # Also build product_id lookup for Scoop SKU pass
-        oc_by_pid = {p['product_id']: p for p in oc_products}
-
-        # ── Pass 0 (Scoop SKU): Extract product_id from SKUs like '12622_en-gb-ZAR' ──
-        aligned_count = 0
-        processed_count = 0
-        pass0_count = 0
-        pass1_count = 0
-        pass1b_count = 0
-        pass2_count = 0
-        after_pass0 = {}
-
-        def _extract_scoop_id(sku_val):
-            """Extract OC product_id from Scoop-format SKUs like '12622_en-gb-ZAR'."""
-            m = re.match(r'^(\d+)_en-gb-[A-Z]{3}$', sku_val)
-            return int(m.group(1)) if m else None
-
-        def _strip_supplier_prefix(sku_val):
-            """Strip common supplier prefixes: 'sp-UUID', 'nol-123', 'PA-123'."""
-            stripped = re.sub(r'^(sp-[0-9a-f-]+|nol-|pa-|PA-)', '', sku_val)
-            return stripped if stripped != sku_val else None
-
-        for sku, products_list in unmatched_by_sku.items():
-            processed_count += 1
-            oc_pid = None
-
-            # Scoop format: '12622_en-gb-ZAR' → product_id 12622
-            scoop_id = _extract_scoop_id(sku)
-            if scoop_id and scoop_id in oc_by_pid:
-                oc_pid = scoop_id
-                if not request.dry_run:
-                    for p in products_list:
-                        try:
-                            sb.client.table("product_matches").insert({
-                                "internal_product_id": p['id'],
-                                "opencart_product_id": oc_pid,
-                                "match_type": "auto_scoop_id",
-                                "score": 100
-                            }).execute()
-                            aligned_count += 1
-                        except Exception:
-                            pass
-                pass0_count += 1
-            else:
-                after_pass0[sku] = products_list
+async def _changed_products(sb: SupabaseConnector, since: dict, current: dict, catalog) -> list:
+    """Products to re-examine since the ``since`` watermarks.
 
-        logger.info("auto_link_pass0_done", matched=pass0_count, remaining=len(after_pass0))
+    Products updated after their supplier's watermark (all of a supplier's
+    products if it has none), plus products whose SKU equals the sku/model
+    of an OpenCart product added or modified since the OpenCart watermark.
+    """
+    since_products = since.get("products") or {}
+
+    async def _supplier_changes(key):
+        mark = since_products.get(key)
+        if mark and not mark.get('updated_at'):
+            mark = None  # Saved before NULL updated_at was excluded: rescan the supplier
+
+        def _where(q):
+            q = q.gt("selling_price", 0)
+            q = q.is_("supplier_id", "null") if key == "none" else q.eq("supplier_id", key)
+            return q.gte("updated_at", mark['updated_at']) if mark else q
+
+        rows = await sb.db.stream("products", AUTO_LINK_COLUMNS, page_size=500, where=_where).to_list()
+        if mark:
+            rows = [p for p in rows if (p['updated_at'], str(p['id'])) > (mark['updated_at'], str(mark['id']))]
+        return rows
+
+    changed = {}
+    for rows in await asyncio.gather(*(_supplier_changes(key) for key in set(current) | set(since_products))):
+        for p in rows:
+            changed[p['id']] = p
+
+    # New or modified OpenCart products: look their sku/model up on the Supabase side
+    oc_since = since.get("opencart")
+    if oc_since:
+        keys = sorted({
+            value.strip()
+            for p in catalog.active_products()
+            if p['product_id'] > oc_since.get("product_id", 0)
+            or str(p.get('date_modified') or '') > oc_since.get("date_modified", '')
+            for value in (p.get('sku'), p.get('model'))
+            if value and value.strip()
+        })
+        for start in range(0, len(keys), 200):
+            response = await sb.db.table("products").select(AUTO_LINK_COLUMNS)\
+                .in_("sku", keys[start:start + 200]).gt("selling_price", 0).execute()
+            for p in response.data or []:
+                changed.setdefault(p['id'], p)
+        logger.info("auto_link_opencart_changes", keys=len(keys))
+
+    return list(changed.values())
+
+
+async def auto_link_products(request: AutoLinkRequest, job: Optional[AlignmentJob] = None):
+    """
+    Automatically link ALL unmatched products that match OpenCart with high confidence.
 
-        # ── Pass 1 (Fast): Match by SKU/model in Python using indexes ──
-        remaining_skus = {}
+    Uses BULK SQL queries instead of per-product lookups to avoid blocking the event loop.
+    Pass 1: Single SQL query loads ALL OpenCart SKUs/Models, matches in Python.
+    Pass 2: Remaining unmatched go through alignment engine (batched with yields).
 
-        for sku, products_list in after_pass0.items():
-            oc_pid = None
+    With ``incremental`` only products changed since the watermarks saved on
+    the last sync session are considered; the response carries the new
+    watermarks for the caller to save.
 
-            # Try exact SKU
-            oc_pid = oc_by_sku.get(sku) or oc_by_model.get(sku)
+    With a ``job`` the links are written and a checkpoint saved after every
+    pass (and every chunk of pass 2); a resumed job keeps its counts and
+    skips the pass-2 SKUs it already scored. Cancelling stops at the next
+    checkpoint.
+    """
+    import asyncio
 
-            # Try normalized
-            if not oc_pid:
-                sku_norm = _normalize(sku)
-                if sku_norm:
-                    oc_pid = oc_by_norm.get(sku_norm)
+    sb = get_supabase_connector()
 
-            # Try stripping supplier prefix then matching
-            if not oc_pid:
-                stripped = _strip_supplier_prefix(sku)
-                if stripped:
-                    stripped_norm = _normalize(stripped)
-                    oc_pid = oc_by_sku.get(stripped) or oc_by_model.get(stripped)
-                    if not oc_pid and stripped_norm:
-                        oc_pid = oc_by_norm.get(stripped_norm)
+    # Counts carried over when resuming a checkpointed job
+    resumed = job.counts if job and job.resumed else {}
+    write_result = MatchWriteResult(dry_run=request.dry_run)
+    pass_counts = {label: resumed.get(label, 0) for label in ("pass0", "pass1", "pass1b", "pass2")}
 
-            if oc_pid:
-                if not request.dry_run:
-                    for p in products_list:
-                        try:
-                            sb.client.table("product_matches").insert({
-                                "internal_product_id": p['id'],
-                                "opencart_product_id": oc_pid,
-                                "match_type": "auto_sku",
-                                "score": 100
-                            }).execute()
-                            aligned_count += 1
-                        except Exception:
-                            pass
-                    pass1_count += 1
-                else:
-                    pass1_count += 1
-            else:
-                remaining_skus[sku] = products_list
+    def _totals():
+        return {**pass_counts, "aligned": resumed.get("aligned", 0) + write_result.inserted}
 
-        logger.info("auto_link_pass1_done", matched=pass1_count, remaining=len(remaining_skus))
+    try:
+        # ── Step 1: Watermarks: newest product per supplier and OpenCart change marker ──
+        # Taken before reading, so rows changing mid-run are picked up again next time
+        catalog = await get_catalog_snapshot()
+        since = await sb.get_auto_link_watermarks() if request.incremental else None
+        watermarks = {"products": await _product_watermarks(sb), "opencart": _catalog_watermark(catalog)}
 
-        # ── Pass 1b (Fast): Bulk name matching in Python ──
-        # Match by normalized product name — catches 100% name matches instantly
-        still_remaining = {}
-        for sku, products_list in remaining_skus.items():
-            rep = products_list[0]
-            product_name = rep.get("product_name", "")
-            if not product_name:
-                still_remaining[sku] = products_list
-                continue
+        # ── Step 2: Unmatched products (only changed ones when incremental), dedup by SKU ──
+        unmatched_by_sku = {}
+        truncated = False
+
+        def _collect(p):
+            """Group an unmatched product by SKU; False once max_products SKUs are held."""
+            nonlocal truncated
+            if p['id'] in matched_ids or not p.get('sku'):
+                return True
+            sku = p['sku']
+            if sku not in unmatched_by_sku:
+                if len(unmatched_by_sku) >= request.max_products:
+                    truncated = True
+                    return False
+                unmatched_by_sku[sku] = []
+            unmatched_by_sku[sku].append(p)
+            return True
+
+        if since:
+            changed = await _changed_products(sb, since, watermarks["products"], catalog)
+            matched_ids = await sb.get_matched_product_ids(p['id'] for p in changed)
+            for p in changed:
+                if not _collect(p):
+                    break
+            logger.info("auto_link_incremental_scan", changed=len(changed), unmatched_skus=len(unmatched_by_sku))
+        else:
+            matched_ids = await sb.db.stream("product_matches", "internal_product_id")\
+                .to_set("internal_product_id")
+            products = sb.db.stream(
+                "products", AUTO_LINK_COLUMNS, page_size=500,
+                where=lambda q: q.gt("selling_price", 0),
+            )
+            async with products as rows:
+                async for p in rows:
+                    if not _collect(p):
+                        break
 
-            name_norm = _normalize(product_name)
-            oc_pid = oc_by_name.get(name_norm) if name_norm and len(name_norm) >= 6 else None
+        # Watermarks only advance when every changed product was looked at
+        next_watermarks = None if truncated or request.dry_run else watermarks
 
-            if oc_pid:
-                if not request.dry_run:
+        if not unmatched_by_sku:
+            return {"status": "success", "aligned": 0, "processed": 0, "incremental": bool(since),
+                    "watermarks": next_watermarks, "message": "No unmatched products found"}
+
+        # ── Step 3: Shared match index over the catalog snapshot (no per-run reload) ──
+        index = await get_match_index(names=True)
+        name_index = index.names
+
+        logger.info("auto_link_oc_index_built", oc_products=len(index),
+                     unique_norms=len(index.by_norm_key), unique_names=len(index.by_norm_name),
+                     catalog_version=index.version)
+
+        links = MatchWriter(sb, dry_run=request.dry_run)
+        processed_count = len(unmatched_by_sku)
+
+        async def _pass_done(label, last_key=None):
+            """Write the links found so far, then checkpoint the job."""
+            write_result.merge(await links.flush())
+            if job:
+                await job.checkpoint(label, last_key, **_totals())
+
+        def _run_pass(candidates, strategies, label):
+            """Link every SKU group the strategies resolve; returns the rest."""
+            remaining = {}
+            matched = 0
+            for sku, products_list in candidates.items():
+                hit = index.match({"sku": sku, "name": products_list[0].get("product_name")}, strategies)
+                if hit:
+                    row, strategy = hit
                     for p in products_list:
-                        try:
-                            sb.client.table("product_matches").insert({
-                                "internal_product_id": p['id'],
-                                "opencart_product_id": oc_pid,
-                                "match_type": "auto_name",
-                                "score": 100
-                            }).execute()
-                            aligned_count += 1
-                        except Exception:
-                            pass
-                    pass1b_count += 1
+                        links.add(p['id'], row['product_id'], strategy.name, 100)
+                    matched += 1
                 else:
-                    pass1b_count += 1
-            else:
-                still_remaining[sku] = products_list
-
-        logger.info("auto_link_pass1b_done", matched=pass1b_count, remaining=len(still_remaining))
+                    remaining[sku] = products_list
+            pass_counts[label] += matched
+            logger.info(f"auto_link_{label}_done", matched=matched, remaining=len(remaining))
+            return remaining
+
+        # ── Pass 0 (Scoop SKU): product_id embedded in SKUs like '12622_en-gb-ZAR' ──
+        after_pass0 = _run_pass(unmatched_by_sku, AUTO_LINK_PASS0, "pass0")
+        await _pass_done("pass0")
+        # ── Pass 1 (Fast): exact, normalized, then supplier-prefix-stripped SKU/model ──
+        remaining_skus = _run_pass(after_pass0, AUTO_LINK_PASS1, "pass1")
+        await _pass_done("pass1")
+        # ── Pass 1b (Fast): normalized product name — catches 100% name matches ──
+        still_remaining = _run_pass(remaining_skus, AUTO_LINK_PASS1B, "pass1b")
+        await _pass_done("pass1b")
 
         # ── Pass 2 (Bulk in-memory fuzzy): No MySQL queries ──
-        # Build inverted word index from OpenCart product names for fast candidate lookup
-        try:
-            from thefuzz import fuzz as _fuzz
-        except ImportError:
-            _fuzz = None
-
-        def _token_set_ratio(s1, s2):
-            if _fuzz:
-                return _fuzz.token_set_ratio(s1, s2)
-            # Fallback: Jaccard similarity on word sets
-            set1 = set(s1.lower().split())
-            set2 = set(s2.lower().split())
-            if not set1 or not set2:
-                return 0
-            return int(len(set1 & set2) / len(set1 | set2) * 100)
-
-        stop_words = {
-            'the', 'and', 'with', 'for', 'from', 'free', 'new', 'pro',
-            'series', 'edition', 'version', 'model', 'type', 'style',
-            'pair', 'set', 'kit', 'pack', 'bundle', 'combo', 'single',
-            'matte', 'gloss', 'active', 'passive', 'powered', 'wireless',
-            'wired', 'portable', 'indoor', 'outdoor', 'heritage',
-            'inspired', 'premium', 'standard', 'basic', 'advanced',
-            'eua', 'usa', 'black', 'white', 'silver', 'walnut', 'oak',
-            'ebony', 'cherry', 'each', 'per', 'channel', 'zone',
-            'way', 'system', 'monitor', 'speaker', 'amplifier', 'receiver',
-            'player', 'cable', 'adapter', 'mount', 'stand', 'bracket',
-            'inch', 'mm', 'cm', 'watts', 'watt', 'ohm', 'ohms',
-        }
-
-        def _extract_words(name):
-            words = re.findall(r'\w+', name.lower())
-            return [w for w in words if (len(w) > 2 or any(c.isdigit() for c in w)) and w not in stop_words]
-
-        # Build inverted index: word -> set of OpenCart product indexes
-        oc_list = []  # list of (product_id, name, sku_norm, model_norm)
-        word_index = {}  # word -> set of indexes into oc_list
-
-        for p in oc_products:
-            name = p.get('name', '') or ''
-            if not name:
-                continue
-            idx = len(oc_list)
-            p_sku_norm = _normalize(p.get('sku', '') or '')
-            p_model_norm = _normalize(p.get('model', '') or '')
-            oc_list.append((p['product_id'], name, p_sku_norm, p_model_norm))
-            for w in _extract_words(name):
-                if w not in word_index:
-                    word_index[w] = set()
-                word_index[w].add(idx)
-
-        logger.info("auto_link_pass2_index_built", oc_indexed=len(oc_list), unique_words=len(word_index))
-
-        pass2_items = list(still_remaining.items())
-        for i, (sku, products_list) in enumerate(pass2_items):
-            rep = products_list[0]
-            s_name = rep.get("product_name", "")
-            s_sku = rep.get("sku", "")
-            s_sku_norm = _normalize(s_sku)
-
-            if not s_name:
-                continue
-
-            s_words = _extract_words(s_name)
-            if not s_words:
-                continue
-
-            # Find candidate OpenCart products that share at least 1 word
-            candidate_counts = {}  # oc_list index -> count of shared words
-            for w in s_words:
-                for idx in word_index.get(w, []):
-                    candidate_counts[idx] = candidate_counts.get(idx, 0) + 1
-
-            # Only consider candidates sharing at least 2 words (or 1 if few words)
-            min_shared = 2 if len(s_words) >= 2 else 1
-            candidates = [idx for idx, cnt in candidate_counts.items() if cnt >= min_shared]
-
-            if not candidates:
-                continue
-
-            # Score top candidates (limit to 50 to keep it fast)
-            candidates.sort(key=lambda idx: candidate_counts[idx], reverse=True)
-            candidates = candidates[:50]
-
-            best_score = 0
-            best_pid = None
-            best_type = "fuzzy"
-            s_name_norm = _normalize(s_name)
-
-            for idx in candidates:
-                oc_pid, oc_name, oc_sku_norm, oc_model_norm = oc_list[idx]
-                score = 0
-                match_type = "fuzzy"
-
-                # SKU match bonus
-                if s_sku_norm and len(s_sku_norm) >= 4:
-                    if s_sku_norm == oc_sku_norm or s_sku_norm == oc_model_norm:
-                        score = 100
-                        match_type = "exact_sku"
-                    elif s_sku_norm in _normalize(oc_name):
-                        score = 90
-                        match_type = "sku_in_name"
-
-                # Fuzzy name match
-                if score < 90:
-                    name_score = _token_set_ratio(s_name, oc_name)
-                    norm_score = _token_set_ratio(s_name_norm, _normalize(oc_name))
-                    score = max(score, name_score, norm_score)
-
-                if score > best_score:
-                    best_score = score
-                    best_pid = oc_pid
-                    best_type = match_type
-
-            if best_score >= request.confidence_threshold and best_pid:
-                if not request.dry_run:
+        # Persisted name index (word -> OpenCart rows), caught up with the catalog
+        # by applying only changed products instead of being rebuilt per run
+        logger.info("auto_link_pass2_index_ready", oc_indexed=len(name_index), unique_words=name_index.word_count,
+                    catalog_version=name_index.catalog_version)
+
+        # Remaining SKUs are scored in chunks (one batch each, off the event loop),
+        # in SKU order so a resumed job can skip the chunks it already finished
+        pass2_items = sorted(still_remaining.items())
+        if job and job.resumed and job.pass_name == "pass2" and job.last_key:
+            pass2_items = [item for item in pass2_items if item[0] > job.last_key]
+        chunk_size = get_config().alignment_job_chunk_size
+        pass2_started = time.monotonic()
+
+        for start in range(0, len(pass2_items), chunk_size):
+            chunk = pass2_items[start:start + chunk_size]
+            best_matches = await asyncio.to_thread(
+                score_candidates,
+                [(pl[0].get("product_name", ""), pl[0].get("sku", "")) for _, pl in chunk],
+                name_index,
+                workers=get_config().auto_link_fuzzy_workers,
+            )
+            for (sku, products_list), best in zip(chunk, best_matches):
+                if best and best.score >= request.confidence_threshold:
                     for p in products_list:
-                        try:
-                            sb.client.table("product_matches").insert({
-                                "internal_product_id": p['id'],
-                                "opencart_product_id": best_pid,
-                                "match_type": best_type,
-                                "score": best_score
-                            }).execute()
-                            aligned_count += 1
-                        except Exception:
-                            pass
-                    pass2_count += 1
-                else:
-                    pass2_count += 1
+                        links.add(p['id'], best.product_id, best.match_type, best.score)
+                    pass_counts["pass2"] += 1
+            await _pass_done("pass2", chunk[-1][0])
+
+        logger.info("auto_link_pass2_scored", total=len(pass2_items),
+                    ms=int((time.monotonic() - pass2_started) * 1000))
 
-            # Log progress every 500 products
-            if (i + 1) % 500 == 0:
-                logger.info("auto_link_pass2_progress", processed=i+1, total=len(pass2_items), matched=pass2_count)
+        # Anything still buffered (no pass-2 chunks) is written here
+        write_result.merge(await links.flush())
+        pass0_count, pass1_count = pass_counts["pass0"], pass_counts["pass1"]
+        pass1b_count, pass2_count = pass_counts["pass1b"], pass_counts["pass2"]
+        aligned_count = _totals()["aligned"]
 
         message = (f"Aligned {aligned_count} products "
                    f"({pass0_count} by Scoop ID, {pass1_count} by SKU, {pass1b_count} by name, {pass2_count} by fuzzy) "
                    f"from {processed_count} unique SKUs scanned. "
-                   f"[OC index: {len(oc_products)} products, {len(oc_by_norm)} norms, "
-                   f"{len(oc_by_name)} names, {len(oc_list)} indexed, threshold={request.confidence_threshold}]")
+                   f"[OC index: {len(index)} products, {len(index.by_norm_key)} norms, "
+                   f"{len(index.by_norm_name)} names, {len(name_index)} indexed, threshold={request.confidence_threshold}]")
         if request.dry_run:
             message = (f"[DRY RUN] Would align {pass0_count} by Scoop ID, {pass1_count} by SKU, "
                        f"{pass1b_count} by name, {pass2_count} by fuzzy "
                        f"from {processed_count} unique SKUs. "
-                       f"[OC index: {len(oc_products)} products]")
+                       f"[OC index: {len(index)} products]")
 
         logger.info("auto_link_complete", aligned=aligned_count, pass0=pass0_count,
                      pass1=pass1_count, pass1b=pass1b_count, pass2=pass2_count,
@@ -696,9 +666,17 @@ async def auto_link_products(request: AutoLinkRequest):
             "pass1_sku_matches": pass1_count,
             "pass1b_name_matches": pass1b_count,
             "pass2_fuzzy_matches": pass2_count,
+            "writes": write_result.as_dict(),
+            "incremental": bool(since),
+            "watermarks": next_watermarks if not write_result.failed else None,
             "message": message
         }
 
+    except JobCancelled:
+        logger.info("auto_link_cancelled", job_id=job.id, **_totals())
+        return {"status": "cancelled", **_totals(), "writes": write_result.as_dict(),
+                "message": "Auto-link cancelled; links found before the last checkpoint were kept"}
+
     except Exception as e:
         logger.error("auto_link_failed", error=str(e))
         return {"status": "failed", "error": str(e)}
@@ -711,85 +689,56 @@ async def auto_link_products_get():
 @router.get("/debug-auto-link/{internal_product_id}")
 async def debug_auto_link(internal_product_id: str):
     """Debug why auto-link misses a specific product. Returns detailed trace."""
-    import re
     sb = get_supabase_connector()
-    from src.connectors.opencart import get_opencart_connector
-
-    def _normalize(s):
-        if not s:
-            return ""
-        return re.sub(r'[^a-z0-9]', '', s.lower())
 
     # 1. Get the product from Supabase
-    p_resp = sb.client.table("products").select("id, sku, product_name, selling_price").eq("id", internal_product_id).single().execute()
+    p_resp = await sb.db.table("products").select("id, sku, product_name, selling_price").eq("id", internal_product_id).single().execute()
     product = p_resp.data
     if not product:
         return {"error": "Product not found in Supabase"}
 
     s_name = product.get("product_name", "") or ""
     s_sku = product.get("sku", "") or ""
-    s_name_norm = _normalize(s_name)
-    s_sku_norm = _normalize(s_sku)
+    s_name_norm = normalize_name(s_name)
+    s_sku_norm = normalize_product_key(s_sku)
 
     # 2. Check if already matched
-    match_check = sb.client.table("product_matches").select("*").eq("internal_product_id", internal_product_id).execute()
+    match_check = await sb.db.table("product_matches").select("*").eq("internal_product_id", internal_product_id).execute()
     already_matched = match_check.data
 
-    # 3. Load OC products (same query as auto-link)
-    oc = get_opencart_connector()
-    conn = oc._get_connection()
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute(f"""
-                SELECT p.product_id, p.sku, p.model, pd.name, pd.language_id
-                FROM {oc.prefix}product p
-                LEFT JOIN {oc.prefix}product_description pd ON (p.product_id = pd.product_id AND pd.language_id = 1)
-                WHERE p.status = 1
-            """)
-            oc_products = cursor.fetchall()
-    finally:
-        conn.close()
+    # 3. OC catalog (same match index as auto-link)
+    index = await get_match_index()
+    oc_products = list(index.by_id.values())
 
-    # 4. Build oc_by_name index (same as auto-link)
-    oc_by_name = {}
-    oc_by_sku = {}
-    oc_by_norm = {}
-    for p in oc_products:
-        pid = p['product_id']
-        if p.get('sku'):
-            oc_by_sku[p['sku']] = pid
-            oc_by_norm[_normalize(p['sku'])] = pid
-        if p.get('model'):
-            oc_by_norm[_normalize(p['model'])] = pid
-        if p.get('name'):
-            nm = _normalize(p['name'])
-            if nm and len(nm) >= 6:
-                oc_by_name[nm] = pid
-
-    # 5. Test each pass
-    pass1_sku = oc_by_sku.get(s_sku) or oc_by_sku.get(s_sku)
-    pass1_model = None
-    pass1_norm = oc_by_norm.get(s_sku_norm) if s_sku_norm else None
-    pass1b_name = oc_by_name.get(s_name_norm) if s_name_norm else None
-
-    # 6. Check if the name IS in the OC index by searching for partial matches
+    # 4. Test each pass
+    def _pid(row):
+        return row['product_id'] if row else None
+
+    pass0_scoop = _pid(index.probe("scoop_id", s_sku))
+    pass1_sku = _pid(index.probe("sku", s_sku))
+    pass1_model = _pid(index.probe("model", s_sku))
+    pass1_norm = _pid(index.probe("norm_key", s_sku))
+    pass1_stripped = _pid(index.probe("stripped", s_sku))
+    pass1b_name = _pid(index.probe("name", s_name))
+
+    # 5. Check if the name IS in the OC index by searching for partial matches
     name_matches_in_index = []
-    for nm, pid in oc_by_name.items():
+    for nm, row in index.by_norm_name.items():
+        pid = row['product_id']
         if s_name_norm and (s_name_norm in nm or nm in s_name_norm):
             name_matches_in_index.append({"normalized": nm, "product_id": pid, "exact": nm == s_name_norm})
         if len(name_matches_in_index) >= 5:
             break
 
-    # 7. Also directly search OC products for matching name
+    # 6. Also directly search OC products for matching name
     direct_oc_matches = []
     for p in oc_products:
         oc_name = p.get('name') or ''
-        if oc_name and _normalize(oc_name) == s_name_norm:
+        if oc_name and normalize_name(oc_name) == s_name_norm:
             direct_oc_matches.append({
                 "product_id": p['product_id'],
                 "name": oc_name,
                 "sku": p.get('sku'),
-                "language_id": p.get('language_id')
             })
 
     return {
@@ -804,12 +753,16 @@ async def debug_auto_link(internal_product_id: str):
         "already_matched": already_matched,
         "oc_index_stats": {
             "total_products": len(oc_products),
-            "names_indexed": len(oc_by_name),
-            "skus_indexed": len(oc_by_sku),
-            "norms_indexed": len(oc_by_norm),
+            "names_indexed": len(index.by_norm_name),
+            "skus_indexed": len(index.by_sku),
+            "norms_indexed": len(index.by_norm_key),
+            "catalog_version": index.version,
         },
+        "pass0_scoop_match": pass0_scoop,
         "pass1_sku_match": pass1_sku,
+        "pass1_model_match": pass1_model,
         "pass1_norm_match": pass1_norm,
+        "pass1_stripped_match": pass1_stripped,
         "pass1b_name_match": pass1b_name,
         "name_partial_matches_in_index": name_matches_in_index,
         "direct_oc_name_matches": direct_oc_matches,
@@ -829,7 +782,7 @@ async def create_product(request: CreateRequest):
 
     try:
         # 1. Fetch product details
-        p_response = sb.client.table("products").select("*")\
+        p_response = await sb.db.table("products").select("*")\
             .eq("id", request.internal_product_id).limit(1).execute()
 
         if not p_response.data:
@@ -841,7 +794,7 @@ async def create_product(request: CreateRequest):
         # --- DUPLICATE GUARD ---
         # Check 1: Already in queue (pending/approved_pending)?
         if sku:
-            existing_queue = sb.client.table("new_products_queue")\
+            existing_queue = await sb.db.table("new_products_queue")\
                 .select("id, status")\
                 .eq("sku", sku)\
                 .in_("status", ["pending", "approved_pending"])\
@@ -863,7 +816,7 @@ async def create_product(request: CreateRequest):
                 return {"status": "already_exists", "message": f"SKU {sku} already exists in OpenCart (ID: {existing_oc['product_id']})"}
 
         # Check 3: Already matched in product_matches?
-        existing_match = sb.client.table("product_matches")\
+        existing_match = await sb.db.table("product_matches")\
             .select("id")\
             .eq("internal_product_id", request.internal_product_id)\
             .limit(1)\
@@ -877,7 +830,7 @@ async def create_product(request: CreateRequest):
         supplier_name = "Internal-Alignment"
         if product.get("supplier_id"):
             try:
-                sup_res = sb.client.table("suppliers").select("name")\
+                sup_res = await sb.db.table("suppliers").select("name")\
                     .eq("id", product.get("supplier_id")).limit(1).execute()
                 if sup_res.data:
                     supplier_name = sup_res.data[0]['name']
@@ -902,35 +855,25 @@ async def create_product(request: CreateRequest):
             "category_ids": request.category_ids or []
         }
 
-        sb.client.table("new_products_queue").insert(queue_data).execute()
-
-        # 3. Mark as matched so it leaves the unmatched list
-        match_data = {
-            "internal_product_id": request.internal_product_id,
-            "opencart_product_id": None,
-            "match_type": "pending_creation",
-            "score": 0
-        }
-        sb.client.table("product_matches").insert(match_data).execute()
+        await sb.db.table("new_products_queue").insert(queue_data).execute()
 
-        # 4. Also mark duplicates (non-fatal)
+        # 3. Mark as matched so it leaves the unmatched list, with its duplicates
+        #    (non-fatal); products already matched, including one matched since
+        #    Check 3, are left as they are
+        links = MatchWriter(sb)
+        links.add(request.internal_product_id, None, "pending_creation", 0)
         try:
             sku = product.get("sku")
             if sku:
-                dupes = sb.client.table("products").select("id").eq("sku", sku).execute()
-                dupe_ids = [d['id'] for d in dupes.data if d['id'] != request.internal_product_id]
-                for dupe_id in dupe_ids:
-                    try:
-                        sb.client.table("product_matches").insert({
-                            "internal_product_id": dupe_id,
-                            "opencart_product_id": None,
-                            "match_type": "pending_creation",
-                            "score": 0
-                        }).execute()
-                    except Exception:
-                        pass
-        except Exception:
-            pass
+                dupes = await sb.db.table("products").select("id").eq("sku", sku).execute()
+                for d in dupes.data:
+                    links.add(d['id'], None, "pending_creation", 0)
+        except Exception as e:
+            logger.warning("duplicate_pending_failed_nonfatal", error=str(e))
+        written = await links.flush()
+        if written.failed:
+            logger.warning("pending_creation_mark_failed", internal_id=request.internal_product_id,
+                           errors=written.errors)
 
         logger.info("product_queued_for_creation", internal_id=request.internal_product_id, name=final_name)
         return {"status": "success", "data": queue_data}
@@ -989,9 +932,7 @@ async def get_categories():
         # Fallback: try to load from OpenCart directly
         from src.connectors.opencart import OpenCartConnector
         oc = OpenCartConnector()
-        conn = oc._get_connection()
-        
-        try:
+        with oc.connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute("""
                     SELECT 
@@ -1036,9 +977,6 @@ async def get_categories():
                     })
                 
                 return result
-                
-        finally:
-            conn.close()
     
     # Return categories from engine
     return [
@@ -1057,7 +995,7 @@ async def suggest_category(internal_product_id: str):
     engine = get_category_engine()
     
     # Fetch product details
-    p_response = sb.client.table("products").select("*").eq("id", internal_product_id).single().execute()
+    p_response = await sb.db.table("products").select("*").eq("id", internal_product_id).single().execute()
     product = p_response.data
     
     if not product:
@@ -1118,79 +1056,37 @@ async def suggest_category(internal_product_id: str):
 # ============================================================================
 
 @router.delete("/duplicates")
-async def delete_duplicate_skus():
+async def delete_duplicate_skus(dry_run: bool = False, preview_limit: int = 100):
     """
     Find and delete duplicate products (same supplier + SKU).
     Keeps products with existing matches, or the oldest if none are matched.
+
+    Grouping, keep-selection and deletion run server-side in one call.
+    ?dry_run=true only previews what would be deleted.
     """
     sb = get_supabase_connector()
-    
-    try:
-        from collections import defaultdict
-        
-        # Get all products
-        all_products = sb.client.table("products")\
-            .select("id, sku, supplier_id, product_name, created_at")\
-            .execute()
-
-        # Group by (supplier_id, sku)
-        groups = defaultdict(list)
-        for p in all_products.data:
-            key = (p.get('supplier_id'), p.get('sku'))
-            groups[key].append(p)
-
-        # Find duplicates
-        duplicates = {k: v for k, v in groups.items() if len(v) > 1}
-
-        to_delete = []
-        matched_kept = 0
-        oldest_kept = 0
-
-        for (supplier_id, sku), products in duplicates.items():
-            # Sort by created_at (oldest first)
-            products.sort(key=lambda x: x.get('created_at', ''))
 
-            # Check which ones have matches
-            product_ids = [p['id'] for p in products]
-            matches = sb.client.table("product_matches")\
-                .select("internal_product_id")\
-                .in_("internal_product_id", product_ids)\
-                .execute()
+    try:
+        result = await sb.delete_duplicate_products(dry_run=dry_run, preview_limit=max(0, preview_limit))
+        deleted_count = result.get("products_deleted", 0)
+        matched_kept = result.get("matched_kept", 0)
+        oldest_kept = result.get("oldest_kept", 0)
 
-            matched_ids = {m['internal_product_id'] for m in matches.data}
+        logger.info("duplicates_deleted", total=deleted_count, matched_kept=matched_kept,
+                    oldest_kept=oldest_kept, dry_run=dry_run)
 
-            # Keep matched or oldest, delete the rest
-            if matched_ids:
-                keep = next(p for p in products if p['id'] in matched_ids)
-                delete = [p for p in products if p['id'] != keep['id']]
-                matched_kept += 1
-            else:
-                keep = products[0]
-                delete = products[1:]
-                oldest_kept += 1
-
-            to_delete.extend(delete)
-
-        # Delete duplicates in batches
-        deleted_count = 0
-        if to_delete:
-            delete_ids = [p['id'] for p in to_delete]
-            for i in range(0, len(delete_ids), 100):
-                batch = delete_ids[i:i+100]
-                sb.client.table("products").delete().in_("id", batch).execute()
-                deleted_count += len(batch)
-
-        logger.info("duplicates_deleted", total=deleted_count, matched_kept=matched_kept, oldest_kept=oldest_kept)
-        
+        prefix = "[DRY RUN] Would delete" if dry_run else "Deleted"
         return {
             "status": "success",
-            "duplicates_found": len(duplicates),
+            "dry_run": dry_run,
+            "duplicates_found": result.get("duplicates_found", 0),
             "products_deleted": deleted_count,
             "matched_kept": matched_kept,
             "oldest_kept": oldest_kept,
-            "message": f"Deleted {deleted_count} duplicate products, kept {matched_kept} with matches and {oldest_kept} oldest unmatched"
+            "preview": result.get("preview", []),
+            "message": f"{prefix} {deleted_count} duplicate products, kept {matched_kept} with matches and {oldest_kept} oldest unmatched"
         }
-        
+
     except Exception as e:
         logger.error("delete_duplicates_failed", error=str(e))
         raise HTTPException(status_code=500, detail=str(e))
@@ -1263,7 +1159,8 @@ async def link_product_manual(request: dict):
             "score": 100
         }
         
-        sb.client.table("product_matches").insert(link_data).execute()
+        # Re-points a product that was already linked, ignored or queued
+        await MatchWriter(sb).replace(internal_id, opencart_product_id, "manual", 100)
         logger.info("manual_link_created", internal_id=internal_id, opencart_id=opencart_product_id)
         
         return {
@@ -1289,255 +1186,130 @@ async def bulk_align_products(background_tasks: BackgroundTasks):
     4. Create/update product_matches entries
     5. Products with no OpenCart match remain unmatched (for manual review)
 
-    Runs as a background task to avoid timeout.
+    Runs as a background alignment job: progress is checkpointed per chunk
+    of products, a restarted or failed run resumes where it stopped, and
+    POST /jobs/{job_id}/cancel stops it.
     """
-    background_tasks.add_task(_run_bulk_alignment)
+    job, started = await get_alignment_job_store().start("bulk_align")
+    if not started:
+        return {"status": "already_running", "job_id": job.id,
+                "message": "Bulk alignment is already running. Check /api/alignment/bulk-align-status for progress."}
+    background_tasks.add_task(_run_bulk_alignment, job)
     return {
-        "status": "started",
+        "status": "resumed" if job.resumed else "started",
+        "job_id": job.id,
         "message": "Bulk alignment started in background. Check /api/alignment/bulk-align-status for progress."
     }
 
 
-# Global status for bulk alignment
-_bulk_align_status = {"status": "idle", "progress": {}}
-
-
 @router.get("/bulk-align-status")
 async def get_bulk_align_status():
-    """Get the current status of the bulk alignment process."""
-    return _bulk_align_status
-
-
-def _run_bulk_alignment():
-    """Background task: bulk align all Supabase products to OpenCart by SKU."""
-    import re
-    import threading
-    global _bulk_align_status
-
-    _bulk_align_status = {"status": "running", "progress": {"step": "starting"}}
-
-    try:
-        sb = get_supabase_connector()
-        from src.connectors.opencart import OpenCartConnector
-        oc = OpenCartConnector()
+    """Get the current status of the bulk alignment process (from any replica)."""
+    return _job_status(await get_alignment_job_store().latest("bulk_align"))
 
-        # =============================================
-        # STEP 1: Load ALL OpenCart products into memory
-        # =============================================
-        _bulk_align_status["progress"]["step"] = "loading_opencart_products"
-        logger.info("bulk_align_step1", step="Loading OpenCart products")
-
-        conn = oc._get_connection()
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute(f"""
-                    SELECT p.product_id, p.sku, p.model, p.quantity, p.price,
-                           pd.name, m.name as manufacturer
-                    FROM {oc.prefix}product p
-                    LEFT JOIN {oc.prefix}product_description pd
-                        ON p.product_id = pd.product_id AND pd.language_id = 1
-                    LEFT JOIN {oc.prefix}manufacturer m
-                        ON p.manufacturer_id = m.manufacturer_id
-                    WHERE p.status = 1
-                """)
-                oc_products = cursor.fetchall()
-        finally:
-            conn.close()
-
-        # Build lookup maps for OpenCart products
-        # Map by: sku (exact), model (exact), and normalized name tokens
-        oc_by_sku = {}
-        oc_by_model = {}
 
-        for ocp in oc_products:
-            sku = (ocp.get('sku') or '').strip().lower()
-            model = (ocp.get('model') or '').strip().lower()
-
-            if sku:
-                oc_by_sku[sku] = ocp
-            if model:
-                oc_by_model[model] = ocp
-
-        _bulk_align_status["progress"]["opencart_products"] = len(oc_products)
-        logger.info("bulk_align_opencart_loaded", count=len(oc_products),
-                    unique_skus=len(oc_by_sku), unique_models=len(oc_by_model))
-
-        # =============================================
-        # STEP 2: Load ALL Supabase products (paginated)
-        # =============================================
-        _bulk_align_status["progress"]["step"] = "loading_supabase_products"
-        logger.info("bulk_align_step2", step="Loading Supabase products")
-
-        all_sb_products = []
-        offset = 0
-        page_size = 1000
+def _run_bulk_alignment(job: AlignmentJob):
+    """Background task: bulk align all Supabase products to OpenCart by SKU.
 
-        while True:
-            response = sb.client.table("products")\
-                .select("id, sku, supplier_sku, product_name")\
-                .gt("selling_price", 0)\
-                .range(offset, offset + page_size - 1)\
-                .execute()
-
-            if not response.data:
-                break
-
-            all_sb_products.extend(response.data)
-            offset += page_size
-
-            if len(response.data) < page_size:
-                break
-
-        _bulk_align_status["progress"]["supabase_products"] = len(all_sb_products)
-        logger.info("bulk_align_supabase_loaded", count=len(all_sb_products))
-
-        # =============================================
-        # STEP 3: Load existing matches to avoid duplicates
-        # =============================================
-        _bulk_align_status["progress"]["step"] = "loading_existing_matches"
-
-        existing_matches = {}
-        match_offset = 0
-
-        while True:
-            m_response = sb.client.table("product_matches")\
-                .select("internal_product_id, opencart_product_id, match_type")\
-                .range(match_offset, match_offset + page_size - 1)\
-                .execute()
-
-            if not m_response.data:
-                break
-
-            for m in m_response.data:
-                existing_matches[m['internal_product_id']] = m
-
-            match_offset += page_size
-
-            if len(m_response.data) < page_size:
-                break
-
-        _bulk_align_status["progress"]["existing_matches"] = len(existing_matches)
-        logger.info("bulk_align_existing_matches", count=len(existing_matches))
-
-        # =============================================
-        # STEP 4: Match products by SKU
-        # =============================================
-        _bulk_align_status["progress"]["step"] = "matching_products"
-
-        new_links = []       # Products with no match entry at all
-        skipped_ignored = 0  # Products user manually ignored - never override
-
-        for sb_prod in all_sb_products:
-            sb_id = sb_prod['id']
-            sb_sku = (sb_prod.get('sku') or '').strip().lower()
-            sb_supplier_sku = (sb_prod.get('supplier_sku') or '').strip().lower()
-
-            # Try to find OpenCart match by multiple strategies
-            oc_match = None
-            match_type = None
-
-            # Strategy 1: Exact SKU match
-            if sb_sku and sb_sku in oc_by_sku:
-                oc_match = oc_by_sku[sb_sku]
-                match_type = "exact_sku"
-
-            # Strategy 2: Exact model match
-            if not oc_match and sb_sku and sb_sku in oc_by_model:
-                oc_match = oc_by_model[sb_sku]
-                match_type = "exact_model"
-
-            # Strategy 3: Supplier SKU match
-            if not oc_match and sb_supplier_sku:
-                if sb_supplier_sku in oc_by_sku:
-                    oc_match = oc_by_sku[sb_supplier_sku]
-                    match_type = "supplier_sku"
-                elif sb_supplier_sku in oc_by_model:
-                    oc_match = oc_by_model[sb_supplier_sku]
-                    match_type = "supplier_model"
-
-            # Strategy 4: Normalized SKU (remove dashes, spaces)
-            if not oc_match and sb_sku:
-                normalized = re.sub(r'[\s\-_.:]+', '', sb_sku)
-                for oc_sku_key, oc_prod in oc_by_sku.items():
-                    if re.sub(r'[\s\-_.:]+', '', oc_sku_key) == normalized:
-                        oc_match = oc_prod
-                        match_type = "normalized_sku"
-                        break
-                if not oc_match:
-                    for oc_model_key, oc_prod in oc_by_model.items():
-                        if re.sub(r'[\s\-_.:]+', '', oc_model_key) == normalized:
-                            oc_match = oc_prod
-                            match_type = "normalized_model"
-                            break
-
-            if not oc_match:
-                continue  # No match found - skip
-
-            oc_product_id = oc_match['product_id']
-
-            # Check existing match status
-            existing = existing_matches.get(sb_id)
-
-            if existing:
-                # Already has a match entry - respect it completely
-                # "ignored" = user deliberately excluded this product
-                # Any other match = already linked
-                if existing.get('match_type') == 'ignored':
-                    skipped_ignored += 1
-                continue
-            else:
-                # No match entry at all - create new auto-link
-                new_links.append({
-                    "internal_product_id": sb_id,
-                    "opencart_product_id": oc_product_id,
-                    "match_type": f"auto_{match_type}",
-                    "score": 100
-                })
+    Runs in a worker thread on a private event loop.
+    """
+    asyncio.run(_bulk_align(job))
 
-        _bulk_align_status["progress"]["new_links"] = len(new_links)
-        _bulk_align_status["progress"]["skipped_ignored"] = skipped_ignored
-        logger.info("bulk_align_matches_found", new=len(new_links), skipped_ignored=skipped_ignored)
 
-        # =============================================
-        # STEP 5: Write matches to database
-        # =============================================
-        _bulk_align_status["progress"]["step"] = "writing_matches"
+async def _bulk_align(job: AlignmentJob):
+    sb = get_supabase_connector()
+    counts = {
+        "supabase_products": 0,
+        "existing_matches": 0,
+        "new_links_created": 0,
+        "already_linked": 0,
+        "failed_links": 0,
+        "skipped_ignored": 0,
+    }
+    if job.resumed:
+        counts.update({key: value for key, value in job.counts.items() if key in counts})
 
-        # Insert new links in batches
-        inserted = 0
-        for i in range(0, len(new_links), 100):
-            batch = new_links[i:i+100]
-            try:
-                sb.client.table("product_matches").insert(batch).execute()
-                inserted += len(batch)
-            except Exception as e:
-                logger.error("bulk_insert_batch_failed", batch_start=i, error=str(e))
+    try:
+        async with job.heartbeat():
+            # =============================================
+            # STEP 1: OpenCart products from the shared catalog snapshot
+            # =============================================
+            logger.info("bulk_align_step1", step="Loading OpenCart products", job_id=job.id, resumed=job.resumed)
+            after = job.last_key if job.resumed and job.pass_name == "matching" else None
+            await job.checkpoint("loading_opencart_products", after, **counts)
+
+            index = await get_match_index()
+            counts["opencart_products"] = len(index)
+            logger.info("bulk_align_opencart_loaded", count=len(index),
+                        unique_skus=len(index.by_sku), unique_models=len(index.by_model))
+
+            # =============================================
+            # STEP 2-5: Per chunk of Supabase products (id order): load their
+            # existing matches, match by SKU, write links, checkpoint
+            # =============================================
+            def _where(q):
+                q = q.gt("selling_price", 0)
+                return q.gt("id", after) if after else q
+
+            products = sb.db.stream("products", "id, sku, supplier_sku, product_name",
+                                    page_size=get_config().alignment_job_chunk_size, where=_where)
+            async for page in products.pages():
+                existing_matches = await sb.get_product_matches(p['id'] for p in page)
+                writer = MatchWriter(sb)
+
+                for sb_prod in page:
+                    # Exact SKU/model, supplier SKU, then normalized SKU/model
+                    hit = index.match(sb_prod, BULK_ALIGN)
+                    if not hit:
+                        continue  # No match found - skip
+                    oc_match, strategy = hit
+
+                    existing = existing_matches.get(sb_prod['id'])
+                    if existing:
+                        # Already has a match entry - respect it completely
+                        # "ignored" = user deliberately excluded this product
+                        # Any other match = already linked
+                        if existing.get('match_type') == 'ignored':
+                            counts["skipped_ignored"] += 1
+                        continue
+
+                    # No match entry at all - create new auto-link
+                    writer.add(sb_prod['id'], oc_match['product_id'], f"auto_{strategy.name}", 100)
+
+                written = await writer.flush()
+                if written.failed:
+                    logger.error("bulk_insert_failed", failed=written.failed, errors=written.errors)
+
+                counts["supabase_products"] += len(page)
+                counts["existing_matches"] += len(existing_matches)
+                counts["new_links_created"] += written.inserted
+                counts["already_linked"] += written.conflicted
+                counts["failed_links"] += written.failed
+                await job.checkpoint("matching", page[-1]['id'], **counts)
 
         # =============================================
         # DONE
         # =============================================
         result = {
             "status": "completed",
-            "progress": {
-                "opencart_products": len(oc_products),
-                "supabase_products": len(all_sb_products),
-                "existing_matches": len(existing_matches),
-                "new_links_created": inserted,
-                "skipped_ignored": skipped_ignored,
-                "total_linked": inserted
-            }
+            "progress": {**counts, "total_linked": counts["new_links_created"]},
         }
-
-        _bulk_align_status = result
+        await job.finish("completed", result)
         logger.info("bulk_align_completed", **result["progress"])
 
+    except JobCancelled:
+        await job.finish("cancelled", {"status": "cancelled", "progress": counts})
+        logger.info("bulk_align_cancelled", **counts)
+
     except Exception as e:
-        _bulk_align_status = {
-            "status": "failed",
-            "error": str(e),
-            "progress": _bulk_align_status.get("progress", {})
-        }
-        logger.error("bulk_align_failed", error=str(e))
+        logger.error("bulk_align_failed", error=str(e), job_id=job.id)
+        try:
+            await job.finish("failed", {"status": "failed", "error": str(e), "progress": counts}, error=str(e))
+        except Exception as finish_error:
+            logger.error("bulk_align_job_update_failed", error=str(finish_error))
+
+    finally:
+        await close_async_supabase()
 
 
 # ============================================================================
@@ -1551,95 +1323,35 @@ async def alignment_health():
     Aggregates counts from OpenCart, Supabase, and product_matches.
     """
     sb = get_supabase_connector()
-    from src.connectors.opencart import get_opencart_connector
-    oc = get_opencart_connector()
 
     try:
-        # 1. OpenCart totals
-        conn = oc._get_connection()
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute(f"SELECT COUNT(*) as cnt FROM {oc.prefix}product WHERE status = 1")
-                oc_total = cursor.fetchone()['cnt']
-
-                # Duplicate SKUs
-                cursor.execute(f"""
-                    SELECT COUNT(*) as cnt FROM (
-                        SELECT sku FROM {oc.prefix}product
-                        WHERE sku IS NOT NULL AND sku != ''
-                        GROUP BY sku HAVING COUNT(*) > 1
-                    ) t
-                """)
-                dup_skus = cursor.fetchone()['cnt']
-
-                # Duplicate names
-                cursor.execute(f"""
-                    SELECT COUNT(*) as cnt FROM (
-                        SELECT name FROM {oc.prefix}product_description
-                        WHERE name IS NOT NULL AND name != ''
-                        GROUP BY name HAVING COUNT(*) > 1
-                    ) t
-                """)
-                dup_names = cursor.fetchone()['cnt']
-        finally:
-            conn.close()
-
-        # 2. Supabase product count
-        sb_count_resp = sb.client.table("products").select("id", count="exact").execute()
-        sb_total = sb_count_resp.count if sb_count_resp.count is not None else len(sb_count_resp.data)
-
-        # 3. Product matches count
-        matches_resp = sb.client.table("product_matches").select("id", count="exact").execute()
-        matched_total = matches_resp.count if matches_resp.count is not None else len(matches_resp.data)
-
-        # Matched with valid OC ID (actually linked)
-        linked_resp = sb.client.table("product_matches").select("id", count="exact").not_.is_("opencart_product_id", "null").execute()
-        linked_total = linked_resp.count if linked_resp.count is not None else len(linked_resp.data)
-
-        # Ignored count
-        ignored_resp = sb.client.table("product_matches").select("id", count="exact").eq("match_type", "ignored").execute()
-        ignored_total = ignored_resp.count if ignored_resp.count is not None else len(ignored_resp.data)
-
-        # 4. Orphaned OC products (in OC but not linked via product_matches)
-        linked_oc_ids = set()
-        offset = 0
-        while True:
-            batch = sb.client.table("product_matches")\
-                .select("opencart_product_id")\
-                .not_.is_("opencart_product_id", "null")\
-                .range(offset, offset + 999)\
-                .execute()
-            if not batch.data:
-                break
-            linked_oc_ids.update(m['opencart_product_id'] for m in batch.data)
-            if len(batch.data) < 1000:
-                break
-            offset += 1000
-
-        orphaned_count = oc_total - len(linked_oc_ids)
+        # 1-5. One aggregate query on each side, run concurrently
+        oc_counts, sb_stats = await asyncio.gather(
+            get_opencart_connector().get_catalog_health_counts(),
+            sb.get_alignment_health_stats(),
+        )
+        oc_total = oc_counts["active_products"]
+        dup_skus = oc_counts["duplicate_skus"]
+        dup_names = oc_counts["duplicate_names"]
+        sb_total = sb_stats["products_total"]
+        matched_total = sb_stats["matches_total"]
+        linked_total = sb_stats["linked_total"]  # Matched with valid OC ID (actually linked)
+        ignored_total = sb_stats["ignored_total"]
+
+        # Orphaned OC products (in OC but not linked via product_matches)
+        orphaned_count = oc_total - sb_stats["linked_opencart_ids"]
         if orphaned_count < 0:
             orphaned_count = 0
 
-        # 5. Unmatched Supabase products (no entry in product_matches at all)
-        matched_sb_ids = set()
-        offset = 0
-        while True:
-            batch = sb.client.table("product_matches")\
-                .select("internal_product_id")\
-                .range(offset, offset + 999)\
-                .execute()
-            if not batch.data:
-                break
-            matched_sb_ids.update(m['internal_product_id'] for m in batch.data)
-            if len(batch.data) < 1000:
-                break
-            offset += 1000
-        unmatched_sb = sb_total - len(matched_sb_ids)
-        if unmatched_sb < 0:
-            unmatched_sb = 0
+        # Unmatched Supabase products (no entry in product_matches at all)
+        unmatched_sb = sb_stats["unmatched_products"]
 
         # 6. Last auto-link result
-        last_auto_link = _auto_link_status.get("last_result")
+        try:
+            last_auto_link = await _last_job_result("auto_link")
+        except Exception as e:
+            logger.warning("alignment_health_last_auto_link_failed", error=str(e))
+            last_auto_link = None
 
         result = {
             "opencart_active_products": oc_total,
@@ -1680,7 +1392,10 @@ def _calc_health_score(oc_total, linked, orphaned, dup_names, dup_skus):
 
 class ReverseImportRequest(BaseModel):
     dry_run: bool = True
-    batch_size: int = 100
+    batch_size: int = 500  # Products per insert request
+
+# Upper bound on products per insert (PostgREST request size)
+MAX_REVERSE_IMPORT_BATCH = 1000
 
 @router.post("/reverse-import")
 async def reverse_import_products(request: ReverseImportRequest):
@@ -1699,6 +1414,7 @@ async def reverse_import_products(request: ReverseImportRequest):
             import asyncio
             loop = asyncio.new_event_loop()
             result = loop.run_until_complete(_do_reverse_import(request))
+            loop.run_until_complete(close_async_supabase())
             loop.close()
             _reverse_import_status["last_result"] = result
         except Exception as e:
@@ -1719,42 +1435,16 @@ async def get_reverse_import_status():
 
 async def _do_reverse_import(request: ReverseImportRequest):
     sb = get_supabase_connector()
-    from src.connectors.opencart import get_opencart_connector
-    oc = get_opencart_connector()
 
-    # 1. Fetch ALL active OC products
-    conn = oc._get_connection()
-    try:
-        with conn.cursor() as cursor:
-            cursor.execute(f"""
-                SELECT p.product_id, p.sku, p.model, p.price, p.quantity,
-                       pd.name, m.name as manufacturer
-                FROM {oc.prefix}product p
-                LEFT JOIN {oc.prefix}product_description pd
-                    ON (p.product_id = pd.product_id AND pd.language_id = 1)
-                LEFT JOIN {oc.prefix}manufacturer m
-                    ON (p.manufacturer_id = m.manufacturer_id)
-                WHERE p.status = 1
-            """)
-            oc_products = cursor.fetchall()
-    finally:
-        conn.close()
+    # 1. ALL active OC products (shared catalog snapshot)
+    catalog = await get_catalog_snapshot()
+    oc_products = catalog.active_products()
 
     # 2. Build set of already-linked OC product IDs
-    linked_oc_ids = set()
-    offset = 0
-    while True:
-        batch = sb.client.table("product_matches")\
-            .select("opencart_product_id")\
-            .not_.is_("opencart_product_id", "null")\
-            .range(offset, offset + 999)\
-            .execute()
-        if not batch.data:
-            break
-        linked_oc_ids.update(m['opencart_product_id'] for m in batch.data)
-        if len(batch.data) < 1000:
-            break
-        offset += 1000
+    linked_oc_ids = await sb.db.stream(
+        "product_matches", "opencart_product_id", partitions=2,
+        where=lambda q: q.not_("opencart_product_id", "is", "null"),
+    ).to_set("opencart_product_id")
 
     # 3. Find orphaned products
     orphaned = [p for p in oc_products if p['product_id'] not in linked_oc_ids]
@@ -1762,18 +1452,24 @@ async def _do_reverse_import(request: ReverseImportRequest):
     if not orphaned:
         return {"status": "success", "imported": 0, "message": "No orphaned products found"}
 
-    # 4. Ensure "OpenCart Legacy" supplier exists
-    legacy_supplier_id = None
-    if not request.dry_run:
+    # 4. One product per SKU: products are unique on (supplier_id, supplier_sku),
+    #    later OC products with an already-seen SKU are skipped
+    by_sku = {}
+    for p in orphaned:
+        by_sku.setdefault(_reverse_import_sku(p), p)
+    duplicate_skus = len(orphaned) - len(by_sku)
+
+    if request.dry_run:
+        imported, skipped, errors, first_error = len(by_sku), duplicate_skus, 0, None
+    else:
+        # 5. Ensure "OpenCart Legacy" supplier exists
         try:
-            existing = sb.client.table("suppliers").select("id").eq("name", "OpenCart Legacy").limit(1).execute()
+            existing = await sb.db.table("suppliers").select("id").eq("name", "OpenCart Legacy").limit(1).execute()
             if existing.data:
                 legacy_supplier_id = existing.data[0]['id']
             else:
-                result = sb.client.table("suppliers").insert({
-                    "name": "OpenCart Legacy"
-                }).execute()
-                legacy_supplier_id = result.data[0]['id']
+                created = await sb.db.table("suppliers").insert({"name": "OpenCart Legacy"}).execute()
+                legacy_supplier_id = created.data[0]['id'] if created.data else None
         except Exception as e:
             logger.error("legacy_supplier_create_failed", error=str(e))
             return {"status": "failed", "error": f"Could not create OpenCart Legacy supplier: {e}"}
@@ -1781,61 +1477,33 @@ async def _do_reverse_import(request: ReverseImportRequest):
         if not legacy_supplier_id:
             return {"status": "failed", "error": "legacy_supplier_id is None after creation attempt"}
 
-    # 5. Import orphaned products
-    imported = 0
-    skipped = 0
-    errors = 0
-    first_error = None
-
-    for i in range(0, len(orphaned), request.batch_size):
-        batch = orphaned[i:i + request.batch_size]
-
-        for p in batch:
-            sku = p.get('sku') or p.get('model') or f"oc-{p['product_id']}"
-            name = p.get('name') or f"OpenCart Product {p['product_id']}"
-            price = float(p.get('price', 0))
-            stock = int(p.get('quantity', 0))
-
-            if request.dry_run:
-                imported += 1
-                continue
-
-            try:
-                # Insert into Supabase products
-                insert_result = sb.client.table("products").insert({
-                    "sku": sku,
-                    "supplier_sku": sku,
-                    "product_name": name,
-                    "selling_price": price,
-                    "cost_price": price,
-                    "retail_price": price,
-                    "total_stock": stock,
-                    "brand": p.get('manufacturer', ''),
-                    "supplier_id": legacy_supplier_id,
-                    "description": "",
-                    "active": True
-                }).execute()
-
-                if insert_result.data:
-                    sb_product_id = insert_result.data[0]['id']
-                    # Create product_matches link
-                    sb.client.table("product_matches").insert({
-                        "internal_product_id": sb_product_id,
-                        "opencart_product_id": p['product_id'],
-                        "match_type": "reverse_import",
-                        "score": 100
-                    }).execute()
-                    imported += 1
-                else:
-                    skipped += 1
-            except Exception as e:
-                errors += 1
-                if first_error is None:
-                    first_error = str(e)
-                if errors <= 10:
-                    logger.warning("reverse_import_item_failed", sku=sku, product_id=p['product_id'], error=str(e))
-
-        logger.info("reverse_import_progress", batch=i, imported=imported, errors=errors)
+        # 6. Import in chunks: one bulk product insert + one bulk link write each,
+        #    up to reverse_import_concurrency chunks in flight
+        batch_size = max(1, min(request.batch_size, MAX_REVERSE_IMPORT_BATCH))
+        items = list(by_sku.items())
+        chunks = [items[i:i + batch_size] for i in range(0, len(items), batch_size)]
+        semaphore = asyncio.Semaphore(max(1, get_config().reverse_import_concurrency))
+        totals = {"imported": 0, "skipped": duplicate_skus, "errors": 0}
+        chunk_errors: List[str] = []
+
+        async def _import(index: int, chunk):
+            async with semaphore:
+                product_ids, failed = await _insert_reverse_import_chunk(sb, legacy_supplier_id, chunk)
+                links = MatchWriter(sb)
+                for sku, p in chunk:
+                    if sku in product_ids:
+                        links.add(product_ids[sku], p['product_id'], "reverse_import", 100)
+                written = await links.flush()
+
+            totals["imported"] += written.inserted
+            totals["skipped"] += written.conflicted
+            totals["errors"] += len(failed) + written.failed
+            chunk_errors.extend(failed + written.errors)
+            logger.info("reverse_import_progress", chunk=index, chunks=len(chunks), **totals)
+
+        await asyncio.gather(*(_import(i, chunk) for i, chunk in enumerate(chunks)))
+        imported, skipped, errors = totals["imported"], totals["skipped"], totals["errors"]
+        first_error = chunk_errors[0] if chunk_errors else None
 
     prefix = "[DRY RUN] Would import" if request.dry_run else "Imported"
     result = {
@@ -1849,3 +1517,66 @@ async def _do_reverse_import(request: ReverseImportRequest):
     if first_error:
         result["first_error"] = first_error
     return result
+
+
+def _reverse_import_sku(p) -> str:
+    return p.get('sku') or p.get('model') or f"oc-{p['product_id']}"
+
+
+def _reverse_import_row(p, sku: str, supplier_id: str) -> dict:
+    price = float(p.get('price', 0))
+    return {
+        "sku": sku,
+        "supplier_sku": sku,
+        "product_name": p.get('name') or f"OpenCart Product {p['product_id']}",
+        "selling_price": price,
+        "cost_price": price,
+        "retail_price": price,
+        "total_stock": int(p.get('quantity', 0)),
+        "brand": p.get('manufacturer', ''),
+        "supplier_id": supplier_id,
+        "description": "",
+        "active": True
+    }
+
+
+async def _insert_reverse_import_chunk(sb: SupabaseConnector, supplier_id: str, chunk):
+    """Insert one chunk of (sku, OC product) pairs into products.
+
+    The insert skips SKUs the legacy supplier already has, and their ids are
+    looked up instead, so a chunk retried after a lost response (or a run that
+    stopped before writing its links) ends up linking the existing rows rather
+    than creating duplicates. A chunk the database rejects is split to
+    isolate the bad rows.
+
+    Returns:
+        ({supplier_sku: product id}, [errors for products that failed])
+    """
+    try:
+        response = await sb.db.table("products").upsert(
+            [_reverse_import_row(p, sku, supplier_id) for sku, p in chunk],
+            on_conflict="supplier_id,supplier_sku", ignore_duplicates=True,
+        ).execute()
+        product_ids = {row['supplier_sku']: row['id'] for row in response.data or []}
+
+        missing = [sku for sku, _ in chunk if sku not in product_ids]
+        for start in range(0, len(missing), 200):
+            existing = await sb.db.table("products").select("id, supplier_sku")\
+                .eq("supplier_id", supplier_id)\
+                .in_("supplier_sku", missing[start:start + 200])\
+                .execute()
+            for row in existing.data or []:
+                product_ids.setdefault(row['supplier_sku'], row['id'])
+        return product_ids, []
+
+    except Exception as e:
+        if len(chunk) == 1:
+            sku, p = chunk[0]
+            logger.warning("reverse_import_item_failed", sku=sku, product_id=p['product_id'], error=str(e))
+            return {}, [f"{sku}: {e}"]
+        mid = len(chunk) // 2
+        (first_ids, first_errors), (second_ids, second_errors) = await asyncio.gather(
+            _insert_reverse_import_chunk(sb, supplier_id, chunk[:mid]),
+            _insert_reverse_import_chunk(sb, supplier_id, chunk[mid:]),
+        )
+        return {**first_ids, **second_ids}, first_errors + second_errors
@@ -82,7 +82,7 @@ async def get_sync_status():
     supabase = get_supabase_connector()
     
     # Get last 10 sync sessions
-    sessions = supabase.client.table("mcp_sync_sessions")\
+    sessions = await supabase.db.table("mcp_sync_sessions")\
         .select("*")\
         .order("started_at", desc=True)\
         .limit(10)\
@@ -100,14 +100,14 @@ async def get_sync_session(session_id: str):
     supabase = get_supabase_connector()
     
     # Get session
-    session = supabase.client.table("mcp_sync_sessions")\
+    session = await supabase.db.table("mcp_sync_sessions")\
         .select("*")\
         .eq("id", session_id)\
         .single()\
         .execute()
     
     # Get logs
-    logs = supabase.client.table("mcp_sync_log")\
+    logs = await supabase.db.table("mcp_sync_log")\
         .select("*")\
         .eq("session_id", session_id)\
         .order("created_at")\
@@ -3,6 +3,8 @@ Product Quality API - Duplicate Detection and Data Quality
 """
 from fastapi import APIRouter, HTTPException
 from typing import List, Dict, Any
+from src.aligner.match_index import DUPLICATES, MatchIndex
+from src.catalog.snapshot import get_catalog_service, get_catalog_snapshot
 from src.connectors.opencart import get_opencart_connector
 from src.connectors.supabase import get_supabase_connector
 from src.utils.logging import AgentLogger
@@ -30,13 +32,10 @@ async def get_duplicate_skus():
         ORDER BY count DESC
         """
         
-        conn = opencart._get_connection()
-        try:
+        with opencart.connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(query)
                 duplicates = cursor.fetchall()
-        finally:
-            conn.close()
         
         logger.info("duplicate_skus_found", count=len(duplicates))
         
@@ -70,13 +69,10 @@ async def get_duplicate_names():
         LIMIT 2000
         """
         
-        conn = opencart._get_connection()
-        try:
+        with opencart.connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute(query)
                 duplicates = cursor.fetchall()
-        finally:
-            conn.close()
         
         logger.info("duplicate_names_found", count=len(duplicates))
         
@@ -93,31 +89,18 @@ async def get_duplicate_names():
 async def get_orphaned_products():
     """Find products in OpenCart that don't exist in any supplier feed."""
     try:
-        opencart = get_opencart_connector()
         supabase = get_supabase_connector()
         
-        # Get all SKUs and Names from OpenCart
-        query = """
-            SELECT p.product_id, p.sku, p.model, pd.name 
-            FROM oc_product p 
-            LEFT JOIN oc_product_description pd ON p.product_id = pd.product_id 
-            WHERE p.sku IS NOT NULL AND p.sku != '' AND pd.language_id = 1 AND p.quantity > 0
-        """
-        
-        conn = opencart._get_connection()
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute(query)
-                opencart_products = cursor.fetchall()
-        finally:
-            conn.close()
-        
-        # Get all SKUs from Supabase products table
-        supabase_response = supabase.client.table("products")\
-            .select("sku")\
-            .execute()
+        # All in-stock OpenCart products with a SKU (shared catalog snapshot)
+        catalog = await get_catalog_snapshot()
+        opencart_products = [
+            p for p in catalog.all_products()
+            if p.get('sku') and p.get('name') is not None and (p.get('quantity') or 0) > 0
+        ]
         
-        supabase_skus = set(p['sku'] for p in supabase_response.data if p.get('sku'))
+        # Get all SKUs from Supabase products table (every page)
+        supabase_skus = await supabase.db.stream("products", "sku", partitions=4).to_set("sku")
+        supabase_skus.discard("")
         
         # Find orphaned products
         orphaned = [
@@ -146,22 +129,14 @@ async def get_orphaned_products():
 async def get_missing_products():
     """Find products in supplier feeds that don't exist in OpenCart."""
     try:
-        opencart = get_opencart_connector()
         supabase = get_supabase_connector()
         
-        # Get all SKUs from OpenCart
-        query = "SELECT sku FROM oc_product WHERE sku IS NOT NULL AND sku != ''"
-        
-        conn = opencart._get_connection()
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute(query)
-                opencart_skus = set(p['sku'] for p in cursor.fetchall())
-        finally:
-            conn.close()
+        # Get all SKUs from OpenCart (shared catalog snapshot)
+        catalog = await get_catalog_snapshot()
+        opencart_skus = set(p['sku'] for p in catalog.all_products() if p.get('sku'))
         
         # Get all active products from Supabase
-        supabase_response = supabase.client.table("products")\
+        supabase_response = await supabase.db.table("products")\
             .select("sku, product_name, supplier_id, cost_price")\
             .eq("active", True)\
             .execute()
@@ -196,83 +171,36 @@ async def get_potential_duplicates():
     Find 'Fuzzy' duplicates: OpenCart products that are NOT aligned, 
     but match an Aligned product via Model/SKU rules.
     """
-    import re
-    
-    def normalize_string(s):
-        if not s: return ""
-        return re.sub(r'[^a-z0-9]', '', str(s).lower())
-
     try:
-        opencart = get_opencart_connector()
         supabase = get_supabase_connector()
         
         # 1. Fetch Alignment Matches (Aligned IDs)
-        matches = supabase.client.table("product_matches").select("opencart_product_id").execute()
-        aligned_ids = set(m['opencart_product_id'] for m in matches.data if m.get('opencart_product_id'))
+        aligned_ids = await supabase.db.stream("product_matches", "opencart_product_id")\
+            .to_set("opencart_product_id")
         
-        # 2. Fetch All OpenCart Products
-        query = """
-            SELECT p.product_id, p.sku, p.model, pd.name 
-            FROM oc_product p 
-            JOIN oc_product_description pd ON p.product_id = pd.product_id 
-            WHERE pd.language_id = 1
-        """
-        conn = opencart._get_connection()
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute(query)
-                oc_products = cursor.fetchall()
-        finally:
-            conn.close()
+        # 2. All OpenCart Products (shared catalog snapshot)
+        catalog = await get_catalog_snapshot()
+        oc_products = [p for p in catalog.all_products() if p.get('name') is not None]
         
         # 3. Separate Aligned vs Unaligned
         aligned = []
         unaligned = []
         
         for p in oc_products:
-            p['norm_sku'] = normalize_string(p.get('sku'))
-            p['norm_model'] = normalize_string(p.get('model'))
-            
             if p['product_id'] in aligned_ids:
                 aligned.append(p)
             else:
                 unaligned.append(p)
                 
-        # 4. Build Indexes for Aligned
-        aligned_sku_map = {}
-        aligned_model_map = {}
-        
-        for p in aligned:
-            if p['norm_sku']: aligned_sku_map[p['norm_sku']] = p
-            if p['norm_model']: aligned_model_map[p['norm_model']] = p
+        # 4. Match index over the Aligned products (normalized SKU/model)
+        aligned_index = MatchIndex.from_products(aligned)
             
-        # 5. Scan for Duplicates
+        # 5. Scan for Duplicates: model first, then SKU (see DUPLICATES)
         potential_duplicates = []
         
         for u in unaligned:
-            target = None
-            match_type = ""
-            
-            # Check 1: Model Match
-            u_model = u['norm_model']
-            if u_model:
-                if u_model in aligned_sku_map:
-                    target = aligned_sku_map[u_model]
-                    match_type = "Model matches Aligned SKU"
-                elif u_model in aligned_model_map:
-                    target = aligned_model_map[u_model]
-                    match_type = "Model matches Aligned Model"
-                    
-            # Check 2: SKU Match (if no model match)
-            if not target:
-                u_sku = u['norm_sku']
-                if u_sku:
-                    if u_sku in aligned_sku_map:
-                        target = aligned_sku_map[u_sku]
-                        match_type = "SKU matches Aligned SKU"
-                    elif u_sku in aligned_model_map:
-                        target = aligned_model_map[u_sku]
-                        match_type = "SKU matches Aligned Model"
+            hit = aligned_index.match(u, DUPLICATES)
+            target, match_type = (hit[0], hit[1].name) if hit else (None, "")
             
             if target:
                 potential_duplicates.append({
@@ -326,7 +254,7 @@ async def merge_products(payload: Dict[str, Any]):
         if find_target and not target_id:
             all_ids = source_ids
             # Fetch alignment matches for these IDs
-            matches = supabase.client.table("product_matches")\
+            matches = await supabase.db.table("product_matches")\
                 .select("opencart_product_id")\
                 .in_("opencart_product_id", all_ids)\
                 .execute()
@@ -352,8 +280,7 @@ async def merge_products(payload: Dict[str, Any]):
              
         # Perform Merge (Delete Sources)
         deleted_count = 0
-        conn = opencart._get_connection()
-        try:
+        with opencart.connection() as conn:
             with conn.cursor() as cursor:
                 # Delete from product, product_description, product_to_store, product_to_category
                 # Note: OpenCart usually cascades, but we'll be explicit for core tables
@@ -383,11 +310,9 @@ async def merge_products(payload: Dict[str, Any]):
                 
             conn.commit()
             deleted_count = len(source_ids)
-        except Exception as e:
-            conn.rollback()
-            raise e
-        finally:
-            conn.close()
+
+        # Deletes aren't visible to the incremental refresh
+        get_catalog_service().invalidate(full=True)
         
         logger.info("products_merged", target=target_id, deleted=source_ids)
         
@@ -422,8 +347,7 @@ async def auto_merge_duplicates(payload: Dict[str, Any] = None):
         supabase = get_supabase_connector()
 
         # 1. Find all duplicate name groups in OpenCart
-        conn = opencart._get_connection()
-        try:
+        with opencart.connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute("""
                     SELECT pd.name, GROUP_CONCAT(pd.product_id) as product_ids
@@ -433,11 +357,9 @@ async def auto_merge_duplicates(payload: Dict[str, Any] = None):
                     HAVING COUNT(*) > 1
                 """)
                 dup_groups = cursor.fetchall()
-        finally:
-            conn.close()
 
         # 2. Get aligned product IDs
-        matches = supabase.client.table("product_matches").select("opencart_product_id").execute()
+        matches = await supabase.db.table("product_matches").select("opencart_product_id").execute()
         aligned_ids = set(m['opencart_product_id'] for m in matches.data if m.get('opencart_product_id'))
 
         merged_groups = 0
@@ -471,7 +393,7 @@ async def auto_merge_duplicates(payload: Dict[str, Any] = None):
                 # Reassign any product_matches pointing to deleted IDs
                 for sid in source_ids:
                     try:
-                        supabase.client.table("product_matches")\
+                        await supabase.db.table("product_matches")\
                             .update({"opencart_product_id": target})\
                             .eq("opencart_product_id", sid)\
                             .execute()
@@ -479,32 +401,33 @@ async def auto_merge_duplicates(payload: Dict[str, Any] = None):
                         pass
 
                 # Delete source products from OpenCart
-                conn2 = opencart._get_connection()
                 try:
-                    with conn2.cursor() as cursor:
-                        fmt = ','.join(['%s'] * len(source_ids))
-                        cursor.execute(f"DELETE FROM oc_product WHERE product_id IN ({fmt})", tuple(source_ids))
-                        cursor.execute(f"DELETE FROM oc_product_description WHERE product_id IN ({fmt})", tuple(source_ids))
-                        cursor.execute(f"DELETE FROM oc_product_to_store WHERE product_id IN ({fmt})", tuple(source_ids))
-                        cursor.execute(f"DELETE FROM oc_product_to_category WHERE product_id IN ({fmt})", tuple(source_ids))
-                        try:
-                            seo_queries = [f"product_id={sid}" for sid in source_ids]
-                            seo_fmt = ','.join(['%s'] * len(seo_queries))
-                            cursor.execute(f"DELETE FROM oc_seo_url WHERE query IN ({seo_fmt})", tuple(seo_queries))
-                        except Exception:
-                            pass
-                    conn2.commit()
+                    with opencart.connection() as conn2:
+                        with conn2.cursor() as cursor:
+                            fmt = ','.join(['%s'] * len(source_ids))
+                            cursor.execute(f"DELETE FROM oc_product WHERE product_id IN ({fmt})", tuple(source_ids))
+                            cursor.execute(f"DELETE FROM oc_product_description WHERE product_id IN ({fmt})", tuple(source_ids))
+                            cursor.execute(f"DELETE FROM oc_product_to_store WHERE product_id IN ({fmt})", tuple(source_ids))
+                            cursor.execute(f"DELETE FROM oc_product_to_category WHERE product_id IN ({fmt})", tuple(source_ids))
+                            try:
+                                seo_queries = [f"product_id={sid}" for sid in source_ids]
+                                seo_fmt = ','.join(['%s'] * len(seo_queries))
+                                cursor.execute(f"DELETE FROM oc_seo_url WHERE query IN ({seo_fmt})", tuple(seo_queries))
+                            except Exception:
+                                pass
+                        conn2.commit()
                     total_deleted += len(source_ids)
                     merged_groups += 1
                 except Exception as e:
-                    conn2.rollback()
                     logger.error("auto_merge_group_failed", name=name, error=str(e))
-                finally:
-                    conn2.close()
             elif dry_run:
                 merged_groups += 1
                 total_deleted += len(source_ids)
 
+        if total_deleted and not dry_run:
+            # Deletes aren't visible to the incremental refresh
+            get_catalog_service().invalidate(full=True)
+
         prefix = "[DRY RUN] Would merge" if dry_run else "Merged"
         logger.info("auto_merge_complete", groups=merged_groups, deleted=total_deleted, dry_run=dry_run)
 
@@ -1,6 +1,7 @@
 """Stock sync API endpoints for applying approved price changes."""
 from fastapi import APIRouter, HTTPException
 from typing import List, Dict, Any
+from src.catalog.snapshot import get_catalog_snapshot
 from src.connectors.opencart import get_opencart_connector
 from src.connectors.supabase import get_supabase_connector
 from src.utils.logging import AgentLogger
@@ -43,21 +44,26 @@ async def apply_price_changes(payload: Dict[str, Any]):
         # Apply to OpenCart
         result = await opencart.bulk_update_products(updates)
         
-        # Log each successful update
-        if result['success']:
-            for change in changes:
-                try:
-                    supabase.client.table("stock_sync_log").insert({
-                        'product_id': change['product_id'],
-                        'sku': change['sku'],
-                        'field_name': 'price',
-                        'old_value': change.get('current_price'),
-                        'new_value': change['new_price'],
-                        'changed_by': 'dashboard_user',
-                        'change_source': 'dashboard'
-                    }).execute()
-                except Exception as e:
-                    logger.error("log_update_failed", sku=change.get('sku'), error=str(e))
+        # Log each row that was actually written
+        updated_ids = {r['product_id'] for r in result['results'] if r['status'] == 'updated'}
+        log_rows = [
+            {
+                'product_id': change['product_id'],
+                'sku': change['sku'],
+                'field_name': 'price',
+                'old_value': change.get('current_price'),
+                'new_value': change['new_price'],
+                'changed_by': 'dashboard_user',
+                'change_source': 'dashboard'
+            }
+            for change in changes
+            if int(change['product_id']) in updated_ids
+        ]
+        if log_rows:
+            try:
+                await supabase.db.table("stock_sync_log").insert(log_rows).execute()
+            except Exception as e:
+                logger.error("log_update_failed", count=len(log_rows), error=str(e))
         
         logger.info("price_changes_applied", 
                    updated=result['updated'], 
@@ -67,6 +73,7 @@ async def apply_price_changes(payload: Dict[str, Any]):
             'success': result['success'],
             'updated': result['updated'],
             'failed': result['failed'],
+            'not_found': result['not_found'],
             'errors': result.get('errors', [])
         }
         
@@ -91,17 +98,10 @@ async def round_all_prices(payload: Dict[str, Any] = None):
     try:
         opencart = get_opencart_connector()
 
-        # Fetch all active product prices from OpenCart
-        conn = opencart._get_connection()
-        try:
-            with conn.cursor() as cursor:
-                cursor.execute(f"""
-                    SELECT product_id, price FROM {opencart.prefix}product
-                    WHERE status = 1 AND price > 0
-                """)
-                products = cursor.fetchall()
-        finally:
-            conn.close()
+        # Active product prices from a fresh catalog snapshot: rounded prices are
+        # written back, so a cached (up to 60s old) price could undo a recent change
+        catalog = await get_catalog_snapshot(max_age=None if dry_run else 0)
+        products = [p for p in catalog.active_products() if float(p['price'] or 0) > 0]
 
         # Find products needing rounding
         to_update = []
@@ -133,32 +133,9 @@ async def round_all_prices(payload: Dict[str, Any] = None):
                 "message": f"[DRY RUN] Would round {len(to_update)} of {len(products)} products"
             }
 
-        # Apply updates using batch SQL (CASE WHEN) for speed
-        updated_count = 0
-        batch_size = 500
-        for batch_start in range(0, len(to_update), batch_size):
-            batch = to_update[batch_start:batch_start + batch_size]
-            conn = opencart._get_connection()
-            try:
-                with conn.cursor() as cursor:
-                    cases = " ".join(
-                        f"WHEN {item['product_id']} THEN {item['price']}"
-                        for item in batch
-                    )
-                    ids = ",".join(str(item['product_id']) for item in batch)
-                    sql = f"""
-                        UPDATE {opencart.prefix}product
-                        SET price = CASE product_id {cases} END
-                        WHERE product_id IN ({ids})
-                    """
-                    cursor.execute(sql)
-                conn.commit()
-                updated_count += len(batch)
-            except Exception as batch_err:
-                conn.rollback()
-                logger.error("round_prices_batch_failed", batch_start=batch_start, error=str(batch_err))
-            finally:
-                conn.close()
+        # Apply updates with the set-based bulk writer (chunked CASE updates)
+        result = await opencart.bulk_update_products(to_update)
+        updated_count = result['updated']
 
         logger.info("prices_rounded", checked=len(products), updated=updated_count)
 
@@ -167,7 +144,7 @@ async def round_all_prices(payload: Dict[str, Any] = None):
             "dry_run": False,
             "checked": len(products),
             "updated": updated_count,
-            "failed": len(to_update) - updated_count,
+            "failed": result['failed'],
             "message": f"Rounded {updated_count} product prices to nearest R10"
         }
 
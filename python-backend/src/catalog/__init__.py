@@ -0,0 +1 @@
+"""Process-wide, incrementally refreshed view of the OpenCart catalog."""
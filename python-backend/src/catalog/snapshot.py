@@ -0,0 +1,239 @@
+"""Shared OpenCart catalog snapshot.
+
+Loads every product once, then refreshes incrementally by ``date_modified``
+plus a max-``product_id`` watermark, and hands out immutable snapshots with
+precomputed lookup maps. Endpoints and jobs read from here instead of each
+re-running ``SELECT ... FROM oc_product JOIN oc_product_description``.
+"""
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from src.connectors.db_executor import run_blocking
+from src.connectors.opencart import OpenCartConnector, get_opencart_connector, normalize_product_key
+from src.utils.config import get_config
+from src.utils.logging import AgentLogger
+
+logger = AgentLogger("CatalogSnapshot")
+
+
+def normalize_name(name: Optional[str]) -> str:
+    """Lowercase alphanumerics only - the auto-link name key."""
+    return re.sub(r'[^a-z0-9]', '', (name or '').lower())
+
+
+def fold_key(value: Optional[str]) -> str:
+    """Case/trailing-space folding matching MySQL's default string comparison."""
+    return (value or '').strip().lower()
+
+
+class CatalogSnapshot:
+    """Immutable view of the catalog at one version.
+
+    ``products`` holds every product (any status). The lookup maps cover
+    active products only (``status = 1``); when several products share a
+    key the highest product_id wins, as the old per-endpoint loops did.
+
+    Attributes:
+        version: Increases every time the catalog data changes
+        loaded_at: Unix time this snapshot was built
+        products: product_id -> row (product_id, sku, model, name, price,
+            quantity, status, manufacturer, date_modified)
+        by_id: product_id -> row, active only
+        by_sku / by_model: fold_key(value) -> row
+        by_norm_sku / by_norm_model: normalize_product_key(value) -> row
+        by_norm_key: normalize_product_key(sku or model) -> row
+        by_norm_name: normalize_name(name) -> row (names of 6+ chars)
+    """
+
+    def __init__(self, version: int, products: Dict[int, Dict[str, Any]]):
+        self.version = version
+        self.loaded_at = time.time()
+        self.products = products
+
+        self.by_id: Dict[int, Dict[str, Any]] = {}
+        self.by_sku: Dict[str, Dict[str, Any]] = {}
+        self.by_model: Dict[str, Dict[str, Any]] = {}
+        self.by_norm_sku: Dict[str, Dict[str, Any]] = {}
+        self.by_norm_model: Dict[str, Dict[str, Any]] = {}
+        self.by_norm_key: Dict[str, Dict[str, Any]] = {}
+        self.by_norm_name: Dict[str, Dict[str, Any]] = {}
+        self._groups: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+
+        for pid in sorted(products):
+            p = products[pid]
+            if p.get('status') != 1:
+                continue
+            self.by_id[pid] = p
+            if p.get('sku'):
+                norm = normalize_product_key(p['sku'])
+                self.by_sku[fold_key(p['sku'])] = p
+                self.by_norm_sku[norm] = p
+                self.by_norm_key[norm] = p
+            if p.get('model'):
+                norm = normalize_product_key(p['model'])
+                self.by_model[fold_key(p['model'])] = p
+                self.by_norm_model[norm] = p
+                self.by_norm_key[norm] = p
+            name_norm = normalize_name(p.get('name'))
+            if len(name_norm) >= 6:
+                self.by_norm_name[name_norm] = p
+        for index in (self.by_norm_sku, self.by_norm_model, self.by_norm_key):
+            index.pop('', None)
+
+    @property
+    def active_count(self) -> int:
+        return len(self.by_id)
+
+    def active_products(self) -> List[Dict[str, Any]]:
+        """Active products in product_id order."""
+        return list(self.by_id.values())
+
+    def all_products(self) -> List[Dict[str, Any]]:
+        """Every product (any status) in product_id order."""
+        return [self.products[pid] for pid in sorted(self.products)]
+
+    def group_by(self, field: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Products (any status) by folded non-empty ``field`` value, in product_id order.
+
+        Built on first use per field and cached; treat the result as read-only.
+        """
+        groups = self._groups.get(field)
+        if groups is None:
+            groups = {}
+            for pid in sorted(self.products):
+                p = self.products[pid]
+                key = fold_key(p.get(field))
+                if key:
+                    groups.setdefault(key, []).append(p)
+            self._groups[field] = groups
+        return groups
+
+    def duplicate_groups(self, field: str) -> Dict[str, List[Dict[str, Any]]]:
+        """Products (any status) sharing the same non-empty ``field`` value, folded like MySQL GROUP BY."""
+        return {key: rows for key, rows in self.group_by(field).items() if len(rows) > 1}
+
+    def find_by_sku(self, value: Optional[str]) -> Optional[Dict[str, Any]]:
+        return self.by_sku.get(fold_key(value)) if value else None
+
+    def find_by_model(self, value: Optional[str]) -> Optional[Dict[str, Any]]:
+        return self.by_model.get(fold_key(value)) if value else None
+
+    def find_by_norm_key(self, value: Optional[str]) -> Optional[Dict[str, Any]]:
+        key = normalize_product_key(value)
+        return self.by_norm_key.get(key) if key else None
+
+
+class CatalogService:
+    """Owns the current CatalogSnapshot and keeps it fresh.
+
+    Safe to use from the event loop (``await snapshot()``) and from worker
+    threads (``snapshot_sync()``); refreshes are serialized by a lock and
+    readers always get a complete, immutable snapshot.
+    """
+
+    def __init__(self, opencart: Optional[OpenCartConnector] = None):
+        self.oc = opencart or get_opencart_connector()
+        self.config = get_config()
+
+        self._lock = threading.Lock()
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._products: Dict[int, Dict[str, Any]] = {}
+        self._watermark: Optional[Any] = None
+        self._max_product_id = 0
+        self._version = 0
+        self._last_refresh = float('-inf')
+        self._last_full = float('-inf')
+
+    def invalidate(self, full: bool = False) -> None:
+        """Force the next read to refresh (``full`` also reloads, e.g. after deletes)."""
+        self._last_refresh = float('-inf')
+        if full:
+            self._last_full = float('-inf')
+
+    def snapshot_sync(self, max_age: Optional[float] = None) -> CatalogSnapshot:
+        """Current snapshot, refreshed first if older than ``max_age`` seconds."""
+        if max_age is None:
+            max_age = self.config.catalog_snapshot_max_age_seconds
+        now = time.monotonic()
+        if self._snapshot is not None and now - self._last_refresh < max_age \
+                and now - self._last_full < self.config.catalog_snapshot_full_reload_seconds:
+            return self._snapshot
+
+        with self._lock:
+            now = time.monotonic()
+            full = self._snapshot is None or now - self._last_full >= self.config.catalog_snapshot_full_reload_seconds
+            if not full and now - self._last_refresh < max_age:
+                return self._snapshot  # refreshed by another thread while we waited
+            self._refresh(full)
+            return self._snapshot
+
+    async def snapshot(self, max_age: Optional[float] = None) -> CatalogSnapshot:
+        """Async variant of snapshot_sync (the refresh runs on the DB executor)."""
+        current = self._snapshot
+        if current is not None and max_age is None:
+            now = time.monotonic()
+            if now - self._last_refresh < self.config.catalog_snapshot_max_age_seconds \
+                    and now - self._last_full < self.config.catalog_snapshot_full_reload_seconds:
+                return current
+        return await run_blocking(self.snapshot_sync, max_age)
+
+    def _refresh(self, full: bool) -> None:
+        started = time.monotonic()
+        if full:
+            batches = self.oc.iter_catalog_rows()
+            products: Dict[int, Dict[str, Any]] = {}
+            watermark, max_id = None, 0
+        else:
+            batches = self.oc.iter_catalog_rows(self._watermark, self._max_product_id)
+            products = self._products
+            watermark, max_id = self._watermark, self._max_product_id
+
+        # Rows are consumed batch by batch from a server-side cursor, so a
+        # full load never holds a second, buffered copy of the catalog.
+        changed = rows = 0
+        for batch in batches:
+            rows += len(batch)
+            for row in batch:
+                pid = row['product_id']
+                max_id = max(max_id, pid)
+                modified = row.get('date_modified')
+                if modified is not None and (watermark is None or modified > watermark):
+                    watermark = modified
+                if full or products.get(pid) != row:
+                    changed += 1
+                    if not full and changed == 1:
+                        products = dict(products)  # copy-on-write: old snapshots stay intact
+                    products[pid] = row
+
+        if full or changed:
+            self._version += 1
+            self._products = products
+            self._snapshot = CatalogSnapshot(self._version, products)
+        self._watermark, self._max_product_id = watermark, max_id
+
+        self._last_refresh = time.monotonic()
+        if full:
+            self._last_full = self._last_refresh
+        if full or changed:
+            logger.info("catalog_snapshot_refreshed", full=full, rows=rows, changed=changed,
+                        products=len(products), active=self._snapshot.active_count,
+                        version=self._version, ms=int((self._last_refresh - started) * 1000))
+
+
+# Global instance
+_catalog_service: Optional[CatalogService] = None
+
+
+def get_catalog_service() -> CatalogService:
+    """Get or create the process-wide catalog service."""
+    global _catalog_service
+    if _catalog_service is None:
+        _catalog_service = CatalogService()
+    return _catalog_service
+
+
+async def get_catalog_snapshot(max_age: Optional[float] = None) -> CatalogSnapshot:
+    """Shortcut for ``await get_catalog_service().snapshot(max_age)``."""
+    return await get_catalog_service().snapshot(max_age)
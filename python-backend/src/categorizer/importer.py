@@ -34,8 +34,7 @@ class CategoryImporter:
         Returns:
             List of category dicts with category_id, name, parent_id, sort_order
         """
-        conn = self.oc._get_connection()
-        try:
+        with self.oc.connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute("""
                     SELECT 
@@ -57,8 +56,6 @@ class CategoryImporter:
                 logger.info("fetched_categories", count=len(categories))
                 return categories
                 
-        finally:
-            conn.close()
     
     async def find_category_by_name(
         self, 
@@ -75,8 +72,7 @@ class CategoryImporter:
         Returns:
             Category dict or None if not found
         """
-        conn = self.oc._get_connection()
-        try:
+        with self.oc.connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute("""
                     SELECT 
@@ -94,8 +90,6 @@ class CategoryImporter:
                 
                 return cursor.fetchone()
                 
-        finally:
-            conn.close()
     
     async def create_category(
         self,
@@ -120,66 +114,63 @@ class CategoryImporter:
         Returns:
             New category ID
         """
-        conn = self.oc._get_connection()
         try:
-            with conn.cursor() as cursor:
-                # Insert into oc_category
-                cursor.execute("""
-                    INSERT INTO oc_category (
-                        parent_id, top, `column`, sort_order, status,
-                        date_added, date_modified
-                    ) VALUES (
-                        %s, %s, %s, %s, %s,
-                        NOW(), NOW()
-                    )
-                """, (parent_id, 1 if parent_id == 0 else 0, 1, sort_order, status))
+            with self.oc.connection() as conn:
+                with conn.cursor() as cursor:
+                    # Insert into oc_category
+                    cursor.execute("""
+                        INSERT INTO oc_category (
+                            parent_id, top, `column`, sort_order, status,
+                            date_added, date_modified
+                        ) VALUES (
+                            %s, %s, %s, %s, %s,
+                            NOW(), NOW()
+                        )
+                    """, (parent_id, 1 if parent_id == 0 else 0, 1, sort_order, status))
                 
-                category_id = cursor.lastrowid
+                    category_id = cursor.lastrowid
                 
-                # Insert description for default language (1 = English)
-                cursor.execute("""
-                    INSERT INTO oc_category_description (
-                        category_id, language_id, name, description, meta_title,
-                        meta_description, meta_keyword
-                    ) VALUES (
-                        %s, 1, %s, %s, %s, %s, %s
-                    )
-                """, (category_id, name, description, name, description[:160] if description else "", slug))
+                    # Insert description for default language (1 = English)
+                    cursor.execute("""
+                        INSERT INTO oc_category_description (
+                            category_id, language_id, name, description, meta_title,
+                            meta_description, meta_keyword
+                        ) VALUES (
+                            %s, 1, %s, %s, %s, %s, %s
+                        )
+                    """, (category_id, name, description, name, description[:160] if description else "", slug))
                 
-                # Insert into store mapping (store_id 0 is default)
-                cursor.execute("""
-                    INSERT INTO oc_category_to_store (category_id, store_id)
-                    VALUES (%s, 0)
-                """, (category_id,))
+                    # Insert into store mapping (store_id 0 is default)
+                    cursor.execute("""
+                        INSERT INTO oc_category_to_store (category_id, store_id)
+                        VALUES (%s, 0)
+                    """, (category_id,))
                 
-                # Build category path
-                await self._rebuild_category_path(cursor, category_id, parent_id)
+                    # Build category path
+                    await self._rebuild_category_path(cursor, category_id, parent_id)
                 
-                # Add SEO URL if slug provided
-                if slug:
-                    cursor.execute("""
-                        INSERT INTO oc_seo_url (store_id, language_id, query, keyword)
-                        VALUES (0, 1, %s, %s)
-                        ON DUPLICATE KEY UPDATE keyword = VALUES(keyword)
-                    """, (f"category_id={category_id}", slug))
+                    # Add SEO URL if slug provided
+                    if slug:
+                        cursor.execute("""
+                            INSERT INTO oc_seo_url (store_id, language_id, query, keyword)
+                            VALUES (0, 1, %s, %s)
+                            ON DUPLICATE KEY UPDATE keyword = VALUES(keyword)
+                        """, (f"category_id={category_id}", slug))
                 
-                conn.commit()
+                    conn.commit()
                 
-                logger.info(
-                    "category_created",
-                    category_id=category_id,
-                    name=name,
-                    parent_id=parent_id
-                )
+                    logger.info(
+                        "category_created",
+                        category_id=category_id,
+                        name=name,
+                        parent_id=parent_id
+                    )
                 
-                return category_id
+                    return category_id
                 
         except Exception as e:
-            conn.rollback()
             logger.error("category_creation_failed", name=name, error=str(e))
             raise
-        finally:
-            conn.close()
     
     async def _rebuild_category_path(
         self, 
@@ -344,8 +335,7 @@ class CategoryImporter:
         Returns:
             Dict mapping category_id to product count
         """
-        conn = self.oc._get_connection()
-        try:
+        with self.oc.connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute("""
                     SELECT category_id, COUNT(*) as product_count
@@ -360,5 +350,3 @@ class CategoryImporter:
                 else:
                     return {r[0]: r[1] for r in results}
                     
-        finally:
-            conn.close()
@@ -46,8 +46,7 @@ class CategoryUpdater:
         Returns:
             List of category IDs
         """
-        conn = self.oc._get_connection()
-        try:
+        with self.oc.connection() as conn:
             with conn.cursor() as cursor:
                 cursor.execute("""
                     SELECT category_id FROM oc_product_to_category
@@ -61,8 +60,6 @@ class CategoryUpdater:
                 else:
                     return [r[0] for r in results]
                     
-        finally:
-            conn.close()
     
     async def update_product_categories(
         self,
@@ -90,60 +87,57 @@ class CategoryUpdater:
         # Get current categories for audit
         old_categories = await self.get_product_categories(product_id)
         
-        conn = self.oc._get_connection()
         try:
-            with conn.cursor() as cursor:
-                if replace:
-                    # Remove existing category assignments
+            with self.oc.connection() as conn:
+                with conn.cursor() as cursor:
+                    if replace:
+                        # Remove existing category assignments
+                        cursor.execute("""
+                            DELETE FROM oc_product_to_category 
+                            WHERE product_id = %s
+                        """, (product_id,))
+                
+                    # Insert new assignments
+                    for cat_id in category_ids:
+                        cursor.execute("""
+                            INSERT INTO oc_product_to_category (product_id, category_id) 
+                            VALUES (%s, %s)
+                            ON DUPLICATE KEY UPDATE category_id = category_id
+                        """, (product_id, cat_id))
+                
+                    # Update product modified date
                     cursor.execute("""
-                        DELETE FROM oc_product_to_category 
+                        UPDATE oc_product SET date_modified = NOW()
                         WHERE product_id = %s
                     """, (product_id,))
                 
-                # Insert new assignments
-                for cat_id in category_ids:
-                    cursor.execute("""
-                        INSERT INTO oc_product_to_category (product_id, category_id) 
-                        VALUES (%s, %s)
-                        ON DUPLICATE KEY UPDATE category_id = category_id
-                    """, (product_id, cat_id))
-                
-                # Update product modified date
-                cursor.execute("""
-                    UPDATE oc_product SET date_modified = NOW()
-                    WHERE product_id = %s
-                """, (product_id,))
+                    conn.commit()
                 
-                conn.commit()
-                
-                logger.info(
-                    "product_categories_updated",
-                    product_id=product_id,
-                    old_categories=old_categories,
-                    new_categories=category_ids
-                )
-                
-                # Log to Supabase if available
-                if self.supabase:
-                    await self._log_assignment(
+                    logger.info(
+                        "product_categories_updated",
                         product_id=product_id,
-                        old_category_ids=old_categories,
-                        new_category_ids=category_ids,
-                        assigned_by=assigned_by
+                        old_categories=old_categories,
+                        new_categories=category_ids
                     )
                 
-                return True
+                    # Log to Supabase if available
+                    if self.supabase:
+                        await self._log_assignment(
+                            product_id=product_id,
+                            old_category_ids=old_categories,
+                            new_category_ids=category_ids,
+                            assigned_by=assigned_by
+                        )
+                
+                    return True
                 
         except Exception as e:
-            conn.rollback()
             logger.error(
                 "category_update_failed",
                 product_id=product_id,
                 error=str(e)
             )
             raise
-        finally:
-            conn.close()
     
     async def _log_assignment(
         self,
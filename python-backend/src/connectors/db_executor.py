@@ -0,0 +1,92 @@
+"""Bounded thread executor that keeps blocking database calls off the event loop."""
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+from src.utils.config import get_config
+from src.utils.logging import AgentLogger
+
+logger = AgentLogger("DBExecutor")
+
+T = TypeVar("T")
+
+_RAISE = object()
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+class QueryTimeoutError(TimeoutError):
+    """Raised when an offloaded database call exceeds its deadline."""
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """Get or create the process-wide database executor.
+
+    Sized to the OpenCart pool so a worker never waits on a pool slot
+    another worker is holding.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = max(1, get_config().opencart_db_pool_max_size)
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="opencart-db")
+                logger.info("db_executor_started", workers=workers)
+    return _executor
+
+
+def shutdown_db_executor() -> None:
+    """Stop the executor (application shutdown). Queued calls are cancelled."""
+    global _executor
+    with _executor_lock:
+        executor, _executor = _executor, None
+    if executor is not None:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+async def run_blocking(func: Callable[..., T], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> T:
+    """Run a blocking callable on the database executor and await its result.
+
+    The caller's context (trace ID) is carried into the worker thread.
+    Cancelling the awaiting task drops the call if it has not started yet;
+    a call that is already running is bounded by the driver's socket
+    timeouts. Raises QueryTimeoutError once ``timeout`` seconds
+    (default: ``opencart_db_call_timeout``) have elapsed.
+    """
+    if timeout is None:
+        timeout = get_config().opencart_db_call_timeout
+    loop = asyncio.get_running_loop()
+    ctx = contextvars.copy_context()
+    call = functools.partial(ctx.run, func, *args, **kwargs)
+    future = loop.run_in_executor(get_db_executor(), call)
+    try:
+        return await asyncio.wait_for(future, timeout=timeout)
+    except asyncio.TimeoutError:
+        name = getattr(func, "__qualname__", repr(func))
+        logger.error("db_call_timeout", call=name, timeout=timeout)
+        raise QueryTimeoutError(f"{name} did not complete within {timeout}s") from None
+
+
+def offload(default: Any = _RAISE, timeout: Optional[float] = None):
+    """Turn a blocking method into an ``async`` one that runs on the database executor.
+
+    Lets connectors keep their ``async def`` signatures while the pymysql
+    work happens off the event loop. If ``default`` is given it is returned
+    when the call times out (matching methods that already return
+    None / [] / False on failure); otherwise QueryTimeoutError propagates.
+    """
+    def decorator(func: Callable[..., T]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        async def wrapper(*args: Any, **kwargs: Any) -> T:
+            try:
+                return await run_blocking(func, *args, timeout=timeout, **kwargs)
+            except QueryTimeoutError:
+                if default is _RAISE:
+                    raise
+                return default() if callable(default) else default
+        return wrapper
+    return decorator
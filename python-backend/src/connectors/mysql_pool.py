@@ -0,0 +1,279 @@
+"""Bounded, health-checked connection pool for the OpenCart MySQL database."""
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+import pymysql
+
+from src.utils.logging import AgentLogger
+
+logger = AgentLogger("MySQLPool")
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection could be borrowed within the acquire timeout."""
+
+
+class PooledConnection:
+    """Proxy around a pymysql connection borrowed from a pool.
+
+    Behaves like the raw connection (``cursor()``, ``commit()``, ``rollback()``...),
+    but ``close()`` hands the connection back to the pool instead of closing the
+    socket, so existing ``try/finally: conn.close()`` code keeps working unchanged.
+    """
+
+    def __init__(self, pool: "MySQLConnectionPool", raw: pymysql.connections.Connection, created_at: float):
+        self._pool = pool
+        self._raw = raw
+        self._created_at = created_at
+        self._released = False
+
+    def __getattr__(self, name: str) -> Any:
+        if self._raw is None:
+            raise pymysql.err.InterfaceError("Connection already returned to pool")
+        return getattr(self._raw, name)
+
+    def close(self) -> None:
+        """Return the connection to the pool (idempotent)."""
+        if self._released:
+            return
+        self._released = True
+        raw, self._raw = self._raw, None
+        self._pool._release(raw, self._created_at)
+
+    def discard(self) -> None:
+        """Drop the underlying connection instead of returning it (e.g. after a protocol error)."""
+        if self._released:
+            return
+        self._released = True
+        raw, self._raw = self._raw, None
+        self._pool._discard(raw)
+
+    def __enter__(self) -> "PooledConnection":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+class MySQLConnectionPool:
+    """Thread-safe pool of pymysql connections.
+
+    - Never holds more than ``max_size`` connections (idle + borrowed).
+    - Keeps up to ``min_size`` connections warm once the pool has been used.
+    - Recycles connections that sat idle for longer than ``recycle_seconds``.
+    - Pings every connection on borrow and transparently replaces dead ones.
+    - Blocks up to ``acquire_timeout`` seconds when exhausted, then raises PoolTimeoutError.
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], pymysql.connections.Connection],
+        min_size: int = 1,
+        max_size: int = 10,
+        recycle_seconds: int = 300,
+        acquire_timeout: float = 10.0,
+        name: str = "opencart",
+    ):
+        self._connect = connect
+        self.min_size = max(0, min_size)
+        self.max_size = max(1, max_size, self.min_size)
+        self.recycle_seconds = recycle_seconds
+        self.acquire_timeout = acquire_timeout
+        self.name = name
+
+        self._lock = threading.Condition()
+        # (raw connection, created_at, last_returned_at)
+        self._idle: Deque[Tuple[pymysql.connections.Connection, float, float]] = deque()
+        self._size = 0  # idle + in use
+        self._in_use = 0
+        self._closed = False
+
+        self._stats = {
+            "created": 0,
+            "closed": 0,
+            "borrowed": 0,
+            "returned": 0,
+            "waits": 0,
+            "timeouts": 0,
+            "ping_failures": 0,
+            "recycled": 0,
+            "max_in_use": 0,
+        }
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def acquire(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Borrow a healthy connection from the pool."""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            raw, created_at, last_used = self._checkout(deadline)
+            if raw is None:
+                # Reserved a slot - open a new physical connection outside the lock
+                try:
+                    raw = self._open()
+                except Exception:
+                    with self._lock:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._lock.notify()
+                    raise
+                return self._wrap(raw, time.monotonic())
+
+            if self._healthy(raw, last_used):
+                return self._wrap(raw, created_at)
+
+            # Dead or stale connection - drop it and try again
+            self._discard(raw)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of pool counters for monitoring."""
+        with self._lock:
+            return {
+                "name": self.name,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                **self._stats,
+            }
+
+    def close_all(self) -> None:
+        """Close idle connections and stop handing out new ones."""
+        with self._lock:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+            self._size -= len(idle)
+            self._lock.notify_all()
+        for raw, _, _ in idle:
+            self._close_raw(raw)
+
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+
+    def _checkout(self, deadline: float) -> Tuple[Optional[pymysql.connections.Connection], float, float]:
+        """Take an idle connection, or reserve a slot for a new one (returns None)."""
+        with self._lock:
+            waited = False
+            while True:
+                if self._closed:
+                    raise pymysql.err.InterfaceError(f"Pool '{self.name}' is closed")
+
+                if self._idle:
+                    raw, created_at, last_used = self._idle.pop()  # LIFO keeps hot connections hot
+                    self._mark_borrowed()
+                    return raw, created_at, last_used
+
+                if self._size < self.max_size:
+                    self._size += 1
+                    self._mark_borrowed()
+                    return None, 0.0, 0.0
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._stats["timeouts"] += 1
+                    logger.error("mysql_pool_acquire_timeout", pool=self.name,
+                                 size=self._size, in_use=self._in_use)
+                    raise PoolTimeoutError(
+                        f"Timed out waiting for a connection from pool '{self.name}' "
+                        f"({self._in_use}/{self.max_size} in use)"
+                    )
+                if not waited:
+                    self._stats["waits"] += 1
+                    waited = True
+                self._lock.wait(remaining)
+
+    def _mark_borrowed(self) -> None:
+        self._in_use += 1
+        self._stats["borrowed"] += 1
+        if self._in_use > self._stats["max_in_use"]:
+            self._stats["max_in_use"] = self._in_use
+
+    def _healthy(self, raw: pymysql.connections.Connection, last_used: float) -> bool:
+        # Idle past the recycle window: the server may already have dropped it (wait_timeout)
+        if self.recycle_seconds and time.monotonic() - last_used > self.recycle_seconds:
+            with self._lock:
+                self._stats["recycled"] += 1
+            return False
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception as e:
+            with self._lock:
+                self._stats["ping_failures"] += 1
+            logger.warning("mysql_pool_ping_failed", pool=self.name, error=str(e))
+            return False
+
+    def _wrap(self, raw: pymysql.connections.Connection, created_at: float) -> PooledConnection:
+        self._ensure_min_idle()
+        return PooledConnection(self, raw, created_at)
+
+    def _ensure_min_idle(self) -> None:
+        """Top the pool up to min_size so bursts don't pay the handshake."""
+        while True:
+            with self._lock:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                raw = self._open()
+            except Exception as e:
+                with self._lock:
+                    self._size -= 1
+                logger.warning("mysql_pool_prefill_failed", pool=self.name, error=str(e))
+                return
+            now = time.monotonic()
+            with self._lock:
+                self._idle.appendleft((raw, now, now))
+                self._lock.notify()
+
+    def _open(self) -> pymysql.connections.Connection:
+        raw = self._connect()
+        with self._lock:
+            self._stats["created"] += 1
+        return raw
+
+    def _release(self, raw: pymysql.connections.Connection, created_at: float) -> None:
+        # End any transaction the borrower left open so the next borrower
+        # doesn't inherit locks or a stale REPEATABLE READ snapshot.
+        try:
+            raw.rollback()
+        except Exception:
+            self._discard(raw)
+            return
+
+        with self._lock:
+            self._in_use -= 1
+            self._stats["returned"] += 1
+            if self._closed:
+                self._size -= 1
+                close_it = True
+            else:
+                self._idle.append((raw, created_at, time.monotonic()))
+                close_it = False
+            self._lock.notify()
+        if close_it:
+            self._close_raw(raw)
+
+    def _discard(self, raw: pymysql.connections.Connection) -> None:
+        with self._lock:
+            self._size -= 1
+            self._in_use -= 1
+            self._lock.notify()
+        self._close_raw(raw)
+
+    def _close_raw(self, raw: pymysql.connections.Connection) -> None:
+        try:
+            raw.close()
+        except Exception:
+            pass
+        with self._lock:
+            self._stats["closed"] += 1
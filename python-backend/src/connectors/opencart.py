@@ -1,12 +1,47 @@
 """OpenCart Database connector using direct MySQL connection."""
-from typing import Any, Dict, Optional, List
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, List
 import pymysql
 import pymysql.cursors
+from src.connectors.db_executor import offload
+from src.connectors.mysql_pool import MySQLConnectionPool, PooledConnection
+from src.search.text import cascade_name_search, content_words
 from src.utils.config import get_config
 from src.utils.logging import AgentLogger
 
 logger = AgentLogger("OpenCartConnector")
 
+# Process-wide pools keyed by DSN, shared by every OpenCartConnector instance
+# (agents and scheduler jobs construct their own connectors).
+_pools: Dict[tuple, MySQLConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+# Column order of iter_catalog_rows' SELECT
+CATALOG_COLUMNS = ("product_id", "model", "sku", "quantity", "price", "status", "date_modified", "name", "manufacturer")
+
+# Column order of iter_order_rows' tuples
+ORDER_COLUMNS = (
+    "order_id", "order_status_id", "status_name", "firstname", "lastname",
+    "email", "telephone", "total", "date_added", "date_modified",
+)
+
+# Columns bulk_update_products knows how to write
+BULK_UPDATE_FIELDS = ("price", "quantity")
+
+# Last refresh (monotonic time) of the normalized key index, per database
+_key_index_refreshed: Dict[tuple, float] = {}
+_key_index_ok: Dict[tuple, bool] = {}
+_key_index_lock = threading.Lock()
+
+
+def normalize_product_key(value: Optional[str]) -> str:
+    """Normalize a SKU/model for matching: lowercase alphanumerics only ('RP-1400 SW' -> 'rp1400sw')."""
+    return re.sub(r'[^a-z0-9]', '', (value or '').lower())
+
+
 class OpenCartConnector:
     """Connector for OpenCart Database (Direct MySQL)."""
 
@@ -24,8 +59,8 @@ class OpenCartConnector:
         
         logger.info("opencart_db_connector_initialized", host=self.host, db=self.db_name)
 
-    def _get_connection(self):
-        """Create and return a new database connection."""
+    def _connect(self) -> pymysql.connections.Connection:
+        """Open a new physical database connection (used by the pool)."""
         try:
             connection = pymysql.connect(
                 host=self.host,
@@ -34,14 +69,73 @@ class OpenCartConnector:
                 password=self.password,
                 database=self.db_name,
                 cursorclass=pymysql.cursors.DictCursor,
-                connect_timeout=10
+                connect_timeout=10,
+                read_timeout=self.config.opencart_db_query_timeout,
+                write_timeout=self.config.opencart_db_query_timeout,
             )
             return connection
         except Exception as e:
             logger.error("db_connection_failed", error=str(e))
             raise
 
-    async def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
+    @property
+    def _db_key(self) -> tuple:
+        return (self.host, self.port, self.user, self.db_name)
+
+    @property
+    def pool(self) -> MySQLConnectionPool:
+        """Shared connection pool for this connector's database."""
+        key = self._db_key
+        pool = _pools.get(key)
+        if pool is None:
+            with _pools_lock:
+                pool = _pools.get(key)
+                if pool is None:
+                    pool = MySQLConnectionPool(
+                        connect=self._connect,
+                        min_size=self.config.opencart_db_pool_min_size,
+                        max_size=self.config.opencart_db_pool_max_size,
+                        recycle_seconds=self.config.opencart_db_pool_recycle_seconds,
+                        acquire_timeout=self.config.opencart_db_pool_acquire_timeout,
+                        name=f"opencart:{self.db_name}",
+                    )
+                    _pools[key] = pool
+                    logger.info("opencart_db_pool_created", host=self.host, db=self.db_name,
+                                min_size=pool.min_size, max_size=pool.max_size)
+        return pool
+
+    def _get_connection(self) -> PooledConnection:
+        """Borrow a connection from the pool.
+
+        Calling ``close()`` on the returned connection hands it back to the pool.
+        """
+        return self.pool.acquire()
+
+    @contextmanager
+    def connection(self) -> Iterator[PooledConnection]:
+        """Borrow a pooled connection for the duration of a ``with`` block.
+
+        Rolls back on error and always returns the connection to the pool.
+        Callers are still responsible for ``commit()`` on writes.
+        """
+        conn = self._get_connection()
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                conn.discard()
+            raise
+        finally:
+            conn.close()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """Connection pool statistics for monitoring."""
+        return self.pool.stats()
+
+    @offload(default=None)
+    def get_order(self, order_id: str) -> Optional[Dict[str, Any]]:
         """Fetch order details by order ID directly from DB.
 
         Args:
@@ -112,7 +206,8 @@ class OpenCartConnector:
             if connection:
                 connection.close()
 
-    async def get_recent_orders(self, days_back: int = 30, limit: int = 100) -> list[Dict[str, Any]]:
+    @offload(default=list)
+    def get_recent_orders(self, days_back: int = 30, limit: int = 100) -> list[Dict[str, Any]]:
         """Fetch recent orders from OpenCart DB.
 
         Args:
@@ -157,7 +252,69 @@ class OpenCartConnector:
             if connection:
                 connection.close()
 
-    async def update_order_status(
+    @offload()
+    def get_orders_changed_since(
+        self,
+        modified_since: Any,
+        after_order_id: int = 0,
+        limit: int = 200,
+    ) -> List[Dict[str, Any]]:
+        """One keyset page of orders changed after a (date_modified, order_id) cursor.
+
+        Returns the same fields as get_recent_orders plus ``date_modified``,
+        ordered by (date_modified, order_id); pass the last row's pair back
+        in to fetch the next page. Errors propagate so a failed page never
+        advances the caller's cursor.
+        """
+        with self.connection() as connection:
+            with connection.cursor() as cursor:
+                sql = f"""
+                    SELECT
+                        o.order_id, o.firstname, o.lastname, o.email, o.telephone,
+                        o.order_status_id, os.name as status_name, o.total, o.date_added, o.date_modified,
+                        o.shipping_address_1, o.shipping_address_2, o.shipping_city,
+                        o.shipping_postcode, o.shipping_zone, o.shipping_country,
+                        (
+                            SELECT GROUP_CONCAT(CONCAT(op.quantity, 'x ', op.name) SEPARATOR ', ')
+                            FROM {self.prefix}order_product op
+                            WHERE op.order_id = o.order_id
+                        ) as products_summary
+                    FROM {self.prefix}order o
+                    LEFT JOIN {self.prefix}order_status os ON (o.order_status_id = os.order_status_id AND os.language_id = 1)
+                    WHERE o.order_status_id > 0
+                      AND (o.date_modified > %s OR (o.date_modified = %s AND o.order_id > %s))
+                    ORDER BY o.date_modified, o.order_id
+                    LIMIT %s
+                """
+                cursor.execute(sql, (modified_since, modified_since, after_order_id, limit))
+                orders = cursor.fetchall()
+
+        logger.info("changed_orders_fetched_from_db", count=len(orders), since=str(modified_since),
+                    after_order_id=after_order_id)
+        return orders
+
+    @offload()
+    def get_orders_sync_position(self) -> Optional[Dict[str, Any]]:
+        """(date_modified, order_id) of the most recently modified order, or None.
+
+        Seeds the order sync cursor on its first run. Errors propagate.
+        """
+        with self.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT date_modified, order_id
+                    FROM {self.prefix}order
+                    WHERE order_status_id > 0
+                    ORDER BY date_modified DESC, order_id DESC
+                    LIMIT 1
+                """)
+                row = cursor.fetchone()
+        if not row:
+            return None
+        return {"date_modified": row["date_modified"], "order_id": int(row["order_id"])}
+
+    @offload()
+    def update_order_status(
         self, order_id: str, status_id: int, comment: Optional[str] = None
     ) -> None:
         """Update order status in DB.
@@ -194,7 +351,8 @@ class OpenCartConnector:
             if connection:
                 connection.close()
 
-    async def get_product_by_sku(self, sku: str) -> Optional[Dict[str, Any]]:
+    @offload(default=None)
+    def get_product_by_sku(self, sku: str) -> Optional[Dict[str, Any]]:
         """Get product details by SKU from OpenCart database.
         
         Args:
@@ -231,7 +389,8 @@ class OpenCartConnector:
             if connection:
                 connection.close()
 
-    async def get_product_by_id(self, product_id: int) -> Optional[Dict[str, Any]]:
+    @offload(default=None)
+    def get_product_by_id(self, product_id: int) -> Optional[Dict[str, Any]]:
         """Get product details by ID from OpenCart database."""
         connection = None
         try:
@@ -254,7 +413,8 @@ class OpenCartConnector:
             if connection:
                 connection.close()
 
-    async def update_product_price(self, product_id: int, price: float) -> bool:
+    @offload()
+    def update_product_price(self, product_id: int, price: float) -> bool:
         """Update product price directly in OpenCart database.
         
         Args:
@@ -263,12 +423,15 @@ class OpenCartConnector:
             
         Returns:
             True if successful, False otherwise
+
+        Raises:
+            QueryTimeoutError: the write may still commit, outcome unknown
         """
         connection = None
         try:
             connection = self._get_connection()
             with connection.cursor() as cursor:
-                sql = f"UPDATE {self.prefix}product SET price = %s WHERE product_id = %s"
+                sql = f"UPDATE {self.prefix}product SET price = %s, date_modified = NOW() WHERE product_id = %s"
                 cursor.execute(sql, (price, product_id))
             connection.commit()
             
@@ -284,7 +447,8 @@ class OpenCartConnector:
             if connection:
                 connection.close()
 
-    async def update_product_stock(self, product_id: int, quantity: int) -> bool:
+    @offload()
+    def update_product_stock(self, product_id: int, quantity: int) -> bool:
         """Update product stock quantity directly in OpenCart database.
         
         Args:
@@ -293,12 +457,15 @@ class OpenCartConnector:
             
         Returns:
             True if successful, False otherwise
+
+        Raises:
+            QueryTimeoutError: the write may still commit, outcome unknown
         """
         connection = None
         try:
             connection = self._get_connection()
             with connection.cursor() as cursor:
-                sql = f"UPDATE {self.prefix}product SET quantity = %s WHERE product_id = %s"
+                sql = f"UPDATE {self.prefix}product SET quantity = %s, date_modified = NOW() WHERE product_id = %s"
                 cursor.execute(sql, (quantity, product_id))
             connection.commit()
             
@@ -314,81 +481,105 @@ class OpenCartConnector:
             if connection:
                 connection.close()
 
-    async def bulk_update_products(self, updates: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Bulk update multiple products in a single transaction.
-        
+    @offload()
+    def bulk_update_products(self, updates: List[Dict[str, Any]], chunk_size: int = 500) -> Dict[str, Any]:
+        """Bulk update product price/quantity with set-based, chunked statements.
+
+        Several updates for the same product_id are merged (later values win)
+        into one row change. Each chunk is a single ``UPDATE ... CASE`` in its
+        own transaction, so a failing chunk only fails its own rows.
+
         Args:
             updates: List of dicts with keys: product_id, price (optional), quantity (optional)
-            
+            chunk_size: Products per UPDATE statement
+
         Returns:
-            Dict with success count, failed count, and errors
+            Dict with success flag, updated/failed/skipped/not_found counts,
+            errors, and per-product ``results`` ({product_id, status, error?})
         """
-        connection = None
-        success_count = 0
-        failed_count = 0
+        # 1. Coalesce by product_id
+        pending: Dict[int, Dict[str, Any]] = {}
+        results: Dict[int, Dict[str, Any]] = {}
         errors = []
-        
-        try:
-            connection = self._get_connection()
-            
-            for update in updates:
-                try:
-                    product_id = update['product_id']
-                    
+        invalid = 0
+        for update in updates:
+            try:
+                product_id = int(update['product_id'])
+            except (KeyError, TypeError, ValueError) as e:
+                invalid += 1
+                errors.append({'product_id': update.get('product_id'), 'error': f"invalid product_id: {e}"})
+                continue
+            fields = pending.setdefault(product_id, {})
+            for field in BULK_UPDATE_FIELDS:
+                if field in update:
+                    fields[field] = update[field]
+
+        for product_id in [pid for pid, fields in pending.items() if not fields]:
+            del pending[product_id]
+            results[product_id] = {'product_id': product_id, 'status': 'skipped'}
+
+        # 2. Apply chunk by chunk
+        product_ids = list(pending)
+        for start in range(0, len(product_ids), chunk_size):
+            chunk = product_ids[start:start + chunk_size]
+            try:
+                with self.connection() as connection:
                     with connection.cursor() as cursor:
-                        # Build dynamic UPDATE query
-                        set_clauses = []
-                        params = []
-                        
-                        if 'price' in update:
-                            set_clauses.append("price = %s")
-                            params.append(update['price'])
-                        
-                        if 'quantity' in update:
-                            set_clauses.append("quantity = %s")
-                            params.append(update['quantity'])
-                        
-                        if not set_clauses:
-                            continue
-                        
-                        params.append(product_id)
-                        sql = f"UPDATE {self.prefix}product SET {', '.join(set_clauses)} WHERE product_id = %s"
-                        cursor.execute(sql, params)
-                    
-                    success_count += 1
-                    
-                except Exception as e:
-                    failed_count += 1
-                    errors.append({
-                        'product_id': update.get('product_id'),
-                        'error': str(e)
-                    })
-            
-            connection.commit()
-            logger.info("bulk_update_completed", success=success_count, failed=failed_count)
-            
-            return {
-                'success': True,
-                'updated': success_count,
-                'failed': failed_count,
-                'errors': errors
-            }
-            
-        except Exception as e:
-            if connection:
-                connection.rollback()
-            logger.error("bulk_update_failed", error=str(e))
-            return {
-                'success': False,
-                'updated': 0,
-                'failed': len(updates),
-                'errors': [{'error': str(e)}]
-            }
-        finally:
-            if connection:
-                connection.close()
+                        placeholders = ", ".join(["%s"] * len(chunk))
+                        cursor.execute(
+                            f"SELECT product_id FROM {self.prefix}product WHERE product_id IN ({placeholders})",
+                            chunk,
+                        )
+                        found = {row['product_id'] for row in cursor.fetchall()}
 
-    async def get_manufacturer_by_name(self, name: str) -> Optional[Dict]:
+                        set_clauses = []
+                        params: List[Any] = []
+                        for field in BULK_UPDATE_FIELDS:
+                            ids_with_field = [pid for pid in chunk if pid in found and field in pending[pid]]
+                            if not ids_with_field:
+                                continue
+                            whens = []
+                            for pid in ids_with_field:
+                                whens.append("WHEN %s THEN %s")
+                                params.extend([pid, pending[pid][field]])
+                            set_clauses.append(f"{field} = CASE product_id {' '.join(whens)} ELSE {field} END")
+
+                        target_ids = [pid for pid in chunk if pid in found]
+                        if set_clauses:
+                            # Bump date_modified so catalog caches pick the change up
+                            set_clauses.append("date_modified = NOW()")
+                            sql = (
+                                f"UPDATE {self.prefix}product SET {', '.join(set_clauses)} "
+                                f"WHERE product_id IN ({', '.join(['%s'] * len(target_ids))})"
+                            )
+                            cursor.execute(sql, params + target_ids)
+                    connection.commit()
+
+                for pid in chunk:
+                    status = 'updated' if pid in found else 'not_found'
+                    results[pid] = {'product_id': pid, 'status': status, **pending[pid]}
+            except Exception as e:
+                logger.error("bulk_update_chunk_failed", chunk_start=start, size=len(chunk), error=str(e))
+                for pid in chunk:
+                    results[pid] = {'product_id': pid, 'status': 'failed', 'error': str(e)}
+                    errors.append({'product_id': pid, 'error': str(e)})
+
+        counts = {'updated': 0, 'failed': 0, 'skipped': 0, 'not_found': 0}
+        for result in results.values():
+            counts[result['status']] += 1
+        counts['failed'] += invalid
+
+        logger.info("bulk_update_completed", requested=len(updates), coalesced=len(pending), **counts)
+
+        return {
+            'success': counts['failed'] == 0,
+            **counts,
+            'errors': errors,
+            'results': list(results.values()),
+        }
+
+    @offload(default=None)
+    def get_manufacturer_by_name(self, name: str) -> Optional[Dict]:
         """Get manufacturer by name."""
         connection = None
         try:
@@ -404,7 +595,8 @@ class OpenCartConnector:
             if connection:
                 connection.close()
 
-    async def get_products_by_manufacturer(self, manufacturer_id: int) -> List[Dict]:
+    @offload(default=list)
+    def get_products_by_manufacturer(self, manufacturer_id: int) -> List[Dict]:
         """Get all products for a manufacturer."""
         connection = None
         try:
@@ -425,7 +617,8 @@ class OpenCartConnector:
             if connection:
                 connection.close()
 
-    async def get_product_by_model(self, model: str) -> Optional[Dict]:
+    @offload(default=None)
+    def get_product_by_model(self, model: str) -> Optional[Dict]:
         """Get product by exact model match."""
         connection = None
         try:
@@ -448,51 +641,265 @@ class OpenCartConnector:
             if connection:
                 connection.close()
 
-    async def search_products_by_name(self, query: str) -> List[Dict]:
-        """Search products by name - flexible multi-token matching with progressive relaxation
-        and model number normalization (handles RP1400SW vs RP-1400SW)."""
-        connection = None
+    def _get_products_keyed(
+        self,
+        column: str,
+        values: List[Any],
+        select_sql: str,
+        chunk_size: int,
+        order_by: str = "p.product_id",
+    ) -> Dict[Any, Dict]:
+        """Resolve ``values`` against ``column`` in chunked ``IN (...)`` queries.
+
+        MySQL compares strings case-insensitively and ignores trailing spaces,
+        so rows are keyed back to the caller's original value with the same
+        folding. The first row by ``order_by`` (lowest product_id) wins when
+        several match, like the single-item lookups.
+        """
+        def fold(v):
+            return v.lower().rstrip() if isinstance(v, str) else v
+
+        wanted: Dict[Any, List[Any]] = {}
+        for value in values:
+            if value is None or value == "":
+                continue
+            wanted.setdefault(fold(value), []).append(value)
+        if not wanted:
+            return {}
+
+        result: Dict[Any, Dict] = {}
+        lookup_values = [vals[0] for vals in wanted.values()]
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                for start in range(0, len(lookup_values), chunk_size):
+                    chunk = lookup_values[start:start + chunk_size]
+                    placeholders = ", ".join(["%s"] * len(chunk))
+                    cursor.execute(
+                        select_sql.format(placeholders=placeholders) + f" ORDER BY {order_by}",
+                        chunk,
+                    )
+                    for row in cursor.fetchall():
+                        for original in wanted.get(fold(row[column]), []):
+                            result.setdefault(original, row)
+        return result
+
+    @offload(default=dict)
+    def get_manufacturers_by_names(self, names: List[str], chunk_size: int = 500) -> Dict[str, Dict]:
+        """Batch version of get_manufacturer_by_name.
+
+        Returns:
+            Dict of requested name -> manufacturer row (names not found are omitted)
+        """
         try:
-            connection = self._get_connection()
-            with connection.cursor() as cursor:
-                import re
-
-                # Common stop words that hurt matching
-                stop_words = {
-                    'the', 'and', 'with', 'for', 'from', 'free', 'new', 'pro',
-                    'series', 'edition', 'version', 'model', 'type', 'style',
-                    'pair', 'set', 'kit', 'pack', 'bundle', 'combo', 'single',
-                    'matte', 'gloss', 'active', 'passive', 'powered', 'wireless',
-                    'wired', 'portable', 'indoor', 'outdoor', 'heritage',
-                    'inspired', 'premium', 'standard', 'basic', 'advanced',
-                    'eua', 'usa', 'black', 'white', 'silver', 'walnut', 'oak',
-                    'ebony', 'cherry', 'each', 'per', 'channel', 'zone',
-                    'way', 'system', 'monitor', 'speaker', 'amplifier', 'receiver',
-                    'player', 'cable', 'adapter', 'mount', 'stand', 'bracket',
-                    'inch', 'mm', 'cm', 'watts', 'watt', 'ohm', 'ohms',
-                }
+            sql = f"SELECT * FROM {self.prefix}manufacturer m WHERE m.name IN ({{placeholders}})"
+            return self._get_products_keyed("name", list(names), sql, chunk_size, order_by="m.manufacturer_id")
+        except Exception as e:
+            logger.error("get_manufacturers_by_names_error", count=len(names), error=str(e))
+            return {}
 
-                # Extract all words
-                words = re.findall(r'\w+', query.lower())
-                all_sig_words = [w for w in words if len(w) > 2 or any(c.isdigit() for c in w)]
+    @offload(default=dict)
+    def get_products_by_ids(self, product_ids: List[int], chunk_size: int = 500) -> Dict[int, Dict[str, Any]]:
+        """Batch version of get_product_by_id.
 
-                if not all_sig_words:
-                    return []
+        Returns:
+            Dict of product_id -> product row (ids not found are omitted)
+        """
+        try:
+            ids = [int(pid) for pid in product_ids if pid is not None]
+            sql = f"""
+                SELECT p.product_id, p.model, p.sku, p.price, p.quantity, p.status
+                FROM {self.prefix}product p
+                WHERE p.product_id IN ({{placeholders}})
+            """
+            return self._get_products_keyed("product_id", ids, sql, chunk_size)
+        except Exception as e:
+            logger.error("get_products_by_ids_error", count=len(product_ids), error=str(e))
+            return {}
 
-                # Detect model numbers: words with both letters and digits (e.g. rp1400sw, ht50d)
-                def _is_model_number(w):
-                    return bool(re.search(r'[a-z]', w)) and bool(re.search(r'\d', w))
+    @offload(default=dict)
+    def get_products_by_skus(self, skus: List[str], chunk_size: int = 500) -> Dict[str, Dict[str, Any]]:
+        """Batch version of get_product_by_sku.
 
-                model_numbers = [w for w in all_sig_words if _is_model_number(w)]
+        Returns:
+            Dict of requested SKU -> product row (SKUs not found are omitted)
+        """
+        try:
+            sql = f"""
+                SELECT p.product_id, p.model, p.sku, p.price, p.quantity, p.status
+                FROM {self.prefix}product p
+                WHERE p.sku IN ({{placeholders}})
+            """
+            return self._get_products_keyed("sku", list(skus), sql, chunk_size)
+        except Exception as e:
+            logger.error("get_products_by_skus_error", count=len(skus), error=str(e))
+            return {}
 
-                # Split into core words (brand/model) and descriptor words
-                core_words = [w for w in all_sig_words if w not in stop_words]
-                if not core_words:
-                    core_words = all_sig_words[:3]
+    @offload(default=dict)
+    def get_products_by_models(self, models: List[str], chunk_size: int = 500) -> Dict[str, Dict]:
+        """Batch version of get_product_by_model.
 
-                results = []
-                seen_ids = set()
+        Returns:
+            Dict of requested model -> product row (models not found are omitted)
+        """
+        try:
+            sql = f"""
+                SELECT p.product_id, p.model, p.sku, p.quantity, p.price, pd.name, m.name as manufacturer
+                FROM {self.prefix}product p
+                LEFT JOIN {self.prefix}product_description pd ON (p.product_id = pd.product_id)
+                LEFT JOIN {self.prefix}manufacturer m ON (p.manufacturer_id = m.manufacturer_id)
+                WHERE p.model IN ({{placeholders}}) AND pd.language_id = 1
+            """
+            return self._get_products_keyed("model", list(models), sql, chunk_size)
+        except Exception as e:
+            logger.error("get_products_by_models_error", count=len(models), error=str(e))
+            return {}
+
+    def stream_query(
+        self,
+        sql: str,
+        params: Any = (),
+        fetch_size: Optional[int] = None,
+        as_dict: bool = False,
+    ) -> Iterator[List[Any]]:
+        """Stream a query's result in batches through an unbuffered server-side cursor.
+
+        Rows arrive as tuples (column order of the SELECT), or dicts with
+        ``as_dict``, ``fetch_size`` at a time, so memory stays bounded by
+        one batch rather than the whole result set. Blocking: call it from
+        a worker thread (e.g. via run_blocking), and keep per-batch work
+        short so the server doesn't time out the open result.
+
+        Abandoning the iterator early discards the connection instead of
+        draining the remaining rows.
+        """
+        fetch_size = fetch_size or self.config.opencart_db_stream_fetch_size
+        cursor_class = pymysql.cursors.SSDictCursor if as_dict else pymysql.cursors.SSCursor
+        conn = self._get_connection()
+        exhausted = False
+        try:
+            cursor = conn.cursor(cursor_class)
+            cursor.execute(sql, params)
+            while True:
+                batch = cursor.fetchmany(fetch_size)
+                if not batch:
+                    break
+                yield batch
+            exhausted = True
+            cursor.close()
+        finally:
+            if exhausted:
+                conn.close()
+            else:
+                conn.discard()
+
+    def iter_catalog_rows(
+        self,
+        modified_since: Optional[Any] = None,
+        after_product_id: int = 0,
+        fetch_size: Optional[int] = None,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Stream product rows (all statuses) in batches, ordered by product_id.
+
+        With no ``modified_since`` every product is returned (full load);
+        otherwise products modified at/after it or with a product_id above
+        ``after_product_id``.
+        """
+        sql = f"""
+            SELECT p.product_id, p.model, p.sku, p.quantity, p.price, p.status, p.date_modified,
+                   pd.name, m.name as manufacturer
+            FROM {self.prefix}product p
+            LEFT JOIN {self.prefix}product_description pd
+                ON (p.product_id = pd.product_id AND pd.language_id = 1)
+            LEFT JOIN {self.prefix}manufacturer m ON (p.manufacturer_id = m.manufacturer_id)
+        """
+        params: tuple = ()
+        if modified_since is not None:
+            sql += " WHERE p.date_modified >= %s OR p.product_id > %s"
+            params = (modified_since, after_product_id)
+        sql += " ORDER BY p.product_id"
+        for batch in self.stream_query(sql, params, fetch_size):
+            yield [dict(zip(CATALOG_COLUMNS, row)) for row in batch]
+
+    def _select_catalog_rows(self, modified_since: Optional[Any] = None, after_product_id: int = 0) -> List[Dict]:
+        rows: List[Dict] = []
+        for batch in self.iter_catalog_rows(modified_since, after_product_id):
+            rows.extend(batch)
+        return rows
+
+    def iter_order_rows(
+        self,
+        modified_since: Optional[Any] = None,
+        after_order_id: int = 0,
+        fetch_size: Optional[int] = None,
+    ) -> Iterator[List[tuple]]:
+        """Stream confirmed orders as compact tuples (ORDER_COLUMNS), in batches.
+
+        Ordered by (date_modified, order_id). With ``modified_since`` only
+        orders changed after that point are returned; ``after_order_id``
+        breaks ties between orders sharing the same ``date_modified``.
+        """
+        sql = f"""
+            SELECT o.order_id, o.order_status_id, os.name, o.firstname, o.lastname,
+                   o.email, o.telephone, o.total, o.date_added, o.date_modified
+            FROM {self.prefix}order o
+            LEFT JOIN {self.prefix}order_status os
+                ON (o.order_status_id = os.order_status_id AND os.language_id = 1)
+            WHERE o.order_status_id > 0
+        """
+        params: tuple = ()
+        if modified_since is not None:
+            sql += " AND (o.date_modified > %s OR (o.date_modified = %s AND o.order_id > %s))"
+            params = (modified_since, modified_since, after_order_id)
+        sql += " ORDER BY o.date_modified, o.order_id"
+        yield from self.stream_query(sql, params, fetch_size)
+
+    @offload()
+    def get_catalog_rows(self, modified_since: Optional[Any] = None, after_product_id: int = 0) -> List[Dict]:
+        """Product rows (all statuses) for in-memory catalog structures.
+
+        With no ``modified_since`` every product is returned (full load);
+        otherwise products modified at/after it or with a product_id above
+        ``after_product_id``. Inactive products are included (``status``) so
+        callers can drop them. Errors propagate so a failed load is never
+        mistaken for an empty catalog.
+        """
+        return self._select_catalog_rows(modified_since, after_product_id)
 
+    @offload()
+    def get_catalog_health_counts(self) -> Dict[str, int]:
+        """Catalog totals for the alignment health report in one aggregate query.
+
+        Returns active_products plus duplicate_skus / duplicate_names: the
+        number of non-empty SKUs / names (any status, grouped under the
+        column collation) shared by more than one product. Errors propagate.
+        """
+        with self.connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT
+                        (SELECT COUNT(*) FROM {self.prefix}product WHERE status = 1) AS active_products,
+                        (SELECT COUNT(*) FROM (
+                            SELECT TRIM(p.sku) AS k FROM {self.prefix}product p
+                            WHERE TRIM(p.sku) <> ''
+                            GROUP BY k HAVING COUNT(*) > 1
+                        ) d) AS duplicate_skus,
+                        (SELECT COUNT(*) FROM (
+                            SELECT TRIM(pd.name) AS k FROM {self.prefix}product_description pd
+                            WHERE pd.language_id = 1 AND TRIM(pd.name) <> ''
+                            GROUP BY k HAVING COUNT(*) > 1
+                        ) d) AS duplicate_names
+                """)
+                row = cursor.fetchone()
+        return {key: int(row[key] or 0) for key in ("active_products", "duplicate_skus", "duplicate_names")}
+
+    @offload(default=list)
+    def search_products_by_name(self, query: str) -> List[Dict]:
+        """Search products by name - flexible multi-token matching with progressive relaxation
+        and model number normalization (handles RP1400SW vs RP-1400SW)."""
+        connection = None
+        try:
+            connection = self._get_connection()
+            with connection.cursor() as cursor:
                 base_sql = f"""
                     SELECT p.product_id, p.model, p.sku, p.quantity, p.price, pd.name, m.name as manufacturer
                     FROM {self.prefix}product p
@@ -524,56 +931,13 @@ class OpenCartConnector:
                     cursor.execute(sql, tuple(params))
                     return cursor.fetchall()
 
-                def _collect(new_results):
-                    """Add new results avoiding duplicates."""
-                    for r in new_results:
-                        if r['product_id'] not in seen_ids:
-                            results.append(r)
-                            seen_ids.add(r['product_id'])
-
-                # Strategy 1: AND with all significant words (strictest)
-                _collect(_run_search(all_sig_words))
-
-                # Strategy 2: Same but with dash-normalized search (RP1400SW matches RP-1400SW)
-                if len(results) < 5:
-                    _collect(_run_normalized_search(all_sig_words))
-
-                # Strategy 3: AND with core words only (no stop words)
-                if len(results) < 5 and core_words != all_sig_words:
-                    _collect(_run_search(core_words))
-                    if len(results) < 5:
-                        _collect(_run_normalized_search(core_words))
-
-                # Strategy 4: Model number search - brand + model number only
-                # e.g. "Klipsch" + "RP1400SW" → matches "KLIPSCH RP-1400SW ..."
-                if len(results) < 5 and model_numbers and core_words:
-                    brand = core_words[0]
-                    for model in model_numbers:
-                        _collect(_run_normalized_search([brand, model]))
-                        if len(results) >= 10:
-                            break
-
-                # Strategy 5: Progressive relaxation - drop words from end of core
-                if len(results) < 5 and len(core_words) > 2:
-                    for n in range(len(core_words) - 1, max(1, len(core_words) // 2) - 1, -1):
-                        subset = core_words[:n]
-                        _collect(_run_search(subset))
-                        if len(results) < 5:
-                            _collect(_run_normalized_search(subset))
-                        if len(results) >= 10:
-                            break
-
-                # Strategy 6: Brand + any one other core word
-                if len(results) < 5 and len(core_words) >= 2:
-                    brand = core_words[0]
-                    for extra_word in core_words[1:4]:
-                        _collect(_run_search([brand, extra_word]))
-                        if len(results) >= 20:
-                            break
+                results, info = cascade_name_search(query, _run_search, _run_normalized_search)
+                if not info["total_words"]:
+                    return []
 
                 logger.info("search_products_by_name", query=query[:50],
-                            core_words=core_words, model_numbers=model_numbers,
-                            total_words=len(all_sig_words), results=len(results))
+                            core_words=info["core_words"], model_numbers=info["model_numbers"],
+                            total_words=info["total_words"], results=len(results))
                 return results[:50]
         except Exception as e:
             logger.error("search_products_failed", query=query[:50], error=str(e))
@@ -582,9 +946,12 @@ class OpenCartConnector:
             if connection:
                 connection.close()
 
-    async def add_product_special(self, product_id: int, price: float, date_start: str = None, date_end: str = None, priority: int = 1) -> bool:
+    @offload()
+    def add_product_special(self, product_id: int, price: float, date_start: str = None, date_end: str = None, priority: int = 1) -> bool:
         """
         Add a special price to a product.
+
+        Raises QueryTimeoutError if the write may still commit (outcome unknown).
         """
         connection = None
         try:
@@ -619,8 +986,9 @@ class OpenCartConnector:
         finally:
             if connection: connection.close()
 
-    async def clear_product_specials(self, product_id: int) -> bool:
-        """Remove all specials for a product."""
+    @offload()
+    def clear_product_specials(self, product_id: int) -> bool:
+        """Remove all specials for a product (QueryTimeoutError: outcome unknown)."""
         connection = None
         try:
             connection = self._get_connection()
@@ -636,8 +1004,75 @@ class OpenCartConnector:
         finally:
             if connection: connection.close()
 
-    async def create_product(self, product_data: Dict[str, Any]) -> Optional[int]:
-        """Create a new product in OpenCart (with pre-creation duplicate check)."""
+    @offload()
+    def replace_product_specials(self, specials: List[Dict[str, Any]], chunk_size: int = 500) -> Dict[str, Any]:
+        """Replace the specials of many products in one transaction.
+
+        Existing specials of every listed product are deleted and the new
+        ones inserted with multi-row statements; either the whole set is
+        applied or nothing is. Several entries for the same product_id are
+        coalesced (later entries win), matching clear + add per product.
+
+        Args:
+            specials: Dicts with product_id, price and optional date_start,
+                date_end, priority
+            chunk_size: Rows per DELETE/INSERT/UPDATE statement
+
+        Returns:
+            Dict with success flag, products (count written), error
+        """
+        rows: Dict[int, tuple] = {}
+        for special in specials:
+            product_id = int(special['product_id'])
+            rows[product_id] = (
+                product_id,
+                special.get('priority') or 1,
+                special['price'],
+                special.get('date_start') or "0000-00-00",
+                special.get('date_end') or "0000-00-00",
+            )
+        if not rows:
+            return {'success': True, 'products': 0, 'error': None}
+
+        product_ids = list(rows)
+        try:
+            with self.connection() as connection:
+                with connection.cursor() as cursor:
+                    for start in range(0, len(product_ids), chunk_size):
+                        chunk = product_ids[start:start + chunk_size]
+                        placeholders = ", ".join(["%s"] * len(chunk))
+                        cursor.execute(
+                            f"DELETE FROM {self.prefix}product_special WHERE product_id IN ({placeholders})",
+                            chunk,
+                        )
+                        # customer_group_id = 1 (Default Retail)
+                        values = ", ".join(["(%s, 1, %s, %s, %s, %s)"] * len(chunk))
+                        params = [value for pid in chunk for value in rows[pid]]
+                        cursor.execute(
+                            f"INSERT INTO {self.prefix}product_special "
+                            f"(product_id, customer_group_id, priority, price, date_start, date_end) VALUES {values}",
+                            params,
+                        )
+                        # Bump date_modified so storefront and catalog caches pick the change up
+                        cursor.execute(
+                            f"UPDATE {self.prefix}product SET date_modified = NOW() WHERE product_id IN ({placeholders})",
+                            chunk,
+                        )
+                connection.commit()
+        except Exception as e:
+            logger.error("replace_product_specials_failed", products=len(product_ids), error=str(e))
+            return {'success': False, 'products': 0, 'error': str(e)}
+
+        logger.info("product_specials_replaced", products=len(product_ids), requested=len(specials))
+        return {'success': True, 'products': len(product_ids), 'error': None}
+
+    @offload()
+    def create_product(self, product_data: Dict[str, Any]) -> Optional[int]:
+        """Create a new product in OpenCart (with pre-creation duplicate check).
+
+        Returns None on failure. A QueryTimeoutError means the insert may
+        still commit, so callers must look the SKU up before retrying.
+        """
         connection = None
         try:
             connection = self._get_connection()
@@ -701,21 +1136,321 @@ class OpenCartConnector:
             if connection:
                 connection.close()
 
-    async def search_products_by_sku(self, sku: str) -> List[Dict]:
+    @offload()
+    def bulk_create_products(
+        self,
+        products: List[Dict[str, Any]],
+        chunk_size: int = 200,
+        seo: bool = True,
+    ) -> Dict[str, Any]:
+        """Create many products in one transaction with multi-row inserts.
+
+        Each entry takes the same fields as create_product (sku, name, price,
+        quantity, manufacturer_id, status). Product, description, store and
+        (with ``seo``) SEO URL rows are written chunk by chunk; nothing is
+        committed unless every chunk succeeds. SKUs that already exist in
+        OpenCart, or repeat within ``products``, are not created again.
+
+        Returns:
+            Dict with success flag, created (sku -> new product_id),
+            existing (sku -> product_id already in OpenCart) and error
+        """
+        def fold(value: str) -> str:
+            return value.lower().rstrip()
+
+        wanted: Dict[str, Dict[str, Any]] = {}
+        for product in products:
+            if product.get('sku'):
+                wanted.setdefault(fold(product['sku']), product)
+        created: Dict[str, int] = {}
+        existing: Dict[str, int] = {}
+        if not wanted:
+            return {'success': True, 'created': created, 'existing': existing, 'error': None}
+
+        try:
+            with self.connection() as connection:
+                with connection.cursor() as cursor:
+                    keys = list(wanted)
+                    # Pre-creation safety: skip SKUs that already exist (lowest product_id wins)
+                    for start in range(0, len(keys), chunk_size):
+                        chunk = [wanted[key]['sku'] for key in keys[start:start + chunk_size]]
+                        cursor.execute(
+                            f"SELECT product_id, sku FROM {self.prefix}product "
+                            f"WHERE sku IN ({', '.join(['%s'] * len(chunk))}) ORDER BY product_id",
+                            chunk,
+                        )
+                        for row in cursor.fetchall():
+                            product = wanted.get(fold(row['sku']))
+                            if product:
+                                existing.setdefault(product['sku'], row['product_id'])
+
+                    to_create = [p for p in wanted.values() if p['sku'] not in existing]
+                    for start in range(0, len(to_create), chunk_size):
+                        chunk = to_create[start:start + chunk_size]
+                        self._insert_product_chunk(cursor, chunk, created, seo)
+                connection.commit()
+        except Exception as e:
+            logger.error("bulk_create_products_failed", requested=len(products), error=str(e))
+            return {'success': False, 'created': {}, 'existing': existing, 'error': str(e)}
+
+        logger.info("bulk_create_products_completed", requested=len(products),
+                    created=len(created), existing=len(existing))
+        return {'success': True, 'created': created, 'existing': existing, 'error': None}
+
+    def _insert_product_chunk(self, cursor, chunk: List[Dict[str, Any]], created: Dict[str, int], seo: bool) -> None:
+        """Insert one chunk of bulk_create_products (inside its transaction)."""
+        values = ", ".join(
+            ["(%s, %s, %s, 7, '', %s, 1, %s, 0, 0, NOW(), 0, 1, 0, 0, 0, 1, 1, 1, 0, %s, 0, NOW(), NOW())"] * len(chunk)
+        )
+        params: List[Any] = []
+        for p in chunk:
+            # model = sku, as in create_product
+            params.extend([p['sku'], p['sku'], p['quantity'], p['manufacturer_id'], p['price'], p['status']])
+        cursor.execute(f"""
+            INSERT INTO {self.prefix}product
+            (model, sku, quantity, stock_status_id, image, manufacturer_id, shipping, price,
+            points, tax_class_id, date_available, weight, weight_class_id, length, width, height,
+            length_class_id, subtract, minimum, sort_order, status, viewed, date_added, date_modified)
+            VALUES {values}
+        """, params)
+        first_id = cursor.lastrowid
+
+        # Auto-increment ids of a multi-row insert aren't guaranteed to be
+        # consecutive, so map them back by SKU within this transaction.
+        skus = [p['sku'] for p in chunk]
+        cursor.execute(
+            f"SELECT product_id, sku FROM {self.prefix}product "
+            f"WHERE product_id >= %s AND sku IN ({', '.join(['%s'] * len(skus))})",
+            [first_id] + skus,
+        )
+        ids = {row['sku'].lower().rstrip(): row['product_id'] for row in cursor.fetchall()}
+        rows = [(ids[p['sku'].lower().rstrip()], p) for p in chunk]
+
+        cursor.execute(
+            f"""
+            INSERT INTO {self.prefix}product_description
+            (product_id, language_id, name, description, tag, meta_title, meta_description, meta_keyword)
+            VALUES {", ".join(["(%s, 1, %s, '', '', %s, '', '')"] * len(rows))}
+            """,
+            [value for product_id, p in rows for value in (product_id, p['name'], p['name'])],  # meta_title = name
+        )
+        # product_to_store (Default store 0)
+        cursor.execute(
+            f"INSERT INTO {self.prefix}product_to_store (product_id, store_id) VALUES "
+            + ", ".join(["(%s, 0)"] * len(rows)),
+            [product_id for product_id, _ in rows],
+        )
+        if seo:
+            self._insert_product_seo_urls(cursor, rows)
+
+        for product_id, p in rows:
+            created[p['sku']] = product_id
+
+    def _insert_product_seo_urls(self, cursor, rows: List[tuple]) -> None:
+        """Add SEO keywords (slug of name + SKU) for new products, suffixing the id on clashes."""
+        slugs = {
+            product_id: re.sub(r'[^a-z0-9]+', '-', f"{p['name']} {p['sku']}".lower()).strip('-')
+            for product_id, p in rows
+        }
+        try:
+            cursor.execute(
+                f"SELECT keyword FROM {self.prefix}seo_url "
+                f"WHERE store_id = 0 AND keyword IN ({', '.join(['%s'] * len(slugs))})",
+                list(slugs.values()),
+            )
+        except pymysql.err.ProgrammingError as e:
+            if e.args and e.args[0] == 1146:  # No seo_url table (pre-3.0 schema)
+                logger.warning("seo_url_table_missing", table=f"{self.prefix}seo_url")
+                return
+            raise
+        taken = {row['keyword'] for row in cursor.fetchall()}
+
+        params: List[Any] = []
+        for product_id, slug in slugs.items():
+            if not slug or slug in taken:
+                slug = f"{slug}-{product_id}".strip('-')
+            taken.add(slug)
+            params.extend([f"product_id={product_id}", slug])
+        cursor.execute(
+            f"INSERT INTO {self.prefix}seo_url (store_id, language_id, query, keyword) VALUES "
+            + ", ".join(["(0, 1, %s, %s)"] * len(slugs)),
+            params,
+        )
+
+    # ------------------------------------------------------------------
+    # Normalized SKU/model index
+    # ------------------------------------------------------------------
+
+    @property
+    def key_index_table(self) -> str:
+        return f"{self.prefix}product_key_index"
+
+    def _ensure_key_index(self, cursor) -> None:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self.key_index_table} (
+                product_id INT NOT NULL,
+                key_type VARCHAR(8) NOT NULL,
+                norm_key VARCHAR(64) NOT NULL,
+                date_modified DATETIME NULL,
+                PRIMARY KEY (product_id, key_type),
+                KEY idx_norm_key (norm_key)
+            ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+        """)
+
+    def _refresh_key_index(self, force: bool = False) -> int:
+        """Bring the normalized key side table up to date.
+
+        Re-indexes products whose ``date_modified`` is at or after the newest
+        one already indexed, plus any product_id above the indexed maximum
+        (imports that carry an old date_modified). Throttled to once per
+        ``opencart_key_index_refresh_seconds`` unless ``force`` is set.
+
+        Returns:
+            Number of products (re)indexed
+        """
+        db_key = self._db_key
+        now = time.monotonic()
+        if not force and now - _key_index_refreshed.get(db_key, float('-inf')) < self.config.opencart_key_index_refresh_seconds:
+            return 0
+
+        with _key_index_lock:
+            if not force and now - _key_index_refreshed.get(db_key, float('-inf')) < self.config.opencart_key_index_refresh_seconds:
+                return 0
+
+            try:
+                with self.connection() as conn:
+                    with conn.cursor() as cursor:
+                        self._ensure_key_index(cursor)
+                        cursor.execute(
+                            f"SELECT MAX(date_modified) AS wm, MAX(product_id) AS max_id FROM {self.key_index_table}"
+                        )
+                        marks = cursor.fetchone() or {}
+
+                        if marks.get('max_id') is None:
+                            cursor.execute(f"SELECT product_id, sku, model, date_modified FROM {self.prefix}product")
+                        else:
+                            cursor.execute(
+                                f"""SELECT product_id, sku, model, date_modified FROM {self.prefix}product
+                                    WHERE date_modified >= %s OR product_id > %s""",
+                                (marks['wm'] or '1970-01-01', marks['max_id']),
+                            )
+                        changed = cursor.fetchall()
+
+                        chunk_size = 1000
+                        for start in range(0, len(changed), chunk_size):
+                            chunk = changed[start:start + chunk_size]
+                            ids = [row['product_id'] for row in chunk]
+                            cursor.execute(
+                                f"DELETE FROM {self.key_index_table} WHERE product_id IN ({', '.join(['%s'] * len(ids))})",
+                                ids,
+                            )
+                            values = []
+                            for row in chunk:
+                                for key_type in ("sku", "model"):
+                                    norm = normalize_product_key(row[key_type])[:64]
+                                    if norm:
+                                        values.append((row['product_id'], key_type, norm, row['date_modified']))
+                            if values:
+                                cursor.executemany(
+                                    f"""INSERT INTO {self.key_index_table}
+                                        (product_id, key_type, norm_key, date_modified)
+                                        VALUES (%s, %s, %s, %s)""",
+                                    values,
+                                )
+                    conn.commit()
+            except Exception:
+                # Don't retry a broken index (e.g. no CREATE privilege) on every call
+                _key_index_ok[db_key] = False
+                _key_index_refreshed[db_key] = time.monotonic()
+                raise
+
+            _key_index_ok[db_key] = True
+            _key_index_refreshed[db_key] = time.monotonic()
+            if changed:
+                logger.info("product_key_index_refreshed", products=len(changed), full=marks.get('max_id') is None)
+            return len(changed)
+
+    def _key_index_available(self) -> bool:
+        """Refresh the key index if due; False means callers should use the expression scan."""
+        try:
+            self._refresh_key_index()
+        except Exception as e:
+            logger.warning("product_key_index_unavailable", error=str(e))
+        return _key_index_ok.get(self._db_key, False)
+
+    def _probe_key_index(self, cursor, norm_keys: List[str], active_only: bool = True, limit: Optional[int] = None) -> List[Dict]:
+        """Indexed equality probe on normalized sku/model keys."""
+        if not norm_keys:
+            return []
+        sql = f"""
+            SELECT DISTINCT k.norm_key, p.product_id, p.model, p.sku, p.quantity, p.price, pd.name, m.name as manufacturer
+            FROM {self.key_index_table} k
+            JOIN {self.prefix}product p ON (p.product_id = k.product_id)
+            LEFT JOIN {self.prefix}product_description pd ON (p.product_id = pd.product_id)
+            LEFT JOIN {self.prefix}manufacturer m ON (p.manufacturer_id = m.manufacturer_id)
+            WHERE k.norm_key IN ({', '.join(['%s'] * len(norm_keys))}) AND pd.language_id = 1
+        """
+        if active_only:
+            sql += " AND p.status = 1"
+        sql += " ORDER BY p.product_id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        cursor.execute(sql, norm_keys)
+        return cursor.fetchall()
+
+    @offload(default=dict)
+    def get_products_by_normalized_keys(self, keys: List[str], active_only: bool = True, chunk_size: int = 500) -> Dict[str, List[Dict]]:
+        """Look up products whose normalized SKU or model equals any of ``keys``.
+
+        Keys are normalized with normalize_product_key, so 'RP-1400SW',
+        'rp1400sw' and 'RP 1400 SW' all probe the same index entry.
+
+        Returns:
+            Dict of requested key -> list of matching product rows
+        """
+        try:
+            if not self._key_index_available():
+                return {}
+            wanted: Dict[str, List[str]] = {}
+            for key in keys:
+                norm = normalize_product_key(key)
+                if norm:
+                    wanted.setdefault(norm, []).append(key)
+
+            result: Dict[str, List[Dict]] = {}
+            norm_keys = list(wanted)
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    for start in range(0, len(norm_keys), chunk_size):
+                        for row in self._probe_key_index(cursor, norm_keys[start:start + chunk_size], active_only):
+                            norm = row.pop('norm_key')
+                            for original in wanted.get(norm, []):
+                                bucket = result.setdefault(original, [])
+                                if all(r['product_id'] != row['product_id'] for r in bucket):
+                                    bucket.append(row)
+            return result
+        except Exception as e:
+            logger.error("get_products_by_normalized_keys_error", count=len(keys), error=str(e))
+            return {}
+
+    @offload(default=list)
+    def search_products_by_sku(self, sku: str) -> List[Dict]:
         """Search products by SKU or model field (exact and normalized matching).
 
         Checks both sku and model columns, stripping non-alphanumeric chars
         so that 'RP-1400SW' matches 'RP1400SW'.
         """
-        import re
+        # Normalize: strip everything except alphanumerics
+        sku_norm = normalize_product_key(sku)
+        if not sku_norm or len(sku_norm) < 2:
+            return []
+
+        key_index_ready = self._key_index_available()
+
         connection = None
         try:
             connection = self._get_connection()
             with connection.cursor() as cursor:
-                # Normalize: strip everything except alphanumerics
-                sku_norm = re.sub(r'[^a-z0-9]', '', sku.lower())
-                if not sku_norm or len(sku_norm) < 2:
-                    return []
 
                 base_sql = f"""
                     SELECT p.product_id, p.model, p.sku, p.quantity, p.price, pd.name, m.name as manufacturer
@@ -740,13 +1475,19 @@ class OpenCartConnector:
 
                 # 2. Normalized match (strip non-alphanum from both sides)
                 if len(results) < 5:
-                    sql2 = f"""{base_sql}
-                        WHERE p.status = 1 AND (
-                            LOWER(REPLACE(REPLACE(REPLACE(p.sku, '-', ''), ' ', ''), '.', '')) = %s
-                            OR LOWER(REPLACE(REPLACE(REPLACE(p.model, '-', ''), ' ', ''), '.', '')) = %s
-                        ) AND pd.language_id = 1 LIMIT 10"""
-                    cursor.execute(sql2, (sku_norm, sku_norm))
-                    _collect(cursor.fetchall())
+                    if key_index_ready:
+                        rows = self._probe_key_index(cursor, [sku_norm], limit=10)
+                        for r in rows:
+                            r.pop('norm_key', None)
+                        _collect(rows)
+                    else:
+                        sql2 = f"""{base_sql}
+                            WHERE p.status = 1 AND (
+                                LOWER(REPLACE(REPLACE(REPLACE(p.sku, '-', ''), ' ', ''), '.', '')) = %s
+                                OR LOWER(REPLACE(REPLACE(REPLACE(p.model, '-', ''), ' ', ''), '.', '')) = %s
+                            ) AND pd.language_id = 1 LIMIT 10"""
+                        cursor.execute(sql2, (sku_norm, sku_norm))
+                        _collect(cursor.fetchall())
 
                 # 3. LIKE match — SKU appears as substring in sku/model/name
                 if len(results) < 5 and len(sku_norm) >= 4:
@@ -770,33 +1511,18 @@ class OpenCartConnector:
             if connection:
                 connection.close()
 
-    async def search_products_by_name_or(self, query: str, min_word_matches: int = 2) -> List[Dict]:
+    @offload(default=list)
+    def search_products_by_name_or(self, query: str, min_word_matches: int = 2) -> List[Dict]:
         """Search products where ANY min_word_matches significant words match (OR-based).
 
         This is a fallback when AND-based search returns too few results.
         Finds products that share at least `min_word_matches` words with the query.
         """
-        import re
         connection = None
         try:
             connection = self._get_connection()
             with connection.cursor() as cursor:
-                stop_words = {
-                    'the', 'and', 'with', 'for', 'from', 'free', 'new', 'pro',
-                    'series', 'edition', 'version', 'model', 'type', 'style',
-                    'pair', 'set', 'kit', 'pack', 'bundle', 'combo', 'single',
-                    'matte', 'gloss', 'active', 'passive', 'powered', 'wireless',
-                    'wired', 'portable', 'indoor', 'outdoor', 'heritage',
-                    'inspired', 'premium', 'standard', 'basic', 'advanced',
-                    'eua', 'usa', 'black', 'white', 'silver', 'walnut', 'oak',
-                    'ebony', 'cherry', 'each', 'per', 'channel', 'zone',
-                    'way', 'system', 'monitor', 'speaker', 'amplifier', 'receiver',
-                    'player', 'cable', 'adapter', 'mount', 'stand', 'bracket',
-                    'inch', 'mm', 'cm', 'watts', 'watt', 'ohm', 'ohms',
-                }
-
-                words = re.findall(r'\w+', query.lower())
-                sig_words = [w for w in words if (len(w) > 2 or any(c.isdigit() for c in w)) and w not in stop_words]
+                sig_words = content_words(query)
 
                 if len(sig_words) < 2:
                     return []
@@ -849,7 +1575,7 @@ class OpenCartConnector:
                 connection.close()
 
     async def close(self) -> None:
-        """Close connection (no-op for per-request connection model)."""
+        """No-op: connections are pooled process-wide (see close_opencart_pools)."""
         pass
 
 
@@ -863,3 +1589,12 @@ def get_opencart_connector() -> OpenCartConnector:
     if _opencart_connector is None:
         _opencart_connector = OpenCartConnector()
     return _opencart_connector
+
+
+def close_opencart_pools() -> None:
+    """Close every OpenCart connection pool (application shutdown)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close_all()
@@ -1,15 +1,32 @@
 """Supabase connector for database operations and logging."""
+import asyncio
 import uuid
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, List, Optional, Set
 
 from supabase import Client, create_client
 
+from src.connectors.supabase_async import AsyncSupabase, get_async_supabase
 from src.utils.config import get_config
 from src.utils.logging import AgentLogger, get_trace_id
 
 logger = AgentLogger("SupabaseConnector")
 
+# Optional fields accepted by upsert_order_tracker / upsert_order_trackers
+TRACKER_FIELDS = frozenset({
+    "order_name", "supplier", "notes", "cost", "invoice_no", "order_paid", "supplier_amount",
+    "shipping", "profit", "owner_wade", "owner_lucky", "owner_kenny", "owner_accounts",
+    "flag_done", "flag_urgent", "supplier_invoice_no", "supplier_quote_no", "supplier_status",
+    "supplier_invoice_url",
+})
+
+
+
+def _is_missing_function(error: Exception) -> bool:
+    """True if a PostgREST error says the called RPC function doesn't exist."""
+    message = str(error)
+    return "PGRST202" in message or "42883" in message or "Could not find the function" in message
+
 
 class SupabaseConnector:
     """Connector for Supabase database operations."""
@@ -21,6 +38,10 @@ class SupabaseConnector:
             config.supabase_url,
             config.supabase_service_role_key,
         )
+        # Awaitable PostgREST client (pooled, retrying) for use from async code
+        self.db: AsyncSupabase = get_async_supabase()
+        # Whether the merge_order_trackers RPC exists (None = not tried yet)
+        self._tracker_rpc_available: Optional[bool] = None
         logger.info("supabase_connected", url=config.supabase_url)
 
     # Agent Logs
@@ -48,7 +69,7 @@ class SupabaseConnector:
                 "trace_id": get_trace_id(),
                 "created_at": datetime.utcnow().isoformat(),
             }
-            self.client.table("agent_logs").insert(record).execute()
+            await self.db.table("agent_logs").insert(record).execute()
             logger.debug("agent_event_logged", target_agent=agent, event_type=event_type)
 
         except Exception as e:
@@ -86,7 +107,7 @@ class SupabaseConnector:
                 "trace_id": get_trace_id(),
             }
 
-            response = self.client.table("email_logs").insert(record).execute()
+            response = await self.db.table("email_logs").insert(record).execute()
             email_log_id = response.data[0]["id"]
             logger.info("email_log_created", email_log_id=email_log_id, category=category)
             return email_log_id
@@ -117,7 +138,7 @@ class SupabaseConnector:
 
             if updates:
                 (
-                    self.client.table("email_logs")
+                    await self.db.table("email_logs")
                     .update(updates)
                     .eq("gmail_message_id", gmail_message_id)
                     .execute()
@@ -132,7 +153,7 @@ class SupabaseConnector:
         """Retrieve email log by Gmail message ID."""
         try:
             response = (
-                self.client.table("email_logs")
+                await self.db.table("email_logs")
                 .select("*")
                 .eq("gmail_message_id", gmail_message_id)
                 .execute()
@@ -180,90 +201,205 @@ class SupabaseConnector:
         supplier_invoice_url: Optional[str] = None,
     ) -> None:
         """Insert or update order tracker record."""
+        fields = {
+            "order_name": order_name, "supplier": supplier, "notes": notes, "cost": cost,
+            "invoice_no": invoice_no, "order_paid": order_paid, "supplier_amount": supplier_amount,
+            "shipping": shipping, "profit": profit, "updates": updates,
+            "owner_wade": owner_wade, "owner_lucky": owner_lucky, "owner_kenny": owner_kenny,
+            "owner_accounts": owner_accounts, "flag_done": flag_done, "flag_urgent": flag_urgent,
+            "supplier_invoice_no": supplier_invoice_no, "supplier_quote_no": supplier_quote_no,
+            "supplier_status": supplier_status, "supplier_invoice_url": supplier_invoice_url,
+        }
         try:
-            # 1. Fetch existing record to get current values for profit calculation
-            existing = await self.get_order_tracker(order_no)
-            current_data = existing if existing else {}
-
-            record = {"order_no": order_no, "source": source}
-            if last_modified_by is not None:
-                record["last_modified_by"] = last_modified_by
-
-            # Add non-None fields
-            if order_name is not None:
-                record["order_name"] = order_name
-            if supplier is not None:
-                record["supplier"] = supplier
-            if notes is not None:
-                record["notes"] = notes
-            if cost is not None:
-                record["cost"] = cost
-            if invoice_no is not None:
-                record["invoice_no"] = invoice_no
-            if order_paid is not None:
-                record["order_paid"] = order_paid
-            if supplier_amount is not None:
-                record["supplier_amount"] = supplier_amount
-            if shipping is not None:
-                record["shipping"] = shipping
-            if supplier_invoice_no is not None:
-                record["supplier_invoice_no"] = supplier_invoice_no
-            if supplier_quote_no is not None:
-                record["supplier_quote_no"] = supplier_quote_no
-            if supplier_status is not None:
-                record["supplier_status"] = supplier_status
-            if flag_done is not None:
-                record["flag_done"] = flag_done
-            if flag_urgent is not None:
-                record["flag_urgent"] = flag_urgent
-            if supplier_invoice_url is not None:
-                record["supplier_invoice_url"] = supplier_invoice_url
-
-            # 3. Calculate Profit
-            # Profit = Cost (Revenue) - Supplier Amount - Shipping
-            # Use new value if provided, else existing value, else 0
-            
-            # Note: 'cost' in DB is actually Revenue/Order Total
-            rev_val = cost if cost is not None else current_data.get("cost", 0)
-            sup_val = supplier_amount if supplier_amount is not None else current_data.get("supplier_amount", 0)
-            ship_val = shipping if shipping is not None else current_data.get("shipping", 0)
-            
-            # Ensure we handle None values from DB
-            rev_val = float(rev_val) if rev_val else 0.0
-            sup_val = float(sup_val) if sup_val else 0.0
-            ship_val = float(ship_val) if ship_val else 0.0
-            
-            # Only calculate profit if we have at least Revenue
-            if rev_val > 0:
-                record["profit"] = rev_val - sup_val - ship_val
-
-            if updates is not None:
-                # Append updates if existing
-                existing_updates = current_data.get("updates", "")
-                timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
-                new_update = f"[{timestamp}] {updates}"
-                if existing_updates:
-                    record["updates"] = f"{new_update}\n{existing_updates}"
-                else:
-                    record["updates"] = new_update
-
-            # Owner flags
-            if owner_wade is not None:
-                record["owner_wade"] = owner_wade
-            if owner_lucky is not None:
-                record["owner_lucky"] = owner_lucky
-            if owner_kenny is not None:
-                record["owner_kenny"] = owner_kenny
-            if owner_accounts is not None:
-                record["owner_accounts"] = owner_accounts
-
-            self.client.table("orders_tracker").upsert(record).execute()
+            await self.merge_order_trackers([
+                {"order_no": order_no, "source": source, "last_modified_by": last_modified_by, **fields}
+            ])
             logger.info("order_tracker_upserted", order_no=order_no, source=source)
 
         except Exception as e:
             logger.error("order_tracker_upsert_failed", order_no=order_no, error=str(e))
             raise
 
+    async def merge_order_trackers(self, entries: List[Dict[str, Any]], chunk_size: int = 500) -> int:
+        """Apply many tracker changes atomically via the merge_order_trackers RPC.
+
+        Same input as upsert_order_trackers. The database recomputes profit
+        and prepends ``updates`` against the row at write time, so
+        concurrent agents don't overwrite each other. Falls back to the
+        client-side upsert_order_trackers if the function isn't installed
+        (migration 019).
+
+        Returns:
+            Number of tracker changes applied
+        """
+        if not entries:
+            return 0
+        if self._tracker_rpc_available is not False:
+            records = [self._tracker_rpc_record(entry) for entry in entries]
+            try:
+                for start in range(0, len(records), chunk_size):
+                    await self.db.rpc("merge_order_trackers", {"p_records": records[start:start + chunk_size]}).execute()
+                self._tracker_rpc_available = True
+                logger.info("order_trackers_merged", entries=len(records))
+                return len(records)
+            except Exception as e:
+                if self._tracker_rpc_available or not _is_missing_function(e):
+                    logger.error("order_trackers_merge_failed", entries=len(records), error=str(e))
+                    raise
+                self._tracker_rpc_available = False
+                logger.warning("merge_order_trackers_rpc_unavailable", error=str(e))
+
+        return await self.upsert_order_trackers(entries)
+
+    @staticmethod
+    def _tracker_rpc_record(entry: Dict[str, Any]) -> Dict[str, Any]:
+        """RPC form of one change: non-None fields only, ``updates`` timestamped."""
+        fields = dict(entry)
+        record = {
+            "order_no": str(fields.pop("order_no")),
+            "source": fields.pop("source", "agent"),
+        }
+        last_modified_by = fields.pop("last_modified_by", "system")
+        if last_modified_by is not None:
+            record["last_modified_by"] = last_modified_by
+
+        unknown = set(fields) - TRACKER_FIELDS - {"updates"}
+        if unknown:
+            raise ValueError(f"Unknown orders_tracker fields: {sorted(unknown)}")
+        fields.pop("profit", None)  # always derived
+        updates = fields.pop("updates", None)
+        if updates is not None:
+            record["updates"] = f"[{datetime.now().strftime('%Y-%m-%d %H:%M')}] {updates}"
+        record.update({field: value for field, value in fields.items() if value is not None})
+        return record
+
+    @staticmethod
+    def _build_tracker_record(
+        current_data: Dict[str, Any],
+        order_no: str,
+        source: str = "agent",
+        last_modified_by: Optional[str] = "system",
+        updates: Optional[str] = None,
+        **fields: Any,
+    ) -> Dict[str, Any]:
+        """Tracker row to upsert for the given changes on top of ``current_data``.
+
+        Takes the keyword arguments of upsert_order_tracker. None means
+        "leave unchanged"; profit is recomputed and ``updates`` is prepended
+        to the existing log.
+        """
+        unknown = set(fields) - TRACKER_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown orders_tracker fields: {sorted(unknown)}")
+
+        record = {"order_no": order_no, "source": source}
+        if last_modified_by is not None:
+            record["last_modified_by"] = last_modified_by
+
+        # Add non-None fields (profit is always derived below)
+        for field, value in fields.items():
+            if value is not None and field != "profit":
+                record[field] = value
+
+        # Calculate Profit
+        # Profit = Cost (Revenue) - Supplier Amount - Shipping
+        # Use new value if provided, else existing value, else 0
+        
+        # Note: 'cost' in DB is actually Revenue/Order Total
+        rev_val = record.get("cost", current_data.get("cost", 0))
+        sup_val = record.get("supplier_amount", current_data.get("supplier_amount", 0))
+        ship_val = record.get("shipping", current_data.get("shipping", 0))
+        
+        # Ensure we handle None values from DB
+        rev_val = float(rev_val) if rev_val else 0.0
+        sup_val = float(sup_val) if sup_val else 0.0
+        ship_val = float(ship_val) if ship_val else 0.0
+        
+        # Only calculate profit if we have at least Revenue
+        if rev_val > 0:
+            record["profit"] = rev_val - sup_val - ship_val
+
+        if updates is not None:
+            # Append updates if existing
+            existing_updates = current_data.get("updates", "")
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M")
+            new_update = f"[{timestamp}] {updates}"
+            if existing_updates:
+                record["updates"] = f"{new_update}\n{existing_updates}"
+            else:
+                record["updates"] = new_update
+
+        return record
+
+    async def get_order_trackers(self, order_nos: List[str], chunk_size: int = 200) -> Dict[str, Dict[str, Any]]:
+        """Retrieve many order tracker records (one ``IN`` query per chunk), keyed by order_no."""
+        trackers: Dict[str, Dict[str, Any]] = {}
+        wanted = list(dict.fromkeys(str(order_no) for order_no in order_nos))
+        try:
+            for start in range(0, len(wanted), chunk_size):
+                response = (
+                    await self.db.table("orders_tracker")
+                    .select("*")
+                    .in_("order_no", wanted[start:start + chunk_size])
+                    .is_("deleted_at", "null")
+                    .execute()
+                )
+                for row in response.data or []:
+                    trackers[row["order_no"]] = row
+            return trackers
+
+        except Exception as e:
+            logger.error("order_trackers_fetch_failed", count=len(wanted), error=str(e))
+            raise
+
+    async def upsert_order_trackers(
+        self,
+        entries: List[Dict[str, Any]],
+        existing: Optional[Dict[str, Dict[str, Any]]] = None,
+        chunk_size: int = 500,
+    ) -> int:
+        """Client-side bulk merge of tracker changes (fallback for merge_order_trackers).
+
+        Args:
+            entries: Keyword arguments of upsert_order_tracker, one dict per
+                change (order_no required); several changes to one order are
+                applied in order
+            existing: Current rows keyed by order_no if the caller already
+                has them; otherwise fetched with get_order_trackers
+            chunk_size: Rows per upsert request
+
+        Returns:
+            Number of tracker rows written
+        """
+        if not entries:
+            return 0
+        if existing is None:
+            existing = await self.get_order_trackers([e["order_no"] for e in entries])
+
+        records: Dict[str, Dict[str, Any]] = {}
+        for entry in entries:
+            fields = dict(entry)
+            order_no = str(fields.pop("order_no"))
+            current = {**existing.get(order_no, {}), **records.get(order_no, {})}
+            record = self._build_tracker_record(current, order_no, **fields)
+            records[order_no] = {**records.get(order_no, {}), **record}
+
+        # PostgREST bulk upserts need identical keys on every row, so write
+        # one request per distinct column set.
+        groups: Dict[frozenset, List[Dict[str, Any]]] = {}
+        for record in records.values():
+            groups.setdefault(frozenset(record), []).append(record)
+        try:
+            for rows in groups.values():
+                for start in range(0, len(rows), chunk_size):
+                    await self.db.table("orders_tracker").upsert(rows[start:start + chunk_size]).execute()
+            logger.info("order_trackers_upserted", entries=len(entries), rows=len(records), batches=len(groups))
+            return len(records)
+
+        except Exception as e:
+            logger.error("order_trackers_upsert_failed", rows=len(records), error=str(e))
+            raise
+
     async def upload_file(self, bucket: str, path: str, data: bytes, content_type: str = "application/pdf") -> Optional[str]:
         """Upload file to Supabase Storage and return public URL.
         
@@ -278,7 +414,8 @@ class SupabaseConnector:
         """
         try:
             # Upload file
-            self.client.storage.from_(bucket).upload(
+            await asyncio.to_thread(
+                self.client.storage.from_(bucket).upload,
                 path=path,
                 file=data,
                 file_options={"content-type": content_type, "upsert": "true"}
@@ -297,7 +434,7 @@ class SupabaseConnector:
         """Retrieve order tracker record by order number."""
         try:
             response = (
-                self.client.table("orders_tracker")
+                await self.db.table("orders_tracker")
                 .select("*")
                 .eq("order_no", order_no)
                 .is_("deleted_at", "null")
@@ -335,7 +472,7 @@ class SupabaseConnector:
                 "payload": payload or {},
             }
 
-            response = self.client.table("order_shipments").insert(record).execute()
+            response = await self.db.table("order_shipments").insert(record).execute()
             shipment_id = response.data[0]["id"]
             logger.info("shipment_created", shipment_id=shipment_id, order_no=order_no)
             return shipment_id
@@ -360,7 +497,7 @@ class SupabaseConnector:
             if webhook_payload:
                 updates["webhook_payload"] = webhook_payload
 
-            self.client.table("order_shipments").update(updates).eq("id", shipment_id).execute()
+            await self.db.table("order_shipments").update(updates).eq("id", shipment_id).execute()
 
             # Log to history
             history_record = {
@@ -369,7 +506,7 @@ class SupabaseConnector:
                 "source": "webhook",
                 "payload": webhook_payload or {},
             }
-            self.client.table("order_shipments_history").insert(history_record).execute()
+            await self.db.table("order_shipments_history").insert(history_record).execute()
 
             logger.info("shipment_status_updated", shipment_id=shipment_id, status=status)
 
@@ -381,7 +518,7 @@ class SupabaseConnector:
     async def get_config(self, key: str) -> Optional[Any]:
         """Retrieve configuration value by key."""
         try:
-            response = self.client.table("config").select("value").eq("key", key).execute()
+            response = await self.db.table("config").select("value").eq("key", key).execute()
 
             if response.data:
                 return response.data[0]["value"]
@@ -398,7 +535,7 @@ class SupabaseConnector:
             if description:
                 record["description"] = description
 
-            self.client.table("config").upsert(record).execute()
+            await self.db.table("config").upsert(record).execute()
             logger.debug("config_set", key=key)
 
         except Exception as e:
@@ -429,7 +566,7 @@ class SupabaseConnector:
         """
         try:
             response = (
-                self.client.table("email_logs")
+                await self.db.table("email_logs")
                 .select("*")
                 .eq("id", email_id)
                 .execute()
@@ -469,7 +606,7 @@ class SupabaseConnector:
                     updates["payload"] = existing_payload
 
             (
-                self.client.table("email_logs")
+                await self.db.table("email_logs")
                 .update(updates)
                 .eq("id", email_id)
                 .execute()
@@ -485,7 +622,7 @@ class SupabaseConnector:
         try:
             # Try exact match first
             response = (
-                self.client.table("supplier_addresses")
+                await self.db.table("supplier_addresses")
                 .select("*")
                 .ilike("name", name) # Case-insensitive match
                 .limit(1)
@@ -500,6 +637,160 @@ class SupabaseConnector:
             logger.error("get_supplier_address_failed", name=name, error=str(e))
             return None
 
+    async def get_alignment_health_stats(self) -> Dict[str, int]:
+        """Product/match totals for the alignment health report.
+
+        One call to the alignment_health_stats RPC (migration 020). If the
+        function isn't installed, the same numbers are computed client-side
+        from exact counts and streamed id sets. Errors propagate.
+
+        Returns:
+            products_total, matches_total, linked_total, ignored_total,
+            linked_opencart_ids (distinct) and unmatched_products
+        """
+        try:
+            response = await self.db.rpc("alignment_health_stats").execute()
+            row = response.data[0] if response.data else {}
+            return {key: int(value or 0) for key, value in row.items()}
+        except Exception as e:
+            if not _is_missing_function(e):
+                raise
+            logger.warning("alignment_health_stats_rpc_unavailable", error=str(e))
+
+        async def exact_count(query) -> int:
+            return (await query.execute()).count or 0
+
+        def head(table: str):
+            return self.db.table(table).select("id", count="exact", head=True)
+
+        (
+            products_total, matches_total, linked_total, ignored_total, linked_oc_ids, matched_ids,
+        ) = await asyncio.gather(
+            exact_count(head("products")),
+            exact_count(head("product_matches")),
+            exact_count(head("product_matches").not_("opencart_product_id", "is", "null")),
+            exact_count(head("product_matches").eq("match_type", "ignored")),
+            self.db.stream("product_matches", "opencart_product_id", partitions=2).to_set("opencart_product_id"),
+            self.db.stream("product_matches", "internal_product_id", partitions=2).to_set("internal_product_id"),
+        )
+        return {
+            "products_total": products_total,
+            "matches_total": matches_total,
+            "linked_total": linked_total,
+            "ignored_total": ignored_total,
+            "linked_opencart_ids": len(linked_oc_ids),
+            "unmatched_products": max(products_total - len(matched_ids), 0),
+        }
+
+    async def delete_duplicate_products(self, dry_run: bool = True, preview_limit: int = 100) -> Dict[str, Any]:
+        """Delete duplicate products (same supplier_id + sku).
+
+        Per group the first matched product is kept, else the oldest. One call
+        to the delete_duplicate_products RPC (migration 024); if the function
+        isn't installed, groups are built client-side from streamed products
+        and matched ids. With ``dry_run`` nothing is deleted. Errors propagate.
+
+        Returns:
+            dry_run, duplicates_found, matched_kept, oldest_kept,
+            products_deleted (would be, in a dry run) and a ``preview`` of up
+            to ``preview_limit`` deleted products with the ``keep_id`` kept
+        """
+        try:
+            response = await self.db.rpc(
+                "delete_duplicate_products", {"p_dry_run": dry_run, "p_preview_limit": preview_limit},
+            ).execute()
+            data = response.data
+            return (data[0] if isinstance(data, list) and data else data) or {}
+        except Exception as e:
+            if not _is_missing_function(e):
+                raise
+            logger.warning("delete_duplicate_products_rpc_unavailable", error=str(e))
+
+        products, matched_ids = await asyncio.gather(
+            self.db.stream("products", "id, sku, supplier_id, product_name, created_at", partitions=4).to_list(),
+            self.db.stream("product_matches", "internal_product_id").to_set("internal_product_id"),
+        )
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for product in products:
+            groups.setdefault((product.get("supplier_id"), product.get("sku")), []).append(product)
+
+        duplicates_found = matched_kept = 0
+        doomed: List[Dict[str, Any]] = []
+        for group in groups.values():
+            if len(group) < 2:
+                continue
+            # Matched first, then oldest (same order as the SQL function)
+            group.sort(key=lambda p: (p["id"] not in matched_ids, p.get("created_at") or "", p["id"]))
+            duplicates_found += 1
+            matched_kept += group[0]["id"] in matched_ids
+            doomed.extend({**p, "matched": p["id"] in matched_ids, "keep_id": group[0]["id"]} for p in group[1:])
+
+        deleted = 0
+        if not dry_run:
+            for start in range(0, len(doomed), 200):
+                batch = [p["id"] for p in doomed[start:start + 200]]
+                await self.db.table("products").delete(returning="minimal").in_("id", batch).execute()
+                deleted += len(batch)
+
+        return {
+            "dry_run": dry_run,
+            "duplicates_found": duplicates_found,
+            "matched_kept": matched_kept,
+            "oldest_kept": duplicates_found - matched_kept,
+            "products_deleted": len(doomed) if dry_run else deleted,
+            "preview": doomed[:preview_limit],
+        }
+
+    async def get_product_matches(self, internal_ids: Iterable[str], chunk_size: int = 200) -> Dict[str, Dict[str, Any]]:
+        """product_matches rows (internal_product_id, opencart_product_id, match_type) for ``internal_ids``."""
+        wanted = list(dict.fromkeys(internal_ids))
+        matches: Dict[str, Dict[str, Any]] = {}
+        for start in range(0, len(wanted), chunk_size):
+            response = await self.db.table("product_matches")\
+                .select("internal_product_id, opencart_product_id, match_type")\
+                .in_("internal_product_id", wanted[start:start + chunk_size])\
+                .execute()
+            for row in response.data or []:
+                matches.setdefault(row["internal_product_id"], row)
+        return matches
+
+    async def get_matched_product_ids(self, internal_ids: Iterable[str], chunk_size: int = 200) -> Set[str]:
+        """The subset of ``internal_ids`` that already has a product_matches row."""
+        return set(await self.get_product_matches(internal_ids, chunk_size))
+
+    # MCP sync sessions
+    async def get_auto_link_watermarks(self) -> Optional[Dict[str, Any]]:
+        """Watermarks saved by the latest post-sync auto-link (migration 022), or None."""
+        try:
+            response = await self.db.table("mcp_sync_sessions")\
+                .select("id, auto_link_watermarks")\
+                .not_("auto_link_watermarks", "is", "null")\
+                .order("started_at", desc=True)\
+                .limit(1)\
+                .execute()
+            if response.data:
+                return response.data[0]["auto_link_watermarks"]
+            return None
+
+        except Exception as e:
+            logger.warning("auto_link_watermarks_fetch_failed", error=str(e))
+            return None
+
+    async def save_auto_link_watermarks(self, session_id: str, watermarks: Dict[str, Any]) -> bool:
+        """Store auto-link watermarks on a sync session."""
+        try:
+            await self.db.table("mcp_sync_sessions")\
+                .update({"auto_link_watermarks": watermarks}, returning="minimal")\
+                .eq("id", session_id)\
+                .execute()
+            logger.info("auto_link_watermarks_saved", session_id=session_id,
+                        suppliers=len(watermarks.get("products", {})))
+            return True
+
+        except Exception as e:
+            logger.error("auto_link_watermarks_save_failed", session_id=session_id, error=str(e))
+            return False
+
 # Global instance
 _supabase_connector: Optional[SupabaseConnector] = None
 
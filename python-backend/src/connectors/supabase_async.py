@@ -0,0 +1,545 @@
+"""Async PostgREST facade for Supabase.
+
+supabase-py's client is synchronous, so every ``.execute()`` made from
+``async`` code blocks the event loop. This module offers the same chainable
+table API (``table().select().eq()...``) with an awaitable ``execute()``,
+backed by a shared keep-alive httpx connection pool, a concurrency limit,
+timeouts, and retry with backoff on 429/5xx responses::
+
+    db = get_async_supabase()
+    res = await db.table("products").select("id, sku").eq("sku", sku).execute()
+    total = (await db.table("products").select("id", count="exact", head=True).execute()).count
+
+Whole-table reads go through ``stream()``, which pages on the primary key
+(keyset, so late pages cost the same as early ones) with pages prefetched
+in the background::
+
+    linked = await db.stream("product_matches", "opencart_product_id",
+                             where=lambda q: q.not_("opencart_product_id", "is", "null")
+                             ).to_set("opencart_product_id")
+"""
+import asyncio
+import json
+import random
+import threading
+import uuid
+import weakref
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple, Union
+
+import httpx
+
+from src.utils.config import get_config
+from src.utils.logging import AgentLogger
+
+logger = AgentLogger("AsyncSupabase")
+
+# Responses worth retrying: rate limited or a transient server/gateway error
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+# Transport errors raised before the request reached the server (always safe to retry)
+_NOT_SENT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout)
+
+
+class SupabaseAPIError(Exception):
+    """A PostgREST request failed (after retries, where applicable)."""
+
+    def __init__(self, status_code: int, message: str, code: Optional[str] = None,
+                 details: Optional[str] = None, hint: Optional[str] = None):
+        self.status_code = status_code
+        self.code = code
+        self.message = message
+        self.details = details
+        self.hint = hint
+        super().__init__(f"{code or status_code}: {message}" + (f" ({details})" if details else ""))
+
+
+@dataclass
+class APIResponse:
+    """Result of execute(): rows (or object for single()/rpc) and the count if requested."""
+    data: Any
+    count: Optional[int] = None
+
+
+def _value(value: Any) -> str:
+    """Format a filter value as PostgREST expects it."""
+    if value is None:
+        return "null"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+def _quote(value: Any) -> str:
+    """Format an ``in`` list item; items with reserved characters are double-quoted."""
+    text = _value(value)
+    if any(ch in text for ch in ',.:()"\\ '):
+        return '"' + text.replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return text
+
+
+class AsyncQuery:
+    """Chainable PostgREST request; mirrors the supabase-py builder methods."""
+
+    def __init__(self, client: "AsyncSupabase", path: str):
+        self._client = client
+        self._path = path
+        self._method = "GET"
+        self._params: List[Tuple[str, str]] = []
+        self._headers: Dict[str, str] = {}
+        self._prefer: List[str] = []
+        self._body: Any = None
+
+    # -- verbs -----------------------------------------------------------
+
+    def select(self, columns: str = "*", count: Optional[str] = None, head: bool = False) -> "AsyncQuery":
+        self._method = "HEAD" if head else "GET"
+        self._params.append(("select", ",".join(part.strip() for part in columns.split(","))))
+        if count:
+            self._prefer.append(f"count={count}")
+        return self
+
+    def insert(self, rows: Union[Dict, List[Dict]], returning: str = "representation") -> "AsyncQuery":
+        self._method = "POST"
+        self._body = rows
+        self._prefer.append(f"return={returning}")
+        if isinstance(rows, list) and rows:
+            # Rows may carry different keys; missing ones take column defaults
+            columns = sorted({key for row in rows for key in row})
+            self._params.append(("columns", ",".join(columns)))
+            self._prefer.append("missing=default")
+        return self
+
+    def upsert(self, rows: Union[Dict, List[Dict]], on_conflict: Optional[str] = None,
+               ignore_duplicates: bool = False, returning: str = "representation") -> "AsyncQuery":
+        """Insert or merge rows. Every row must carry the same keys: a missing
+        key would otherwise reset that column on rows that already exist."""
+        self._method = "POST"
+        self._body = rows
+        self._prefer.append(f"return={returning}")
+        self._prefer.append("resolution=ignore-duplicates" if ignore_duplicates else "resolution=merge-duplicates")
+        if on_conflict:
+            self._params.append(("on_conflict", on_conflict))
+        return self
+
+    def update(self, values: Dict[str, Any], returning: str = "representation") -> "AsyncQuery":
+        self._method = "PATCH"
+        self._body = values
+        self._prefer.append(f"return={returning}")
+        return self
+
+    def delete(self, returning: str = "representation") -> "AsyncQuery":
+        self._method = "DELETE"
+        self._prefer.append(f"return={returning}")
+        return self
+
+    # -- filters ---------------------------------------------------------
+
+    def _filter(self, column: str, op: str, value: Any) -> "AsyncQuery":
+        self._params.append((column, f"{op}.{value}"))
+        return self
+
+    def eq(self, column: str, value: Any) -> "AsyncQuery":
+        return self._filter(column, "eq", _value(value))
+
+    def neq(self, column: str, value: Any) -> "AsyncQuery":
+        return self._filter(column, "neq", _value(value))
+
+    def gt(self, column: str, value: Any) -> "AsyncQuery":
+        return self._filter(column, "gt", _value(value))
+
+    def gte(self, column: str, value: Any) -> "AsyncQuery":
+        return self._filter(column, "gte", _value(value))
+
+    def lt(self, column: str, value: Any) -> "AsyncQuery":
+        return self._filter(column, "lt", _value(value))
+
+    def lte(self, column: str, value: Any) -> "AsyncQuery":
+        return self._filter(column, "lte", _value(value))
+
+    def like(self, column: str, pattern: str) -> "AsyncQuery":
+        return self._filter(column, "like", pattern)
+
+    def ilike(self, column: str, pattern: str) -> "AsyncQuery":
+        return self._filter(column, "ilike", pattern)
+
+    def is_(self, column: str, value: Any) -> "AsyncQuery":
+        return self._filter(column, "is", _value(value))
+
+    def in_(self, column: str, values: List[Any]) -> "AsyncQuery":
+        return self._filter(column, "in", "(" + ",".join(_quote(v) for v in values) + ")")
+
+    def not_(self, column: str, op: str, value: Any) -> "AsyncQuery":
+        return self._filter(column, f"not.{op}", value)
+
+    def or_(self, filters: str) -> "AsyncQuery":
+        self._params.append(("or", f"({filters})"))
+        return self
+
+    # -- modifiers -------------------------------------------------------
+
+    def order(self, column: str, desc: bool = False, nullsfirst: Optional[bool] = None) -> "AsyncQuery":
+        value = f"{column}.{'desc' if desc else 'asc'}"
+        if nullsfirst is not None:
+            value += ".nullsfirst" if nullsfirst else ".nullslast"
+        # Repeated calls add tiebreak columns (PostgREST takes one comma-separated order)
+        for i, (name, existing) in enumerate(self._params):
+            if name == "order":
+                self._params[i] = ("order", f"{existing},{value}")
+                return self
+        self._params.append(("order", value))
+        return self
+
+    def limit(self, count: int) -> "AsyncQuery":
+        self._params.append(("limit", str(count)))
+        return self
+
+    def range(self, start: int, end: int) -> "AsyncQuery":
+        self._params.append(("offset", str(start)))
+        self._params.append(("limit", str(end - start + 1)))
+        return self
+
+    def single(self) -> "AsyncQuery":
+        """Return one object instead of a list (error unless exactly one row matches)."""
+        self._headers["Accept"] = "application/vnd.pgrst.object+json"
+        return self
+
+    async def execute(self) -> APIResponse:
+        headers = dict(self._headers)
+        if self._prefer:
+            headers["Prefer"] = ",".join(self._prefer)
+        # Reads and upserts can be resent safely after a dropped response
+        idempotent = self._method in ("GET", "HEAD") or any(p.startswith("resolution=") for p in self._prefer)
+        response = await self._client.request(
+            self._method, self._path, params=self._params, headers=headers,
+            body=self._body, idempotent=idempotent,
+        )
+        return _to_response(response, self._method)
+
+
+# End-of-partition marker on a TableStream page queue
+_DONE = object()
+
+
+def _split_keys(low: Any, high: Any, parts: int) -> List[Any]:
+    """Interior boundaries that cut [low, high] into ``parts`` even key ranges.
+
+    Works for integer keys and UUIDs (Postgres orders uuid bytewise, i.e. as
+    a 128-bit integer). Any other key type gets no boundaries: one range.
+    """
+    if isinstance(low, int) and isinstance(high, int):
+        lo, hi, to_key = low, high, int
+    else:
+        try:
+            lo, hi = uuid.UUID(str(low)).int, uuid.UUID(str(high)).int
+        except ValueError:
+            return []
+        to_key = lambda n: str(uuid.UUID(int=n))
+    parts = min(parts, hi - lo)
+    return [to_key(lo + (hi - lo) * i // parts) for i in range(1, parts)] if parts > 1 else []
+
+
+class TableStream:
+    """Keyset-paginated scan of a whole table (or filtered subset).
+
+    Pages are read ``WHERE key > last ORDER BY key LIMIT page_size`` so every
+    page costs the same, and a partition only ends on an empty page, so a
+    server-side row cap smaller than ``page_size`` can't truncate the scan.
+    With ``partitions > 1`` the key range is split and scanned concurrently;
+    rows then arrive in key order within a partition only. Up to ``prefetch``
+    pages are read ahead of the consumer.
+
+    Iterate rows with ``async for`` (use ``async with stream as rows:`` when
+    the loop may stop early, so the background reads are cancelled), or
+    collect with to_list()/to_set()/to_dict().
+    """
+
+    def __init__(
+        self,
+        client: "AsyncSupabase",
+        table: str,
+        columns: str = "*",
+        key: str = "id",
+        page_size: int = 1000,
+        partitions: int = 1,
+        prefetch: int = 4,
+        where: Optional[Callable[[AsyncQuery], AsyncQuery]] = None,
+    ):
+        self._client = client
+        self._table = table
+        self._key = key
+        # The key must be selected for the cursor to advance
+        names = [part.strip() for part in columns.split(",")]
+        self._columns = columns if "*" in names or key in names else f"{columns}, {key}"
+        self._page_size = page_size
+        self._partitions = max(1, partitions)
+        self._prefetch = max(1, prefetch)
+        self._where = where
+        self._rows: Optional[AsyncIterator[Dict[str, Any]]] = None
+
+    def _query(self, columns: str) -> AsyncQuery:
+        query = self._client.table(self._table).select(columns)
+        return self._where(query) if self._where else query
+
+    async def _boundaries(self) -> List[Any]:
+        if self._partitions == 1:
+            return []
+        first, last = await asyncio.gather(
+            self._query(self._key).order(self._key).limit(1).execute(),
+            self._query(self._key).order(self._key, desc=True).limit(1).execute(),
+        )
+        if not first.data or not last.data:
+            return []
+        return _split_keys(first.data[0][self._key], last.data[0][self._key], self._partitions)
+
+    async def _scan(self, lower: Any, upper: Any, queue: asyncio.Queue) -> None:
+        """Page through [lower, upper) onto ``queue``; ends with _DONE or the error."""
+        try:
+            last = None
+            while True:
+                query = self._query(self._columns).order(self._key).limit(self._page_size)
+                if last is not None:
+                    query = query.gt(self._key, last)
+                elif lower is not None:
+                    query = query.gte(self._key, lower)
+                if upper is not None:
+                    query = query.lt(self._key, upper)
+                page = (await query.execute()).data or []
+                if not page:
+                    break
+                await queue.put(page)
+                last = page[-1][self._key]
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(_DONE)
+
+    async def pages(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield pages of rows as they arrive."""
+        edges = [None, *await self._boundaries(), None]
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._prefetch + len(edges))
+        tasks = [
+            asyncio.create_task(self._scan(lower, upper, queue))
+            for lower, upper in zip(edges, edges[1:])
+        ]
+        remaining = len(tasks)
+        try:
+            while remaining:
+                item = await queue.get()
+                if item is _DONE:
+                    remaining -= 1
+                elif isinstance(item, Exception):
+                    raise item
+                else:
+                    yield item
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _iter_rows(self) -> AsyncIterator[Dict[str, Any]]:
+        pages = self.pages()
+        try:
+            async for page in pages:
+                for row in page:
+                    yield row
+        finally:
+            await pages.aclose()
+
+    def __aiter__(self) -> AsyncIterator[Dict[str, Any]]:
+        return self._iter_rows()
+
+    async def __aenter__(self) -> AsyncIterator[Dict[str, Any]]:
+        self._rows = self._iter_rows()
+        return self._rows
+
+    async def __aexit__(self, *exc_info) -> None:
+        if self._rows is not None:
+            await self._rows.aclose()
+            self._rows = None
+
+    async def to_list(self) -> List[Dict[str, Any]]:
+        rows: List[Dict[str, Any]] = []
+        async for page in self.pages():
+            rows.extend(page)
+        return rows
+
+    async def to_set(self, column: str) -> Set[Any]:
+        """Distinct non-null values of one column."""
+        values: Set[Any] = set()
+        async for page in self.pages():
+            values.update(row[column] for row in page if row.get(column) is not None)
+        return values
+
+    async def to_dict(self, key_column: str, value_column: Optional[str] = None) -> Dict[Any, Any]:
+        """Rows (or one column of them) keyed by ``key_column``; later rows win."""
+        result: Dict[Any, Any] = {}
+        async for page in self.pages():
+            for row in page:
+                result[row[key_column]] = row[value_column] if value_column else row
+        return result
+
+
+def _to_response(response: httpx.Response, method: str) -> APIResponse:
+    count = None
+    content_range = response.headers.get("content-range")
+    if content_range and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        count = int(total) if total.isdigit() else None
+    if method == "HEAD" or not response.content:
+        return APIResponse(data=[], count=count)
+    return APIResponse(data=response.json(), count=count)
+
+
+class AsyncSupabase:
+    """Async PostgREST client sharing one connection pool per event loop.
+
+    A separate httpx client and semaphore are kept for each running loop,
+    since jobs that start their own loop in a worker thread can't share
+    connections with the main application loop.
+    """
+
+    def __init__(self, url: Optional[str] = None, key: Optional[str] = None):
+        config = get_config()
+        self.config = config
+        self.rest_url = f"{(url or config.supabase_url).rstrip('/')}/rest/v1"
+        key = key or config.supabase_service_role_key
+        self._auth_headers = {"apikey": key, "Authorization": f"Bearer {key}"}
+        self._lock = threading.Lock()
+        self._per_loop: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Tuple[httpx.AsyncClient, asyncio.Semaphore]]" = (
+            weakref.WeakKeyDictionary()
+        )
+
+    def table(self, name: str) -> AsyncQuery:
+        return AsyncQuery(self, name)
+
+    def rpc(self, function: str, params: Optional[Dict[str, Any]] = None) -> AsyncQuery:
+        query = AsyncQuery(self, f"rpc/{function}")
+        query._method = "POST"
+        query._body = params or {}
+        return query
+
+    def stream(
+        self,
+        table: str,
+        columns: str = "*",
+        key: str = "id",
+        page_size: int = 1000,
+        partitions: int = 1,
+        prefetch: int = 4,
+        where: Optional[Callable[[AsyncQuery], AsyncQuery]] = None,
+    ) -> TableStream:
+        """Keyset-paginated scan of ``table``; ``where`` adds filters to every page query."""
+        return TableStream(self, table, columns, key=key, page_size=page_size,
+                           partitions=partitions, prefetch=prefetch, where=where)
+
+    def _session(self) -> Tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._per_loop.get(loop)
+            if session is None or session[0].is_closed:
+                client = httpx.AsyncClient(
+                    base_url=self.rest_url,
+                    headers={**self._auth_headers, "Content-Type": "application/json"},
+                    timeout=httpx.Timeout(
+                        self.config.supabase_http_timeout,
+                        connect=self.config.supabase_http_connect_timeout,
+                    ),
+                    limits=httpx.Limits(
+                        max_connections=self.config.supabase_http_max_connections,
+                        max_keepalive_connections=self.config.supabase_http_max_connections,
+                        keepalive_expiry=30.0,
+                    ),
+                )
+                session = (client, asyncio.Semaphore(self.config.supabase_http_max_concurrency))
+                self._per_loop[loop] = session
+        return session
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        params: Optional[List[Tuple[str, str]]] = None,
+        headers: Optional[Dict[str, str]] = None,
+        body: Any = None,
+        idempotent: bool = False,
+    ) -> httpx.Response:
+        """Send one request with the concurrency limit and retry policy applied.
+
+        Retries 429/5xx responses and connection failures with exponential
+        backoff (honouring ``Retry-After``); a request whose response was
+        lost mid-flight is only resent when ``idempotent``. Raises
+        SupabaseAPIError for error responses.
+        """
+        client, semaphore = self._session()
+        content = json.dumps(body, default=str) if body is not None else None
+        attempts = self.config.supabase_http_max_retries + 1
+
+        for attempt in range(1, attempts + 1):
+            retry_after: Optional[float] = None
+            try:
+                async with semaphore:
+                    response = await client.request(method, path, params=params, headers=headers, content=content)
+            except httpx.TransportError as e:
+                retryable = isinstance(e, _NOT_SENT_ERRORS) or idempotent
+                if not retryable or attempt == attempts:
+                    logger.error("supabase_request_failed", method=method, path=path, attempt=attempt, error=str(e))
+                    raise
+                logger.warning("supabase_request_retry", method=method, path=path, attempt=attempt, error=str(e))
+            else:
+                if response.status_code < 400:
+                    return response
+                if response.status_code not in RETRY_STATUSES or attempt == attempts:
+                    raise _api_error(response)
+                header = response.headers.get("retry-after", "")
+                retry_after = float(header) if header.replace(".", "", 1).isdigit() else None
+                logger.warning("supabase_request_retry", method=method, path=path, attempt=attempt,
+                               status=response.status_code)
+
+            delay = retry_after if retry_after is not None else \
+                self.config.supabase_http_backoff_base * (2 ** (attempt - 1)) * (0.5 + random.random())
+            await asyncio.sleep(min(delay, 30.0))
+
+        raise RuntimeError("unreachable")  # pragma: no cover
+
+    async def aclose(self) -> None:
+        """Close the connection pool of the current event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._per_loop.pop(loop, None)
+        if session is not None:
+            await session[0].aclose()
+
+
+def _api_error(response: httpx.Response) -> SupabaseAPIError:
+    try:
+        payload = response.json()
+    except ValueError:
+        payload = {}
+    if not isinstance(payload, dict):
+        payload = {}
+    return SupabaseAPIError(
+        status_code=response.status_code,
+        message=payload.get("message") or response.text[:500],
+        code=payload.get("code"),
+        details=payload.get("details"),
+        hint=payload.get("hint"),
+    )
+
+
+# Global instance
+_async_supabase: Optional[AsyncSupabase] = None
+
+
+def get_async_supabase() -> AsyncSupabase:
+    """Get or create the process-wide async Supabase client."""
+    global _async_supabase
+    if _async_supabase is None:
+        _async_supabase = AsyncSupabase()
+    return _async_supabase
+
+
+async def close_async_supabase() -> None:
+    """Close the shared client's connections for the running loop (application shutdown)."""
+    if _async_supabase is not None:
+        await _async_supabase.aclose()
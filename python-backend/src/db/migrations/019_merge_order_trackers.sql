@@ -0,0 +1,95 @@
+-- Atomic read-modify-write for orders_tracker
+-- Used by SupabaseConnector.merge_order_trackers: applies many partial
+-- updates in one call, recomputing profit and prepending to the updates log
+-- against the row as it is at write time (no lost updates between callers).
+--
+-- p_records: JSON array of objects with order_no plus any orders_tracker
+-- fields to change. Absent or null fields are left unchanged. "updates" is
+-- the already-timestamped line to prepend. Records are applied in order.
+
+CREATE OR REPLACE FUNCTION merge_order_trackers(p_records JSONB)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    r JSONB;
+    n INTEGER := 0;
+BEGIN
+    FOR r IN
+        SELECT e.value FROM jsonb_array_elements(p_records) WITH ORDINALITY AS e(value, idx) ORDER BY e.idx
+    LOOP
+        INSERT INTO orders_tracker AS t (
+            order_no, source, last_modified_by,
+            order_name, supplier, notes, cost, invoice_no, order_paid,
+            supplier_amount, shipping, profit, updates,
+            owner_wade, owner_lucky, owner_kenny, owner_accounts, flag_done, flag_urgent,
+            supplier_invoice_no, supplier_quote_no, supplier_status, supplier_invoice_url
+        ) VALUES (
+            r->>'order_no',
+            COALESCE(r->>'source', 'agent'),
+            r->>'last_modified_by',
+            r->>'order_name',
+            r->>'supplier',
+            r->>'notes',
+            (r->>'cost')::numeric,
+            r->>'invoice_no',
+            COALESCE((r->>'order_paid')::boolean, FALSE),
+            (r->>'supplier_amount')::numeric,
+            (r->>'shipping')::numeric,
+            CASE WHEN COALESCE((r->>'cost')::numeric, 0) > 0
+                 THEN (r->>'cost')::numeric
+                      - COALESCE((r->>'supplier_amount')::numeric, 0)
+                      - COALESCE((r->>'shipping')::numeric, 0)
+            END,
+            r->>'updates',
+            COALESCE((r->>'owner_wade')::boolean, FALSE),
+            COALESCE((r->>'owner_lucky')::boolean, FALSE),
+            COALESCE((r->>'owner_kenny')::boolean, FALSE),
+            COALESCE((r->>'owner_accounts')::boolean, FALSE),
+            COALESCE((r->>'flag_done')::boolean, FALSE),
+            COALESCE((r->>'flag_urgent')::boolean, FALSE),
+            r->>'supplier_invoice_no',
+            r->>'supplier_quote_no',
+            COALESCE(r->>'supplier_status', 'Pending'),
+            r->>'supplier_invoice_url'
+        )
+        ON CONFLICT (order_no) DO UPDATE SET
+            source = EXCLUDED.source,
+            last_modified_by = COALESCE(r->>'last_modified_by', t.last_modified_by),
+            order_name = COALESCE(r->>'order_name', t.order_name),
+            supplier = COALESCE(r->>'supplier', t.supplier),
+            notes = COALESCE(r->>'notes', t.notes),
+            cost = COALESCE((r->>'cost')::numeric, t.cost),
+            invoice_no = COALESCE(r->>'invoice_no', t.invoice_no),
+            order_paid = COALESCE((r->>'order_paid')::boolean, t.order_paid),
+            supplier_amount = COALESCE((r->>'supplier_amount')::numeric, t.supplier_amount),
+            shipping = COALESCE((r->>'shipping')::numeric, t.shipping),
+            -- Profit = Cost (Revenue) - Supplier Amount - Shipping, only when there is revenue
+            profit = CASE WHEN COALESCE((r->>'cost')::numeric, t.cost, 0) > 0
+                          THEN COALESCE((r->>'cost')::numeric, t.cost)
+                               - COALESCE((r->>'supplier_amount')::numeric, t.supplier_amount, 0)
+                               - COALESCE((r->>'shipping')::numeric, t.shipping, 0)
+                          ELSE t.profit
+                     END,
+            updates = CASE WHEN r->>'updates' IS NOT NULL
+                           THEN (r->>'updates') || COALESCE(E'\n' || NULLIF(t.updates, ''), '')
+                           ELSE t.updates
+                      END,
+            owner_wade = COALESCE((r->>'owner_wade')::boolean, t.owner_wade),
+            owner_lucky = COALESCE((r->>'owner_lucky')::boolean, t.owner_lucky),
+            owner_kenny = COALESCE((r->>'owner_kenny')::boolean, t.owner_kenny),
+            owner_accounts = COALESCE((r->>'owner_accounts')::boolean, t.owner_accounts),
+            flag_done = COALESCE((r->>'flag_done')::boolean, t.flag_done),
+            flag_urgent = COALESCE((r->>'flag_urgent')::boolean, t.flag_urgent),
+            supplier_invoice_no = COALESCE(r->>'supplier_invoice_no', t.supplier_invoice_no),
+            supplier_quote_no = COALESCE(r->>'supplier_quote_no', t.supplier_quote_no),
+            supplier_status = COALESCE(r->>'supplier_status', t.supplier_status),
+            supplier_invoice_url = COALESCE(r->>'supplier_invoice_url', t.supplier_invoice_url);
+        n := n + 1;
+    END LOOP;
+    RETURN n;
+END;
+$$;
+
+GRANT EXECUTE ON FUNCTION merge_order_trackers(JSONB) TO authenticated;
+GRANT EXECUTE ON FUNCTION merge_order_trackers(JSONB) TO service_role;
@@ -0,0 +1,37 @@
+-- Supabase-side numbers for GET /api/alignment/health in one call
+-- Replaces four exact-count queries plus two full downloads of
+-- product_matches (used only to take len() of id sets). product_matches is
+-- scanned once; unmatched products use the internal_product_id index.
+
+CREATE OR REPLACE FUNCTION alignment_health_stats()
+RETURNS TABLE (
+    products_total BIGINT,
+    matches_total BIGINT,
+    linked_total BIGINT,
+    ignored_total BIGINT,
+    linked_opencart_ids BIGINT,
+    unmatched_products BIGINT
+)
+LANGUAGE sql
+STABLE
+AS $$
+    SELECT
+        (SELECT COUNT(*) FROM products),
+        m.matches_total,
+        m.linked_total,
+        m.ignored_total,
+        m.linked_opencart_ids,
+        (SELECT COUNT(*) FROM products p
+         WHERE NOT EXISTS (SELECT 1 FROM product_matches pm WHERE pm.internal_product_id = p.id))
+    FROM (
+        SELECT
+            COUNT(*) AS matches_total,
+            COUNT(opencart_product_id) AS linked_total,
+            COUNT(*) FILTER (WHERE match_type = 'ignored') AS ignored_total,
+            COUNT(DISTINCT opencart_product_id) AS linked_opencart_ids
+        FROM product_matches
+    ) m;
+$$;
+
+GRANT EXECUTE ON FUNCTION alignment_health_stats() TO authenticated;
+GRANT EXECUTE ON FUNCTION alignment_health_stats() TO service_role;
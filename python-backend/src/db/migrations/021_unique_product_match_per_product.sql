@@ -0,0 +1,37 @@
+-- One product_matches row per internal product
+-- MatchWriter upserts links with on_conflict=internal_product_id, which needs
+-- a unique index on that column. Older code paths could link a product more
+-- than once; keep one row per product: a real link over an 'ignored' marker,
+-- then the newest. The removed rows are copied to product_matches_dedup_backup
+-- first.
+
+CREATE TABLE IF NOT EXISTS product_matches_dedup_backup (
+    LIKE product_matches,
+    backed_up_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE TEMP TABLE product_matches_doomed AS
+SELECT id FROM (
+    SELECT id, ROW_NUMBER() OVER (
+        PARTITION BY internal_product_id
+        ORDER BY (opencart_product_id IS NULL), id DESC
+    ) AS rn
+    FROM product_matches
+) ranked
+WHERE ranked.rn > 1;
+
+INSERT INTO product_matches_dedup_backup
+SELECT pm.* FROM product_matches pm
+JOIN product_matches_doomed d ON d.id = pm.id;
+
+DELETE FROM product_matches pm
+USING product_matches_doomed d
+WHERE pm.id = d.id;
+
+DROP TABLE product_matches_doomed;
+
+CREATE UNIQUE INDEX IF NOT EXISTS product_matches_internal_product_id_key
+    ON product_matches (internal_product_id);
+
+-- Superseded by the unique index above
+DROP INDEX IF EXISTS idx_product_matches_internal;
@@ -0,0 +1,32 @@
+-- Incremental auto-link watermarks
+-- After a supplier sync, auto-link only looks at products changed since the
+-- previous run. The (updated_at, id) watermark per supplier and the OpenCart
+-- date_modified/product_id watermark are stored on the sync session that ran
+-- the auto-link; the next run reads them from the latest session that has one.
+
+ALTER TABLE mcp_sync_sessions
+    ADD COLUMN IF NOT EXISTS auto_link_watermarks JSONB;
+
+CREATE INDEX IF NOT EXISTS idx_mcp_sync_sessions_watermarks
+    ON mcp_sync_sessions (started_at DESC)
+    WHERE auto_link_watermarks IS NOT NULL;
+
+-- Changed-rows scan per supplier
+CREATE INDEX IF NOT EXISTS idx_products_supplier_updated
+    ON products (supplier_id, updated_at, id);
+
+-- The watermark relies on updated_at moving on every update
+DO $$
+BEGIN
+    IF NOT EXISTS (
+        SELECT 1 FROM pg_trigger t
+        JOIN pg_proc p ON p.oid = t.tgfoid
+        WHERE t.tgrelid = 'products'::regclass
+          AND p.proname = 'update_updated_at_column'
+          AND NOT t.tgisinternal
+    ) THEN
+        CREATE TRIGGER update_products_updated_at
+            BEFORE UPDATE ON products
+            FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();
+    END IF;
+END $$;
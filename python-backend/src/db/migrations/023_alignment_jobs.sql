@@ -0,0 +1,32 @@
+-- Checkpointed alignment jobs (bulk align, auto-link)
+-- Replaces per-process status dicts: progress is readable from any replica,
+-- and a job whose worker died resumes from its last checkpoint.
+
+CREATE TABLE IF NOT EXISTS alignment_jobs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    kind TEXT NOT NULL CHECK (kind IN ('bulk_align', 'auto_link')),
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'completed', 'failed', 'cancelled')),
+    params JSONB NOT NULL DEFAULT '{}'::jsonb,
+    pass TEXT,                      -- current pass / step
+    last_key TEXT,                  -- last key fully processed in that pass
+    counts JSONB NOT NULL DEFAULT '{}'::jsonb,
+    result JSONB,
+    error TEXT,
+    cancel_requested BOOLEAN NOT NULL DEFAULT FALSE,
+    heartbeat_at TIMESTAMPTZ,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    completed_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_alignment_jobs_kind_created
+    ON alignment_jobs (kind, created_at DESC);
+
+-- At most one live job per kind across all replicas
+CREATE UNIQUE INDEX IF NOT EXISTS alignment_jobs_one_active_per_kind
+    ON alignment_jobs (kind)
+    WHERE status IN ('queued', 'running');
+
+GRANT SELECT, INSERT, UPDATE ON alignment_jobs TO authenticated;
+GRANT SELECT, INSERT, UPDATE ON alignment_jobs TO anon;
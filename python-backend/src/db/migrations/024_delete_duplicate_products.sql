@@ -0,0 +1,67 @@
+-- Duplicate products (same supplier + SKU) found and removed in one call
+-- Replaces DELETE /api/alignment/duplicates downloading every product and
+-- every matched id, grouping client-side and deleting in id batches. Per
+-- (supplier_id, sku) group the product to keep is the first matched one,
+-- then the oldest; the rest are deleted. With p_dry_run nothing is deleted
+-- and the counts are what a real run would do. ``preview`` lists up to
+-- p_preview_limit of the products deleted (or to be deleted) with the id kept.
+
+CREATE INDEX IF NOT EXISTS idx_products_supplier_sku_created
+    ON products (supplier_id, sku, created_at);
+
+CREATE OR REPLACE FUNCTION delete_duplicate_products(
+    p_dry_run BOOLEAN DEFAULT TRUE,
+    p_preview_limit INTEGER DEFAULT 100
+)
+RETURNS JSONB
+LANGUAGE sql
+VOLATILE
+AS $$
+    WITH ranked AS (
+        SELECT
+            m.id, m.supplier_id, m.sku, m.product_name, m.created_at, m.matched,
+            COUNT(*) OVER grp AS group_size,
+            ROW_NUMBER() OVER keep_order AS rn,
+            FIRST_VALUE(m.id) OVER keep_order AS keep_id
+        FROM (
+            SELECT p.id, p.supplier_id, p.sku, p.product_name, p.created_at,
+                   EXISTS (SELECT 1 FROM product_matches pm WHERE pm.internal_product_id = p.id) AS matched
+            FROM products p
+        ) m
+        WINDOW grp AS (PARTITION BY m.supplier_id, m.sku),
+               keep_order AS (grp ORDER BY m.matched DESC, m.created_at ASC NULLS FIRST, m.id)
+    ),
+    doomed AS (
+        SELECT * FROM ranked WHERE rn > 1
+    ),
+    kept AS (
+        SELECT matched FROM ranked WHERE rn = 1 AND group_size > 1
+    ),
+    deleted AS (
+        DELETE FROM products p
+        USING doomed d
+        WHERE p.id = d.id AND NOT p_dry_run
+        RETURNING p.id
+    )
+    SELECT jsonb_build_object(
+        'dry_run', p_dry_run,
+        'duplicates_found', (SELECT COUNT(*) FROM kept),
+        'matched_kept', (SELECT COUNT(*) FROM kept WHERE matched),
+        'oldest_kept', (SELECT COUNT(*) FROM kept WHERE NOT matched),
+        'products_deleted', CASE WHEN p_dry_run THEN (SELECT COUNT(*) FROM doomed)
+                                 ELSE (SELECT COUNT(*) FROM deleted) END,
+        'preview', COALESCE((
+            SELECT jsonb_agg(to_jsonb(s))
+            FROM (
+                SELECT id, supplier_id, sku, product_name, created_at, matched, keep_id
+                FROM doomed
+                ORDER BY supplier_id, sku, rn
+                LIMIT p_preview_limit
+            ) s
+        ), '[]'::jsonb)
+    );
+$$;
+
+-- Destructive: backend (service role) only
+REVOKE EXECUTE ON FUNCTION delete_duplicate_products(BOOLEAN, INTEGER) FROM PUBLIC;
+GRANT EXECUTE ON FUNCTION delete_duplicate_products(BOOLEAN, INTEGER) TO service_role;
@@ -5,9 +5,11 @@ Triggers all MCP supplier feeds to sync data into Supabase via HTTP
 import asyncio
 import httpx
 import os
+import time
 from datetime import datetime
-from typing import Dict, List
+from typing import Any, Dict, List, Optional
 from src.connectors.supabase import get_supabase_connector
+from src.utils.config import get_config
 from src.utils.logging import AgentLogger
 
 logger = AgentLogger("MCPSyncOrchestrator")
@@ -16,25 +18,38 @@ logger = AgentLogger("MCPSyncOrchestrator")
 MCP_SERVICE_URL = os.getenv("MCP_SERVICE_URL", "https://mcp-http-service-production-b30b.up.railway.app")
 
 
-# MCP servers to sync (in order)
-# Each entry maps to an endpoint on the MCP HTTP service
+# MCP servers to sync
+# Each entry maps to an endpoint on the MCP HTTP service. Suppliers start in
+# priority order (lower first); within a priority the slowest last run starts first.
 MCP_SERVERS = [
-    {"name": "Nology", "endpoint": "nology", "enabled": True},
-    {"name": "Stock2Shop", "endpoint": "stock2shop", "enabled": True},
-    {"name": "Solution Technologies", "endpoint": "solution-technologies", "enabled": True},
-    {"name": "Esquire", "endpoint": "esquire", "enabled": True},
-    {"name": "Scoop", "endpoint": "scoop", "enabled": True},
-    {"name": "Smart Homes", "endpoint": "smart-homes", "enabled": True},
-    {"name": "Connoisseur", "endpoint": "connoisseur", "enabled": True},
-    {"name": "ProAudio", "endpoint": "proaudio", "enabled": True},
-    {"name": "Stage-One", "endpoint": "stage-one", "enabled": True},
-    {"name": "Linkqage", "endpoint": "linkqage", "enabled": True},
-    {"name": "Planet World", "endpoint": "planetworld", "enabled": True},
+    {"name": "Nology", "endpoint": "nology", "enabled": True, "priority": 1},
+    {"name": "Stock2Shop", "endpoint": "stock2shop", "enabled": True, "priority": 1},
+    {"name": "Solution Technologies", "endpoint": "solution-technologies", "enabled": True, "priority": 1},
+    {"name": "Esquire", "endpoint": "esquire", "enabled": True, "priority": 1},
+    {"name": "Scoop", "endpoint": "scoop", "enabled": True, "priority": 1},
+    {"name": "Smart Homes", "endpoint": "smart-homes", "enabled": True, "priority": 2},
+    {"name": "Connoisseur", "endpoint": "connoisseur", "enabled": True, "priority": 2},
+    {"name": "ProAudio", "endpoint": "proaudio", "enabled": True, "priority": 2},
+    {"name": "Stage-One", "endpoint": "stage-one", "enabled": True, "priority": 2},
+    {"name": "Linkqage", "endpoint": "linkqage", "enabled": True, "priority": 2},
+    {"name": "Planet World", "endpoint": "planetworld", "enabled": True, "priority": 2},
     # Disabled servers (have issues per Claude's report)
     {"name": "Homemation", "endpoint": "homemation", "enabled": False},
     {"name": "Google Merchant", "endpoint": "google-merchant", "enabled": False},
 ]
 
+def _next_poll_interval(interval: float, response: Optional[httpx.Response]) -> float:
+    """Back off 1.5x per poll up to the configured max; a numeric Retry-After wins."""
+    config = get_config()
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    if retry_after:
+        try:
+            return min(max(float(retry_after), config.mcp_sync_poll_initial_seconds), config.mcp_sync_poll_max_seconds)
+        except ValueError:
+            pass
+    return min(interval * 1.5, config.mcp_sync_poll_max_seconds)
+
+
 class MCPSyncOrchestrator:
     """Orchestrates syncing of all MCP supplier feeds."""
     
@@ -42,9 +57,23 @@ class MCPSyncOrchestrator:
         self.supabase = get_supabase_connector()
         self.session_id = None
         self.results = []
+        self._log_buffer: List[Dict[str, Any]] = []
     
-    async def sync_supplier(self, server: Dict) -> Dict:
-        """Sync a single MCP server via HTTP, polling until completion."""
+    @staticmethod
+    def _http_client(concurrency: int = 1) -> httpx.AsyncClient:
+        """HTTP client for the MCP service, pooled for ``concurrency`` suppliers."""
+        return httpx.AsyncClient(
+            timeout=httpx.Timeout(600.0, connect=10.0),
+            limits=httpx.Limits(max_connections=max(concurrency * 2, 4),
+                                max_keepalive_connections=max(concurrency, 2)),
+        )
+
+    async def sync_supplier(self, server: Dict, client: Optional[httpx.AsyncClient] = None) -> Dict:
+        """Sync a single MCP server via HTTP, polling until completion.
+
+        Uses ``client`` when given (sync_all shares one pooled client),
+        otherwise a client of its own.
+        """
         supplier_name = server["name"]
         endpoint = server["endpoint"]
 
@@ -53,101 +82,10 @@ class MCPSyncOrchestrator:
         start_time = datetime.now()
 
         try:
-            async with httpx.AsyncClient(timeout=600.0) as client:
-                # 1. Start the sync (async - returns immediately with sessionId)
-                response = await client.post(
-                    f"{MCP_SERVICE_URL}/sync/{endpoint}"
-                )
-
-                if response.status_code != 200:
-                    error_data = response.json() if "application/json" in response.headers.get("content-type", "") else {"error": response.text}
-                    return {
-                        "supplier": supplier_name,
-                        "status": "failed",
-                        "duration": (datetime.now() - start_time).total_seconds(),
-                        "output": None,
-                        "error": str(error_data.get("error", "Failed to start sync"))[:500]
-                    }
-
-                data = response.json()
-                session_id = data.get("sessionId")
-
-                if not session_id:
-                    # Old-style response without sessionId - treat as immediate success
-                    logger.info("sync_supplier_immediate", supplier=supplier_name)
-                    return {
-                        "supplier": supplier_name,
-                        "status": "success",
-                        "duration": (datetime.now() - start_time).total_seconds(),
-                        "output": data.get("output", "")[:500],
-                        "error": None
-                    }
-
-                # 2. Poll for completion (up to 5 minutes)
-                logger.info("sync_supplier_polling", supplier=supplier_name, session_id=session_id)
-                max_wait = 300  # 5 minutes
-                poll_interval = 5  # Check every 5 seconds
-                elapsed = 0
-
-                while elapsed < max_wait:
-                    await asyncio.sleep(poll_interval)
-                    elapsed += poll_interval
-
-                    status_response = await client.get(
-                        f"{MCP_SERVICE_URL}/sync-status/{session_id}"
-                    )
-
-                    if status_response.status_code != 200:
-                        continue  # Keep polling
-
-                    status_data = status_response.json()
-                    status = status_data.get("status")
-
-                    if status == "completed":
-                        result = status_data.get("result", {})
-                        duration = (datetime.now() - start_time).total_seconds()
-                        logger.info("sync_supplier_success",
-                                   supplier=supplier_name,
-                                   duration=duration)
-                        return {
-                            "supplier": supplier_name,
-                            "status": "success",
-                            "duration": duration,
-                            "output": result.get("output", "")[:500],
-                            "error": None
-                        }
-
-                    elif status == "failed":
-                        duration = (datetime.now() - start_time).total_seconds()
-                        error = status_data.get("error", "Unknown error")
-                        logger.error("sync_supplier_failed",
-                                    supplier=supplier_name,
-                                    error=error)
-                        return {
-                            "supplier": supplier_name,
-                            "status": "failed",
-                            "duration": duration,
-                            "output": None,
-                            "error": str(error)[:500]
-                        }
-
-                    # Still running, continue polling
-                    logger.debug("sync_supplier_still_running",
-                                supplier=supplier_name,
-                                elapsed=elapsed)
-
-                # Timeout waiting for completion
-                duration = (datetime.now() - start_time).total_seconds()
-                logger.error("sync_supplier_poll_timeout",
-                            supplier=supplier_name,
-                            duration=duration)
-                return {
-                    "supplier": supplier_name,
-                    "status": "error",
-                    "duration": duration,
-                    "output": None,
-                    "error": f"Sync still running after {max_wait}s"
-                }
+            if client is None:
+                async with self._http_client() as own_client:
+                    return await self._run_supplier_sync(server, own_client, start_time)
+            return await self._run_supplier_sync(server, client, start_time)
 
         except httpx.TimeoutException as e:
             duration = (datetime.now() - start_time).total_seconds()
@@ -177,6 +115,112 @@ class MCPSyncOrchestrator:
                 "error": str(e)
             }
 
+    async def _run_supplier_sync(self, server: Dict, client: httpx.AsyncClient, start_time: datetime) -> Dict:
+        """Start one supplier's sync and poll /sync-status until it finishes."""
+        supplier_name = server["name"]
+        endpoint = server["endpoint"]
+        config = get_config()
+
+        # 1. Start the sync (async - returns immediately with sessionId)
+        response = await client.post(
+            f"{MCP_SERVICE_URL}/sync/{endpoint}"
+        )
+
+        if response.status_code != 200:
+            error_data = response.json() if "application/json" in response.headers.get("content-type", "") else {"error": response.text}
+            return {
+                "supplier": supplier_name,
+                "status": "failed",
+                "duration": (datetime.now() - start_time).total_seconds(),
+                "output": None,
+                "error": str(error_data.get("error", "Failed to start sync"))[:500]
+            }
+
+        data = response.json()
+        session_id = data.get("sessionId")
+
+        if not session_id:
+            # Old-style response without sessionId - treat as immediate success
+            logger.info("sync_supplier_immediate", supplier=supplier_name)
+            return {
+                "supplier": supplier_name,
+                "status": "success",
+                "duration": (datetime.now() - start_time).total_seconds(),
+                "output": data.get("output", "")[:500],
+                "error": None
+            }
+
+        # 2. Poll for completion, backing off between polls
+        logger.info("sync_supplier_polling", supplier=supplier_name, session_id=session_id)
+        max_wait = config.mcp_sync_max_wait_seconds
+        poll_interval = config.mcp_sync_poll_initial_seconds
+        polling_started = time.monotonic()
+
+        while True:
+            remaining = max_wait - (time.monotonic() - polling_started)
+            if remaining <= 0:
+                break
+            await asyncio.sleep(min(poll_interval, remaining))
+            elapsed = round(time.monotonic() - polling_started, 1)
+
+            status_response = await client.get(
+                f"{MCP_SERVICE_URL}/sync-status/{session_id}"
+            )
+            poll_interval = _next_poll_interval(poll_interval, status_response)
+
+            if status_response.status_code != 200:
+                continue  # Keep polling
+
+            status_data = status_response.json()
+            status = status_data.get("status")
+
+            if status == "completed":
+                result = status_data.get("result", {})
+                duration = (datetime.now() - start_time).total_seconds()
+                logger.info("sync_supplier_success",
+                           supplier=supplier_name,
+                           duration=duration)
+                return {
+                    "supplier": supplier_name,
+                    "status": "success",
+                    "duration": duration,
+                    "output": result.get("output", "")[:500],
+                    "error": None
+                }
+
+            elif status == "failed":
+                duration = (datetime.now() - start_time).total_seconds()
+                error = status_data.get("error", "Unknown error")
+                logger.error("sync_supplier_failed",
+                            supplier=supplier_name,
+                            error=error)
+                return {
+                    "supplier": supplier_name,
+                    "status": "failed",
+                    "duration": duration,
+                    "output": None,
+                    "error": str(error)[:500]
+                }
+
+            # Still running, continue polling
+            logger.debug("sync_supplier_still_running",
+                        supplier=supplier_name,
+                        elapsed=elapsed,
+                        next_poll=poll_interval)
+
+        # Timeout waiting for completion
+        duration = (datetime.now() - start_time).total_seconds()
+        logger.error("sync_supplier_poll_timeout",
+                    supplier=supplier_name,
+                    duration=duration)
+        return {
+            "supplier": supplier_name,
+            "status": "error",
+            "duration": duration,
+            "output": None,
+            "error": f"Sync still running after {max_wait}s"
+        }
+
     async def sync_single_with_logging(self, server_key: str) -> Dict:
         """Sync a single supplier with full database logging."""
         # Find server config
@@ -197,7 +241,7 @@ class MCPSyncOrchestrator:
             "triggered_by": "api-single"
         }
         
-        session_response = self.supabase.client.table("mcp_sync_sessions")\
+        session_response = await self.supabase.db.table("mcp_sync_sessions")\
             .insert(session_data)\
             .execute()
             
@@ -207,7 +251,7 @@ class MCPSyncOrchestrator:
         result = await self.sync_supplier(server)
         
         # Log result
-        self.supabase.client.table("mcp_sync_log")\
+        await self.supabase.db.table("mcp_sync_log")\
             .insert({
                 "session_id": self.session_id,
                 "supplier_name": result["supplier"],
@@ -220,7 +264,7 @@ class MCPSyncOrchestrator:
             
         # Update session status
         is_success = result["status"] == "success"
-        self.supabase.client.table("mcp_sync_sessions")\
+        await self.supabase.db.table("mcp_sync_sessions")\
             .update({
                 "completed_at": datetime.now().isoformat(),
                 "status": "completed" if is_success else "failed",
@@ -233,65 +277,130 @@ class MCPSyncOrchestrator:
         return result
     
     async def _run_auto_link(self) -> Dict:
-        """Run auto-link after supplier sync to link obvious matches."""
+        """Run auto-link after supplier sync to link obvious matches.
+
+        Incremental: only products changed since the previous session's
+        watermarks are matched; the new watermarks are saved on this session.
+        """
         try:
             from src.api.alignment import auto_link_products, AutoLinkRequest
             logger.info("auto_link_post_sync_start")
-            result = await auto_link_products(AutoLinkRequest())
+            result = await auto_link_products(AutoLinkRequest(incremental=True))
             logger.info("auto_link_post_sync_complete",
                        aligned=result.get("aligned", 0),
-                       processed=result.get("processed", 0))
+                       processed=result.get("processed", 0),
+                       incremental=result.get("incremental", False))
+            if result.get("watermarks") and self.session_id:
+                await self.supabase.save_auto_link_watermarks(self.session_id, result["watermarks"])
             return result
         except Exception as e:
             logger.error("auto_link_post_sync_failed", error=str(e))
             return {"status": "failed", "error": str(e)}
 
-    async def sync_all(self) -> Dict:
-        """Sync all enabled MCP servers sequentially."""
-        logger.info("sync_all_start", total_servers=len([s for s in MCP_SERVERS if s["enabled"]]))
+    def _log_row(self, result: Dict) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "supplier_name": result["supplier"],
+            "status": result["status"],
+            "duration_seconds": result["duration"],
+            "output": result["output"],
+            "error": result["error"]
+        }
+
+    async def _flush_logs(self, results: List[Dict], total: int) -> None:
+        """Write buffered mcp_sync_log rows in one insert and update the session's progress."""
+        rows, self._log_buffer = self._log_buffer, []
+        if not rows:
+            return
+        try:
+            await self.supabase.db.table("mcp_sync_log").insert(rows, returning="minimal").execute()
+            await self.supabase.db.table("mcp_sync_sessions")\
+                .update({
+                    "completed_suppliers": len([r for r in results if r["status"] == "success"]),
+                    "failed_suppliers": len([r for r in results if r["status"] in ["failed", "error"]]),
+                }, returning="minimal")\
+                .eq("id", self.session_id)\
+                .execute()
+            logger.debug("sync_log_flushed", rows=len(rows), done=len(results), total=total)
+        except Exception as e:
+            logger.error("sync_log_flush_failed", rows=len(rows), error=str(e))
+
+    async def _last_durations(self) -> Dict[str, float]:
+        """Most recent sync duration per supplier, for scheduling the slow ones first."""
+        try:
+            response = await self.supabase.db.table("mcp_sync_log")\
+                .select("supplier_name, duration_seconds")\
+                .order("created_at", desc=True)\
+                .limit(100)\
+                .execute()
+            durations: Dict[str, float] = {}
+            for row in response.data or []:
+                if row.get("duration_seconds") is not None:
+                    durations.setdefault(row["supplier_name"], float(row["duration_seconds"]))
+            return durations
+        except Exception as e:
+            logger.warning("sync_durations_fetch_failed", error=str(e))
+            return {}
+
+    async def sync_all(self, concurrency: Optional[int] = None) -> Dict:
+        """Sync all enabled MCP servers, ``concurrency`` at a time over one pooled client.
+
+        Suppliers start by priority, slowest (by last run) first, so the run
+        takes about as long as the slowest supplier rather than the sum.
+        """
+        config = get_config()
+        concurrency = max(1, concurrency or config.mcp_sync_concurrency)
+        enabled = [s for s in MCP_SERVERS if s["enabled"]]
+        for server in MCP_SERVERS:
+            if not server["enabled"]:
+                logger.info("sync_supplier_skipped", supplier=server["name"])
+
+        logger.info("sync_all_start", total_servers=len(enabled), concurrency=concurrency)
         
         # Create sync session in database
         session_data = {
             "started_at": datetime.now().isoformat(),
             "status": "running",
-            "total_suppliers": len([s for s in MCP_SERVERS if s["enabled"]]),
+            "total_suppliers": len(enabled),
             "completed_suppliers": 0,
             "failed_suppliers": 0
         }
         
-        session_response = self.supabase.client.table("mcp_sync_sessions")\
+        session_response = await self.supabase.db.table("mcp_sync_sessions")\
             .insert(session_data)\
             .execute()
         
         self.session_id = session_response.data[0]["id"]
-        
-        # Sync each server sequentially
+
+        durations = await self._last_durations()
+        ordered = sorted(enabled, key=lambda s: (s.get("priority", 100), -durations.get(s["name"], 0.0)))
+
+        # Sync suppliers concurrently; log rows are written in batches as they finish
         results = []
-        for server in MCP_SERVERS:
-            if not server["enabled"]:
-                logger.info("sync_supplier_skipped", supplier=server["name"])
-                continue
-            
-            result = await self.sync_supplier(server)
-            results.append(result)
-            
-            # Log to database
-            self.supabase.client.table("mcp_sync_log")\
-                .insert({
-                    "session_id": self.session_id,
-                    "supplier_name": result["supplier"],
-                    "status": result["status"],
-                    "duration_seconds": result["duration"],
-                    "output": result["output"],
-                    "error": result["error"]
-                })\
-                .execute()
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async with self._http_client(concurrency) as client:
+
+            async def _run(server: Dict) -> Dict:
+                async with semaphore:
+                    result = await self.sync_supplier(server, client)
+                results.append(result)
+                self._log_buffer.append(self._log_row(result))
+                if len(self._log_buffer) >= config.mcp_sync_log_batch_size:
+                    await self._flush_logs(results, len(ordered))
+                return result
+
+            started = time.monotonic()
+            ordered_results = await asyncio.gather(*(_run(server) for server in ordered))
+
+        await self._flush_logs(results, len(ordered))
+        results = list(ordered_results)
         
         # Update session
         completed = len([r for r in results if r["status"] == "success"])
         failed = len([r for r in results if r["status"] in ["failed", "error"]])
         
-        self.supabase.client.table("mcp_sync_sessions")\
+        await self.supabase.db.table("mcp_sync_sessions")\
             .update({
                 "completed_at": datetime.now().isoformat(),
                 "status": "completed" if failed == 0 else "partial",
@@ -304,7 +413,9 @@ class MCPSyncOrchestrator:
         logger.info("sync_all_complete",
                    completed=completed,
                    failed=failed,
-                   total=len(results))
+                   total=len(results),
+                   wall_seconds=round(time.monotonic() - started, 1),
+                   supplier_seconds=round(sum(r["duration"] for r in results), 1))
 
         # Auto-link products after sync completes
         auto_link_result = await self._run_auto_link()
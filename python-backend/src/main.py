@@ -9,6 +9,9 @@ from fastapi.responses import JSONResponse
 
 from src.agents.email_agent import get_email_agent
 from src.agents.orders_agent import get_orders_agent
+from src.connectors.db_executor import shutdown_db_executor
+from src.connectors.opencart import close_opencart_pools, get_opencart_connector
+from src.connectors.supabase_async import close_async_supabase
 from src.utils.config import get_config
 from src.utils.logging import get_logger, setup_logging
 from src.scheduler.jobs import start_scheduler
@@ -102,6 +105,10 @@ async def lifespan(app: FastAPI):
         except asyncio.CancelledError:
             pass
 
+    shutdown_db_executor()
+    close_opencart_pools()
+    await close_async_supabase()
+
 
 # Create FastAPI app
 app = FastAPI(
@@ -164,6 +171,7 @@ async def health_check():
             "agents": {
                 "EmailManagementAgent": config.agent_enabled.get("EmailManagementAgent", False),
             },
+            "opencart_db_pool": get_opencart_connector().pool_stats(),
         }
     except Exception as e:
         logger.error("health_check_failed", error=str(e))
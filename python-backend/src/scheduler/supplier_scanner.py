@@ -100,7 +100,7 @@ class SupplierScanner:
         # Check if 'products' table has a supplier_sku field or if 'sku' is the supplier sku.
         # Based on user description: "Scanner finds Item A. System looks up A in products table"
         
-        response = self.supabase.client.table("products")\
+        response = await self.supabase.db.table("products")\
             .select("id, sku")\
             .eq("sku", supplier_sku)\
             .execute()
@@ -113,7 +113,7 @@ class SupplierScanner:
         internal_product_id = response.data[0]["id"]
 
         # 2. Find OpenCart ID from product_matches table
-        match_response = self.supabase.client.table("product_matches")\
+        match_response = await self.supabase.db.table("product_matches")\
             .select("opencart_product_id")\
             .eq("internal_product_id", internal_product_id)\
             .execute()
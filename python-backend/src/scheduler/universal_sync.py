@@ -1,5 +1,4 @@
-import asyncio
-from typing import Dict, List, Any
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 from src.connectors.supabase import get_supabase_connector
 from src.connectors.opencart import get_opencart_connector
@@ -25,29 +24,43 @@ class UniversalProductSyncer:
         stats = {"total": 0, "updated": 0, "skipped": 0, "errors": 0}
 
         try:
-            # 1. Fetch all matches
-            # 1. Fetch all matches
-            matches_response = await asyncio.to_thread(
-                lambda: self.supabase.client.table("product_matches")
-                .select("internal_product_id, opencart_product_id")
-                .execute()
-            )
-            
-            all_matches = matches_response.data
+            # 1. Fetch all matches (every page, not just the first row-capped one)
+            all_matches = await self.supabase.db.stream(
+                "product_matches", "internal_product_id, opencart_product_id", partitions=2,
+            ).to_list()
             matches = [m for m in all_matches if m.get('opencart_product_id')]
             
             stats["total"] = len(matches)
             logger.info("found_linked_products", total_raw=len(all_matches), valid_links=len(matches))
 
+            # 2. Bulk-load both sides instead of two lookups per product
+            internal_ids = list({m['internal_product_id'] for m in matches})
+            sb_products = await self._fetch_supabase_products(internal_ids)
+            oc_products = await self.opencart.get_products_by_ids(
+                [m['opencart_product_id'] for m in matches]
+            )
+
+            pending: Dict[int, Dict[str, Any]] = {}
             for match in matches:
                 try:
-                    await self._sync_single_product(match, dry_run, stats)
+                    await self._sync_single_product(
+                        match,
+                        sb_products.get(match['internal_product_id']),
+                        oc_products.get(int(match['opencart_product_id'])),
+                        dry_run,
+                        stats,
+                        pending,
+                    )
                 except Exception as e:
                     stats["errors"] += 1
                     logger.error("sync_failed_for_product", 
                                  internal_id=match.get('internal_product_id'), 
                                  error=str(e))
 
+            # 3. Push every price/stock change in one coalesced bulk write
+            if pending:
+                await self._apply_updates(pending, stats)
+
             logger.info("universal_sync_completed", stats=stats)
             return stats
 
@@ -55,40 +68,46 @@ class UniversalProductSyncer:
             logger.error("universal_sync_fatal_error", error=str(e))
             return stats
 
-    async def _sync_single_product(self, match: Dict, dry_run: bool, stats: Dict):
-        """Sync a single product record."""
-        internal_id = match['internal_product_id']
+    async def _fetch_supabase_products(self, internal_ids: List[str], chunk_size: int = 100) -> Dict[str, Dict]:
+        """Load price/stock for many Supabase products, keyed by id."""
+        products: Dict[str, Dict] = {}
+        for start in range(0, len(internal_ids), chunk_size):
+            chunk = internal_ids[start:start + chunk_size]
+            res = await self.supabase.db.table("products")\
+                .select("id, sku, selling_price, total_stock, product_name")\
+                .in_("id", chunk)\
+                .execute()
+            for row in res.data or []:
+                products[row['id']] = row
+        return products
+
+    async def _sync_single_product(
+        self,
+        match: Dict,
+        product: Optional[Dict],
+        oc_product: Optional[Dict],
+        dry_run: bool,
+        stats: Dict,
+        pending: Dict[int, Dict[str, Any]],
+    ):
+        """Compare one linked product and queue its OpenCart update in ``pending``."""
         oc_id = match['opencart_product_id']
         
         if not oc_id: 
             return # Should be filtered already data logic check
 
-        # 1. Get current Supabase Data
-        # 1. Get current Supabase Data
-        p_res = await asyncio.to_thread(
-            lambda: self.supabase.client.table("products")
-            .select("sku, selling_price, total_stock, product_name")
-            .eq("id", internal_id)
-            .limit(1)
-            .execute()
-        )
-        
-        if not p_res.data:
-            # logger.warning("linked_product_missing_in_db", internal_id=internal_id) # Optional: reduce noise
+        # 1. Current Supabase Data
+        if not product:
+            # logger.warning("linked_product_missing_in_db", internal_id=match["internal_product_id"]) # Optional: reduce noise
             stats["errors"] += 1
             return
 
-        product = p_res.data[0]
-
         sb_price_raw = float(product.get('selling_price') or 0)
         sb_price = round(sb_price_raw / 10) * 10 if sb_price_raw > 0 else 0  # Round to nearest R10
         sb_stock = int(product.get('total_stock') or 0)
         sku = product.get('sku', 'unknown')
 
-        # 2. Get current OpenCart Data (to check if update matches)
-        # Note: Ideally we just overwrite to be safe, but fetching helps us log "Changes"
-        # For efficiency we could skip fetching and just update, but checking is safer for logging.
-        oc_product = await self.opencart.get_product_by_id(oc_id)
+        # 2. Current OpenCart Data (to check if update matches)
         if not oc_product:
              logger.warning("linked_product_missing_in_opencart", oc_id=oc_id)
              stats["errors"] += 1
@@ -109,16 +128,31 @@ class UniversalProductSyncer:
             }
 
             if not dry_run:
-                # Execute Updates
+                # Queue updates; applied together by _apply_updates
+                update = pending.setdefault(int(oc_id), {"product_id": int(oc_id), "log": req_log})
                 if price_differs:
-                    await self.opencart.update_product_price(oc_id, sb_price)
+                    update["price"] = sb_price
                 if stock_differs:
-                    await self.opencart.update_product_stock(oc_id, sb_stock)
-                
-                logger.info("product_synced", **req_log)
-                stats["updated"] += 1
+                    update["quantity"] = sb_stock
             else:
                 logger.info("dry_run_would_update", **req_log)
                 stats["skipped"] += 1 # Counted as skipped in dry run
         else:
             stats["skipped"] += 1
+
+    async def _apply_updates(self, pending: Dict[int, Dict[str, Any]], stats: Dict):
+        """Write queued changes with one bulk update and record per-product outcomes."""
+        result = await self.opencart.bulk_update_products(
+            [{k: v for k, v in update.items() if k != "log"} for update in pending.values()]
+        )
+        for row in result["results"]:
+            update = pending.get(row["product_id"])
+            if row["status"] == "updated":
+                logger.info("product_synced", **(update["log"] if update else {}))
+                stats["updated"] += 1
+            else:
+                stats["errors"] += 1
+                logger.error("sync_failed_for_product",
+                             oc_id=row["product_id"],
+                             status=row["status"],
+                             error=row.get("error"))
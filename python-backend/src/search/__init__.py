@@ -0,0 +1 @@
+"""In-memory product search over the OpenCart catalog."""
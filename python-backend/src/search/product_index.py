@@ -0,0 +1,308 @@
+"""Token/trigram inverted index over active OpenCart product names.
+
+Answers the same queries as OpenCartConnector.search_products_by_name and
+search_products_by_name_or from memory, refreshing incrementally from
+``date_modified`` instead of running LIKE scans per query.
+"""
+import asyncio
+import contextlib
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from src.connectors.db_executor import run_blocking
+from src.connectors.opencart import OpenCartConnector, get_opencart_connector
+from src.search.text import cascade_name_search, content_words, dashless
+from src.utils.config import get_config
+from src.utils.logging import AgentLogger
+
+logger = AgentLogger("ProductSearchIndex")
+
+# Fields returned to callers, matching the connector's search results
+RESULT_FIELDS = ("product_id", "model", "sku", "quantity", "price", "name", "manufacturer")
+
+SEARCH_LIMIT = 50
+OR_SEARCH_LIMIT = 30
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _tokens(name_lower: str) -> Set[str]:
+    """Word tokens plus their dash-normalized form ('rp-1400sw' -> rp, 1400sw, rp1400sw)."""
+    return set(re.findall(r'\w+', name_lower)) | set(re.findall(r'\w+', name_lower.replace('-', '')))
+
+
+class ProductSearchIndex:
+    """In-memory search index of active OpenCart products.
+
+    Thread-safe: refreshes are applied on the DB executor while searches
+    run on the event loop; incremental updates and searches share one lock.
+    ``version`` increases whenever the indexed data changes.
+    """
+
+    def __init__(self, opencart: Optional[OpenCartConnector] = None):
+        self.oc = opencart or get_opencart_connector()
+        self.config = get_config()
+
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+
+        self._docs: Dict[int, Dict[str, Any]] = {}
+        self._names: Dict[int, Tuple[str, str]] = {}  # product_id -> (lower name, dashless name)
+        self._trigram_index: Dict[str, Set[int]] = {}  # over dashless names
+        self._token_index: Dict[str, Set[int]] = {}
+
+        self._watermark: Optional[Any] = None  # newest date_modified seen
+        self._max_product_id = 0
+        self._loaded = False
+        self._last_refresh = float('-inf')
+        self._last_full = float('-inf')
+        self.version = 0
+
+    # ------------------------------------------------------------------
+    # Refresh
+    # ------------------------------------------------------------------
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    async def ensure_fresh(self, force: bool = False) -> None:
+        """Load or incrementally refresh the index if it is due.
+
+        Concurrent callers don't stack refreshes: while one runs, others
+        keep searching the current data (or wait for the first load).
+        """
+        now = time.monotonic()
+        full_due = now - self._last_full >= self.config.search_index_full_rebuild_seconds
+        if not force and not full_due and now - self._last_refresh < self.config.search_index_refresh_seconds:
+            return
+
+        if not self._refresh_lock.acquire(blocking=False):
+            while not self._loaded and self._refresh_lock.locked():
+                await asyncio.sleep(0.05)
+            return
+
+        try:
+            full = full_due or not self._loaded
+            changed = await run_blocking(self._load, full)
+            self._last_refresh = time.monotonic()
+            if full:
+                self._last_full = self._last_refresh
+            if changed:
+                logger.info("search_index_refreshed", full=full,
+                            changed=changed, products=len(self._docs), version=self.version)
+        finally:
+            self._refresh_lock.release()
+
+    def _load(self, full: bool) -> int:
+        """Read catalog rows and apply them (runs on the DB executor).
+
+        A full rebuild indexes straight off the streamed batches; an
+        incremental refresh is small, so it is read before taking the lock.
+        """
+        if full:
+            rows = (row for batch in self.oc.iter_catalog_rows() for row in batch)
+            return self._apply_rows(rows, full=True)
+        rows = self.oc._select_catalog_rows(self._watermark, self._max_product_id)
+        return self._apply_rows(rows, full=False)
+
+    def _apply_rows(self, rows: Iterable[Dict[str, Any]], full: bool) -> int:
+        if full:
+            docs, names, trigram_index, token_index = {}, {}, {}, {}
+            watermark, max_id = None, 0
+        else:
+            docs, names = self._docs, self._names
+            trigram_index, token_index = self._trigram_index, self._token_index
+            watermark, max_id = self._watermark, self._max_product_id
+
+        changed = 0
+        # A full rebuild fills fresh structures and swaps them in, so searches
+        # only wait on the lock for incremental updates and the final swap.
+        with (contextlib.nullcontext() if full else self._lock):
+            for row in rows:
+                pid = row['product_id']
+                max_id = max(max_id, pid)
+                modified = row.get('date_modified')
+                if modified is not None and (watermark is None or modified > watermark):
+                    watermark = modified
+
+                if pid in names:
+                    self._unindex(pid, names, trigram_index, token_index)
+                    docs.pop(pid, None)
+                    changed += 1
+
+                name = row.get('name') or ''
+                if row.get('status') != 1 or not name:
+                    continue
+
+                lower = name.lower()
+                flat = dashless(name)
+                docs[pid] = {field: row.get(field) for field in RESULT_FIELDS}
+                names[pid] = (lower, flat)
+                for gram in _trigrams(flat):
+                    trigram_index.setdefault(gram, set()).add(pid)
+                for token in _tokens(lower):
+                    token_index.setdefault(token, set()).add(pid)
+                changed += 1
+
+        with self._lock:
+            if full:
+                changed = len(docs)
+                self._docs, self._names = docs, names
+                self._trigram_index, self._token_index = trigram_index, token_index
+            self._watermark, self._max_product_id = watermark, max_id
+            self._loaded = True
+            if changed:
+                self.version += 1
+        return changed
+
+    @staticmethod
+    def _unindex(pid: int, names, trigram_index, token_index) -> None:
+        lower, flat = names.pop(pid)
+        for gram in _trigrams(flat):
+            postings = trigram_index.get(gram)
+            if postings is not None:
+                postings.discard(pid)
+                if not postings:
+                    del trigram_index[gram]
+        for token in _tokens(lower):
+            postings = token_index.get(token)
+            if postings is not None:
+                postings.discard(pid)
+                if not postings:
+                    del token_index[token]
+
+    # ------------------------------------------------------------------
+    # Queries (in memory)
+    # ------------------------------------------------------------------
+
+    def _substring_ids(self, term: str) -> Set[int]:
+        """Product ids whose dashless name may contain ``term`` (exact for len >= 3 after verify)."""
+        if len(term) < 3:
+            return set(self._names)
+        grams = sorted(_trigrams(term), key=lambda g: len(self._trigram_index.get(g, ())))
+        ids: Optional[Set[int]] = None
+        for gram in grams:
+            postings = self._trigram_index.get(gram)
+            if not postings:
+                return set()
+            ids = set(postings) if ids is None else ids & postings
+            if not ids:
+                return ids
+        return ids or set()
+
+    def _match_all(self, words: List[str], normalized: bool) -> List[Dict[str, Any]]:
+        """Products whose (dashless, if normalized) name contains every word."""
+        if not words:
+            return []
+        terms = [dashless(w) if normalized else w.lower() for w in words]
+        field = 1 if normalized else 0
+        with self._lock:
+            candidates: Optional[Set[int]] = None
+            for term in sorted(terms, key=len, reverse=True):
+                if len(term) < 3:
+                    continue
+                ids = self._substring_ids(dashless(term))
+                candidates = ids if candidates is None else candidates & ids
+                if not candidates:
+                    return []
+            if candidates is None:
+                candidates = set(self._names)
+
+            hits = sorted(
+                pid for pid in candidates
+                if all(term in self._names[pid][field] for term in terms)
+            )[:SEARCH_LIMIT]
+            return [dict(self._docs[pid]) for pid in hits]
+
+    def search(self, query: str) -> List[Dict[str, Any]]:
+        """Progressive-relaxation AND search (same strategies as the MySQL search)."""
+        results, _ = cascade_name_search(
+            query,
+            lambda words: self._match_all(words, normalized=False),
+            lambda words: self._match_all(words, normalized=True),
+        )
+        return results[:SEARCH_LIMIT]
+
+    def search_or(self, query: str, min_word_matches: int = 2) -> List[Dict[str, Any]]:
+        """Products sharing at least ``min_word_matches`` significant words, best first."""
+        sig_words = content_words(query)
+        if len(sig_words) < 2:
+            return []
+
+        counts: Dict[int, int] = {}
+        with self._lock:
+            for word in sig_words[:8]:  # Cap at 8 words, like the SQL version
+                term = dashless(word)
+                for pid in self._substring_ids(term):
+                    if term in self._names[pid][1]:
+                        counts[pid] = counts.get(pid, 0) + 1
+
+            ranked = sorted(
+                (pid for pid, count in counts.items() if count >= min_word_matches),
+                key=lambda pid: (-counts[pid], pid),
+            )[:OR_SEARCH_LIMIT]
+            return [dict(self._docs[pid]) for pid in ranked]
+
+    def products_with_tokens(self, tokens: Iterable[str]) -> Dict[int, int]:
+        """Count, per product, how many of ``tokens`` appear as whole name tokens.
+
+        Tokens include dash-normalized model numbers, so 'rp1400sw' finds
+        'RP-1400SW'.
+        """
+        counts: Dict[int, int] = {}
+        with self._lock:
+            for token in set(tokens):
+                for pid in self._token_index.get(token.lower(), ()):
+                    counts[pid] = counts.get(pid, 0) + 1
+        return counts
+
+    def get(self, product_id: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            doc = self._docs.get(product_id)
+            return dict(doc) if doc else None
+
+    # ------------------------------------------------------------------
+    # Drop-in async equivalents of the connector methods
+    # ------------------------------------------------------------------
+
+    async def search_products_by_name(self, query: str) -> List[Dict]:
+        """In-memory search_products_by_name; falls back to MySQL if the index can't load."""
+        if not await self.ready():
+            return await self.oc.search_products_by_name(query)
+        return self.search(query)
+
+    async def search_products_by_name_or(self, query: str, min_word_matches: int = 2) -> List[Dict]:
+        """In-memory search_products_by_name_or; falls back to MySQL if the index can't load."""
+        if not await self.ready():
+            return await self.oc.search_products_by_name_or(query, min_word_matches)
+        return self.search_or(query, min_word_matches)
+
+    async def ready(self) -> bool:
+        """Refresh if due; False means the index never loaded (use the MySQL searches)."""
+        try:
+            await self.ensure_fresh()
+        except Exception as e:
+            # Keep serving stale data if we have any; retry on the next interval
+            self._last_refresh = time.monotonic()
+            logger.error("search_index_refresh_failed", error=str(e), loaded=self._loaded)
+        return self._loaded
+
+
+# Global instance
+_product_search_index: Optional[ProductSearchIndex] = None
+
+
+def get_product_search_index() -> ProductSearchIndex:
+    """Get or create the process-wide product search index."""
+    global _product_search_index
+    if _product_search_index is None:
+        _product_search_index = ProductSearchIndex()
+    return _product_search_index
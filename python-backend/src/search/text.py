@@ -0,0 +1,128 @@
+"""Shared tokenization and name-search strategy cascade.
+
+Used by both the MySQL search in OpenCartConnector and the in-memory
+ProductSearchIndex so the two always apply the same relaxation rules.
+"""
+import re
+from typing import Any, Callable, Dict, List, Tuple
+
+# Common stop words that hurt matching
+STOP_WORDS = frozenset({
+    'the', 'and', 'with', 'for', 'from', 'free', 'new', 'pro',
+    'series', 'edition', 'version', 'model', 'type', 'style',
+    'pair', 'set', 'kit', 'pack', 'bundle', 'combo', 'single',
+    'matte', 'gloss', 'active', 'passive', 'powered', 'wireless',
+    'wired', 'portable', 'indoor', 'outdoor', 'heritage',
+    'inspired', 'premium', 'standard', 'basic', 'advanced',
+    'eua', 'usa', 'black', 'white', 'silver', 'walnut', 'oak',
+    'ebony', 'cherry', 'each', 'per', 'channel', 'zone',
+    'way', 'system', 'monitor', 'speaker', 'amplifier', 'receiver',
+    'player', 'cable', 'adapter', 'mount', 'stand', 'bracket',
+    'inch', 'mm', 'cm', 'watts', 'watt', 'ohm', 'ohms',
+})
+
+SearchFn = Callable[[List[str]], List[Dict[str, Any]]]
+
+
+def significant_words(text: str) -> List[str]:
+    """Lowercase words longer than 2 chars, or containing a digit."""
+    words = re.findall(r'\w+', (text or '').lower())
+    return [w for w in words if len(w) > 2 or any(c.isdigit() for c in w)]
+
+
+def content_words(text: str) -> List[str]:
+    """Significant words with stop words removed."""
+    return [w for w in significant_words(text) if w not in STOP_WORDS]
+
+
+def is_model_number(word: str) -> bool:
+    """Words with both letters and digits (e.g. rp1400sw, ht50d)."""
+    return bool(re.search(r'[a-z]', word)) and bool(re.search(r'\d', word))
+
+
+def dashless(text: str) -> str:
+    """Lowercase and drop dashes, so RP-1400SW and RP1400SW compare equal."""
+    return (text or '').lower().replace('-', '')
+
+
+def cascade_name_search(
+    query: str,
+    run_search: SearchFn,
+    run_normalized_search: SearchFn,
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """Run the progressive-relaxation name search.
+
+    ``run_search`` must return products whose lowercased name contains every
+    word; ``run_normalized_search`` the same with dashes stripped from both
+    sides. Results are de-duplicated by product_id in discovery order.
+
+    Returns:
+        (results, info) where info holds core_words / model_numbers / total_words
+    """
+    all_sig_words = significant_words(query)
+    if not all_sig_words:
+        return [], {"core_words": [], "model_numbers": [], "total_words": 0}
+
+    model_numbers = [w for w in all_sig_words if is_model_number(w)]
+
+    # Split into core words (brand/model) and descriptor words
+    core_words = [w for w in all_sig_words if w not in STOP_WORDS]
+    if not core_words:
+        core_words = all_sig_words[:3]
+
+    results: List[Dict[str, Any]] = []
+    seen_ids = set()
+
+    def _collect(new_results):
+        """Add new results avoiding duplicates."""
+        for r in new_results:
+            if r['product_id'] not in seen_ids:
+                results.append(r)
+                seen_ids.add(r['product_id'])
+
+    # Strategy 1: AND with all significant words (strictest)
+    _collect(run_search(all_sig_words))
+
+    # Strategy 2: Same but with dash-normalized search (RP1400SW matches RP-1400SW)
+    if len(results) < 5:
+        _collect(run_normalized_search(all_sig_words))
+
+    # Strategy 3: AND with core words only (no stop words)
+    if len(results) < 5 and core_words != all_sig_words:
+        _collect(run_search(core_words))
+        if len(results) < 5:
+            _collect(run_normalized_search(core_words))
+
+    # Strategy 4: Model number search - brand + model number only
+    # e.g. "Klipsch" + "RP1400SW" → matches "KLIPSCH RP-1400SW ..."
+    if len(results) < 5 and model_numbers and core_words:
+        brand = core_words[0]
+        for model in model_numbers:
+            _collect(run_normalized_search([brand, model]))
+            if len(results) >= 10:
+                break
+
+    # Strategy 5: Progressive relaxation - drop words from end of core
+    if len(results) < 5 and len(core_words) > 2:
+        for n in range(len(core_words) - 1, max(1, len(core_words) // 2) - 1, -1):
+            subset = core_words[:n]
+            _collect(run_search(subset))
+            if len(results) < 5:
+                _collect(run_normalized_search(subset))
+            if len(results) >= 10:
+                break
+
+    # Strategy 6: Brand + any one other core word
+    if len(results) < 5 and len(core_words) >= 2:
+        brand = core_words[0]
+        for extra_word in core_words[1:4]:
+            _collect(run_search([brand, extra_word]))
+            if len(results) >= 20:
+                break
+
+    info = {
+        "core_words": core_words,
+        "model_numbers": model_numbers,
+        "total_words": len(all_sig_words),
+    }
+    return results, info
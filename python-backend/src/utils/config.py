@@ -53,6 +53,14 @@ class Config(BaseSettings):
     supabase_service_role_key: str
     supabase_anon_key: Optional[str] = None
 
+    # Async PostgREST client (src.connectors.supabase_async)
+    supabase_http_max_connections: int = 20  # Keep-alive pool size per event loop
+    supabase_http_max_concurrency: int = 10  # Requests in flight per event loop
+    supabase_http_timeout: float = 30.0  # Read/write/pool timeout (seconds)
+    supabase_http_connect_timeout: float = 10.0
+    supabase_http_max_retries: int = 3  # Retries on 429/5xx and connection errors
+    supabase_http_backoff_base: float = 0.5  # First retry delay (seconds), doubled each attempt
+
     # OpenCart Configuration
     opencart_base_url: Optional[str] = None
     opencart_client_id: Optional[str] = None
@@ -68,6 +76,45 @@ class Config(BaseSettings):
     opencart_db_name: Optional[str] = None
     opencart_table_prefix: str = "oc_"
 
+    # OpenCart Database connection pool
+    opencart_db_pool_min_size: int = 1
+    opencart_db_pool_max_size: int = 10
+    opencart_db_pool_recycle_seconds: int = 300  # Drop connections idle longer than this
+    opencart_db_pool_acquire_timeout: float = 10.0
+    opencart_db_query_timeout: int = 60  # Socket read/write timeout per query (seconds)
+    opencart_db_call_timeout: float = 120.0  # Deadline for one offloaded connector call
+    opencart_db_stream_fetch_size: int = 2000  # Rows per batch for streamed (server-side cursor) scans
+    opencart_key_index_refresh_seconds: int = 300  # Max staleness of the normalized SKU/model index
+
+    # In-memory product name search index
+    search_index_refresh_seconds: int = 60  # Incremental refresh from date_modified
+    search_index_full_rebuild_seconds: int = 3600  # Full reload (drops deleted products)
+
+    # Shared OpenCart catalog snapshot
+    catalog_snapshot_max_age_seconds: int = 60  # Incremental refresh from date_modified
+    catalog_snapshot_full_reload_seconds: int = 3600  # Full reload (drops deleted products)
+
+    # Persisted auto-link name index (src.aligner.match_artifact)
+    match_index_dir: str = ".cache/match_index"
+    match_index_rebuild_seconds: int = 86400  # Re-tokenize the whole catalog at least this often
+    match_index_max_overlay_ratio: float = 0.1  # Rewrite the files once deltas exceed this share of rows
+    auto_link_fuzzy_workers: int = -1  # rapidfuzz threads for pass-2 scoring (-1 = all cores)
+    alignment_job_stale_seconds: int = 300  # A running job without a heartbeat this long is resumed
+    alignment_job_chunk_size: int = 1000  # Products per checkpoint (bulk align, auto-link pass 2)
+    reverse_import_concurrency: int = 4  # Reverse-import chunks inserted at the same time
+
+    # MCP supplier sync orchestration (src.jobs.sync_all_suppliers)
+    mcp_sync_concurrency: int = 4  # Suppliers synced at the same time
+    mcp_sync_max_wait_seconds: int = 300  # Give up polling a supplier's sync after this long
+    mcp_sync_poll_initial_seconds: float = 2.0  # First /sync-status poll, then backs off
+    mcp_sync_poll_max_seconds: float = 30.0
+    mcp_sync_log_batch_size: int = 5  # mcp_sync_log rows written per insert
+
+    # Incremental OpenCart order sync
+    orders_sync_page_size: int = 200  # Changed orders fetched per keyset page
+    orders_sync_backfill_days: int = 0  # First run: trackers-only backfill this far back (0 = start at newest order)
+    orders_sync_overlap_seconds: int = 2  # Re-read before the saved cursor (date_modified has 1s resolution)
+
     # Shiplogic API
     shiplogic_api_key: Optional[str] = None
     ship_logic_api_key: Optional[str] = None